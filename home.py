@@ -1,8 +1,12 @@
 import streamlit as st
-import pandas as pd
-import io
+import time
 from supabase import create_client
-from streamlit import cache_data
+from utils.carregamento import carregar_tabelas, sincronizar_tabelas
+from utils.dimensoes import registro_da_sessao
+from utils.cache_disco import TTL_PADRAO, carregar_snapshot, info_snapshot, salvar_snapshot
+from utils.cache_escopo import espaco_cache, estatisticas_cache, limpar_espaco
+from utils.compartilhado import apelidar_registro, obter_registro, publicar_registro
+from utils.exportacao import botao_exportar
 
 # Configuração do Supabase
 SUPABASE_URL = 'https://lwklfogmduwitmbqbgyp.supabase.co'
@@ -50,7 +54,8 @@ Essa jornada busca entender o desempenho agronômico dos materiais, auxiliando n
 
 st.markdown("""
 Esta página é responsável por **carregar, integrar e exibir os dados das avaliações** de soja diretamente do banco Supabase.
-Você pode optar por carregar com cache (mais rápido) ou buscar os dados mais atualizados (mais lento).
+Você pode optar por carregar com cache (mais rápido), buscar os dados mais atualizados (mais lento)
+ou sincronizar apenas as alterações feitas desde a última carga (incremental).
 """)
 
 # Tabelas a serem carregadas
@@ -59,128 +64,119 @@ TABELAS = [
     "av6TratamentoSoja", "av7TratamentoSoja", "avaliacao", "fazenda", "cidade", "estado", "tratamentoBase", "users"
 ]
 
-# Função para buscar dados do Supabase com cache
-@cache_data
-def fetch_table(table_name):
-    try:
-        response = supabase.table(table_name).select("*").execute()
-        if hasattr(response, 'error') and response.error:
-            st.error(f"Erro ao obter dados da tabela {table_name}: {response.error}")
-            return pd.DataFrame()
-        return pd.DataFrame(response.data)
-    except Exception as e:
-        st.error(f"Erro ao processar a tabela {table_name}: {str(e)}")
-        return pd.DataFrame()
+# Função para buscar dados do Supabase com cache (paginado e em paralelo)
+# cache_resource: todas as sessões recebem os mesmos DataFrames (somente leitura), sem cópia por sessão
+# Espaço de cache "supabase": limpo só pelo botão "sem cache" desta página
+@espaco_cache("supabase", ttl=TTL_PADRAO).memorizar(recurso=True, show_spinner="Carregando tabelas do Supabase...")
+def fetch_tables(tabelas):
+    dataframes, relatorio = carregar_tabelas(supabase, list(tabelas))
+    return dataframes, relatorio, time.time()
+
+# 📦 Usa o snapshot em disco (se ainda estiver dentro do TTL) sem acessar a rede
+def carregar_do_disco():
+    manifesto = info_snapshot()
+    if manifesto is None or manifesto["idade"] > TTL_PADRAO:
+        return False
+    # Outra sessão já leu esta versão: só aponta para o mesmo registro
+    registro = obter_registro(f"disco-{manifesto['versao']}")
+    if registro is None:
+        snapshot = carregar_snapshot()
+        if snapshot is None:
+            return False
+        dataframes, merged, manifesto = snapshot
+        registro = publicar_registro(f"disco-{manifesto['versao']}", dataframes, merged)
+    st.session_state["dataframes"] = registro.dataframes
+    st.session_state["merged_dataframes"] = registro
+    return True
+
+def carregar_dados_supabase(usar_disco=True):
+    if usar_disco and carregar_do_disco():
+        return
+    dataframes, relatorio, carregado_em = fetch_tables(tuple(TABELAS))
+    for _, linha in relatorio[relatorio["Erro"] != ""].iterrows():
+        st.error(f"Erro ao processar a tabela {linha['Tabela']}: {linha['Erro']}")
+    st.session_state["dataframes"] = dataframes
+    st.session_state["merged_dataframes"] = publicar_registro(f"supabase-{carregado_em}", dataframes)
+    st.session_state["relatorio_carregamento"] = relatorio
+    if relatorio["Erro"].eq("").all():
+        st.session_state["salvar_cache_disco"] = carregado_em
+
+# Busca só as linhas alteradas desde a última carga e mescla por uuid
+def sincronizar_dados_supabase():
+    if "dataframes" in st.session_state:
+        snapshots = st.session_state["dataframes"]
+    else:
+        snapshots = fetch_tables(tuple(TABELAS))[0]
+    with st.spinner("Sincronizando alterações do Supabase..."):
+        dataframes, relatorio = sincronizar_tabelas(supabase, snapshots, TABELAS)
+    for _, linha in relatorio[relatorio["Erro"] != ""].iterrows():
+        st.error(f"Erro ao sincronizar a tabela {linha['Tabela']}: {linha['Erro']}")
+    sincronizado_em = time.time()
+    st.session_state["dataframes"] = dataframes
+    st.session_state["merged_dataframes"] = publicar_registro(f"sync-{sincronizado_em}", dataframes)
+    st.session_state["relatorio_carregamento"] = relatorio
+    st.session_state["salvar_cache_disco"] = sincronizado_em
+
+# Ao abrir o app, aquece a sessão a partir do cache em disco
+if "dataframes" not in st.session_state:
+    carregar_do_disco()
 
 # Botão para carregar os dados do Supabase
-col1, col2, col3 = st.columns([2.5, 2.5, 6]) # proporcional: 25%, 25%, 60%
+col1, col2, col3, col4 = st.columns([2.5, 2.5, 2.5, 3.5]) # proporcional: 23%, 23%, 23%, 31%
 
 with col1:
     st.markdown("✅ Usa dados em cache (mais rápido).")
     if st.button("🔄 Carregar Dados do Supabase (com cache)"):
-        dataframes = {tabela: fetch_table(tabela) for tabela in TABELAS}
-        st.session_state["dataframes"] = dataframes
+        carregar_dados_supabase()
         st.success("✅ Dados carregados e armazenados!")
 
 with col2:
     st.markdown("⚠️ Atualiza dados direto do Supabase (mais lento).")
     if st.button("♻️ Carregar Dados do Supabase (sem cache)"):
-        fetch_table.clear() # limpa o cache da função
-        dataframes = {tabela: fetch_table(tabela) for tabela in TABELAS}
-        st.session_state["dataframes"] = dataframes
+        limpar_espaco("supabase") # limpa só o cache das tabelas do Supabase
+        carregar_dados_supabase(usar_disco=False)
         st.success("✅ Dados carregados direto do Supabase!")
 
-# col3 fica vazia para ocupar o resto do espaço e alinhar botões à direita
+with col3:
+    st.markdown("⚡ Busca só o que mudou desde a última carga.")
+    if st.button("🔁 Sincronizar Alterações (incremental)"):
+        sincronizar_dados_supabase()
+        st.success("✅ Alterações sincronizadas!")
+
+# col4 fica vazia para ocupar o resto do espaço e alinhar botões à direita
 
 # Verifica se os dados já foram carregados
 if "dataframes" in st.session_state:
     dataframes = st.session_state["dataframes"]
-    avaliacao = dataframes.get("avaliacao")
-    fazenda = dataframes.get("fazenda")
-    users = dataframes.get("users")
-    cidade = dataframes.get("cidade")
-    estado = dataframes.get("estado")
-
-    # Função para realizar merges
-    def merge_with_avaliacao(df, avaliacao):
-        if df is not None and not df.empty and avaliacao is not None:
-            return df.merge(
-                avaliacao[['uuid', 'fazendaRef', 'tipoAvaliacao', 'avaliado']],
-                left_on='avaliacaoRef',
-                right_on='uuid',
-                how='left'
-            ).drop(columns=['uuid'], errors='ignore')
-        return None
-    
-    merged_dataframes = {
-        f"{tabela}_Avaliacao": merge_with_avaliacao(dataframes.get(tabela), avaliacao)
-        for tabela in ["av1TratamentoSoja", "av2TratamentoSoja", "av3TratamentoSoja", "av4TratamentoSoja", 
-                       "av5TratamentoSoja", "av6TratamentoSoja", "av7TratamentoSoja"]
-    }
-    
-    def merge_with_fazenda(df, fazenda):
-        if df is not None and not df.empty and fazenda is not None:
-            return df.merge(
-                fazenda[['uuid', 'nomeFazenda', 'nomeProdutor', 'latitude', 'longitude', 'altitude', 'regional', 'dataPlantio', 'dataColheita', 'dtcResponsavelRef', 'cidadeRef']],
-                left_on='fazendaRef',
-                right_on='uuid',
-                how='left'
-            ).drop(columns=['uuid'], errors='ignore')
-        return None
-    
-    merged_dataframes_fazenda = {
-        f"{key}_Fazenda": merge_with_fazenda(merged_dataframes[key], fazenda)
-        for key in merged_dataframes.keys()
-    }
-    
-    def merge_with_users(df, users):
-        if df is not None and not df.empty and users is not None:
-            return df.merge(
-                users[['uuid', 'displayName']],
-                left_on='dtcResponsavelRef',
-                right_on='uuid',
-                how='left'
-            ).drop(columns=['uuid'], errors='ignore')
-        return None
-    
-    merged_dataframes_users = {
-        f"{key}_Users": merge_with_users(merged_dataframes_fazenda[key], users)
-        for key in merged_dataframes_fazenda.keys()
-    }
-    
-    def merge_with_cidade(df, cidade):
-        if df is not None and not df.empty and cidade is not None:
-            return df.merge(
-                cidade[['uuid', 'nomeCidade', 'estadoRef']],
-                left_on='cidadeRef',
-                right_on='uuid',
-                how='left'
-            ).drop(columns=['uuid'], errors='ignore')
-        return None
-    
-    merged_dataframes_cidade = {
-        f"{key}_Cidade": merge_with_cidade(merged_dataframes_users[key], cidade)
-        for key in merged_dataframes_users.keys()
-    }
-
-    def merge_with_estado(df, estado):
-        if df is not None and not df.empty and estado is not None:
-            return df.merge(
-                estado[['uuid', 'codigoEstado', 'nomeEstado']],
-                left_on='estadoRef',
-                right_on='uuid',
-                how='left'
-            ).drop(columns=['uuid'], errors='ignore')
-        return None
-
-    # Aplicando a mesclagem com a tabela estado
-    merged_dataframes_estado = {
-        f"{key}_Estado": merge_with_estado(merged_dataframes_cidade[key], estado)
-        for key in merged_dataframes_cidade.keys()
-    }
-
-    # **Salvando os DataFrames no session_state para uso em outras páginas**
-    st.session_state["merged_dataframes"] = merged_dataframes_estado
+    # 🔗 Registro preguiçoso (compartilhado entre sessões) salvo no session_state:
+    # cada página monta, uma única vez, só as tabelas mescladas que usar
+    merged_dataframes_estado = registro_da_sessao(st.session_state, dataframes)
+
+    # 📦 Grava um novo snapshot em disco após uma carga/sincronização pela rede.
+    # Vão as tabelas brutas e só as mescladas já montadas; as outras continuam
+    # preguiçosas e são montadas pela página que as pedir
+    if "salvar_cache_disco" in st.session_state:
+        carregado_em = st.session_state.pop("salvar_cache_disco")
+        try:
+            versao_disco = salvar_snapshot(dataframes, merged_dataframes_estado.materializados(), criado_em=carregado_em)
+            # Sessões que aquecerem deste snapshot usam o mesmo registro (uma cópia por processo)
+            apelidar_registro(f"disco-{versao_disco}", merged_dataframes_estado)
+        except Exception as e:
+            st.warning(f"Não foi possível gravar o cache em disco: {e}")
+
+    snapshot_disco = info_snapshot()
+    if snapshot_disco is not None:
+        st.caption(f"📦 Cache em disco: versão {snapshot_disco['versao']}, "
+                   f"baixada há {snapshot_disco['idade'] / 60:.0f} min (validade de {TTL_PADRAO // 3600} h).")
+
+    # ⏱️ Linhas e tempo de carregamento de cada tabela
+    if "relatorio_carregamento" in st.session_state:
+        with st.expander("⏱️ Relatório de carregamento das tabelas"):
+            st.dataframe(st.session_state["relatorio_carregamento"], hide_index=True)
+
+    # 🧮 Uso dos espaços de cache do processo
+    with st.expander("🧮 Estatísticas de cache"):
+        st.dataframe(estatisticas_cache(), hide_index=True)
 
     # Exibir os dados mesclados com estado
     with st.expander("🔹 Base de dados - avaliações realizadas"):
@@ -196,16 +192,14 @@ if "dataframes" in st.session_state:
         if selected_merged_df is not None:
             st.dataframe(selected_merged_df, height=400)
 
-            # Exportação para Excel com os dados finais
-            output_merged = io.BytesIO()
-            with pd.ExcelWriter(output_merged, engine='xlsxwriter') as writer:
-                selected_merged_df.to_excel(writer, index=False, sheet_name=df_merged_selectbox[:31])
-
-            st.download_button(
+            # Exportação dos dados finais (gerada só quando o usuário pede)
+            botao_exportar(
+                selected_merged_df,
+                nome_arquivo=df_merged_selectbox,
+                chave="home_merged",
                 label=f"📥 Baixar {df_merged_selectbox}",
-                data=output_merged.getvalue(),
-                file_name=f"{df_merged_selectbox}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                formatos=("xlsx", "csv", "parquet"),
+                nome_aba=df_merged_selectbox
             )
         else:
             st.error("❌ Nenhum dado disponível para exibição.")
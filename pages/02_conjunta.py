@@ -3,10 +3,18 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from scipy.stats import gaussian_kde
+from scipy.spatial import ConvexHull
 from st_aggrid import AgGrid, GridOptionsBuilder
 
-import io
+from utils.anova import lsd_por_variavel
+from utils.estabilidade import calcular_estabilidade
+from utils.exportacao import botao_exportar
+from utils.filtros import painel_filtros, versao_sessao
+from utils.graficos import LIMITE_PONTOS, boxplot_variavel, histograma_densidade, tracos_dispersao
+from utils.gxe import MODELOS_GXE, analise_gxe, matriz_local_cultivar
+from utils.metricas_av7 import tabela_av7
+from utils.modelo_misto import blup_cultivares
+from utils.secoes import figura_em_cache, secao_adiada
 
 st.title("📊 Resultados de Produção")
 st.markdown(
@@ -21,87 +29,8 @@ if "merged_dataframes" in st.session_state:
     if df_av7 is not None and not df_av7.empty:
         st.success("✅ Dados carregados com sucesso!")
 
-        df_final_av7 = df_av7[~df_av7["displayName"].isin(["raullanconi", "stine"])].copy()
-
-        if "numeroLinhas" in df_final_av7.columns and "comprimentoLinha" in df_final_av7.columns:
-            df_final_av7["areaParcela"] = df_final_av7["numeroLinhas"] * df_final_av7["comprimentoLinha"] * 0.5
-
-        colunas_plantas = ["numeroPlantas10Metros1a", "numeroPlantas10Metros2a", "numeroPlantas10Metros3a", "numeroPlantas10Metros4a"]
-        if all(col in df_final_av7.columns for col in colunas_plantas):
-            df_final_av7["numeroPlantasMedio10m"] = df_final_av7[colunas_plantas].replace(0, pd.NA).mean(axis=1, skipna=True)
-            df_final_av7["Pop_Final"] = (20000 * df_final_av7["numeroPlantasMedio10m"]) / 10
-
-        if "numeroPlantasMedio10m" in df_final_av7.columns:
-            df_final_av7["popMediaFinal"] = (10000 / 0.5) * (df_final_av7["numeroPlantasMedio10m"] / 10)
-
-        if all(col in df_final_av7.columns for col in ["pesoParcela", "umidadeParcela", "areaParcela"]):
-            df_final_av7["producaoCorrigida"] = (
-                (df_final_av7["pesoParcela"] * (100 - df_final_av7["umidadeParcela"]) / 87) * (10000 / df_final_av7["areaParcela"])
-            ).astype(float).round(1)
-
-        if "producaoCorrigida" in df_final_av7.columns:
-            df_final_av7["producaoCorrigidaSc"] = (df_final_av7["producaoCorrigida"] / 60).astype(float).round(1)
-
-        if all(col in df_final_av7.columns for col in ["pesoMilGraos", "umidadeAmostraPesoMilGraos"]):
-            df_final_av7["PMG_corrigido"] = (
-                df_final_av7["pesoMilGraos"] * ((100 - df_final_av7["umidadeAmostraPesoMilGraos"]) / 87)
-            ).astype(float).round(1)
-
-        if all(col in df_final_av7.columns for col in ["fazendaRef", "indexTratamento"]):
-            df_final_av7["ChaveFaixa"] = df_final_av7["fazendaRef"].astype(str) + "_" + df_final_av7["indexTratamento"].astype(str)
-
-        for col in ["dataPlantio", "dataColheita"]:
-            if col in df_final_av7.columns:
-                df_final_av7[col] = pd.to_datetime(df_final_av7[col], origin="unix", unit="s").dt.strftime("%d/%m/%Y")
-
-        colunas_selecionadas = [
-            "nomeFazenda", "nomeProdutor", "regional", "nomeCidade", "codigoEstado", "nomeEstado",
-            "dataPlantio", "dataColheita", "tipoTeste", "populacao", "indexTratamento", "nome", "gm",
-            "areaParcela", "numeroPlantasMedio10m", "Pop_Final", "umidadeParcela", "producaoCorrigida",
-            "producaoCorrigidaSc", "PMG_corrigido", "displayName", "cidadeRef", "fazendaRef", "ChaveFaixa"
-        ]
-
-        colunas_renomeadas = {
-            "nomeFazenda": "Fazenda",
-            "nomeProdutor": "Produtor",
-            "regional": "Microrregiao",
-            "nomeCidade": "Cidade",
-            "codigoEstado": "Estado",
-            "nomeEstado": "UF",
-            "dataPlantio": "Plantio",
-            "dataColheita": "Colheita",
-            "tipoTeste": "Teste",
-            "nome": "Cultivar",
-            "gm": "GM",
-            "indexTratamento": "Index",
-            "areaParcela": "Área Parcela",
-            "numeroPlantasMedio10m": "plts_10m",
-            "Pop_Final": "Pop_Final",
-            "umidadeParcela": "Umidade (%)",
-            "producaoCorrigida": "prod_kg_ha",
-            "producaoCorrigidaSc": "prod_sc_ha",
-            "PMG_corrigido": "PMG",
-            "displayName": "DTC",
-            "cidadeRef": "CidadeRef",
-            "fazendaRef": "FazendaRef",
-            "ChaveFaixa": "ChaveFaixa"
-        }
-
-        df_final_av7 = df_final_av7[colunas_selecionadas].rename(columns=colunas_renomeadas)
-
-        if "Produtor" in df_final_av7.columns:
-            df_final_av7["Produtor"] = df_final_av7["Produtor"].astype(str).str.upper()
-        if "Fazenda" in df_final_av7.columns:
-            df_final_av7["Fazenda"] = df_final_av7["Fazenda"].astype(str).str.upper()
-
-        if "Cultivar" in df_final_av7.columns:
-            df_final_av7["Cultivar"] = df_final_av7["Cultivar"].replace({
-                "B�NUS IPRO": "BÔNUS IPRO",
-                "DOM�NIO IPRO": "DOMÍNIO IPRO",
-                "F�RIA CE": "FÚRIA CE",
-                "V�NUS CE": "VÊNUS CE",
-                "GH 2383 IPRO": "GH 2483 IPRO",
-            })
+        # 🧮 Métricas da av7 (calculadas uma vez e reaproveitadas entre as páginas)
+        df_final_av7 = tabela_av7(df_av7)
         st.session_state["df_final_av7"] = df_final_av7
         
 
@@ -113,16 +42,6 @@ if "merged_dataframes" in st.session_state:
 
         col_filtros, col_tabela = st.columns([1.5, 8.5])
         
-        # 🔁 Correção dos nomes da coluna Cultivar (antes dos filtros)
-        if "Cultivar" in df_final_av7.columns:
-            df_final_av7["Cultivar"] = df_final_av7["Cultivar"].replace({
-                "B�NUS IPRO": "BÔNUS IPRO",
-                "DOM�NIO IPRO": "DOMÍNIO IPRO",
-                "F�RIA CE": "FÚRIA CE",
-                "V�NUS CE": "VÊNUS CE",
-                "GH 2383 IPRO": "GH 2483 IPRO"
-            })
-
         with col_filtros:
             st.markdown("### 🎧 Filtros")
 
@@ -135,26 +54,11 @@ if "merged_dataframes" in st.session_state:
                 "Cidade": "Cidade",
                 "Fazenda": "Fazenda",
                 "Cultivar": "Cultivar",
-                "Teste": "Teste",               
+                "Teste": "Teste",
+                "GM": "GM"
             }
-            for coluna, label in filtros.items():
-                if coluna in df_final_av7.columns:
-                    with st.expander(label):
-                        opcoes = sorted(df_final_av7[coluna].dropna().unique())
-                        selecionados = [
-                            op for op in opcoes if st.checkbox(op, key=f"{coluna}_{op}", value=False)
-                        ]
-                        if selecionados:
-                            df_final_av7 = df_final_av7[df_final_av7[coluna].isin(selecionados)]
-
-            if "GM" in df_final_av7.columns:
-                gm_min = int(df_final_av7["GM"].min())
-                gm_max = int(df_final_av7["GM"].max())
-                if gm_min < gm_max:
-                    gm_range = st.slider("Intervalo de GM", gm_min, gm_max, (gm_min, gm_max), step=1)
-                    df_final_av7 = df_final_av7[df_final_av7["GM"].between(gm_range[0], gm_range[1])]
-                else:
-                    st.info(f"Apenas um valor de GM disponível: {gm_min}")
+            # 🎛️ Seleção compartilhada entre as páginas; máscaras em cache por versão dos dados
+            df_final_av7 = painel_filtros(df_final_av7, filtros, versao_sessao("av7", "conjunta"))
             
             
 
@@ -194,15 +98,12 @@ if "merged_dataframes" in st.session_state:
                 )
 
                 # Botão de exportação
-                output = io.BytesIO()
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    df_visualizacao.to_excel(writer, index=False, sheet_name="faixa_densidade")
-
-                st.download_button(
+                botao_exportar(
+                    df_visualizacao,
+                    nome_arquivo="faixa_densidade",
+                    chave="conjunta_faixa_densidade",
                     label="📅 Baixar Faixa + Densidade",
-                    data=output.getvalue(),
-                    file_name="faixa_densidade.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    nome_aba="faixa_densidade"
                 )
 
         	
@@ -357,6 +258,10 @@ if "merged_dataframes" in st.session_state:
                 ## ✅ Aqui salva no session_state  
                 st.session_state["df_faixa_completo"] = df_faixa_completo
 
+                # 🏷️ A faixa é derivada só do resultado dos filtros e das tabelas da sessão:
+                # a versão dos filtros identifica o conteúdo (exportação e gráficos em cache)
+                versao_faixa = df_final_av7.attrs["versao_filtros"]
+
                 # calcula as estatisticas sem considerar os zeros
                 stats_dict = {col: df_faixa_completo[col].describe() for col in colunas_validas}
                 df_stats = pd.DataFrame(stats_dict).round(2).reset_index().rename(columns={"index": "Medida"})
@@ -373,44 +278,27 @@ if "merged_dataframes" in st.session_state:
                 cv_df = pd.DataFrame([cv_series], index=["CV (%)"]).reset_index().rename(columns={"index": "Medida"})
                 df_stats = pd.concat([df_stats, cv_df], ignore_index=True)
 
-                from statsmodels.stats.anova import anova_lm
-                from statsmodels.formula.api import ols
-                from scipy.stats import t
-
-                if {"prod_kg_ha", "Cultivar", "FazendaRef"}.issubset(df_faixa_completo.columns):
-                    df_anova = df_faixa_completo[["prod_kg_ha", "Cultivar", "FazendaRef"]].dropna()
-
-                    if not df_anova.empty and df_anova["FazendaRef"].nunique() > 1:
-                        try:
-                            model = ols('prod_kg_ha ~ C(Cultivar) + C(FazendaRef)', data=df_anova).fit()
-                            anova_table = anova_lm(model, typ=2)
-
-                            mse = anova_table.loc["Residual", "sum_sq"] / anova_table.loc["Residual", "df"]
-                            n_rep = df_anova["FazendaRef"].nunique()
-                            df_resid = anova_table.loc["Residual", "df"]
-                            t_val = t.ppf(1 - 0.025, df_resid)
-
-                            lsd = round(t_val * (2 * mse / n_rep) ** 0.5, 2)
-                            lsd_sc = round(lsd / 60, 2)
-
-                            # ✅ Prepara linha com todas colunas existentes
-                            nova_linha = {col: "" for col in df_stats.columns}
-                            nova_linha["Medida"] = "LSD"
-                            if "prod_kg_ha" in df_stats.columns:
-                                nova_linha["prod_kg_ha"] = lsd
-                            if "prod_sc_ha" in df_stats.columns:
-                                nova_linha["prod_sc_ha"] = lsd_sc
-
-                            # ✅ Cria DataFrame e concatena
-                            lsd_df = pd.DataFrame([nova_linha])
-                            df_stats = pd.concat([df_stats, lsd_df], ignore_index=True)
-
-                        except Exception as e:
-                            st.warning(f"⚠️ Erro ao calcular LSD: {e}")
-
-
-                        except Exception as e:
-                            st.warning(f"⚠️ Erro ao calcular LSD: {e}")
+                # ⚡ LSD por variável com a ANOVA cultivar + fazenda (sem matrizes de dummies)
+                if {"Cultivar", "FazendaRef"}.issubset(df_faixa_completo.columns):
+                    try:
+                        lsds = lsd_por_variavel(df_faixa_completo, ["prod_kg_ha", "PMG", "ALT", "AIV"], "Cultivar", "FazendaRef")
+                    except Exception as e:
+                        lsds = {}
+                        st.warning(f"⚠️ Erro ao calcular LSD: {e}")
+
+                    if lsds:
+                        # ✅ Prepara linha com todas colunas existentes
+                        nova_linha = {col: "" for col in df_stats.columns}
+                        nova_linha["Medida"] = "LSD"
+                        for col, valor in lsds.items():
+                            if col in df_stats.columns:
+                                nova_linha[col] = round(valor, 2)
+                        if "prod_kg_ha" in lsds and "prod_sc_ha" in df_stats.columns:
+                            nova_linha["prod_sc_ha"] = round(round(lsds["prod_kg_ha"], 2) / 60, 2)
+
+                        # ✅ Cria DataFrame e concatena
+                        lsd_df = pd.DataFrame([nova_linha])
+                        df_stats = pd.concat([df_stats, lsd_df], ignore_index=True)
 
                 # 👉 Traduz os nomes das medidas para Português
                 mapa_medidas = {
@@ -436,43 +324,40 @@ if "merged_dataframes" in st.session_state:
                 df_stats = pd.concat([df_stats, locais_df], ignore_index=True)
 
                                 
-                output_faixa = io.BytesIO()
-                with pd.ExcelWriter(output_faixa, engine='xlsxwriter') as writer:
-                    
-                    #colunas_exportar = [
-                    #    "Fazenda", "Produtor", "Microrregiao", "Cidade", "Estado", "UF", "Plantio", "Colheita", "Teste",
-                    #    "populacao", "Index", "Cultivar", "GM", "Área Parcela", "plts_10m", "Pop_Final", "Umidade (%)",
-                    #    "prod_kg_ha", "prod_sc_ha", "PMG", "DTC", "CidadeRef", "FazendaRef", "ChaveFaixa", "MAT", "AC", "GM_obs",
-                    #    "1_ENG", "2_ENG", "3_ENG", "4_ENG", "5_ENG",
-                    #    "1_AIV", "2_AIV", "3_AIV", "4_AIV", "5_AIV",
-                    #    "1_ALT", "2_ALT", "3_ALT", "4_ALT", "5_ALT",
-                    #    "ENG", "ALT", "AIV"
-                    #]
-                    
-                    
-                    
-                    colunas_exportar = [
-                        "Fazenda", "Produtor", "Microrregiao", "Cidade", "Estado", "UF", "Plantio", "Colheita","MAT","Teste",
-                        "populacao", "Index", "Cultivar", "GM","GM_obs", "Área Parcela", "plts_10m", "Pop_Final", "Umidade (%)",
-                        "prod_kg_ha", "prod_sc_ha", "PMG", "DTC","AC", 
-                        "1_ENG", "2_ENG", "3_ENG", "4_ENG", "5_ENG","ENG",
-                        "1_AIV", "2_AIV", "3_AIV", "4_AIV", "5_AIV","ALT",
-                        "1_ALT", "2_ALT", "3_ALT", "4_ALT", "5_ALT","AIV"
-                          
-                    ]
-
-                    # 🔍 Filtra apenas colunas que realmente existem no df
-                    colunas_para_exportar = [col for col in colunas_exportar if col in df_faixa_completo.columns]
-
-                    # 💾 Exporta apenas as colunas desejadas
-                    df_faixa_completo[colunas_para_exportar].to_excel(writer, index=False, sheet_name="resultado_faixa")
-
-                # Botão de download
-                st.download_button(
+                
+                #colunas_exportar = [
+                #    "Fazenda", "Produtor", "Microrregiao", "Cidade", "Estado", "UF", "Plantio", "Colheita", "Teste",
+                #    "populacao", "Index", "Cultivar", "GM", "Área Parcela", "plts_10m", "Pop_Final", "Umidade (%)",
+                #    "prod_kg_ha", "prod_sc_ha", "PMG", "DTC", "CidadeRef", "FazendaRef", "ChaveFaixa", "MAT", "AC", "GM_obs",
+                #    "1_ENG", "2_ENG", "3_ENG", "4_ENG", "5_ENG",
+                #    "1_AIV", "2_AIV", "3_AIV", "4_AIV", "5_AIV",
+                #    "1_ALT", "2_ALT", "3_ALT", "4_ALT", "5_ALT",
+                #    "ENG", "ALT", "AIV"
+                #]
+                
+                
+                
+                colunas_exportar = [
+                    "Fazenda", "Produtor", "Microrregiao", "Cidade", "Estado", "UF", "Plantio", "Colheita","MAT","Teste",
+                    "populacao", "Index", "Cultivar", "GM","GM_obs", "Área Parcela", "plts_10m", "Pop_Final", "Umidade (%)",
+                    "prod_kg_ha", "prod_sc_ha", "PMG", "DTC","AC", 
+                    "1_ENG", "2_ENG", "3_ENG", "4_ENG", "5_ENG","ENG",
+                    "1_AIV", "2_AIV", "3_AIV", "4_AIV", "5_AIV","ALT",
+                    "1_ALT", "2_ALT", "3_ALT", "4_ALT", "5_ALT","AIV"
+                      
+                ]
+
+                # 🔍 Filtra apenas colunas que realmente existem no df
+                colunas_para_exportar = [col for col in colunas_exportar if col in df_faixa_completo.columns]
+
+                # Botão de download (o arquivo só é gerado no clique)
+                botao_exportar(
+                    lambda: df_faixa_completo[colunas_para_exportar],
+                    versao=(versao_faixa, tuple(colunas_para_exportar)),
+                    nome_arquivo="resultado_faixa",
+                    chave="conjunta_resultado_faixa",
                     label="📅 Baixar Resultado Faixa",
-                    data=output_faixa.getvalue(),
-                    file_name="resultado_faixa.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    nome_aba="resultado_faixa"
                 )
 
 
@@ -501,6 +386,24 @@ if "merged_dataframes" in st.session_state:
                     .round(1)
                 )
 
+                # 🧮 BLUE/BLUP por cultivar com fazenda aleatória (em cache por estado dos filtros)
+                try:
+                    df_blup, variancias_blup = blup_cultivares(df_faixa_completo[["prod_sc_ha", "Cultivar", "FazendaRef"]])
+                except (np.linalg.LinAlgError, ValueError) as erro:
+                    st.warning(f"⚠️ Não foi possível ajustar o modelo misto (BLUE/BLUP): {erro}")
+                    df_blup, variancias_blup = None, None
+                if variancias_blup is not None and "residual" in variancias_blup["ajustadas"]:
+                    st.warning(
+                        "⚠️ Variância residual nula no modelo misto: usado um valor mínimo positivo, "
+                        "BLUE/BLUP e confiabilidades são aproximados."
+                    )
+                if df_blup is not None:
+                    df_conjunta_cultivar = df_conjunta_cultivar.merge(
+                        df_blup[["Cultivar", "BLUE", "BLUP", "Confiabilidade", "Rank_BLUP"]], on="Cultivar", how="left"
+                    )
+                    df_conjunta_cultivar["Confiabilidade"] = df_conjunta_cultivar["Confiabilidade"] * 100
+                    df_conjunta_cultivar["Rank_BLUP"] = df_conjunta_cultivar["Rank_BLUP"].astype("Int64")
+
                 # Limite de classificação
                 col_input, _ = st.columns([1.5, 8.5])
                 with col_input:
@@ -541,29 +444,33 @@ if "merged_dataframes" in st.session_state:
 
                     df_conjunta_cultivar = df_conjunta_cultivar[df_conjunta_cultivar["Classificação"].isin(opcoes)]
 
-                # Ordenação por produção média
-                df_conjunta_cultivar = df_conjunta_cultivar.sort_values(by=["Prod_sc_ha"], ascending=False)
+                # Ordenação por BLUP (ajustado para as fazendas em que cada cultivar foi testado) ou pela média bruta
+                if df_blup is not None:
+                    ordenar_por = st.radio(
+                        "Ordenar por:", ["BLUP (ajustado por fazenda)", "Média bruta"], horizontal=True, key="conjunta_ordenacao"
+                    )
+                    st.caption(
+                        f"Modelo misto com fazenda aleatória · σ² cultivar = {variancias_blup['cultivar']:.1f} · "
+                        f"σ² fazenda = {variancias_blup['fazenda']:.1f} · σ² resíduo = {variancias_blup['residual']:.1f}"
+                    )
+                else:
+                    ordenar_por = "Média bruta"
+
+                coluna_ordem = "BLUP" if ordenar_por.startswith("BLUP") else "Prod_sc_ha"
+                df_conjunta_cultivar = df_conjunta_cultivar.sort_values(by=[coluna_ordem], ascending=False)
 
                 # Colunas visíveis
                 colunas_visiveis = [
                     "Cultivar","Umidade","Prod_kg_ha","Prod_sc_ha","Pop_Final","AIV", "ALT","AC"
                 ]
+                if df_blup is not None:
+                    colunas_visiveis += ["BLUE", "BLUP", "Confiabilidade", "Rank_BLUP"]
 
                 # Exibe a tabela
                 #st.dataframe(df_conjunta_cultivar[colunas_visiveis], use_container_width=True)
 
                 # formatando tabela
                 
-                # 🧼 Corrige os nomes da Cultivar
-                if "Cultivar" in df_conjunta_cultivar.columns:
-                    df_conjunta_cultivar["Cultivar"] = df_conjunta_cultivar["Cultivar"].replace({
-                        "B�NUS IPRO": "BÔNUS IPRO",
-                        "DOM�NIO IPRO": "DOMÍNIO IPRO",
-                        "F�RIA CE": "FÚRIA CE",
-                        "V�NUS CE": "VÊNUS CE",
-                        "GH 2383 IPRO": "GH 2483 IPRO"
-                    })               
-
                 # 🔢 Arredonda os valores para 1 casa decimal
                 df_fmt = df_conjunta_cultivar[colunas_visiveis].copy()
                 colunas_float = df_fmt.select_dtypes(include=["float", "float64"]).columns
@@ -606,16 +513,12 @@ if "merged_dataframes" in st.session_state:
 
 
                 # Botão para baixar
-                output_resumo = io.BytesIO()
-                with pd.ExcelWriter(output_resumo, engine="xlsxwriter") as writer:
-                    df_fmt.to_excel(writer, index=False, sheet_name="resumo_fazendas")
-
-
-                st.download_button(
+                botao_exportar(
+                    df_fmt,
+                    nome_arquivo="resumo_conjunta_cultivar",
+                    chave="conjunta_resumo_conjunta_cultivar",
                     label="📥 Baixar Resumo de Conjunta",
-                    data=output_resumo.getvalue(),
-                    file_name="resumo_conjunta_cultivar.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    nome_aba="resumo_fazendas"
                 )
 
                 # 📌 Tabela com estatísticas descritivas
@@ -672,1566 +575,725 @@ if "merged_dataframes" in st.session_state:
                 )
 
                # Botão para exportar estatísticas descritivas em Excel
-                output_stats = io.BytesIO()
-                with pd.ExcelWriter(output_stats, engine="xlsxwriter") as writer:
-                    df_stats.to_excel(writer, index=False, sheet_name="estatisticas_descritivas")
-
-                st.download_button(
+                botao_exportar(
+                    df_stats,
+                    nome_arquivo="estatisticas_descritivas",
+                    chave="conjunta_estatisticas_descritivas",
                     label="📅 Baixar Estatísticas Descritivas",
-                    data=output_stats.getvalue(),
-                    file_name="estatisticas_descritivas.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    nome_aba="estatisticas_descritivas"
                 )
 
-               
-                output_faixa = io.BytesIO()
-                with pd.ExcelWriter(output_faixa, engine='xlsxwriter') as writer:
-                    df_faixa_completo.to_excel(writer, index=False, sheet_name="resultado_faixa")
-
 
                 # 📌Histograma de População Final (kg/ha)
-                df_hist = df_faixa_completo.copy()
-                df_hist = df_hist[df_hist["Pop_Final"].notna()]
-                df_hist = df_hist[df_hist["Pop_Final"] > 0]  # Apenas positivos
-                df_hist["Pop_Final"] = pd.to_numeric(df_hist["Pop_Final"], errors="coerce")
-
-                # Dados para o eixo x
-                x_data = df_hist["Pop_Final"].dropna()
-                x_data = x_data[x_data > 0]
-
-                # Cria o histograma
-                fig_hist = go.Figure()
-
-                fig_hist.add_trace(go.Histogram(
-                    x=x_data,
-                    nbinsx=50,
-                    name="Frequência",
-                    marker_color="lightblue",
-                    marker_line_color="black",
-                    marker_line_width=1.5,
-                    opacity=0.75,
-                    yaxis="y"
-                ))
-
-                # Adiciona curva de densidade
-                if len(x_data) > 1 and x_data.std() > 0:
-                    kde = gaussian_kde(x_data)
-                    x_vals = np.linspace(x_data.min(), x_data.max(), 500)
-                    y_vals = kde(x_vals)
-
-                    fig_hist.add_trace(go.Scatter(
-                        x=x_vals,
-                        y=y_vals,
-                        mode="lines",
-                        name="Densidade",
-                        line=dict(color="darkblue", width=2),
-                        yaxis="y2"
-                    ))
-                else:
-                    st.warning("⚠️ Dados insuficientes ou sem variação para calcular a curva de densidade.")
-
-                # Linha da média
-                media = x_data.mean()
-                fig_hist.add_trace(go.Scatter(
-                    x=[media, media],
-                    y=[0, y_vals.max()],
-                    mode="lines",
-                    name=f"Média: {media:.1f}",
-                    line=dict(color="red", width=2, dash="dash"),
-                    yaxis="y2"
-                ))
-
-                # Estilo dos textos
-                font_bold = dict(size=16, family="Arial Bold", color="black")
-
-                # Layout final com legenda estilizada
-                fig_hist.update_layout(
-                    title=dict(text="Histograma de População Final", font=font_bold),
-                    xaxis=dict(
-                        title=dict(text="População Final", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray",
-                    ),
-                    yaxis=dict(
-                        title=dict(text="Frequência", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    yaxis2=dict(
-                        title=dict(text="Densidade", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        overlaying="y",
-                        side="right",
-                        showgrid=False
-                    ),
-                    plot_bgcolor="white",
-                    bargap=0.1,
-                    legend=dict(
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.02,
-                        xanchor="right",
-                        x=1,
-                        font=dict(size=16, family="Arial", color="black")
-                    )
+                histograma_densidade(
+                    df_faixa_completo["Pop_Final"],
+                    "📊 Visualizar Histograma de População Final",
+                    titulo="Histograma de População Final",
+                    titulo_x="População Final",
+                    chave="conjunta_hist_Pop_Final",
+                    versao=versao_faixa
                 )
 
-                # Mostra o gráfico
-                with st.expander("📊 Visualizar Histograma de População Final", expanded=False):
-                    st.plotly_chart(fig_hist, use_container_width=True)
-
                
                 # 📌Histograma de Produção (kg/ha)
-                df_hist = df_faixa_completo.copy()
-                df_hist = df_hist[df_hist["prod_kg_ha"].notna()]
-                df_hist = df_hist[df_hist["prod_kg_ha"] > 0]  # Apenas positivos
-                df_hist["prod_kg_ha"] = pd.to_numeric(df_hist["prod_kg_ha"], errors="coerce")
-
-                # Dados para o eixo x
-                x_data = df_faixa_completo["prod_kg_ha"].dropna()
-                x_data = x_data[x_data > 0]
-
-                # Cria o histograma
-                fig_hist = go.Figure()
-
-                fig_hist.add_trace(go.Histogram(
-                    x=x_data,
-                    nbinsx=50,
-                    name="Frequência",
-                    marker_color="lightblue",
-                    marker_line_color="black",
-                    marker_line_width=1.5,
-                    opacity=0.75,
-                    yaxis="y"
-                ))
-
-                # Adiciona curva de densidade
-                if len(x_data) > 1 and x_data.std() > 0:
-                    kde = gaussian_kde(x_data)
-                    x_vals = np.linspace(x_data.min(), x_data.max(), 500)
-                    y_vals = kde(x_vals)
-
-                    fig_hist.add_trace(go.Scatter(
-                        x=x_vals,
-                        y=y_vals,
-                        mode="lines",
-                        name="Densidade",
-                        line=dict(color="darkblue", width=2),
-                        yaxis="y2"
-                    ))
-                else:
-                    st.warning("⚠️ Dados insuficientes ou sem variação para calcular a curva de densidade.")
-
-                # Linha da média
-                media = x_data.mean()
-                fig_hist.add_trace(go.Scatter(
-                    x=[media, media],
-                    y=[0, y_vals.max()],
-                    mode="lines",
-                    name=f"Média: {media:.1f}",
-                    line=dict(color="red", width=2, dash="dash"),
-                    yaxis="y2"
-                ))
-
-                # Estilo dos textos
-                font_bold = dict(size=16, family="Arial Bold", color="black")
-
-                # Layout final com legenda estilizada
-                fig_hist.update_layout(
-                    title=dict(text="Histograma de Produção (kg/ha)", font=font_bold),
-                    xaxis=dict(
-                        title=dict(text="Produção (kg/ha)", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray",
-                    ),
-                    yaxis=dict(
-                        title=dict(text="Frequência", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    yaxis2=dict(
-                        title=dict(text="Densidade", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        overlaying="y",
-                        side="right",
-                        showgrid=False
-                    ),
-                    plot_bgcolor="white",
-                    bargap=0.1,
-                    legend=dict(
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.02,
-                        xanchor="right",
-                        x=1,
-                        font=dict(size=16, family="Arial", color="black")
-                    )
+                histograma_densidade(
+                    df_faixa_completo["prod_kg_ha"],
+                    "📊 Visualizar Histograma de Produção (kg/ha)",
+                    titulo="Histograma de Produção (kg/ha)",
+                    titulo_x="Produção (kg/ha)",
+                    chave="conjunta_hist_prod_kg_ha",
+                    versao=versao_faixa
                 )
-
-                # Mostra o gráfico
-                with st.expander("📊 Visualizar Histograma de Produção (sc/ha)", expanded=False):
-                    st.plotly_chart(fig_hist, use_container_width=True)
       
 
                 # 📌 Histograma de Produção (sc/ha)
-                df_hist = df_faixa_completo.copy()
-                df_hist = df_hist[df_hist["prod_sc_ha"].notna()]
-                df_hist = df_hist[df_hist["prod_sc_ha"] > 0]  # Apenas positivos
-                df_hist["prod_sc_ha"] = pd.to_numeric(df_hist["prod_sc_ha"], errors="coerce")
-
-                # Dados para o eixo x
-                x_data = df_faixa_completo["prod_sc_ha"].dropna()
-                x_data = x_data[x_data > 0]
-
-                # Cria o histograma
-                fig_hist = go.Figure()
-
-                fig_hist.add_trace(go.Histogram(
-                    x=x_data,
-                    nbinsx=50,
-                    name="Frequência",
-                    marker_color="lightblue",
-                    marker_line_color="black",
-                    marker_line_width=1.5,
-                    opacity=0.75,
-                    yaxis="y"
-                ))
-
-                # Adiciona curva de densidade (KDE)
-                if len(x_data) > 1 and x_data.std() > 0:
-                    kde = gaussian_kde(x_data)
-                    x_vals = np.linspace(x_data.min(), x_data.max(), 500)
-                    y_vals = kde(x_vals)
-
-                    fig_hist.add_trace(go.Scatter(
-                        x=x_vals,
-                        y=y_vals,
-                        mode="lines",
-                        name="Densidade",
-                        line=dict(color="darkblue", width=2),
-                        yaxis="y2"
-                    ))
-                else:
-                    st.warning("⚠️ Dados insuficientes ou sem variação para calcular a curva de densidade.")
-
-                # Linha da média
-                media = x_data.mean()
-                fig_hist.add_trace(go.Scatter(
-                    x=[media, media],
-                    y=[0, y_vals.max()],
-                    mode="lines",
-                    name=f"Média: {media:.1f}",
-                    line=dict(color="red", width=2, dash="dash"),
-                    yaxis="y2"
-                ))
-
-                # Layout com dois eixos e legenda em negrito
-                font_bold = dict(size=16, family="Arial Bold", color="black")
-
-                fig_hist.update_layout(
-                    title=dict(text="Histograma de Produção (sc/ha)", font=font_bold),
-                    xaxis=dict(
-                        title=dict(text="Produção (sc/ha)", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    yaxis=dict(
-                        title=dict(text="Frequência", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    yaxis2=dict(
-                        title=dict(text="Densidade", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        overlaying="y",
-                        side="right",
-                        showgrid=False
-                    ),
-                    plot_bgcolor="white",
-                    bargap=0.1,
-                    legend=dict(
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.02,
-                        xanchor="right",
-                        x=1,
-                        font=dict(size=16, family="Arial Bold", color="black")
-                    ),
+                histograma_densidade(
+                    df_faixa_completo["prod_sc_ha"],
+                    "📊 Visualizar Histograma de Produção (sc/ha)",
+                    titulo="Histograma de Produção (sc/ha)",
+                    titulo_x="Produção (sc/ha)",
+                    chave="conjunta_hist_prod_sc_ha",
+                    versao=versao_faixa
                 )
 
-                # Mostra o gráfico
-                with st.expander("📊 Visualizar Histograma de Produção (sc/ha)", expanded=False):
-                    st.plotly_chart(fig_hist, use_container_width=True)
-
 
                 # 📌 Histograma de Acamamento (AC)
-                df_hist = df_faixa_completo.copy()
-                df_hist = df_hist[df_hist["AC"].notna()]
-                df_hist = df_hist[df_hist["AC"] > 0]
-                df_hist["AC"] = pd.to_numeric(df_hist["AC"], errors="coerce")
-
-                # Dados para o eixo x
-                x_data = df_faixa_completo["AC"].dropna()
-                x_data = x_data[x_data > 0]
-
-                # Cria o histograma
-                fig_hist = go.Figure()
-
-                fig_hist.add_trace(go.Histogram(
-                    x=x_data,
-                    nbinsx=50,
-                    name="Frequência",
-                    marker_color="lightblue",
-                    marker_line_color="black",
-                    marker_line_width=1.5,
-                    opacity=0.75,
-                    yaxis="y"
-                ))
-
-                # Adiciona curva de densidade (KDE)
-                if len(x_data) > 1 and x_data.std() > 0:
-                    kde = gaussian_kde(x_data)
-                    x_vals = np.linspace(x_data.min(), x_data.max(), 500)
-                    y_vals = kde(x_vals)
-
-                    fig_hist.add_trace(go.Scatter(
-                        x=x_vals,
-                        y=y_vals,
-                        mode="lines",
-                        name="Densidade",
-                        line=dict(color="darkblue", width=2),
-                        yaxis="y2"
-                    ))
-                else:
-                    st.warning("⚠️ Dados insuficientes ou sem variação para calcular a curva de densidade.")
-
-                # Linha da média
-                media = x_data.mean()
-                fig_hist.add_trace(go.Scatter(
-                    x=[media, media],
-                    y=[0, y_vals.max()],
-                    mode="lines",
-                    name=f"Média: {media:.1f}",
-                    line=dict(color="red", width=2, dash="dash"),
-                    yaxis="y2"
-                ))
-
-                # Layout
-                font_bold = dict(size=16, family="Arial Bold", color="black")
-
-                fig_hist.update_layout(
-                    title=dict(text="Histograma de Acamamento", font=font_bold),
-                    xaxis=dict(
-                        title=dict(text="Nota Acamamento (AC)", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    yaxis=dict(
-                        title=dict(text="Frequência", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    yaxis2=dict(
-                        title=dict(text="Densidade", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        overlaying="y",
-                        side="right",
-                        showgrid=False
-                    ),
-                    plot_bgcolor="white",
-                    bargap=0.1,
-                    legend=dict(
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.02,
-                        xanchor="right",
-                        x=1,
-                        font=dict(size=16, family="Arial Bold", color="black")
-                    ),
+                histograma_densidade(
+                    df_faixa_completo["AC"],
+                    "📊 Visualizar Histograma de Nota de Acamamento (AC)",
+                    titulo="Histograma de Acamamento",
+                    titulo_x="Nota Acamamento (AC)",
+                    chave="conjunta_hist_AC",
+                    versao=versao_faixa
                 )
 
-                # Mostra o gráfico
-                with st.expander("📊 Visualizar Histograma de Nota de Acamamento (AC)", expanded=False):
-                    st.plotly_chart(fig_hist, use_container_width=True)
-
-                # 📌 Histograma de Peso de Mil Grãos 
-                df_hist = df_faixa_completo.copy()
-                df_hist = df_hist[df_hist["PMG"].notna()]
-                df_hist = df_hist[df_hist["PMG"] > 0]
-                df_hist["PMG"] = pd.to_numeric(df_hist["PMG"], errors="coerce")
-
-                # Dados para o eixo x
-                x_data = df_hist["PMG"].dropna()
-                x_data = x_data[x_data > 0]
-
-                # Cria o histograma
-                fig_hist = go.Figure()
-
-                fig_hist.add_trace(go.Histogram(
-                    x=x_data,
-                    nbinsx=50,
-                    name="Frequência",
-                    marker_color="lightblue",
-                    marker_line_color="black",
-                    marker_line_width=1.5,
-                    opacity=0.75,
-                    yaxis="y"
-                ))
-
-                # Adiciona curva de densidade (KDE)
-                if len(x_data) > 1 and x_data.std() > 0:
-                    kde = gaussian_kde(x_data)
-                    x_vals = np.linspace(x_data.min(), x_data.max(), 500)
-                    y_vals = kde(x_vals)
-
-                    fig_hist.add_trace(go.Scatter(
-                        x=x_vals,
-                        y=y_vals,
-                        mode="lines",
-                        name="Densidade",
-                        line=dict(color="darkblue", width=2),
-                        yaxis="y2"
-                    ))
-                else:
-                    st.warning("⚠️ Dados insuficientes ou sem variação para calcular a curva de densidade.")
-
-                # Linha da média
-                media = x_data.mean()
-                fig_hist.add_trace(go.Scatter(
-                    x=[media, media],
-                    y=[0, y_vals.max()],
-                    mode="lines",
-                    name=f"Média: {media:.1f}",
-                    line=dict(color="red", width=2, dash="dash"),
-                    yaxis="y2"
-                ))
-
-                # Layout
-                font_bold = dict(size=16, family="Arial Bold", color="black")
-
-                fig_hist.update_layout(
-                    title=dict(text="Peso de Mil Grão (PMG)", font=font_bold),
-                    xaxis=dict(
-                        title=dict(text="Peso de Mil Grãos (PMG)", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    yaxis=dict(
-                        title=dict(text="Frequência", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    yaxis2=dict(
-                        title=dict(text="Densidade", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        overlaying="y",
-                        side="right",
-                        showgrid=False
-                    ),
-                    plot_bgcolor="white",
-                    bargap=0.1,
-                    legend=dict(
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.02,
-                        xanchor="right",
-                        x=1,
-                        font=dict(size=16, family="Arial Bold", color="black")
-                    ),
+                # 📌 Histograma de Peso de Mil Grãos
+                histograma_densidade(
+                    df_faixa_completo["PMG"],
+                    "📊 Visualizar Histograma de Peso de Mil Grãos (PMG)",
+                    titulo="Peso de Mil Grão (PMG)",
+                    titulo_x="Peso de Mil Grãos (PMG)",
+                    chave="conjunta_hist_PMG",
+                    versao=versao_faixa
                 )
 
-                # Mostra o gráfico
-                with st.expander("📊 Visualizar Histograma de Peso de Mil Grãos (PMG)", expanded=False):
-                    st.plotly_chart(fig_hist, use_container_width=True)
-
    
 
                 # 📌 Histograma de Engalhamento (ENG)
-                df_hist = df_faixa_completo.copy()
-                df_hist = df_hist[df_hist["ENG"].notna()]
-                df_hist = df_hist[df_hist["ENG"] > 0]
-                df_hist["ENG"] = pd.to_numeric(df_hist["ENG"], errors="coerce")
-
-                # Dados para o eixo x
-                x_data = df_faixa_completo["ENG"].dropna()
-                x_data = x_data[x_data > 0]
-
-                # Cria o histograma
-                fig_hist = go.Figure()
-
-                fig_hist.add_trace(go.Histogram(
-                    x=x_data,
-                    nbinsx=50,
-                    name="Frequência",
-                    marker_color="lightblue",
-                    marker_line_color="black",
-                    marker_line_width=1.5,
-                    opacity=0.75,
-                    yaxis="y"
-                ))
-
-                # Adiciona curva de densidade
-                if len(x_data) > 1 and x_data.std() > 0:
-                    kde = gaussian_kde(x_data)
-                    x_vals = np.linspace(x_data.min(), x_data.max(), 500)
-                    y_vals = kde(x_vals)
-
-                    fig_hist.add_trace(go.Scatter(
-                        x=x_vals,
-                        y=y_vals,
-                        mode="lines",
-                        name="Densidade",
-                        line=dict(color="darkblue", width=2),
-                        yaxis="y2"
-                    ))
-
-                    # Linha da média
-                    media = x_data.mean()
-                    fig_hist.add_trace(go.Scatter(
-                        x=[media, media],
-                        y=[0, y_vals.max()],
-                        mode="lines",
-                        name=f"Média: {media:.1f}",
-                        line=dict(color="red", width=2, dash="dash"),
-                        yaxis="y2"
-                    ))
-                else:
-                    st.warning("⚠️ Dados insuficientes ou sem variação para calcular a curva de densidade.")
-
-                # Layout
-                font_bold = dict(size=16, family="Arial Bold", color="black")
-
-                fig_hist.update_layout(
-                    title=dict(text="Histograma de Nota de Engalhamento", font=font_bold),
-                    xaxis=dict(
-                        title=dict(text="Engalhamento (ENG)", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray",
-                    ),
-                    yaxis=dict(
-                        title=dict(text="Frequência", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    yaxis2=dict(
-                        title=dict(text="Densidade", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        overlaying="y",
-                        side="right",
-                        showgrid=False
-                    ),
-                    legend=dict(
-                        font=dict(size=16, family="Arial Bold", color="black"),
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.02,
-                        xanchor="right",
-                        x=1
-                    ),
-                    plot_bgcolor="white",
-                    bargap=0.1,
+                histograma_densidade(
+                    df_faixa_completo["ENG"],
+                    "📊 Visualizar Histograma de Engalhamento (ENG)",
+                    titulo="Histograma de Nota de Engalhamento",
+                    titulo_x="Engalhamento (ENG)",
+                    chave="conjunta_hist_ENG",
+                    versao=versao_faixa
                 )
 
-                # Mostra o gráfico
-                with st.expander("📊 Visualizar Histograma de Engalhamento (ENG)", expanded=False):
-                    st.plotly_chart(fig_hist, use_container_width=True)
-
                  
                 # 📌 Histograma de Altura de Inserção da Primeira Vagem (AIV)
-                df_hist = df_faixa_completo.copy()
-                df_hist = df_hist[df_hist["AIV"].notna()]
-                df_hist = df_hist[df_hist["AIV"] > 0]
-                df_hist["AIV"] = pd.to_numeric(df_hist["AIV"], errors="coerce")
-
-                # Dados para o eixo x
-                x_data = df_faixa_completo["AIV"].dropna()
-                x_data = x_data[x_data > 0]
-
-                # Cria o histograma
-                fig_hist = go.Figure()
-
-                fig_hist.add_trace(go.Histogram(
-                    x=x_data,
-                    nbinsx=50,
-                    name="Frequência",
-                    marker_color="lightblue",
-                    marker_line_color="black",
-                    marker_line_width=1.5,
-                    opacity=0.75,
-                    yaxis="y"
-                ))
-
-                # Adiciona curva de densidade
-                if len(x_data) > 1 and x_data.std() > 0:
-                    kde = gaussian_kde(x_data)
-                    x_vals = np.linspace(x_data.min(), x_data.max(), 500)
-                    y_vals = kde(x_vals)
-
-                    fig_hist.add_trace(go.Scatter(
-                        x=x_vals,
-                        y=y_vals,
-                        mode="lines",
-                        name="Densidade",
-                        line=dict(color="darkblue", width=2),
-                        yaxis="y2"
-                    ))
-
-                    # Linha da média
-                    media = x_data.mean()
-                    fig_hist.add_trace(go.Scatter(
-                        x=[media, media],
-                        y=[0, y_vals.max()],
-                        mode="lines",
-                        name=f"Média: {media:.1f}",
-                        line=dict(color="red", width=2, dash="dash"),
-                        yaxis="y2"
-                    ))
-                else:
-                    st.warning("⚠️ Dados insuficientes ou sem variação para calcular a curva de densidade.")
-
-                # Layout com dois eixos
-                font_bold = dict(size=16, family="Arial Bold", color="black")
-
-                fig_hist.update_layout(
-                    title=dict(text="Histograma de Altura de Inserção da Primeira Vagem", font=font_bold),
-                    xaxis=dict(
-                        title=dict(text="Altura de Inserção da Primeira Vagem (AIV)", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray",
-                    ),
-                    yaxis=dict(
-                        title=dict(text="Frequência", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    yaxis2=dict(
-                        title=dict(text="Densidade", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        overlaying="y",
-                        side="right",
-                        showgrid=False
-                    ),
-                    plot_bgcolor="white",
-                    bargap=0.1,
-                    legend=dict(
-                        font=dict(size=16, family="Arial Bold", color="black"),
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.02,
-                        xanchor="right",
-                        x=1
-                    ),
+                histograma_densidade(
+                    df_faixa_completo["AIV"],
+                    "📊 Visualizar Histograma de Altura de Inserção da Primeira Vagem (AIV)",
+                    titulo="Histograma de Altura de Inserção da Primeira Vagem",
+                    titulo_x="Altura de Inserção da Primeira Vagem (AIV)",
+                    chave="conjunta_hist_AIV",
+                    versao=versao_faixa
                 )
 
-                # Mostra o gráfico
-                with st.expander("📊 Visualizar Histograma de Altura de Inserção da Primeira Vagem (AIV)", expanded=False):
-                    st.plotly_chart(fig_hist, use_container_width=True)
-
                 
-                # 📌 Histograma de Altura da Planta (ALT)                
-                df_hist = df_faixa_completo.copy()
-                df_hist = df_hist[df_hist["ALT"].notna()]
-                df_hist = df_hist[df_hist["ALT"] > 0]
-                df_hist["ALT"] = pd.to_numeric(df_hist["ALT"], errors="coerce")
-
-                # Dados para o eixo x
-                x_data = df_faixa_completo["ALT"].dropna()
-                x_data = x_data[x_data > 0]
-
-                # Cria o histograma
-                fig_hist = go.Figure()
-
-                fig_hist.add_trace(go.Histogram(
-                    x=x_data,
-                    nbinsx=50,
-                    name="Frequência",
-                    marker_color="lightblue",
-                    marker_line_color="black",
-                    marker_line_width=1.5,
-                    opacity=0.75,
-                    yaxis="y"
-                ))
-
-                # Adiciona curva de densidade
-                if len(x_data) > 1 and x_data.std() > 0:
-                    kde = gaussian_kde(x_data)
-                    x_vals = np.linspace(x_data.min(), x_data.max(), 500)
-                    y_vals = kde(x_vals)
-
-                    fig_hist.add_trace(go.Scatter(
-                        x=x_vals,
-                        y=y_vals,
-                        mode="lines",
-                        name="Densidade",
-                        line=dict(color="darkblue", width=2),
-                        yaxis="y2"
-                    ))
-
-                    # Linha da média
-                    media = x_data.mean()
-                    fig_hist.add_trace(go.Scatter(
-                        x=[media, media],
-                        y=[0, y_vals.max()],
-                        mode="lines",
-                        name=f"Média: {media:.1f}",
-                        line=dict(color="red", width=2, dash="dash"),
-                        yaxis="y2"
-                    ))
-                else:
-                    st.warning("⚠️ Dados insuficientes ou sem variação para calcular a curva de densidade.")
-
-                # Layout com dois eixos
-                font_bold = dict(size=16, family="Arial Bold", color="black")
-
-                fig_hist.update_layout(
-                    title=dict(text="Histograma de Altura de Planta (ALT)", font=font_bold),
-                    xaxis=dict(
-                        title=dict(text="Altura de Planta (ALT)", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray",
-                    ),
-                    yaxis=dict(
-                        title=dict(text="Frequência", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    yaxis2=dict(
-                        title=dict(text="Densidade", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        overlaying="y",
-                        side="right",
-                        showgrid=False
-                    ),
-                    plot_bgcolor="white",
-                    bargap=0.1,
-                    legend=dict(
-                        font=dict(size=16, family="Arial Bold", color="black"),
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.02,
-                        xanchor="right",
-                        x=1
-                    ),
+                # 📌 Histograma de Altura da Planta (ALT)
+                histograma_densidade(
+                    df_faixa_completo["ALT"],
+                    "📊 Visualizar Histograma de Altura de Planta (ALT)",
+                    titulo="Histograma de Altura de Planta (ALT)",
+                    titulo_x="Altura de Planta (ALT)",
+                    chave="conjunta_hist_ALT",
+                    versao=versao_faixa
                 )
 
-                # Mostra o gráfico
-                with st.expander("📊 Visualizar Histograma de Altura de Planta (ALT)", expanded=False):
-                    st.plotly_chart(fig_hist, use_container_width=True)
-
                 # 📦Boxplot de População Final
-                media = df_faixa_completo["Pop_Final"].dropna().mean()
-
-                with st.expander("📦 Visualizar Box Plot de População Final", expanded=False):
-                    fig_box = go.Figure()
-
-                    fig_box.add_trace(go.Box(
-                        x=df_faixa_completo["Pop_Final"],
-                        name="População Final",
-                        boxpoints="outliers",
-                        fillcolor="lightblue",
-                        marker_color="lightblue",
-                        line=dict(color="black", width=1),
-                        boxmean=True
-                    ))
-
-                    # Estilo dos textos
-                    font_bold = dict(size=20, family="Arial Bold", color="black")
-
-                    fig_box.update_layout(
-                        title=dict(
-                            text="Box Plot de População Final",
-                            font=font_bold
-                        ),
-                        xaxis=dict(
-                            title=dict(
-                                text="População Final",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        yaxis=dict(
-                            title=dict(
-                                text="Observações",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        legend=dict(
-                            font=font_bold,
-                            orientation="h",
-                            yanchor="bottom",
-                            y=1.02,
-                            xanchor="right",
-                            x=1
-                        ),
-                        plot_bgcolor="white",
-                        showlegend=True
-                    )
-
-                    st.plotly_chart(fig_box, use_container_width=True)
+                boxplot_variavel(
+                    df_faixa_completo["Pop_Final"],
+                    "📦 Visualizar Box Plot de População Final",
+                    nome="População Final",
+                    titulo="Box Plot de População Final",
+                    titulo_x="População Final",
+                    chave="conjunta_box_Pop_Final",
+                    versao=versao_faixa
+                )
 
 
 
                 # 📦 Boxplot de Produção (kg/ha)
-                media = df_faixa_completo["prod_kg_ha"].dropna().mean()
-
-                with st.expander("📦 Visualizar Box Plot de Produção (kg/ha)", expanded=False):
-                    fig_box = go.Figure()
-
-                    fig_box.add_trace(go.Box(
-                        x=df_faixa_completo["prod_kg_ha"],
-                        name="Produção (kg/ha)",
-                        boxpoints="outliers",
-                        fillcolor="lightblue",
-                        marker_color="lightblue",
-                        line=dict(color="black", width=1),
-                        boxmean=True
-                    ))
-
-                    # Fonte personalizada
-                    font_bold = dict(size=20, family="Arial Bold", color="black")
-
-                    fig_box.update_layout(
-                        title=dict(
-                            text="Box Plot de Produção (kg/ha)",
-                            font=font_bold
-                        ),
-                        xaxis=dict(
-                            title=dict(
-                                text="Produção (kg/ha)",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        yaxis=dict(
-                            title=dict(
-                                text="Observações",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        legend=dict(
-                            font=font_bold,
-                            orientation="h",
-                            yanchor="bottom",
-                            y=1.02,
-                            xanchor="right",
-                            x=1
-                        ),
-                        plot_bgcolor="white",
-                        showlegend=True
-                    )
-
-                    st.plotly_chart(fig_box, use_container_width=True)
+                boxplot_variavel(
+                    df_faixa_completo["prod_kg_ha"],
+                    "📦 Visualizar Box Plot de Produção (kg/ha)",
+                    nome="Produção (kg/ha)",
+                    titulo="Box Plot de Produção (kg/ha)",
+                    titulo_x="Produção (kg/ha)",
+                    chave="conjunta_box_prod_kg_ha",
+                    versao=versao_faixa
+                )
 
 
                 # 📦 Boxplot de Produção (sc/ha)
-
-                media = df_faixa_completo["prod_sc_ha"].dropna().mean()
-
-                with st.expander("📦 Visualizar Box Plot de Produção (sc/ha)", expanded=False):
-                    fig_box = go.Figure()
-
-                    fig_box.add_trace(go.Box(
-                        x=df_faixa_completo["prod_sc_ha"],
-                        name="Produção (sc/ha)",
-                        boxpoints="outliers",
-                        fillcolor="lightblue",
-                        marker_color="lightblue",
-                        line=dict(color="black", width=1),
-                        boxmean=True
-                    ))
-
-                    # Estilo dos títulos e rótulos 
-                    font_bold = dict(size=20, family="Arial Bold", color="black")
-
-                    fig_box.update_layout(
-                        title=dict(
-                            text="Box Plot de Produção (sc/ha)",
-                            font=font_bold
-                        ),
-                        xaxis=dict(
-                            title=dict(
-                                text="Produção (sc/ha)",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        yaxis=dict(
-                            title=dict(
-                                text="Observações",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        legend=dict(
-                            font=font_bold,
-                            orientation="h",
-                            yanchor="bottom",
-                            y=1.02,
-                            xanchor="right",
-                            x=1
-                        ),
-                        plot_bgcolor="white",
-                        showlegend=True
-                    )
-
-                    st.plotly_chart(fig_box, use_container_width=True)
+                boxplot_variavel(
+                    df_faixa_completo["prod_sc_ha"],
+                    "📦 Visualizar Box Plot de Produção (sc/ha)",
+                    nome="Produção (sc/ha)",
+                    titulo="Box Plot de Produção (sc/ha)",
+                    titulo_x="Produção (sc/ha)",
+                    chave="conjunta_box_prod_sc_ha",
+                    versao=versao_faixa
+                )
 
 
 
                 # 📦 Boxplot de Nota Acamamento (AC)
-
-                media = df_faixa_completo["AC"].dropna().mean()
-
-                with st.expander("📦 Visualizar Box Plot de Acamamento (AC)", expanded=False):
-                    fig_box = go.Figure()
-
-                    fig_box.add_trace(go.Box(
-                        x=df_faixa_completo["AC"],
-                        name="Nota Acamamento (AC)",
-                        boxpoints="outliers",
-                        fillcolor="lightblue",
-                        marker_color="lightblue",
-                        line=dict(color="black", width=1),
-                        boxmean=True
-                    ))
-
-                    # Estilo dos títulos e rótulos
-                    font_bold = dict(size=20, family="Arial Bold", color="black")
-
-                    fig_box.update_layout(
-                        title=dict(
-                            text="Box Plot de Nota Acamamento (AC)",
-                            font=font_bold
-                        ),
-                        xaxis=dict(
-                            title=dict(
-                                text="Nota Acamamento (AC)",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        yaxis=dict(
-                            title=dict(
-                                text="Observações",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        legend=dict(
-                            font=font_bold,
-                            orientation="h",
-                            yanchor="bottom",
-                            y=1.02,
-                            xanchor="right",
-                            x=1
-                        ),
-                        plot_bgcolor="white",
-                        showlegend=True
-                    )
-
-                    st.plotly_chart(fig_box, use_container_width=True)
+                boxplot_variavel(
+                    df_faixa_completo["AC"],
+                    "📦 Visualizar Box Plot de Acamamento (AC)",
+                    nome="Nota Acamamento (AC)",
+                    titulo="Box Plot de Nota Acamamento (AC)",
+                    titulo_x="Nota Acamamento (AC)",
+                    chave="conjunta_box_AC",
+                    versao=versao_faixa
+                )
 
                  
 
                 # 📦 Boxplot de Peso de Mil Grãos (PMG)
-                media = df_faixa_completo["PMG"].dropna().mean()
-
-                with st.expander("📦 Visualizar Box Plot de Peso de Mil Grãos (PMG)", expanded=False):
-                    fig_box = go.Figure()
-
-                    fig_box.add_trace(go.Box(
-                        x=df_faixa_completo["PMG"],
-                        name="Peso de Mil Grãos (PMG)",
-                        boxpoints="outliers",
-                        fillcolor="lightblue",
-                        marker_color="lightblue",
-                        line=dict(color="black", width=1),
-                        boxmean=True
-                    ))
-
-                    # Estilo negrito e maior
-                    font_bold = dict(size=20, family="Arial Bold", color="black")
-
-                    fig_box.update_layout(
-                        title=dict(
-                            text="Box Plot de Peso de Mil Grãos (PMG)",
-                            font=font_bold
-                        ),
-                        xaxis=dict(
-                            title=dict(
-                                text="Peso de Mil Grãos (PMG)",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        yaxis=dict(
-                            title=dict(
-                                text="Observações",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        legend=dict(
-                            font=font_bold,
-                            orientation="h",
-                            yanchor="bottom",
-                            y=1.02,
-                            xanchor="right",
-                            x=1
-                        ),
-                        plot_bgcolor="white",
-                        showlegend=True
-                    )
-
-                    st.plotly_chart(fig_box, use_container_width=True)
+                boxplot_variavel(
+                    df_faixa_completo["PMG"],
+                    "📦 Visualizar Box Plot de Peso de Mil Grãos (PMG)",
+                    nome="Peso de Mil Grãos (PMG)",
+                    titulo="Box Plot de Peso de Mil Grãos (PMG)",
+                    titulo_x="Peso de Mil Grãos (PMG)",
+                    chave="conjunta_box_PMG",
+                    versao=versao_faixa
+                )
 
 
 
                 # 📦 Boxplot de Engalhamento (ENG)
-
-                media = df_faixa_completo["ENG"].dropna().mean()
-
-                with st.expander("📦 Visualizar Box Plot de Engalhamento (ENG)", expanded=False):
-                    fig_box = go.Figure()
-
-                    fig_box.add_trace(go.Box(
-                        x=df_faixa_completo["ENG"],
-                        name="Engalhamento (ENG)",
-                        boxpoints="outliers",
-                        fillcolor="lightblue",
-                        marker_color="lightblue",
-                        line=dict(color="black", width=1),
-                        boxmean=True
-                    ))
-
-                    # Estilo negrito e maior
-                    font_bold = dict(size=20, family="Arial Bold", color="black")
-
-                    fig_box.update_layout(
-                        title=dict(
-                            text="Box Plot de Nota Engalhamento (ENG)",
-                            font=font_bold
-                        ),
-                        xaxis=dict(
-                            title=dict(
-                                text="Engalhamento (ENG)",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        yaxis=dict(
-                            title=dict(
-                                text="Observações",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        legend=dict(
-                            font=font_bold,
-                            orientation="h",
-                            yanchor="bottom",
-                            y=1.02,
-                            xanchor="right",
-                            x=1
-                        ),
-                        plot_bgcolor="white",
-                        showlegend=True
-                    )
-
-                    st.plotly_chart(fig_box, use_container_width=True)
+                boxplot_variavel(
+                    df_faixa_completo["ENG"],
+                    "📦 Visualizar Box Plot de Engalhamento (ENG)",
+                    nome="Engalhamento (ENG)",
+                    titulo="Box Plot de Nota Engalhamento (ENG)",
+                    titulo_x="Engalhamento (ENG)",
+                    chave="conjunta_box_ENG",
+                    versao=versao_faixa
+                )
 
                 # 📦 Boxplot de Altura de Inserção da Primeira Vagem (AIV)
-
-                media = df_faixa_completo["AIV"].dropna().mean()
-
-                with st.expander("📦 Visualizar Box Plot de Altura de Inserção da Primeira Vagem (AIV)", expanded=False):
-                    fig_box = go.Figure()
-
-                    fig_box.add_trace(go.Box(
-                        x=df_faixa_completo["AIV"],
-                        name="Altura de Inserção da Primeira Vagem (AIV)",
-                        boxpoints="outliers",
-                        fillcolor="lightblue",
-                        marker_color="lightblue",
-                        line=dict(color="black", width=1),
-                        boxmean=True
-                    ))
-
-                    # Estilo negrito e maior
-                    font_bold = dict(size=20, family="Arial Bold", color="black")
-
-                    fig_box.update_layout(
-                        title=dict(
-                            text="Box Plot de Altura de Inserção da Primeira Vagem (AIV)",
-                            font=font_bold
-                        ),
-                        xaxis=dict(
-                            title=dict(
-                                text="Altura de Inserção da Primeira Vagem (AIV)",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        yaxis=dict(
-                            title=dict(
-                                text="Observações",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        legend=dict(
-                            font=font_bold,
-                            orientation="h",
-                            yanchor="bottom",
-                            y=1.02,
-                            xanchor="right",
-                            x=1
-                        ),
-                        plot_bgcolor="white",
-                        showlegend=True
-                    )
-
-                    st.plotly_chart(fig_box, use_container_width=True)
+                boxplot_variavel(
+                    df_faixa_completo["AIV"],
+                    "📦 Visualizar Box Plot de Altura de Inserção da Primeira Vagem (AIV)",
+                    nome="Altura de Inserção da Primeira Vagem (AIV)",
+                    titulo="Box Plot de Altura de Inserção da Primeira Vagem (AIV)",
+                    titulo_x="Altura de Inserção da Primeira Vagem (AIV)",
+                    chave="conjunta_box_AIV",
+                    versao=versao_faixa
+                )
 
 
                 # 📦 Boxplot de Altura de Planta (ALT)
-
-                media = df_faixa_completo["ALT"].dropna().mean()
-
-                with st.expander("📦 Visualizar Box Plot de Altura de Planta (ALT)", expanded=False):
-                    fig_box = go.Figure()
-
-                    fig_box.add_trace(go.Box(
-                        x=df_faixa_completo["ALT"],
-                        name="Altura de Planta (ALT)",
-                        boxpoints="outliers",
-                        fillcolor="lightblue",
-                        marker_color="lightblue",
-                        line=dict(color="black", width=1),
-                        boxmean=True
-                    ))
-
-                    # Estilo negrito e maior
-                    font_bold = dict(size=20, family="Arial Bold", color="black")
-
-                    fig_box.update_layout(
-                        title=dict(
-                            text="Box Plot de Altura de Planta (ALT)",
-                            font=font_bold
-                        ),
-                        xaxis=dict(
-                            title=dict(
-                                text="Altura de Planta (ALT)",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        yaxis=dict(
-                            title=dict(
-                                text="Observações",
-                                font=font_bold
-                            ),
-                            tickfont=font_bold,
-                            showgrid=True,
-                            gridcolor="lightgray"
-                        ),
-                        legend=dict(
-                            font=font_bold,
-                            orientation="h",
-                            yanchor="bottom",
-                            y=1.02,
-                            xanchor="right",
-                            x=1
-                        ),
-                        plot_bgcolor="white",
-                        showlegend=True
-                    )
-
-                    st.plotly_chart(fig_box, use_container_width=True)               
+                boxplot_variavel(
+                    df_faixa_completo["ALT"],
+                    "📦 Visualizar Box Plot de Altura de Planta (ALT)",
+                    nome="Altura de Planta (ALT)",
+                    titulo="Box Plot de Altura de Planta (ALT)",
+                    titulo_x="Altura de Planta (ALT)",
+                    chave="conjunta_box_ALT",
+                    versao=versao_faixa
+                )
 
 
                  
                 # 🗺️ Cálculo de Índice Ambiental
-                with st.expander("📉 Índice Ambiental: Média do Local x Produção do Material", expanded=False):
-                    df_dispersao = df_faixa_completo.copy()
-
-                    # Multiselect de cultivares
-                    cultivares_disp = sorted(df_dispersao["Cultivar"].dropna().unique())
-                    cultivar_default = "78KA42"
-
-                    if cultivar_default in cultivares_disp:
-                        valor_default = [cultivar_default]
-                    elif cultivares_disp:
-                        valor_default = [cultivares_disp[0]]
-                    else:
-                        valor_default = []
-
-                    cultivares_selecionadas = st.multiselect("🧬 Selecione as Cultivares:", cultivares_disp, default=valor_default)
-                    mostrar_outras = st.checkbox("👀 Mostrar outras cultivares", value=True)
-
-                    if not df_dispersao.empty and "FazendaRef" in df_dispersao and "prod_sc_ha" in df_dispersao:
-                        df_media_local = df_dispersao.groupby("FazendaRef")["prod_sc_ha"].mean().reset_index().rename(columns={"prod_sc_ha": "Media_Local"})
-                        df_dispersao = df_dispersao.merge(df_media_local, on="FazendaRef", how="left")
-                        df_dispersao = df_dispersao.dropna(subset=["Media_Local", "prod_sc_ha"])
-
-                        if mostrar_outras:
-                            df_dispersao["Cor"] = df_dispersao["Cultivar"].apply(lambda x: x if x in cultivares_selecionadas else "Outras")
+                with secao_adiada("📉 Índice Ambiental: Média do Local x Produção do Material", "conjunta_indice_ambiental") as aberta:
+                    if aberta:
+                        # Multiselect de cultivares
+                        cultivares_disp = sorted(df_faixa_completo["Cultivar"].dropna().unique())
+                        cultivar_default = "78KA42"
+
+                        if cultivar_default in cultivares_disp:
+                            valor_default = [cultivar_default]
+                        elif cultivares_disp:
+                            valor_default = [cultivares_disp[0]]
                         else:
-                            df_dispersao = df_dispersao[df_dispersao["Cultivar"].isin(cultivares_selecionadas)]
-                            df_dispersao["Cor"] = df_dispersao["Cultivar"]
-
-                        color_map = {cult: px.colors.qualitative.Plotly[i % 10] for i, cult in enumerate(cultivares_selecionadas)}
-                        if mostrar_outras:
-                            color_map["Outras"] = "#d3d3d3"
-
-                        fig_disp = px.scatter(
-                            df_dispersao,
-                            x="Media_Local",
-                            y="prod_sc_ha",
-                            color="Cor",
-                            color_discrete_map=color_map,
-                            labels={
-                                "Media_Local": "Média do Local",
-                                "prod_sc_ha": "Produção do Material",
-                                "Cor": "Cultivar"
-                            }
-                        )
-
-                        import statsmodels.api as sm
-                        for cultivar in cultivares_selecionadas:
-                            df_cult = df_dispersao[df_dispersao["Cultivar"] == cultivar]
-                            if not df_cult.empty and df_cult.shape[0] > 1:
-                                X_train = df_cult[["Media_Local"]]
-                                X_train = sm.add_constant(X_train)
-                                y_train = df_cult["prod_sc_ha"]
-                                model = sm.OLS(y_train, X_train).fit()
-
-                                x_vals = np.linspace(df_dispersao["Media_Local"].min(), df_dispersao["Media_Local"].max(), 100)
-                                X_pred = pd.DataFrame({"Media_Local": x_vals})
-                                X_pred = sm.add_constant(X_pred)
-                                y_pred = model.predict(X_pred)
-
-                                fig_disp.add_trace(go.Scatter(
-                                    x=x_vals,
-                                    y=y_pred,
-                                    mode="lines",
-                                    name=f"Tendência - {cultivar}",
-                                    line=dict(color=color_map.get(cultivar, "black"), dash="solid")
+                            valor_default = []
+
+                        cultivares_selecionadas = st.multiselect("🧬 Selecione as Cultivares:", cultivares_disp, default=valor_default)
+                        mostrar_outras = st.checkbox("👀 Mostrar outras cultivares", value=True)
+
+                        if not df_faixa_completo.empty and "FazendaRef" in df_faixa_completo and "prod_sc_ha" in df_faixa_completo:
+                            # 📐 Regressões de todas as cultivares calculadas de uma vez (em cache)
+                            df_estabilidade = calcular_estabilidade(df_faixa_completo[["FazendaRef", "Cultivar", "prod_sc_ha"]])
+
+                            def construir_indice_ambiental():
+                                df_dispersao = df_faixa_completo.copy()
+                                df_media_local = df_dispersao.groupby("FazendaRef")["prod_sc_ha"].mean().reset_index().rename(columns={"prod_sc_ha": "Media_Local"})
+                                df_dispersao = df_dispersao.merge(df_media_local, on="FazendaRef", how="left")
+                                df_dispersao = df_dispersao.dropna(subset=["Media_Local", "prod_sc_ha"])
+
+                                if mostrar_outras:
+                                    df_dispersao["Cor"] = df_dispersao["Cultivar"].apply(lambda x: x if x in cultivares_selecionadas else "Outras")
+                                else:
+                                    df_dispersao = df_dispersao[df_dispersao["Cultivar"].isin(cultivares_selecionadas)]
+                                    df_dispersao["Cor"] = df_dispersao["Cultivar"]
+
+                                color_map = {cult: px.colors.qualitative.Plotly[i % 10] for i, cult in enumerate(cultivares_selecionadas)}
+                                if mostrar_outras:
+                                    color_map["Outras"] = "#d3d3d3"
+
+                                # 🚀 Pontos em WebGL; acima do limite vão agregados (as tendências usam todos os dados)
+                                fig_disp = go.Figure(tracos_dispersao(
+                                    df_dispersao.sort_values("Cor", key=lambda cor: cor != "Outras", kind="stable"),
+                                    x="Media_Local",
+                                    y="prod_sc_ha",
+                                    grupo="Cor",
+                                    cores=color_map,
+                                    rotulos={"Media_Local": "Média do Local", "prod_sc_ha": "Produção do Material"}
                                 ))
 
-                        # Fonte em negrito
-                        font_bold = dict(size=20, family="Arial Bold", color="black")
-
-                        fig_disp.update_layout(
-                            plot_bgcolor="white",
-                            title=dict(
-                                text="Índice Ambiental: Cultivares Selecionadas",
-                                font=font_bold
-                            ),
-                            xaxis=dict(
-                                title=dict(
-                                    text="Média do Local",
-                                    font=font_bold
-                                ),
-                                tickfont=font_bold,
-                                showgrid=True,
-                                gridcolor="lightgray"
-                            ),
-                            yaxis=dict(
-                                title=dict(
-                                    text="Produção do Material",
-                                    font=font_bold
-                                ),
-                                tickfont=font_bold,
-                                showgrid=True,
-                                gridcolor="lightgray"
-                            ),
-                            legend=dict(
-                                orientation="h",
-                                yanchor="bottom",
-                                y=1.02,
-                                xanchor="right",
-                                x=1,
-                                font=font_bold
-                            )
-                        )
+                                regressoes = df_estabilidade.set_index("Cultivar")
 
-                        st.plotly_chart(fig_disp, use_container_width=True)
+                                x_vals = np.linspace(df_dispersao["Media_Local"].min(), df_dispersao["Media_Local"].max(), 100)
+                                for cultivar in cultivares_selecionadas:
+                                    if cultivar not in regressoes.index or pd.isna(regressoes.loc[cultivar, "Inclinacao"]):
+                                        continue
+                                    y_pred = regressoes.loc[cultivar, "Intercepto"] + regressoes.loc[cultivar, "Inclinacao"] * x_vals
+
+                                    fig_disp.add_trace(go.Scatter(
+                                        x=x_vals,
+                                        y=y_pred,
+                                        mode="lines",
+                                        name=f"Tendência - {cultivar}",
+                                        line=dict(color=color_map.get(cultivar, "black"), dash="solid")
+                                    ))
+
+                                # Fonte em negrito
+                                font_bold = dict(size=20, family="Arial Bold", color="black")
+
+                                fig_disp.update_layout(
+                                    plot_bgcolor="white",
+                                    title=dict(
+                                        text="Índice Ambiental: Cultivares Selecionadas",
+                                        font=font_bold
+                                    ),
+                                    xaxis=dict(
+                                        title=dict(
+                                            text="Média do Local",
+                                            font=font_bold
+                                        ),
+                                        tickfont=font_bold,
+                                        showgrid=True,
+                                        gridcolor="lightgray"
+                                    ),
+                                    yaxis=dict(
+                                        title=dict(
+                                            text="Produção do Material",
+                                            font=font_bold
+                                        ),
+                                        tickfont=font_bold,
+                                        showgrid=True,
+                                        gridcolor="lightgray"
+                                    ),
+                                    legend=dict(
+                                        orientation="h",
+                                        yanchor="bottom",
+                                        y=1.02,
+                                        xanchor="right",
+                                        x=1,
+                                        title=dict(text="Cultivar"),
+                                        font=font_bold
+                                    )
+                                )
+                                return fig_disp, len(df_dispersao)
+
+                            # 🗂️ Figura refeita só quando os filtros ou as cultivares escolhidas mudam
+                            fig_disp, n_pontos = figura_em_cache(
+                                "conjunta_indice_ambiental",
+                                (versao_faixa, tuple(cultivares_selecionadas), mostrar_outras),
+                                construir_indice_ambiental
+                            )
+                            if n_pontos > LIMITE_PONTOS:
+                                st.caption(f"ℹ️ {n_pontos:,} pontos agregados por proximidade; o tamanho do marcador indica o nº de observações.".replace(",", "."))
+
+                            st.plotly_chart(fig_disp, use_container_width=True)
+
+                            # 📋 Tabela de estabilidade (Finlay–Wilkinson / Eberhart–Russell)
+                            st.markdown("#### 📋 Estabilidade por Cultivar")
+                            st.markdown("""
+                            <small>
+                            Inclinação (b) da regressão da produção de cada cultivar sobre a média do local: 
+                            b > 1 indica resposta acima da média em ambientes favoráveis, b < 1 maior estabilidade. 
+                            O desvio da regressão mede a previsibilidade (quanto menor, mais previsível).
+                            </small>
+                            """, unsafe_allow_html=True)
+
+                            df_estabilidade_fmt = df_estabilidade.dropna(subset=["Inclinacao"]).rename(columns={
+                                "Locais": "Nº Locais",
+                                "Media": "Média (sc/ha)",
+                                "Intercepto": "Intercepto (a)",
+                                "Inclinacao": "Inclinação (b)",
+                                "Desvio_Regressao": "Desvio da Regressão"
+                            }).sort_values("Média (sc/ha)", ascending=False)
+                            df_estabilidade_fmt = df_estabilidade_fmt.round({
+                                "Média (sc/ha)": 1, "Intercepto (a)": 2, "Inclinação (b)": 2, "R2": 2, "Desvio da Regressão": 2
+                            })
+
+                            gb = GridOptionsBuilder.from_dataframe(df_estabilidade_fmt)
+                            gb.configure_default_column(cellStyle={'fontSize': '14px'})
+                            gb.configure_grid_options(headerHeight=30)
+                            custom_css = {".ag-header-cell-label": {"font-weight": "bold", "font-size": "15px", "color": "black"}}
+                            AgGrid(df_estabilidade_fmt, gridOptions=gb.build(), height=400, custom_css=custom_css)
+
+                            botao_exportar(
+                                df_estabilidade_fmt,
+                                nome_arquivo="estabilidade_cultivares",
+                                chave="conjunta_estabilidade",
+                                label="📥 Baixar Estabilidade (Excel)",
+                                nome_aba="estabilidade"
+                            )
 
-                    else:
-                        st.info("❌ Dados insuficientes para gerar o gráfico.")
+                        else:
+                            st.info("❌ Dados insuficientes para gerar o gráfico.")
 
 
                 
                 # 📉 Dispersão: GM x Produção Média por GM (com base nos filtros)
 
-                with st.expander("📉 Dispersão: GM x Produção do Material", expanded=False):
-                    df_dispersao = df_faixa_completo.copy()
-
-                    if not df_dispersao.empty and "GM" in df_dispersao and "prod_sc_ha" in df_dispersao:
-                        # Calcula a média dinâmica conforme filtros
-                        df_grafico = (
-                            df_dispersao
-                            .groupby(["GM", "Cultivar"])["prod_sc_ha"]
-                            .mean()
-                            .reset_index()
-                            .dropna()
-                        )
-
-                        media_y = df_grafico["prod_sc_ha"].mean()
-                        font_bold = dict(size=20, family="Arial Bold", color="black")
-
-                        fig_gm = px.scatter(
-                            df_grafico,
-                            x="GM",
-                            y="prod_sc_ha",
-                            color_discrete_sequence=["gray"],
-                            text="Cultivar",
-                            labels={
-                                "GM": "Grupo de Maturação (GM)",
-                                "prod_sc_ha": "Produção Média (sc/ha)"
-                            },
-                            title="Dispersão: GM x Produção Média (sc/ha)"
-                        )
-
-                        fig_gm.update_traces(textposition="top center")
-
-                        # ⬇️ Rótulos em negrito e tamanho 16
-                        fig_gm.update_traces(textfont=dict(size=16, family="Arial Bold", color="black"))
-
-
-                        # Linha da média
-                        fig_gm.add_trace(go.Scatter(
-                            x=[df_grafico["GM"].min(), df_grafico["GM"].max()],
-                            y=[media_y, media_y],
-                            mode="lines",
-                            name=f"Média: {media_y:.1f} sc/ha",
-                            line=dict(color="red", width=2, dash="dash")
-                        ))
-
-                        fig_gm.update_layout(
-                            title=dict(text="Dispersão: GM x Produção Média (sc/ha)", font=font_bold),
-                            xaxis=dict(
-                                title=dict(text="Grupo de Maturação (GM)", font=font_bold),
-                                tickfont=font_bold,
-                                showgrid=True,
-                                gridcolor="lightgray",
-                                dtick=1
-                            ),
-                            yaxis=dict(
-                                title=dict(text="Produção Média (sc/ha)", font=font_bold),
-                                tickfont=font_bold,
-                                showgrid=True,
-                                gridcolor="lightgray"
-                            ),
-                            legend=dict(
-                                font=font_bold,
-                                orientation="h",
-                                yanchor="bottom",
-                                y=1.02,
-                                xanchor="right",
-                                x=1
-                            ),
-                            plot_bgcolor="white"
-                        )
-
-                        st.plotly_chart(fig_gm, use_container_width=True)
-
-                    else:
-                        st.info("❌ Dados insuficientes para gerar o gráfico de GM.")
+                with secao_adiada("📉 Dispersão: GM x Produção do Material", "conjunta_dispersao_gm") as aberta:
+                    if aberta:
+                        if not df_faixa_completo.empty and "GM" in df_faixa_completo and "prod_sc_ha" in df_faixa_completo:
+                            def construir_dispersao_gm():
+                                df_dispersao = df_faixa_completo.copy()
+                                # Calcula a média dinâmica conforme filtros
+                                df_grafico = (
+                                    df_dispersao
+                                    .groupby(["GM", "Cultivar"])["prod_sc_ha"]
+                                    .mean()
+                                    .reset_index()
+                                    .dropna()
+                                )
+
+                                media_y = df_grafico["prod_sc_ha"].mean()
+                                font_bold = dict(size=20, family="Arial Bold", color="black")
+
+                                fig_gm = px.scatter(
+                                    df_grafico,
+                                    x="GM",
+                                    y="prod_sc_ha",
+                                    color_discrete_sequence=["gray"],
+                                    text="Cultivar",
+                                    labels={
+                                        "GM": "Grupo de Maturação (GM)",
+                                        "prod_sc_ha": "Produção Média (sc/ha)"
+                                    },
+                                    title="Dispersão: GM x Produção Média (sc/ha)"
+                                )
+
+                                fig_gm.update_traces(textposition="top center")
+
+                                # ⬇️ Rótulos em negrito e tamanho 16
+                                fig_gm.update_traces(textfont=dict(size=16, family="Arial Bold", color="black"))
+
+
+                                # Linha da média
+                                fig_gm.add_trace(go.Scatter(
+                                    x=[df_grafico["GM"].min(), df_grafico["GM"].max()],
+                                    y=[media_y, media_y],
+                                    mode="lines",
+                                    name=f"Média: {media_y:.1f} sc/ha",
+                                    line=dict(color="red", width=2, dash="dash")
+                                ))
+
+                                fig_gm.update_layout(
+                                    title=dict(text="Dispersão: GM x Produção Média (sc/ha)", font=font_bold),
+                                    xaxis=dict(
+                                        title=dict(text="Grupo de Maturação (GM)", font=font_bold),
+                                        tickfont=font_bold,
+                                        showgrid=True,
+                                        gridcolor="lightgray",
+                                        dtick=1
+                                    ),
+                                    yaxis=dict(
+                                        title=dict(text="Produção Média (sc/ha)", font=font_bold),
+                                        tickfont=font_bold,
+                                        showgrid=True,
+                                        gridcolor="lightgray"
+                                    ),
+                                    legend=dict(
+                                        font=font_bold,
+                                        orientation="h",
+                                        yanchor="bottom",
+                                        y=1.02,
+                                        xanchor="right",
+                                        x=1
+                                    ),
+                                    plot_bgcolor="white"
+                                )
+                                return fig_gm
+
+                            # 🗂️ Figura refeita só quando os filtros mudam
+                            fig_gm = figura_em_cache("conjunta_dispersao_gm", versao_faixa, construir_dispersao_gm)
+                            st.plotly_chart(fig_gm, use_container_width=True)
+
+                        else:
+                            st.info("❌ Dados insuficientes para gerar o gráfico de GM.")
 
 
                  
                 
                 # 🧩 Heatmap Interativo: Desempenho Relativo por Local x Cultivar
 
-                with st.expander("🧩 Heatmap Interativo: Desempenho Relativo por Local x Cultivar", expanded=False):
-                    df_heatmap = df_faixa_completo.copy()
-
-                    if not df_heatmap.empty and "prod_sc_ha" in df_heatmap.columns and "Cultivar" in df_heatmap.columns:
-                        df_heatmap["Local"] = df_heatmap["Fazenda"].astype(str) + "_" + df_heatmap["Cidade"].astype(str)
-                        df_heatmap["Prod_Max_Local"] = df_heatmap.groupby("Local")["prod_sc_ha"].transform("max")
-                        df_heatmap["Prod_%"] = (df_heatmap["prod_sc_ha"] / df_heatmap["Prod_Max_Local"]) * 100
-
-                        heatmap_pivot = df_heatmap.pivot_table(
-                            index="Local",
-                            columns="Cultivar",
-                            values="Prod_%",
-                            aggfunc="mean"
-                        )
-
-                        if "Microrregiao" in df_heatmap.columns:
-                            locais_com_regional = df_heatmap[["Local", "Microrregiao"]].drop_duplicates()
-                            locais_ordenados = (
-                                locais_com_regional
-                                .sort_values(by=["Microrregiao", "Local"])
-                                .set_index("Local")
-                            )
-                            ordem_local = locais_ordenados.index.tolist()
-                            heatmap_pivot = heatmap_pivot.loc[heatmap_pivot.index.intersection(ordem_local)]
-                            heatmap_pivot = heatmap_pivot.reindex(ordem_local)
-
-                        escala_de_cores = [
-                            (0.00, "lightcoral"),
-                            (0.35, "lightcoral"),
-                            (0.45, "lightyellow"),
-                            (0.55, "lightyellow"),
-                            (0.70, "lightgreen"),
-                            (0.80, "mediumseagreen"),
-                            (1.00, "green")
-                        ]
-
-                        font_bold = dict(size=20, family="Arial Bold", color="black")
-
-                        fig = px.imshow(
-                            heatmap_pivot,
-                            text_auto=".0f",
-                            color_continuous_scale=escala_de_cores,
-                            aspect="auto",
-                            labels=dict(x="Cultivar", y="Local", color="Produtividade (%)")
-                        )
-
-                        fig.update_layout(
-                            title=dict(text="Produção Relativa por Cultivar e Local (100% = Maior do Local)", font=font_bold),
-                            xaxis=dict(title=dict(text="Cultivar", font=font_bold), tickfont=font_bold),
-                            yaxis=dict(title=dict(text="Produtor + Cidade", font=font_bold), tickfont=font_bold),
-                            plot_bgcolor="white",
-                            coloraxis_colorbar=dict(
-                                title=dict(text="Produtividade (%)", font=font_bold),
-                                tickvals=[0, 20, 40, 60, 80, 100],
-                                ticktext=["0%", "20%", "40%", "60%", "80%", "100%"],
-                                tickfont=font_bold
-                            )
-                        )
-
-                        # ⬇️ Aqui o ajuste do tamanho do texto nas células
-                        fig.update_traces(textfont=dict(size=14, family="Arial Bold", color="black"))
-
-                        st.plotly_chart(fig, use_container_width=True)
-                    else:
-                        st.warning("❌ Dados insuficientes para gerar o heatmap.")
+                with secao_adiada("🧩 Heatmap Interativo: Desempenho Relativo por Local x Cultivar", "conjunta_heatmap_relativo") as aberta:
+                    if aberta:
+                        if not df_faixa_completo.empty and "prod_sc_ha" in df_faixa_completo.columns and "Cultivar" in df_faixa_completo.columns:
+                            def construir_heatmap_relativo():
+                                df_heatmap = df_faixa_completo.copy()
+                                df_heatmap["Local"] = df_heatmap["Fazenda"].astype(str) + "_" + df_heatmap["Cidade"].astype(str)
+                                df_heatmap["Prod_Max_Local"] = df_heatmap.groupby("Local")["prod_sc_ha"].transform("max")
+                                df_heatmap["Prod_%"] = (df_heatmap["prod_sc_ha"] / df_heatmap["Prod_Max_Local"]) * 100
+
+                                heatmap_pivot = df_heatmap.pivot_table(
+                                    index="Local",
+                                    columns="Cultivar",
+                                    values="Prod_%",
+                                    aggfunc="mean"
+                                )
+
+                                if "Microrregiao" in df_heatmap.columns:
+                                    locais_com_regional = df_heatmap[["Local", "Microrregiao"]].drop_duplicates()
+                                    locais_ordenados = (
+                                        locais_com_regional
+                                        .sort_values(by=["Microrregiao", "Local"])
+                                        .set_index("Local")
+                                    )
+                                    ordem_local = locais_ordenados.index.tolist()
+                                    heatmap_pivot = heatmap_pivot.loc[heatmap_pivot.index.intersection(ordem_local)]
+                                    heatmap_pivot = heatmap_pivot.reindex(ordem_local)
+
+                                escala_de_cores = [
+                                    (0.00, "lightcoral"),
+                                    (0.35, "lightcoral"),
+                                    (0.45, "lightyellow"),
+                                    (0.55, "lightyellow"),
+                                    (0.70, "lightgreen"),
+                                    (0.80, "mediumseagreen"),
+                                    (1.00, "green")
+                                ]
+
+                                font_bold = dict(size=20, family="Arial Bold", color="black")
+
+                                fig = px.imshow(
+                                    heatmap_pivot,
+                                    text_auto=".0f",
+                                    color_continuous_scale=escala_de_cores,
+                                    aspect="auto",
+                                    labels=dict(x="Cultivar", y="Local", color="Produtividade (%)")
+                                )
+
+                                fig.update_layout(
+                                    title=dict(text="Produção Relativa por Cultivar e Local (100% = Maior do Local)", font=font_bold),
+                                    xaxis=dict(title=dict(text="Cultivar", font=font_bold), tickfont=font_bold),
+                                    yaxis=dict(title=dict(text="Produtor + Cidade", font=font_bold), tickfont=font_bold),
+                                    plot_bgcolor="white",
+                                    coloraxis_colorbar=dict(
+                                        title=dict(text="Produtividade (%)", font=font_bold),
+                                        tickvals=[0, 20, 40, 60, 80, 100],
+                                        ticktext=["0%", "20%", "40%", "60%", "80%", "100%"],
+                                        tickfont=font_bold
+                                    )
+                                )
+
+                                # ⬇️ Aqui o ajuste do tamanho do texto nas células
+                                fig.update_traces(textfont=dict(size=14, family="Arial Bold", color="black"))
+                                return fig
+
+                            # 🗂️ Figura refeita só quando os filtros mudam
+                            fig = figura_em_cache("conjunta_heatmap_relativo", versao_faixa, construir_heatmap_relativo)
+                            st.plotly_chart(fig, use_container_width=True)
+                        else:
+                            st.warning("❌ Dados insuficientes para gerar o heatmap.")
                 
 
 
                 # 🏅 Heatmap Interativo: Ranking Relativo por Local x Cultivar
 
-                with st.expander("🧩 Heatmap Interativo: Ranking Relativo por Local x Cultivar", expanded=False):
-                    df_heatmap = df_faixa_completo.copy()
-
-                    if not df_heatmap.empty and "prod_sc_ha" in df_heatmap.columns and "Cultivar" in df_heatmap.columns:
-                        df_heatmap["Local"] = df_heatmap["Fazenda"].astype(str) + "_" + df_heatmap["Cidade"].astype(str)
-
-                        # ⬇️ Calcular ranking (1 = melhor)
-                        df_heatmap["Rank_Local"] = (
-                            df_heatmap.groupby("Local")["prod_sc_ha"]
-                            .rank(method="min", ascending=False)
-                        )
-
-                        # Pivot para gerar a matriz de rankings
-                        heatmap_pivot = df_heatmap.pivot_table(
-                            index="Local",
-                            columns="Cultivar",
-                            values="Rank_Local",
-                            aggfunc="min"
-                        )
-
-                        # Ordena os locais
-                        if "Microrregiao" in df_heatmap.columns:
-                            locais_com_regional = df_heatmap[["Local", "Microrregiao"]].drop_duplicates()
-                            locais_ordenados = (
-                                locais_com_regional
-                                .sort_values(by=["Microrregiao", "Local"])
-                                .set_index("Local")
-                            )
-                            ordem_local = locais_ordenados.index.tolist()
-                            heatmap_pivot = heatmap_pivot.loc[heatmap_pivot.index.intersection(ordem_local)]
-                            heatmap_pivot = heatmap_pivot.reindex(ordem_local)
-
-                        # Máximo ranking encontrado (ajuste automático)
-                        max_rank = int(heatmap_pivot.max().max())
-
-                        # Escala de cores: do verde escuro (ranking 1) ao verde claro (ranking alto)
-                        escala_verde = [
-                            (0.0, "#006400"),   # verde escuro (melhor)
-                            (0.5, "#66CDAA"),   # verde médio
-                            (1.0, "#C1E1C1")    # verde claro (pior)
-                        ]
-
-                        font_bold = dict(size=20, family="Arial Bold", color="black")
-
-                        fig = px.imshow(
-                            heatmap_pivot,
-                            text_auto=True,
-                            color_continuous_scale=escala_verde,
-                            aspect="auto",
-                            labels=dict(x="Cultivar", y="Local", color="Ranking")
-                        )
-
-                        fig.update_layout(
-                            title=dict(text="Ranking Relativo por Cultivar e Local (1 = Melhor)", font=font_bold),
-                            xaxis=dict(title=dict(text="Cultivar", font=font_bold), tickfont=font_bold),
-                            yaxis=dict(title=dict(text="Produtor + Cidade", font=font_bold), tickfont=font_bold),
-                            plot_bgcolor="white",
-                            coloraxis_colorbar=dict(
-                                title=dict(text="Ranking", font=font_bold),
-                                tickfont=font_bold
-                            )
-                        )
+                with secao_adiada("🧩 Heatmap Interativo: Ranking Relativo por Local x Cultivar", "conjunta_heatmap_ranking") as aberta:
+                    if aberta:
+                        if not df_faixa_completo.empty and "prod_sc_ha" in df_faixa_completo.columns and "Cultivar" in df_faixa_completo.columns:
+                            def construir_heatmap_ranking():
+                                df_heatmap = df_faixa_completo.copy()
+                                df_heatmap["Local"] = df_heatmap["Fazenda"].astype(str) + "_" + df_heatmap["Cidade"].astype(str)
+
+                                # ⬇️ Calcular ranking (1 = melhor)
+                                df_heatmap["Rank_Local"] = (
+                                    df_heatmap.groupby("Local")["prod_sc_ha"]
+                                    .rank(method="min", ascending=False)
+                                )
+
+                                # Pivot para gerar a matriz de rankings
+                                heatmap_pivot = df_heatmap.pivot_table(
+                                    index="Local",
+                                    columns="Cultivar",
+                                    values="Rank_Local",
+                                    aggfunc="min"
+                                )
+
+                                # Ordena os locais
+                                if "Microrregiao" in df_heatmap.columns:
+                                    locais_com_regional = df_heatmap[["Local", "Microrregiao"]].drop_duplicates()
+                                    locais_ordenados = (
+                                        locais_com_regional
+                                        .sort_values(by=["Microrregiao", "Local"])
+                                        .set_index("Local")
+                                    )
+                                    ordem_local = locais_ordenados.index.tolist()
+                                    heatmap_pivot = heatmap_pivot.loc[heatmap_pivot.index.intersection(ordem_local)]
+                                    heatmap_pivot = heatmap_pivot.reindex(ordem_local)
+
+                                # Escala de cores: do verde escuro (ranking 1) ao verde claro (ranking alto)
+                                escala_verde = [
+                                    (0.0, "#006400"),   # verde escuro (melhor)
+                                    (0.5, "#66CDAA"),   # verde médio
+                                    (1.0, "#C1E1C1")    # verde claro (pior)
+                                ]
+
+                                font_bold = dict(size=20, family="Arial Bold", color="black")
+
+                                fig = px.imshow(
+                                    heatmap_pivot,
+                                    text_auto=True,
+                                    color_continuous_scale=escala_verde,
+                                    aspect="auto",
+                                    labels=dict(x="Cultivar", y="Local", color="Ranking")
+                                )
+
+                                fig.update_layout(
+                                    title=dict(text="Ranking Relativo por Cultivar e Local (1 = Melhor)", font=font_bold),
+                                    xaxis=dict(title=dict(text="Cultivar", font=font_bold), tickfont=font_bold),
+                                    yaxis=dict(title=dict(text="Produtor + Cidade", font=font_bold), tickfont=font_bold),
+                                    plot_bgcolor="white",
+                                    coloraxis_colorbar=dict(
+                                        title=dict(text="Ranking", font=font_bold),
+                                        tickfont=font_bold
+                                    )
+                                )
+
+                                fig.update_traces(textfont=dict(size=16, family="Arial Bold", color="black"))
+                                return fig
+
+                            # 🗂️ Figura refeita só quando os filtros mudam
+                            fig = figura_em_cache("conjunta_heatmap_ranking", versao_faixa, construir_heatmap_ranking)
+                            st.plotly_chart(fig, use_container_width=True)
 
-                        fig.update_traces(textfont=dict(size=16, family="Arial Bold", color="black"))
-
-                        st.plotly_chart(fig, use_container_width=True)
+                        else:
+                            st.warning("❌ Dados insuficientes para gerar o heatmap.")
+
+
+
+                # 🧬 Interação Genótipo x Ambiente: biplots GGE / AMMI
+
+                with secao_adiada("🧬 Análise GxE: Biplot GGE / AMMI (Local x Cultivar)", "conjunta_gxe") as aberta:
+                    if aberta:
+                        st.markdown("""
+                        <small>
+                        A matriz de produção média Cultivar x Local é decomposta em componentes principais (SVD). 
+                        No <b>GGE</b> (efeito de cultivar + interação), cada local é atribuído ao cultivar vencedor, formando mega-ambientes. 
+                        No <b>AMMI</b> aparece só a interação: cultivares próximos da origem são mais estáveis. 
+                        Células sem dado são estimadas por imputação iterativa.
+                        </small>
+                        """, unsafe_allow_html=True)
+
+                        def construir_matriz_gxe():
+                            df_gxe = df_faixa_completo.copy()
+                            if df_gxe.empty or "prod_sc_ha" not in df_gxe.columns or "Cultivar" not in df_gxe.columns:
+                                return pd.DataFrame()
+                            df_gxe["Local"] = df_gxe["Fazenda"].astype(str) + "_" + df_gxe["Cidade"].astype(str)
+                            return matriz_local_cultivar(df_gxe)
+
+                        # 🗂️ Matriz e biplot refeitos só quando os filtros (ou o modelo) mudam
+                        matriz_gxe = figura_em_cache("conjunta_gxe_matriz", versao_faixa, construir_matriz_gxe)
+
+                        if matriz_gxe.shape[0] >= 3 and matriz_gxe.shape[1] >= 3:
+                            modelo_gxe = st.radio("Modelo", MODELOS_GXE, horizontal=True, key="conjunta_modelo_gxe")
+
+                            def construir_biplot():
+                                resultado_gxe = analise_gxe(matriz_gxe, modelo_gxe)
+                                escores_cultivar = resultado_gxe["cultivares"]
+                                escores_local = resultado_gxe["locais"]
+                                variancia = resultado_gxe["variancia"]
+
+                                font_bold = dict(size=20, family="Arial Bold", color="black")
+                                fig_biplot = go.Figure()
+
+                                if modelo_gxe == "GGE":
+                                    # 🏆 Polígono "quem venceu onde" (envoltória convexa dos cultivares)
+                                    try:
+                                        pontos = escores_cultivar[["PC1", "PC2"]].to_numpy()
+                                        vertices = ConvexHull(pontos).vertices
+                                        vertices = np.r_[vertices, vertices[0]]
+                                        fig_biplot.add_trace(go.Scatter(
+                                            x=pontos[vertices, 0],
+                                            y=pontos[vertices, 1],
+                                            mode="lines",
+                                            name="Polígono",
+                                            line=dict(color="gray", dash="dot")
+                                        ))
+                                    except Exception:
+                                        pass
+
+                                    for i, (vencedor, df_mega) in enumerate(escores_local.groupby("Vencedor")):
+                                        fig_biplot.add_trace(go.Scatter(
+                                            x=df_mega["PC1"],
+                                            y=df_mega["PC2"],
+                                            mode="markers",
+                                            name=f"Mega-ambiente: {vencedor}",
+                                            text=df_mega["Local"],
+                                            hovertemplate="%{text}<extra></extra>",
+                                            marker=dict(symbol="diamond", size=9, color=px.colors.qualitative.Plotly[i % 10])
+                                        ))
+                                else:
+                                    fig_biplot.add_trace(go.Scatter(
+                                        x=escores_local["PC1"],
+                                        y=escores_local["PC2"],
+                                        mode="markers",
+                                        name="Locais",
+                                        text=escores_local["Local"],
+                                        hovertemplate="%{text}<extra></extra>",
+                                        marker=dict(symbol="diamond", size=9, color="#01B8AA")
+                                    ))
+
+                                fig_biplot.add_trace(go.Scatter(
+                                    x=escores_cultivar["PC1"],
+                                    y=escores_cultivar["PC2"],
+                                    mode="markers+text",
+                                    name="Cultivares",
+                                    text=escores_cultivar["Cultivar"],
+                                    textposition="top center",
+                                    textfont=dict(size=14, family="Arial Bold", color="black"),
+                                    marker=dict(size=10, color="black")
+                                ))
 
-                    else:
-                        st.warning("❌ Dados insuficientes para gerar o heatmap.")
+                                fig_biplot.update_layout(
+                                    title=dict(text=f"Biplot {modelo_gxe}", font=font_bold),
+                                    xaxis=dict(
+                                        title=dict(text=f"PC1 ({variancia[0]:.1f}%)", font=font_bold),
+                                        tickfont=font_bold, showgrid=True, gridcolor="lightgray", zeroline=True
+                                    ),
+                                    yaxis=dict(
+                                        title=dict(text=f"PC2 ({variancia[1]:.1f}%)", font=font_bold),
+                                        tickfont=font_bold, showgrid=True, gridcolor="lightgray", zeroline=True
+                                    ),
+                                    plot_bgcolor="white",
+                                    height=700
+                                )
+                                return fig_biplot, resultado_gxe
+
+                            fig_biplot, resultado_gxe = figura_em_cache("conjunta_gxe", (versao_faixa, modelo_gxe), construir_biplot)
+                            escores_local = resultado_gxe["locais"]
+                            st.plotly_chart(fig_biplot, use_container_width=True)
+                            situacao_imputacao = "convergiu" if resultado_gxe["convergiu"] else "sem convergência"
+                            st.caption(
+                                f"{matriz_gxe.shape[0]} cultivares x {matriz_gxe.shape[1]} locais · "
+                                f"{resultado_gxe['imputados']} células imputadas "
+                                f"({resultado_gxe['iteracoes']} iterações, {situacao_imputacao})"
+                            )
+                            if not resultado_gxe["convergiu"]:
+                                st.warning(
+                                    f"⚠️ A imputação das células vazias não atingiu a tolerância em "
+                                    f"{resultado_gxe['iteracoes']} iterações: os escores podem mudar com mais dados."
+                                )
+
+                            if modelo_gxe == "GGE":
+                                st.markdown("#### 🏆 Mega-ambientes: Quem Venceu Onde")
+                                df_mega_ambientes = (
+                                    escores_local.groupby("Vencedor")
+                                    .agg(Num_Locais=("Local", "size"), Locais=("Local", lambda x: ", ".join(sorted(x))))
+                                    .reset_index()
+                                    .rename(columns={"Vencedor": "Cultivar Vencedor"})
+                                    .sort_values("Num_Locais", ascending=False)
+                                )
+                                gb = GridOptionsBuilder.from_dataframe(df_mega_ambientes)
+                                gb.configure_default_column(cellStyle={'fontSize': '14px'})
+                                gb.configure_grid_options(headerHeight=30)
+                                custom_css = {".ag-header-cell-label": {"font-weight": "bold", "font-size": "15px", "color": "black"}}
+                                AgGrid(df_mega_ambientes, gridOptions=gb.build(), height=300, custom_css=custom_css)
+
+                                botao_exportar(
+                                    df_mega_ambientes,
+                                    nome_arquivo="mega_ambientes_gge",
+                                    chave="conjunta_mega_ambientes",
+                                    label="📥 Baixar Mega-ambientes",
+                                    nome_aba="mega_ambientes"
+                                )
+                        else:
+                            st.warning("❌ Dados insuficientes para a análise GxE (mínimo de 3 cultivares e 3 locais).")
 
 
                              
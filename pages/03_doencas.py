@@ -1,6 +1,6 @@
 import streamlit as st
-import pandas as pd
-import io
+from utils.exportacao import botao_exportar
+from utils.filtros import painel_filtros, versao_sessao
 
 st.title("📊 Avaliação de Doenças (AV2)")
 st.markdown("Explore as notas de doenças em faixas avaliadas. Aplique filtros para visualizar os dados conforme necessário.")
@@ -89,37 +89,8 @@ if "merged_dataframes" in st.session_state:
                 "GM": "GM"
             }
 
-            for coluna, label in filtros.items():
-                if coluna in df_doencas.columns:
-
-                    # 🔘 GM como slider
-                    if coluna == "GM":
-                        valores_gm = df_doencas["GM"].dropna().unique()
-                        if len(valores_gm) > 0:
-                            gm_min = int(df_doencas["GM"].min())
-                            gm_max = int(df_doencas["GM"].max())
-                            intervalo_gm = st.slider(
-                                "Selecione intervalo de GM:",
-                                min_value=gm_min,
-                                max_value=gm_max,
-                                value=(gm_min, gm_max),
-                                step=1
-                            )
-                            df_doencas = df_doencas[
-                                df_doencas["GM"].between(intervalo_gm[0], intervalo_gm[1])
-                            ]
-
-                    # 🔲 Checkbox para os demais
-                    else:
-                        with st.expander(label):
-                            opcoes = sorted(df_doencas[coluna].dropna().unique())
-                            selecionados = []
-                            for op in opcoes:
-                                op_str = str(op)
-                                if st.checkbox(op_str, key=f"{coluna}_doenca_{op_str}", value=False):
-                                    selecionados.append(op)
-                            if selecionados:
-                                df_doencas = df_doencas[df_doencas[coluna].isin(selecionados)]
+            # 🎛️ Seleção compartilhada entre as páginas; máscaras em cache por versão dos dados
+            df_doencas = painel_filtros(df_doencas, filtros, versao_sessao("av2", "doencas"), rotulo_gm="Selecione intervalo de GM:")
 
 
 
@@ -213,15 +184,13 @@ if "merged_dataframes" in st.session_state:
                         
 
             # 📥 Exportar
-            output_av2 = io.BytesIO()
-            with pd.ExcelWriter(output_av2, engine="xlsxwriter") as writer:
-                df_doencas[colunas_visiveis].to_excel(writer, index=False, sheet_name="dados_doencas")
-
-            st.download_button(
+            botao_exportar(
+                lambda: df_doencas[colunas_visiveis],
+                versao=(df_doencas.attrs["versao_filtros"], tuple(colunas_visiveis)),
+                nome_arquivo="faixa_doencas_av2",
+                chave="doencas_faixa_doencas_av2",
                 label="📥 Baixar Dados de Doenças (AV2)",
-                data=output_av2.getvalue(),
-                file_name="faixa_doencas_av2.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                nome_aba="dados_doencas"
             )
 
             col_esquerda, col_direita = st.columns([0.85, 0.15])
@@ -331,18 +300,13 @@ if "merged_dataframes" in st.session_state:
                     )
 
                     # 👇 Botão de exportação
-                    import io
-
-                    buffer = io.BytesIO()
-                    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-                        df_mostrar.to_excel(writer, sheet_name="Resumo Doenças", index=False)
-                        writer.close()
-                        st.download_button(
-                            label="📥 Baixar Resumo Doenças",
-                            data=buffer,
-                            file_name="resumo_doencas.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
+                    botao_exportar(
+                        df_mostrar,
+                        nome_arquivo="resumo_doencas",
+                        chave="doencas_resumo_doencas",
+                        label="📥 Baixar Resumo Doenças",
+                        nome_aba="Resumo Doenças"
+                    )
 
 
                    
@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import io
+from utils.exportacao import botao_exportar
+from utils.filtros import versao_conteudo, versao_sessao
+from utils.secoes import figura_em_cache, secao_adiada
 
 st.title("📊 Caracterização Agronômica")
 st.markdown("Explore os dados de caracterização agronômica nas faixas avaliadas. Aplique filtros para visualizar os dados conforme necessário.")
@@ -45,6 +47,9 @@ if "merged_dataframes" in st.session_state:
         if "Cultivar" in df_caract.columns:
             df_caract["Cultivar"] = df_caract["Cultivar"].replace(substituicoes)
 
+        # 🏷️ Versão dos dados + filtros aplicados: chave dos gráficos em cache
+        passos_filtros = [versao_conteudo(versao_sessao("av5", "caracterizacao"), df_caract)]
+
         # 🔍 Layout com filtros
         col_filtros, col_tabela = st.columns([1.5, 8.5])
 
@@ -71,6 +76,7 @@ if "merged_dataframes" in st.session_state:
                                 selecionados.append(op)
                         if selecionados:
                             df_caract = df_caract[df_caract[coluna].isin(selecionados)]
+                            passos_filtros.append((coluna, tuple(selecionados)))
 
             # Slider de GM por último (fora do expander)
             if "GM" in df_caract.columns:
@@ -87,10 +93,13 @@ if "merged_dataframes" in st.session_state:
                         step=1
                     )
                     df_caract = df_caract[df_caract["GM"].between(gm_range[0], gm_range[1])]
+                    passos_filtros.append(("GM", tuple(gm_range)))
                 else:
                     st.info(f"Grupo de Maturação disponível: **{gm_min}**")        
 
         
+        versao_caract = tuple(passos_filtros)
+
         # 📊 Tabela
         with col_tabela:
             colunas_principais = [
@@ -233,7 +242,6 @@ if "merged_dataframes" in st.session_state:
 
 
             # ====================== 📊 Resumo por Cultivar – Número de Vagens ======================
-            import io
             import numpy as np
             import pandas as pd
             from st_aggrid import AgGrid, GridOptionsBuilder
@@ -358,15 +366,12 @@ if "merged_dataframes" in st.session_state:
 
 
             # 📥 Exportar Excel
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-                df_vagens_pivot.to_excel(writer, index=False, sheet_name="resumo_vagens_pivot")
-
-            st.download_button(
+            botao_exportar(
+                df_vagens_pivot,
+                nome_arquivo="resumo_vagens_pivotado",
+                chave="caract_resumo_vagens_pivotado",
                 label="📥 Baixar Resumo de Vagens (Pivotado)",
-                data=output.getvalue(),
-                file_name="resumo_vagens_pivotado.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                nome_aba="resumo_vagens_pivot"
             )
 
             # ====================== 📊 Resumo por Cultivar – Número de Grãos por Vagem ======================
@@ -481,15 +486,12 @@ if "merged_dataframes" in st.session_state:
                 )
 
                 # 📥 Exportar Excel
-                output_graos = io.BytesIO()
-                with pd.ExcelWriter(output_graos, engine="xlsxwriter") as writer:
-                    df_resumo_graos.to_excel(writer, index=False, sheet_name="resumo_graos")
-
-                st.download_button(
+                botao_exportar(
+                    df_resumo_graos,
+                    nome_arquivo="resumo_cultivar_graos",
+                    chave="caract_resumo_cultivar_graos",
                     label="📥 Baixar Resumo (Grãos por Vagem)",
-                    data=output_graos.getvalue(),
-                    file_name="resumo_cultivar_graos.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    nome_aba="resumo_graos"
                 )
 
                 # 📝 Legenda
@@ -502,381 +504,405 @@ if "merged_dataframes" in st.session_state:
 
             
             # 📊 Visualizar Gráfico - Percentual de Vagens por Terço da Planta    
-            with st.expander("📊 Visualizar Gráfico - Distribuição Percentual de Vagens por Terço"):
-                import plotly.express as px
-
-                # Agrupamento e reshape dos dados
-                df_vagens_grouped = df_caract.groupby("Cultivar")[["NV_TS_perc", "NV_TM_perc", "NV_TI_perc"]].mean().reset_index()
-
-                df_vagens_long = df_vagens_grouped.melt(
-                    id_vars="Cultivar",
-                    value_vars=["NV_TS_perc", "NV_TM_perc", "NV_TI_perc"],
-                    var_name="Terço",
-                    value_name="Percentual"
-                )
-
-                # Legenda personalizada
-                tercos_legenda = {
-                    "NV_TS_perc": "Terço Superior",
-                    "NV_TM_perc": "Terço Médio",
-                    "NV_TI_perc": "Terço Inferior"
-                }
-                df_vagens_long["Terço"] = df_vagens_long["Terço"].map(tercos_legenda)
-
-                # 🌈 Cores claras personalizadas
-                cores_personalizadas = {
-                    "Terço Superior": "#438AD8",  # Azul escuro
-                    "Terço Médio": "#5EEFF7",     # Azul água
-                    "Terço Inferior": "#0C9A73"   # Verde escuro
-                }
-
-                # 🎯 Gráfico
-                fig = px.bar(
-                    df_vagens_long,
-                    x="Cultivar",
-                    y="Percentual",
-                    color="Terço",
-                    barmode="group",
-                    text="Percentual",
-                    color_discrete_map=cores_personalizadas
-                )
-
-                fig.update_traces(
-                    texttemplate='<b>%{text:.1f}%</b>',
-                    textposition='outside',
-                    textfont=dict(size=20, family="Arial", color="black")
-                )
+            with secao_adiada("📊 Visualizar Gráfico - Distribuição Percentual de Vagens por Terço", "caract_vagens_terco") as aberta:
+                if aberta:
+                    def construir_vagens_terco():
+                        import plotly.express as px
+
+                        # Agrupamento e reshape dos dados
+                        df_vagens_grouped = df_caract.groupby("Cultivar")[["NV_TS_perc", "NV_TM_perc", "NV_TI_perc"]].mean().reset_index()
+
+                        df_vagens_long = df_vagens_grouped.melt(
+                            id_vars="Cultivar",
+                            value_vars=["NV_TS_perc", "NV_TM_perc", "NV_TI_perc"],
+                            var_name="Terço",
+                            value_name="Percentual"
+                        )
+
+                        # Legenda personalizada
+                        tercos_legenda = {
+                            "NV_TS_perc": "Terço Superior",
+                            "NV_TM_perc": "Terço Médio",
+                            "NV_TI_perc": "Terço Inferior"
+                        }
+                        df_vagens_long["Terço"] = df_vagens_long["Terço"].map(tercos_legenda)
 
-                fig.update_layout(
-                    title="<b>Distribuição Percentual de Vagens por Terço</b>",
-                    title_font=dict(family="Arial", size=20, color="black"),
-                    xaxis=dict(
-                        title=dict(text="<b>Cultivar</b>", font=dict(family="Arial", size=20, color="black")),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        tickangle=-45
-                    ),
-                    yaxis=dict(
-                        title=dict(text="<b>Percentual (%)</b>", font=dict(family="Arial", size=20, color="black")),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        range=[0, 100]
-                    ),
-                    bargap=0.25,
-                    height=500,
-                    legend_title_text="",
-                    legend=dict(font=dict(size=20, family="Arial", color="black"))
-                )
+                        # 🌈 Cores claras personalizadas
+                        cores_personalizadas = {
+                            "Terço Superior": "#438AD8",  # Azul escuro
+                            "Terço Médio": "#5EEFF7",     # Azul água
+                            "Terço Inferior": "#0C9A73"   # Verde escuro
+                        }
 
-                st.plotly_chart(fig, use_container_width=True)
+                        # 🎯 Gráfico
+                        fig = px.bar(
+                            df_vagens_long,
+                            x="Cultivar",
+                            y="Percentual",
+                            color="Terço",
+                            barmode="group",
+                            text="Percentual",
+                            color_discrete_map=cores_personalizadas
+                        )
+
+                        fig.update_traces(
+                            texttemplate='<b>%{text:.1f}%</b>',
+                            textposition='outside',
+                            textfont=dict(size=20, family="Arial", color="black")
+                        )
+
+                        fig.update_layout(
+                            title="<b>Distribuição Percentual de Vagens por Terço</b>",
+                            title_font=dict(family="Arial", size=20, color="black"),
+                            xaxis=dict(
+                                title=dict(text="<b>Cultivar</b>", font=dict(family="Arial", size=20, color="black")),
+                                tickfont=dict(family="Arial", size=20, color="black"),
+                                tickangle=-45
+                            ),
+                            yaxis=dict(
+                                title=dict(text="<b>Percentual (%)</b>", font=dict(family="Arial", size=20, color="black")),
+                                tickfont=dict(family="Arial", size=20, color="black"),
+                                range=[0, 100]
+                            ),
+                            bargap=0.25,
+                            height=500,
+                            legend_title_text="",
+                            legend=dict(font=dict(size=20, family="Arial", color="black"))
+                        )
+                        return fig
+
+                    fig = figura_em_cache("caract_vagens_terco", versao_caract, construir_vagens_terco)
+                    st.plotly_chart(fig, use_container_width=True)
       
 
 
             # 📊 Gráfico único: Percentual de Vagens com 4 Grãos por Terço (TS, TM, TI)
-            with st.expander("📊 Visualizar Gráfico - Percentual de Vagens com 4 Grãos por Terço da Planta"):
-                # Prepara o dataframe no formato longo
-                df_4g = df_resumo_graos[["Cultivar", "NV_TS_4G_perc", "NV_TM_4G_perc", "NV_TI_4G_perc"]].copy()
-
-                df_4g_long = df_4g.melt(
-                    id_vars="Cultivar",
-                    value_vars=["NV_TS_4G_perc", "NV_TM_4G_perc", "NV_TI_4G_perc"],
-                    var_name="Terço",
-                    value_name="Percentual"
-                )
-
-                # Renomeia os terços
-                df_4g_long["Terço"] = df_4g_long["Terço"].map({
-                    "NV_TS_4G_perc": "Terço Superior",
-                    "NV_TM_4G_perc": "Terço Médio",
-                    "NV_TI_4G_perc": "Terço Inferior"
-                })
-
-                fig = px.bar(
-                    df_4g_long,
-                    x="Cultivar",
-                    y="Percentual",
-                    color="Terço",
-                    barmode="group",
-                    text="Percentual",
-                    color_discrete_map={
-                        "Terço Superior": "#438AD8",  # Azul escuro
-                        "Terço Médio": "#5EEFF7",     # Azul água
-                        "Terço Inferior": "#0C9A73"   # Verde escuro
-                        },
-                    title="<b>Percentual de Vagens com 4 Grãos por Terço da Planta (%)</b>"
-                )
-
-                fig.update_traces(
-                    texttemplate='<b>%{text:.1f}%</b>',
-                    textposition='outside',
-                    textfont=dict(size=20, family="Arial", color="black")
-                )
-
-                fig.update_layout(
-                    title_font=dict(family="Arial", size=20, color="black"),
-                    xaxis=dict(
-                        title=dict(text="<b>Cultivar</b>", font=dict(size=20, family="Arial", color="black")),
-                        tickfont=dict(size=20, family="Arial", color="black"),
-                        tickangle=-45
-                    ),
-                    yaxis=dict(
-                        title=dict(text="<b>Percentual (%)</b>", font=dict(size=20, family="Arial", color="black")),
-                        tickfont=dict(size=20, family="Arial", color="black"),
-                        range=[0, 100]
-                    ),
-                    bargap=0.25,
-                    height=500,
-                    legend_title_text="",
-                    legend=dict(font=dict(size=20, family="Arial", color="black"))
-                )
-
-                st.plotly_chart(fig, use_container_width=True)
+            with secao_adiada("📊 Visualizar Gráfico - Percentual de Vagens com 4 Grãos por Terço da Planta", "caract_vagens_4g") as aberta:
+                if aberta:
+                    def construir_vagens_4g():
+                        # Prepara o dataframe no formato longo
+                        df_4g = df_resumo_graos[["Cultivar", "NV_TS_4G_perc", "NV_TM_4G_perc", "NV_TI_4G_perc"]].copy()
+
+                        df_4g_long = df_4g.melt(
+                            id_vars="Cultivar",
+                            value_vars=["NV_TS_4G_perc", "NV_TM_4G_perc", "NV_TI_4G_perc"],
+                            var_name="Terço",
+                            value_name="Percentual"
+                        )
+
+                        # Renomeia os terços
+                        df_4g_long["Terço"] = df_4g_long["Terço"].map({
+                            "NV_TS_4G_perc": "Terço Superior",
+                            "NV_TM_4G_perc": "Terço Médio",
+                            "NV_TI_4G_perc": "Terço Inferior"
+                        })
+
+                        fig = px.bar(
+                            df_4g_long,
+                            x="Cultivar",
+                            y="Percentual",
+                            color="Terço",
+                            barmode="group",
+                            text="Percentual",
+                            color_discrete_map={
+                                "Terço Superior": "#438AD8",  # Azul escuro
+                                "Terço Médio": "#5EEFF7",     # Azul água
+                                "Terço Inferior": "#0C9A73"   # Verde escuro
+                                },
+                            title="<b>Percentual de Vagens com 4 Grãos por Terço da Planta (%)</b>"
+                        )
+
+                        fig.update_traces(
+                            texttemplate='<b>%{text:.1f}%</b>',
+                            textposition='outside',
+                            textfont=dict(size=20, family="Arial", color="black")
+                        )
+
+                        fig.update_layout(
+                            title_font=dict(family="Arial", size=20, color="black"),
+                            xaxis=dict(
+                                title=dict(text="<b>Cultivar</b>", font=dict(size=20, family="Arial", color="black")),
+                                tickfont=dict(size=20, family="Arial", color="black"),
+                                tickangle=-45
+                            ),
+                            yaxis=dict(
+                                title=dict(text="<b>Percentual (%)</b>", font=dict(size=20, family="Arial", color="black")),
+                                tickfont=dict(size=20, family="Arial", color="black"),
+                                range=[0, 100]
+                            ),
+                            bargap=0.25,
+                            height=500,
+                            legend_title_text="",
+                            legend=dict(font=dict(size=20, family="Arial", color="black"))
+                        )
+                        return fig
+
+                    fig = figura_em_cache("caract_vagens_4g", versao_caract, construir_vagens_4g)
+                    st.plotly_chart(fig, use_container_width=True)
 
 
 
             # 📊 Gráfico único: Percentual de Vagens com 3 Grãos por Terço (TS, TM, TI)
-            with st.expander("📊 Visualizar Gráfico - Percentual de Vagens com 3 Grãos por Terço da Planta"):
-                # Prepara o dataframe no formato longo
-                df_3g = df_resumo_graos[["Cultivar", "NV_TS_3G_perc", "NV_TM_3G_perc", "NV_TI_3G_perc"]].copy()
-
-                df_3g_long = df_3g.melt(
-                    id_vars="Cultivar",
-                    value_vars=["NV_TS_3G_perc", "NV_TM_3G_perc", "NV_TI_3G_perc"],
-                    var_name="Terço",
-                    value_name="Percentual"
-                )
-
-                # Renomeia os terços
-                df_3g_long["Terço"] = df_3g_long["Terço"].map({
-                    "NV_TS_3G_perc": "Terço Superior",
-                    "NV_TM_3G_perc": "Terço Médio",
-                    "NV_TI_3G_perc": "Terço Inferior"
-                })
-
-                # Cria o gráfico
-                fig = px.bar(
-                    df_3g_long,
-                    x="Cultivar",
-                    y="Percentual",
-                    color="Terço",
-                    barmode="group",
-                    text="Percentual",
-                    color_discrete_map={
-                        "Terço Superior": "#438AD8",  # Azul escuro
-                        "Terço Médio": "#5EEFF7",     # Azul água
-                        "Terço Inferior": "#0C9A73"   # Verde escuro
-                        },
-                    title="<b>Percentual de Vagens com 3 Grãos por Terço da Planta (%)</b>"
-                )
-
-                fig.update_traces(
-                    texttemplate='<b>%{text:.1f}%</b>',
-                    textposition='outside',
-                    textfont=dict(size=20, family="Arial", color="black")
-                )
-
-                fig.update_layout(
-                    title_font=dict(family="Arial", size=20, color="black"),
-                    xaxis=dict(
-                        title=dict(text="<b>Cultivar</b>", font=dict(size=20, family="Arial", color="black")),
-                        tickfont=dict(size=20, family="Arial", color="black"),
-                        tickangle=-45
-                    ),
-                    yaxis=dict(
-                        title=dict(text="<b>Percentual (%)</b>", font=dict(size=20, family="Arial", color="black")),
-                        tickfont=dict(size=20, family="Arial", color="black"),
-                        range=[0, 100]
-                    ),
-                    bargap=0.25,
-                    height=500,
-                    legend_title_text="",
-                    legend=dict(font=dict(size=20, family="Arial", color="black"))
-                )
-
-                st.plotly_chart(fig, use_container_width=True)
+            with secao_adiada("📊 Visualizar Gráfico - Percentual de Vagens com 3 Grãos por Terço da Planta", "caract_vagens_3g") as aberta:
+                if aberta:
+                    def construir_vagens_3g():
+                        # Prepara o dataframe no formato longo
+                        df_3g = df_resumo_graos[["Cultivar", "NV_TS_3G_perc", "NV_TM_3G_perc", "NV_TI_3G_perc"]].copy()
+
+                        df_3g_long = df_3g.melt(
+                            id_vars="Cultivar",
+                            value_vars=["NV_TS_3G_perc", "NV_TM_3G_perc", "NV_TI_3G_perc"],
+                            var_name="Terço",
+                            value_name="Percentual"
+                        )
+
+                        # Renomeia os terços
+                        df_3g_long["Terço"] = df_3g_long["Terço"].map({
+                            "NV_TS_3G_perc": "Terço Superior",
+                            "NV_TM_3G_perc": "Terço Médio",
+                            "NV_TI_3G_perc": "Terço Inferior"
+                        })
+
+                        # Cria o gráfico
+                        fig = px.bar(
+                            df_3g_long,
+                            x="Cultivar",
+                            y="Percentual",
+                            color="Terço",
+                            barmode="group",
+                            text="Percentual",
+                            color_discrete_map={
+                                "Terço Superior": "#438AD8",  # Azul escuro
+                                "Terço Médio": "#5EEFF7",     # Azul água
+                                "Terço Inferior": "#0C9A73"   # Verde escuro
+                                },
+                            title="<b>Percentual de Vagens com 3 Grãos por Terço da Planta (%)</b>"
+                        )
+
+                        fig.update_traces(
+                            texttemplate='<b>%{text:.1f}%</b>',
+                            textposition='outside',
+                            textfont=dict(size=20, family="Arial", color="black")
+                        )
+
+                        fig.update_layout(
+                            title_font=dict(family="Arial", size=20, color="black"),
+                            xaxis=dict(
+                                title=dict(text="<b>Cultivar</b>", font=dict(size=20, family="Arial", color="black")),
+                                tickfont=dict(size=20, family="Arial", color="black"),
+                                tickangle=-45
+                            ),
+                            yaxis=dict(
+                                title=dict(text="<b>Percentual (%)</b>", font=dict(size=20, family="Arial", color="black")),
+                                tickfont=dict(size=20, family="Arial", color="black"),
+                                range=[0, 100]
+                            ),
+                            bargap=0.25,
+                            height=500,
+                            legend_title_text="",
+                            legend=dict(font=dict(size=20, family="Arial", color="black"))
+                        )
+                        return fig
+
+                    fig = figura_em_cache("caract_vagens_3g", versao_caract, construir_vagens_3g)
+                    st.plotly_chart(fig, use_container_width=True)
 
            
 
             # 📊 Gráfico único: Percentual de Vagens com 2 Grãos por Terço (TS, TM, TI)
-            with st.expander("📊 Visualizar Gráfico - Percentual de Vagens com 2 Grãos por Terço da Planta"):
-                # Prepara o DataFrame no formato longo
-                df_2g = df_resumo_graos[["Cultivar", "NV_TS_2G_perc", "NV_TM_2G_perc", "NV_TI_2G_perc"]].copy()
-
-                df_2g_long = df_2g.melt(
-                    id_vars="Cultivar",
-                    value_vars=["NV_TS_2G_perc", "NV_TM_2G_perc", "NV_TI_2G_perc"],
-                    var_name="Terço",
-                    value_name="Percentual"
-                )
-
-                df_2g_long["Terço"] = df_2g_long["Terço"].map({
-                    "NV_TS_2G_perc": "Terço Superior",
-                    "NV_TM_2G_perc": "Terço Médio",
-                    "NV_TI_2G_perc": "Terço Inferior"
-                })
-
-                # Cria o gráfico agrupado
-                fig = px.bar(
-                    df_2g_long,
-                    x="Cultivar",
-                    y="Percentual",
-                    color="Terço",
-                    barmode="group",
-                    text="Percentual",
-                    color_discrete_map={
-                        "Terço Superior": "#438AD8",  # Azul escuro
-                        "Terço Médio": "#5EEFF7",     # Azul água
-                        "Terço Inferior": "#0C9A73"   # Verde escuro
-                        },
-                    title="<b>Percentual de Vagens com 2 Grãos por Terço da Planta (%)</b>"
-                )
-
-                fig.update_traces(
-                    texttemplate='<b>%{text:.1f}%</b>',
-                    textposition='outside',
-                    textfont=dict(size=20, family="Arial", color="black")
-                )
-
-                fig.update_layout(
-                    title_font=dict(family="Arial", size=20, color="black"),
-                    xaxis=dict(
-                        title=dict(text="<b>Cultivar</b>", font=dict(size=20, family="Arial", color="black")),
-                        tickfont=dict(size=20, family="Arial", color="black"),
-                        tickangle=-45
-                    ),
-                    yaxis=dict(
-                        title=dict(text="<b>Percentual (%)</b>", font=dict(size=20, family="Arial", color="black")),
-                        tickfont=dict(size=20, family="Arial", color="black"),
-                        range=[0, 100]
-                    ),
-                    bargap=0.25,
-                    height=500,
-                    legend_title_text="",
-                    legend=dict(font=dict(size=20, family="Arial", color="black"))
-                )
-
-                st.plotly_chart(fig, use_container_width=True)
+            with secao_adiada("📊 Visualizar Gráfico - Percentual de Vagens com 2 Grãos por Terço da Planta", "caract_vagens_2g") as aberta:
+                if aberta:
+                    def construir_vagens_2g():
+                        # Prepara o DataFrame no formato longo
+                        df_2g = df_resumo_graos[["Cultivar", "NV_TS_2G_perc", "NV_TM_2G_perc", "NV_TI_2G_perc"]].copy()
+
+                        df_2g_long = df_2g.melt(
+                            id_vars="Cultivar",
+                            value_vars=["NV_TS_2G_perc", "NV_TM_2G_perc", "NV_TI_2G_perc"],
+                            var_name="Terço",
+                            value_name="Percentual"
+                        )
+
+                        df_2g_long["Terço"] = df_2g_long["Terço"].map({
+                            "NV_TS_2G_perc": "Terço Superior",
+                            "NV_TM_2G_perc": "Terço Médio",
+                            "NV_TI_2G_perc": "Terço Inferior"
+                        })
+
+                        # Cria o gráfico agrupado
+                        fig = px.bar(
+                            df_2g_long,
+                            x="Cultivar",
+                            y="Percentual",
+                            color="Terço",
+                            barmode="group",
+                            text="Percentual",
+                            color_discrete_map={
+                                "Terço Superior": "#438AD8",  # Azul escuro
+                                "Terço Médio": "#5EEFF7",     # Azul água
+                                "Terço Inferior": "#0C9A73"   # Verde escuro
+                                },
+                            title="<b>Percentual de Vagens com 2 Grãos por Terço da Planta (%)</b>"
+                        )
+
+                        fig.update_traces(
+                            texttemplate='<b>%{text:.1f}%</b>',
+                            textposition='outside',
+                            textfont=dict(size=20, family="Arial", color="black")
+                        )
+
+                        fig.update_layout(
+                            title_font=dict(family="Arial", size=20, color="black"),
+                            xaxis=dict(
+                                title=dict(text="<b>Cultivar</b>", font=dict(size=20, family="Arial", color="black")),
+                                tickfont=dict(size=20, family="Arial", color="black"),
+                                tickangle=-45
+                            ),
+                            yaxis=dict(
+                                title=dict(text="<b>Percentual (%)</b>", font=dict(size=20, family="Arial", color="black")),
+                                tickfont=dict(size=20, family="Arial", color="black"),
+                                range=[0, 100]
+                            ),
+                            bargap=0.25,
+                            height=500,
+                            legend_title_text="",
+                            legend=dict(font=dict(size=20, family="Arial", color="black"))
+                        )
+                        return fig
+
+                    fig = figura_em_cache("caract_vagens_2g", versao_caract, construir_vagens_2g)
+                    st.plotly_chart(fig, use_container_width=True)
 
             # ============================ 📊 Gráfico único: Vagens com 1 Grão por Terço ============================
-            with st.expander("📊 Visualizar Gráfico - Percentual de Vagens com 1 Grão por Terço da Planta"):
-                # Prepara o DataFrame no formato longo
-                df_1g = df_resumo_graos[["Cultivar", "NV_TS_1G_perc", "NV_TM_1G_perc", "NV_TI_1G_perc"]].copy()
-
-                df_1g_long = df_1g.melt(
-                    id_vars="Cultivar",
-                    value_vars=["NV_TS_1G_perc", "NV_TM_1G_perc", "NV_TI_1G_perc"],
-                    var_name="Terço",
-                    value_name="Percentual"
-                )
-
-                df_1g_long["Terço"] = df_1g_long["Terço"].map({
-                    "NV_TS_1G_perc": "Terço Superior",
-                    "NV_TM_1G_perc": "Terço Médio",
-                    "NV_TI_1G_perc": "Terço Inferior"
-                })
-
-                # Cria o gráfico agrupado
-                fig = px.bar(
-                    df_1g_long,
-                    x="Cultivar",
-                    y="Percentual",
-                    color="Terço",
-                    barmode="group",
-                    text="Percentual",
-                    color_discrete_map={
-                        "Terço Superior": "#438AD8",  # Azul escuro
-                        "Terço Médio": "#5EEFF7",     # Azul água
-                        "Terço Inferior": "#0C9A73"   # Verde escuro
-                        },
-                    title="<b>Percentual de Vagens com 1 Grão por Terço da Planta (%)</b>"
-                )
-
-                fig.update_traces(
-                    texttemplate='<b>%{text:.1f}%</b>',
-                    textposition='outside',
-                    textfont=dict(size=20, family="Arial", color="black")
-                )
-
-                fig.update_layout(
-                    title_font=dict(family="Arial", size=20, color="black"),
-                    xaxis=dict(
-                        title=dict(text="<b>Cultivar</b>", font=dict(size=20, family="Arial", color="black")),
-                        tickfont=dict(size=20, family="Arial", color="black"),
-                        tickangle=-45
-                    ),
-                    yaxis=dict(
-                        title=dict(text="<b>Percentual (%)</b>", font=dict(size=20, family="Arial", color="black")),
-                        tickfont=dict(size=20, family="Arial", color="black"),
-                        range=[0, 100]
-                    ),
-                    bargap=0.25,
-                    height=500,
-                    legend_title_text="",
-                    legend=dict(font=dict(size=20, family="Arial", color="black"))
-                )
-
-                st.plotly_chart(fig, use_container_width=True)
+            with secao_adiada("📊 Visualizar Gráfico - Percentual de Vagens com 1 Grão por Terço da Planta", "caract_vagens_1g") as aberta:
+                if aberta:
+                    def construir_vagens_1g():
+                        # Prepara o DataFrame no formato longo
+                        df_1g = df_resumo_graos[["Cultivar", "NV_TS_1G_perc", "NV_TM_1G_perc", "NV_TI_1G_perc"]].copy()
+
+                        df_1g_long = df_1g.melt(
+                            id_vars="Cultivar",
+                            value_vars=["NV_TS_1G_perc", "NV_TM_1G_perc", "NV_TI_1G_perc"],
+                            var_name="Terço",
+                            value_name="Percentual"
+                        )
+
+                        df_1g_long["Terço"] = df_1g_long["Terço"].map({
+                            "NV_TS_1G_perc": "Terço Superior",
+                            "NV_TM_1G_perc": "Terço Médio",
+                            "NV_TI_1G_perc": "Terço Inferior"
+                        })
+
+                        # Cria o gráfico agrupado
+                        fig = px.bar(
+                            df_1g_long,
+                            x="Cultivar",
+                            y="Percentual",
+                            color="Terço",
+                            barmode="group",
+                            text="Percentual",
+                            color_discrete_map={
+                                "Terço Superior": "#438AD8",  # Azul escuro
+                                "Terço Médio": "#5EEFF7",     # Azul água
+                                "Terço Inferior": "#0C9A73"   # Verde escuro
+                                },
+                            title="<b>Percentual de Vagens com 1 Grão por Terço da Planta (%)</b>"
+                        )
+
+                        fig.update_traces(
+                            texttemplate='<b>%{text:.1f}%</b>',
+                            textposition='outside',
+                            textfont=dict(size=20, family="Arial", color="black")
+                        )
+
+                        fig.update_layout(
+                            title_font=dict(family="Arial", size=20, color="black"),
+                            xaxis=dict(
+                                title=dict(text="<b>Cultivar</b>", font=dict(size=20, family="Arial", color="black")),
+                                tickfont=dict(size=20, family="Arial", color="black"),
+                                tickangle=-45
+                            ),
+                            yaxis=dict(
+                                title=dict(text="<b>Percentual (%)</b>", font=dict(size=20, family="Arial", color="black")),
+                                tickfont=dict(size=20, family="Arial", color="black"),
+                                range=[0, 100]
+                            ),
+                            bargap=0.25,
+                            height=500,
+                            legend_title_text="",
+                            legend=dict(font=dict(size=20, family="Arial", color="black"))
+                        )
+                        return fig
+
+                    fig = figura_em_cache("caract_vagens_1g", versao_caract, construir_vagens_1g)
+                    st.plotly_chart(fig, use_container_width=True)
       
 
 
 
             # ============================ 📊 Gráfico único: Percentual de Vagens com 1 a 4 Grãos ============================
-            with st.expander("📊 Visualizar Gráfico - Percentual de Vagens com 1 a 4 Grãos por Cultivar"):
-                df_vagens_graos = df_resumo_graos[["Cultivar", "NV_1G", "NV_2G", "NV_3G", "NV_4G"]].copy()
-
-                df_vagens_graos_long = df_vagens_graos.melt(
-                    id_vars="Cultivar",
-                    value_vars=["NV_1G", "NV_2G", "NV_3G", "NV_4G"],
-                    var_name="Grãos por Vagem",
-                    value_name="Percentual"
-                )
-
-                df_vagens_graos_long["Grãos por Vagem"] = df_vagens_graos_long["Grãos por Vagem"].map({
-                    "NV_1G": "1 Grão",
-                    "NV_2G": "2 Grãos",
-                    "NV_3G": "3 Grãos",
-                    "NV_4G": "4 Grãos"
-                })
-
-                fig = px.bar(
-                    df_vagens_graos_long,
-                    x="Cultivar",
-                    y="Percentual",
-                    color="Grãos por Vagem",
-                    barmode="group",
-                    text="Percentual",
-                    title="<b>Percentual de Vagens com 1 a 4 Grãos por Cultivar</b>",
-                    color_discrete_map={
-                        "1 Grão": "#438AD8",    # Azul escuro
-                        "2 Grãos": "#5EEFF7",   # Azul água
-                        "3 Grãos": "#0C9A73",   # Verde escuro
-                        "4 Grãos": "#7D9632"    # Verde claro
-                    }
-                )
-
-                fig.update_traces(
-                    texttemplate='<b>%{text:.1f}%</b>',
-                    textposition='outside',
-                    textfont=dict(size=20, family="Arial", color="black")
-                )
-
-                fig.update_layout(
-                    title_font=dict(family="Arial", size=20, color="black"),
-                    xaxis=dict(
-                        title=dict(text="<b>Cultivar</b>", font=dict(size=20, family="Arial", color="black")),
-                        tickfont=dict(size=20, family="Arial", color="black"),
-                        tickangle=-45
-                    ),
-                    yaxis=dict(
-                        title=dict(text="<b>Percentual (%)</b>", font=dict(size=20, family="Arial", color="black")),
-                        tickfont=dict(size=20, family="Arial", color="black"),
-                        range=[0, 100]
-                    ),
-                    bargap=0.25,
-                    height=500,
-                    legend_title_text="",
-                    legend=dict(font=dict(size=20, family="Arial", color="black"))
-                )
-
-                st.plotly_chart(fig, use_container_width=True)
+            with secao_adiada("📊 Visualizar Gráfico - Percentual de Vagens com 1 a 4 Grãos por Cultivar", "caract_vagens_cultivar") as aberta:
+                if aberta:
+                    def construir_vagens_cultivar():
+                        df_vagens_graos = df_resumo_graos[["Cultivar", "NV_1G", "NV_2G", "NV_3G", "NV_4G"]].copy()
+
+                        df_vagens_graos_long = df_vagens_graos.melt(
+                            id_vars="Cultivar",
+                            value_vars=["NV_1G", "NV_2G", "NV_3G", "NV_4G"],
+                            var_name="Grãos por Vagem",
+                            value_name="Percentual"
+                        )
+
+                        df_vagens_graos_long["Grãos por Vagem"] = df_vagens_graos_long["Grãos por Vagem"].map({
+                            "NV_1G": "1 Grão",
+                            "NV_2G": "2 Grãos",
+                            "NV_3G": "3 Grãos",
+                            "NV_4G": "4 Grãos"
+                        })
+
+                        fig = px.bar(
+                            df_vagens_graos_long,
+                            x="Cultivar",
+                            y="Percentual",
+                            color="Grãos por Vagem",
+                            barmode="group",
+                            text="Percentual",
+                            title="<b>Percentual de Vagens com 1 a 4 Grãos por Cultivar</b>",
+                            color_discrete_map={
+                                "1 Grão": "#438AD8",    # Azul escuro
+                                "2 Grãos": "#5EEFF7",   # Azul água
+                                "3 Grãos": "#0C9A73",   # Verde escuro
+                                "4 Grãos": "#7D9632"    # Verde claro
+                            }
+                        )
+
+                        fig.update_traces(
+                            texttemplate='<b>%{text:.1f}%</b>',
+                            textposition='outside',
+                            textfont=dict(size=20, family="Arial", color="black")
+                        )
+
+                        fig.update_layout(
+                            title_font=dict(family="Arial", size=20, color="black"),
+                            xaxis=dict(
+                                title=dict(text="<b>Cultivar</b>", font=dict(size=20, family="Arial", color="black")),
+                                tickfont=dict(size=20, family="Arial", color="black"),
+                                tickangle=-45
+                            ),
+                            yaxis=dict(
+                                title=dict(text="<b>Percentual (%)</b>", font=dict(size=20, family="Arial", color="black")),
+                                tickfont=dict(size=20, family="Arial", color="black"),
+                                range=[0, 100]
+                            ),
+                            bargap=0.25,
+                            height=500,
+                            legend_title_text="",
+                            legend=dict(font=dict(size=20, family="Arial", color="black"))
+                        )
+                        return fig
+
+                    fig = figura_em_cache("caract_vagens_cultivar", versao_caract, construir_vagens_cultivar)
+                    st.plotly_chart(fig, use_container_width=True)
 
 
 
@@ -884,17 +910,13 @@ if "merged_dataframes" in st.session_state:
           
 
             # 📥 Exportar
-            output_graos = io.BytesIO()
-            with pd.ExcelWriter(output_graos, engine="xlsxwriter") as writer:
-                df_resumo_graos.to_excel(writer, index=False, sheet_name="resumo_grao_vagem")
-
-            st.download_button(
+            botao_exportar(
+                df_resumo_graos,
+                nome_arquivo="resumo_cultivar_grao_vagem",
+                chave="caract_resumo_cultivar_grao_vagem",
                 label="📥 Baixar Resumo (Grãos por Vagem)",
-                data=output_graos.getvalue(),
-                file_name="resumo_cultivar_grao_vagem.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                key="download_graos"
-            )           
+                nome_aba="resumo_grao_vagem"
+            )
 
 
 
@@ -1,6 +1,8 @@
 import streamlit as st
-import pandas as pd
-import io
+from utils.exportacao import botao_exportar
+from utils.filtros import painel_filtros, versao_sessao
+from utils.head_to_head import CacheHeadToHead, CuboHeadToHead
+from utils.metricas_av7 import tabela_av7
 import plotly.graph_objects as go
 
 from st_aggrid import AgGrid, GridOptionsBuilder
@@ -14,74 +16,9 @@ if "merged_dataframes" in st.session_state:
     if df_av7 is not None and not df_av7.empty:
         st.success("✅ Dados carregados com sucesso!")
 
-        df_final_av7 = df_av7[~df_av7["displayName"].isin(["raullanconi", "stine"])].copy()
-
-        # Cálculos adicionais
-        if "numeroLinhas" in df_final_av7.columns and "comprimentoLinha" in df_final_av7.columns:
-            df_final_av7["areaParcela"] = df_final_av7["numeroLinhas"] * df_final_av7["comprimentoLinha"] * 0.5
-
-        colunas_plantas = ["numeroPlantas10Metros1a", "numeroPlantas10Metros2a", "numeroPlantas10Metros3a", "numeroPlantas10Metros4a"]
-        if all(col in df_final_av7.columns for col in colunas_plantas):
-            df_final_av7["numeroPlantasMedio10m"] = df_final_av7[colunas_plantas].replace(0, pd.NA).mean(axis=1, skipna=True)
-            df_final_av7["Pop_Final"] = (20000 * df_final_av7["numeroPlantasMedio10m"]) / 10
-
-        if "numeroPlantasMedio10m" in df_final_av7.columns:
-            df_final_av7["popMediaFinal"] = (10000 / 0.5) * (df_final_av7["numeroPlantasMedio10m"] / 10)
-
-        if all(col in df_final_av7.columns for col in ["pesoParcela", "umidadeParcela", "areaParcela"]):
-            df_final_av7["producaoCorrigida"] = (
-                (df_final_av7["pesoParcela"] * (100 - df_final_av7["umidadeParcela"]) / 87) * (10000 / df_final_av7["areaParcela"])
-            ).astype(float).round(1)
-
-        if "producaoCorrigida" in df_final_av7.columns:
-            df_final_av7["producaoCorrigidaSc"] = (df_final_av7["producaoCorrigida"] / 60).astype(float).round(1)
-
-        if all(col in df_final_av7.columns for col in ["pesoMilGraos", "umidadeAmostraPesoMilGraos"]):
-            df_final_av7["PMG_corrigido"] = (
-                df_final_av7["pesoMilGraos"] * ((100 - df_final_av7["umidadeAmostraPesoMilGraos"]) / 87)
-            ).astype(float).round(1)
-
-        if all(col in df_final_av7.columns for col in ["fazendaRef", "indexTratamento"]):
-            df_final_av7["ChaveFaixa"] = df_final_av7["fazendaRef"].astype(str) + "_" + df_final_av7["indexTratamento"].astype(str)
-
-        for col in ["dataPlantio", "dataColheita"]:
-            if col in df_final_av7.columns:
-                df_final_av7[col] = pd.to_datetime(df_final_av7[col], origin="unix", unit="s").dt.strftime("%d/%m/%Y")
-
-        colunas_selecionadas = [
-            "nomeFazenda", "nomeProdutor", "regional", "nomeCidade", "codigoEstado", "nomeEstado",
-            "dataPlantio", "dataColheita", "tipoTeste", "populacao", "indexTratamento", "nome", "gm",
-            "areaParcela", "numeroPlantasMedio10m", "Pop_Final", "umidadeParcela", "producaoCorrigida",
-            "producaoCorrigidaSc", "PMG_corrigido", "displayName", "cidadeRef", "fazendaRef", "ChaveFaixa"
-        ]
-
-        colunas_renomeadas = {
-            "nomeFazenda": "Fazenda",
-            "nomeProdutor": "Produtor",
-            "regional": "Microrregiao",
-            "nomeCidade": "Cidade",
-            "codigoEstado": "Estado",
-            "nomeEstado": "UF",
-            "dataPlantio": "Plantio",
-            "dataColheita": "Colheita",
-            "tipoTeste": "Teste",
-            "nome": "Cultivar",
-            "gm": "GM",
-            "indexTratamento": "Index",
-            "areaParcela": "Area Parcela",
-            "numeroPlantasMedio10m": "plts_10m",
-            "Pop_Final": "Pop_Final",
-            "umidadeParcela": "Umidade (%)",
-            "producaoCorrigida": "prod_kg_ha",
-            "producaoCorrigidaSc": "prod_sc_ha",
-            "PMG_corrigido": "PMG",
-            "displayName": "DTC",
-            "cidadeRef": "CidadeRef",
-            "fazendaRef": "FazendaRef",
-            "ChaveFaixa": "ChaveFaixa"
-        }
-
-        df_final_av7 = df_final_av7[colunas_selecionadas].rename(columns=colunas_renomeadas)
+        # 🧮 Métricas da av7 (calculadas uma vez e reaproveitadas entre as páginas)
+        df_final_av7 = tabela_av7(df_av7)
+
         # Remove registros do tipo "Densidade"
         df_final_av7 = df_final_av7[df_final_av7["Teste"] != "Densidade"]
 
@@ -89,23 +26,6 @@ if "merged_dataframes" in st.session_state:
         # Normaliza nomes das colunas para facilitar filtros
         df_final_av7.columns = df_final_av7.columns.str.normalize('NFKD').str.encode('ascii', errors='ignore').str.decode('utf-8')
 
-        # Normaliza texto de colunas
-        df_final_av7["Produtor"] = df_final_av7["Produtor"].astype(str).str.upper()
-        df_final_av7["Fazenda"] = df_final_av7["Fazenda"].astype(str).str.upper()
-
-        # Corrige nomes corrompidos de cultivares
-        substituicoes_cultivares = {
-            "B�NUS IPRO": "BÔNUS IPRO",
-            "DOM�NIO IPRO": "DOMÍNIO IPRO",
-            "F�RIA CE": "FÚRIA CE",
-            "V�NUS CE": "VÊNUS CE",
-            "GH 2383 IPRO": "GH 2483 IPRO"
-        }
-
-        if "Cultivar" in df_final_av7.columns:
-            df_final_av7["Cultivar"] = df_final_av7["Cultivar"].replace(substituicoes_cultivares)
-
-
         # Remove duplicadas para evitar repetição em análises futuras
         df_final_av7.drop_duplicates(inplace=True)
 
@@ -127,36 +47,9 @@ if "merged_dataframes" in st.session_state:
                 "GM": "GM"
             }
 
-            for coluna, label in filtros.items():
-                if coluna in df_final_av7.columns:
-                    if coluna == "GM":
-                        valores_gm = df_final_av7["GM"].dropna().unique()
-                        if len(valores_gm) > 0:
-                            gm_min = int(df_final_av7["GM"].min())
-                            gm_max = int(df_final_av7["GM"].max())
-
-                            if gm_min < gm_max:
-                                intervalo_gm = st.slider(
-                                    "Selecione intervalo de GM:",
-                                    min_value=gm_min,
-                                    max_value=gm_max,
-                                    value=(gm_min, gm_max),
-                                    step=1
-                                )
-                                df_final_av7 = df_final_av7[df_final_av7["GM"].between(intervalo_gm[0], intervalo_gm[1])]
-                            else:
-                                st.info(f"Apenas um valor de GM disponível: {gm_min}")
-                                df_final_av7 = df_final_av7[df_final_av7["GM"] == gm_min]
-                    else:
-                        with st.expander(label):
-                            opcoes = sorted(df_final_av7[coluna].dropna().unique())
-                            selecionados = []
-                            for op in opcoes:
-                                op_str = str(op)
-                                if st.checkbox(op_str, key=f"{coluna}_{op_str}", value=False):
-                                    selecionados.append(op)
-                            if selecionados:
-                                df_final_av7 = df_final_av7[df_final_av7[coluna].isin(selecionados)]
+            # 🎛️ Seleção compartilhada entre as páginas; máscaras em cache por versão dos dados
+            df_final_av7 = painel_filtros(df_final_av7, filtros, versao_sessao("av7", "head_to_head"), rotulo_gm="Selecione intervalo de GM:",
+                                          gm_unico="filtrar")
 
 
         with col_tabela:
@@ -196,14 +89,12 @@ if "merged_dataframes" in st.session_state:
             )
 
             # Botão de exportação 
-            buffer = io.BytesIO()
-            with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-                df_fmt.to_excel(writer, sheet_name="dados_av7", index=False)
-            st.download_button(
+            botao_exportar(
+                df_fmt,
+                nome_arquivo="dados_av7",
+                chave="h2h_dados_av7",
                 label="📥 Baixar Dados AV7",
-                data=buffer.getvalue(),
-                file_name="dados_av7.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                nome_aba="dados_av7"
             )
 
             # 🤜🏻🤛🏻 Análise Head to Head
@@ -218,61 +109,22 @@ if "merged_dataframes" in st.session_state:
             """, unsafe_allow_html=True)
 
             # Botão para rodar análise
-            if st.button("🔁 Rodar Análise Head to Head"):
+            rodar_h2h = st.button("🔁 Rodar Análise Head to Head")
+            if rodar_h2h:
+                st.session_state["h2h_incremental"] = True
+
+            # ♻️ Depois da primeira execução, a análise acompanha os filtros sozinha:
+            # só os locais cujas linhas mudaram são recalculados, o resto vem do cache
+            if st.session_state.get("h2h_incremental"):
                 df_final_av7["Local"] = df_final_av7["Fazenda"] + "_" + df_final_av7["Cidade"]
 
                 # 🎯 Filtra somente valores válidos de produtividade (> 0)
                 df_h2h = df_final_av7[["Local", "Cultivar", "prod_sc_ha", "Pop_Final", "Umidade (%)"]].dropna()
                 df_h2h = df_h2h[df_h2h["prod_sc_ha"] > 0]
 
-                resultados_h2h = []
-
-                for local, grupo in df_h2h.groupby("Local"):
-                    cultivares = grupo["Cultivar"].unique()
-
-                    for head in cultivares:
-                        head_row = grupo[grupo["Cultivar"] == head]
-                        if head_row.empty:
-                            continue
-
-                        prod_head = head_row["prod_sc_ha"].values[0]
-                        pop_head = head_row["Pop_Final"].values[0]
-                        umid_head = head_row["Umidade (%)"].values[0]
-
-                        for check in cultivares:
-                            if head == check:
-                                continue
-
-                            check_row = grupo[grupo["Cultivar"] == check]
-                            if check_row.empty:
-                                continue
-
-                            prod_check = check_row["prod_sc_ha"].values[0]
-                            pop_check = check_row["Pop_Final"].values[0]
-                            umid_check = check_row["Umidade (%)"].values[0]
-
-                            diff = prod_head - prod_check
-                            win = int(diff > 1)
-                            draw = int(-1 <= diff <= 1)
-
-                            resultados_h2h.append({
-                                "Head": head,
-                                "Check": check,
-                                "Head_Mean": round(prod_head, 1),
-                                "Check_Mean": round(prod_check, 1),
-                                "Pop_Final_Head": round(pop_head, 0),
-                                "Umidade_Head": round(umid_head, 1),
-                                "Pop_Final_Check": round(pop_check, 0),
-                                "Umidade_Check": round(umid_check, 1),
-                                "Difference": round(diff, 1),
-                                "Number_of_Win": win,
-                                "Is_Draw": draw,
-                                "Percentage_of_Win": 100.0 if win else 0.0,
-                                "Number_of_Comparison": 1,
-                                "Local": local
-                            })
-
-                df_resultado_h2h = pd.DataFrame(resultados_h2h)
+                # ⚡ Pares head x check por local, reaproveitando os locais já calculados
+                cache_h2h = st.session_state.setdefault("cache_h2h", CacheHeadToHead())
+                df_resultado_h2h = cache_h2h.calcular(df_h2h, "prod_sc_ha", "Pop_Final", "Umidade (%)")
 
                 # 🔍 Colunas visíveis padrão
                 colunas_visiveis = [
@@ -282,13 +134,18 @@ if "merged_dataframes" in st.session_state:
 
                 st.session_state["df_resultado_h2h"] = df_resultado_h2h
                 st.session_state["colunas_visiveis_h2h"] = colunas_visiveis
-                st.success("✅ Análise concluída (zeros removidos)!")
+                if rodar_h2h:
+                    st.success("✅ Análise concluída (zeros removidos)!")
 
 
             
             # Exibição interativa da Tabela Head-to-Head
             if "df_resultado_h2h" in st.session_state:
                 df_resultado_h2h = st.session_state["df_resultado_h2h"]
+                # 🧊 Resultado indexado por par (head, check); refeito só quando o resultado muda
+                cubo_h2h = st.session_state.get("cubo_h2h")
+                if cubo_h2h is None or cubo_h2h.resultado is not df_resultado_h2h:
+                    cubo_h2h = st.session_state["cubo_h2h"] = CuboHeadToHead(df_resultado_h2h)
                 colunas_visiveis = st.session_state.get("colunas_visiveis_h2h", df_resultado_h2h.columns.tolist())
 
                 #
@@ -299,13 +156,11 @@ if "merged_dataframes" in st.session_state:
                 st.markdown("### 🎯 Selecione os cultivares para exibir na Tabela")
                 col1, col2 = st.columns(2)
                 with col1:
-                    head_filtrado = st.selectbox("Cultivar Head", sorted(df_resultado_h2h["Head"].unique()), key="head_tabela")
+                    head_filtrado = st.selectbox("Cultivar Head", cubo_h2h.cultivares, key="head_tabela")
                 with col2:
-                    check_filtrado = st.selectbox("Cultivar Check", sorted(df_resultado_h2h["Check"].unique()), key="check_tabela")
+                    check_filtrado = st.selectbox("Cultivar Check", cubo_h2h.cultivares, key="check_tabela")
 
-                df_filtrado = df_resultado_h2h[
-                    (df_resultado_h2h["Head"] == head_filtrado) & (df_resultado_h2h["Check"] == check_filtrado)
-                ]
+                df_filtrado = cubo_h2h.confrontos(head_filtrado, check_filtrado)
 
                 st.markdown(f"### 📋 Tabela Head to Head: <b>{head_filtrado} x {check_filtrado}</b>", unsafe_allow_html=True)
 
@@ -388,32 +243,26 @@ if "merged_dataframes" in st.session_state:
 
 
 
-                buffer = io.BytesIO()
-                with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-                    df_resultado_h2h.to_excel(writer, sheet_name="head_to_head", index=False)
-
-                st.download_button(
+                botao_exportar(
+                    df_resultado_h2h,
+                    nome_arquivo="resultado_head_to_head",
+                    chave="h2h_resultado_head_to_head",
                     label="📅 Baixar Resultado Head to Head",
-                    data=buffer.getvalue(),
-                    file_name="resultado_head_to_head.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    nome_aba="head_to_head"
                 )
 
                 # ⬇️ Botão para baixar o df_filtrado
-                buffer = io.BytesIO()
-                with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-                    df_filtrado.to_excel(writer, sheet_name="head_to_head_filtrado", index=False)
-
-                st.download_button(
+                botao_exportar(
+                    df_filtrado,
+                    nome_arquivo=f"head_to_head_{head_filtrado}_vs_{check_filtrado}",
+                    chave="h2h_head_to_head_filtrado",
                     label="📥 Baixar Resultado Filtrado",
-                    data=buffer.getvalue(),
-                    file_name=f"head_to_head_{head_filtrado}_vs_{check_filtrado}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    nome_aba="head_to_head_filtrado"
                 )
 
 
                 st.markdown("### 🔹 Selecione os cultivares para comparação Head to Head")
-                cultivares_unicos = sorted(df_resultado_h2h["Head"].unique())
+                cultivares_unicos = cubo_h2h.cultivares
                 col1, col2, col3 = st.columns([0.3, 0.4, 0.3])
 
                 with col1:
@@ -424,17 +273,18 @@ if "merged_dataframes" in st.session_state:
                     check_select = st.selectbox("Selecionar Cultivar Check", options=cultivares_unicos, key="check_select")
 
                 if head_select and check_select and head_select != check_select:
-                    df_selecionado = df_resultado_h2h[(df_resultado_h2h["Head"] == head_select) & (df_resultado_h2h["Check"] == check_select)]
+                    df_selecionado = cubo_h2h.confrontos(head_select, check_select)
+                    resumo_par = cubo_h2h.resumo_par(head_select, check_select)
 
-                    num_locais = df_selecionado["Local"].nunique()
-                    vitorias = df_selecionado[df_selecionado["Difference"] > 1].shape[0]
-                    derrotas = df_selecionado[df_selecionado["Difference"] < -1].shape[0]
-                    empates = df_selecionado[df_selecionado["Difference"].between(-1, 1)].shape[0]
+                    num_locais = resumo_par["num_locais"]
+                    vitorias = resumo_par["vitorias"]
+                    derrotas = resumo_par["derrotas"]
+                    empates = resumo_par["empates"]
 
-                    max_diff = df_selecionado["Difference"].max() if not df_selecionado.empty else 0
-                    min_diff = df_selecionado["Difference"].min() if not df_selecionado.empty else 0
-                    media_diff_vitorias = df_selecionado[df_selecionado["Difference"] > 1]["Difference"].mean() or 0
-                    media_diff_derrotas = df_selecionado[df_selecionado["Difference"] < -1]["Difference"].mean() or 0
+                    max_diff = resumo_par["max_diff"]
+                    min_diff = resumo_par["min_diff"]
+                    media_diff_vitorias = resumo_par["media_diff_vitorias"]
+                    media_diff_derrotas = resumo_par["media_diff_derrotas"]
 
                    
                     # ⏹️ Cards de Resultados
@@ -589,29 +439,26 @@ if "merged_dataframes" in st.session_state:
                 checks_selecionados = st.multiselect("Cultivares Check", options=opcoes_checks, key="multi_checks")
 
                 if head_unico and checks_selecionados:
-                    df_multi = df_resultado_h2h[
-                        (df_resultado_h2h["Head"] == head_unico) &
-                        (df_resultado_h2h["Check"].isin(checks_selecionados))
-                    ]
+                    resumo, media_head = cubo_h2h.resumo_checks(head_unico, checks_selecionados)
 
-                    if not df_multi.empty:
+                    if not resumo.empty:
                         # 👉 Produtividade média do Head
-                        prod_head_media = df_multi["Head_Mean"].mean().round(1)
+                        prod_head_media = round(media_head, 1)
 
                         # 🧷 Título atualizado com produtividade
                         st.markdown(f"#### 🎯 Cultivar Head: **{head_unico}** | Produtividade Média: **{prod_head_media} sc/ha**")
 
-                        resumo = df_multi.groupby("Check").agg({
-                            "Number_of_Win": "sum",
-                            "Number_of_Comparison": "sum",
-                            "Check_Mean": "mean"
-                        }).reset_index()
-
                         resumo.rename(columns={
                             "Check": "Cultivar Check",
                             "Number_of_Win": "Vitórias",
                             "Number_of_Comparison": "Num_Locais",
-                            "Check_Mean": "Prod_sc_ha_media"
+                            "Check_Mean": "Prod_sc_ha_media",
+                            "Mean_Difference": "Diferença Pareada",
+                            "CI_Lower": "IC 95% Inf",
+                            "CI_Upper": "IC 95% Sup",
+                            "p_t": "p (t pareado)",
+                            "p_Sign": "p (sinal)",
+                            "p_Wilcoxon": "p (Wilcoxon)"
                         }, inplace=True)
 
                         resumo["% Vitórias"] = (resumo["Vitórias"] / resumo["Num_Locais"] * 100).round(1)
@@ -622,7 +469,14 @@ if "merged_dataframes" in st.session_state:
 
 
 
-                        resumo = resumo[["Cultivar Check", "% Vitórias", "Num_Locais", "Prod_sc_ha_media", "Diferença Média"]]
+                        # 🧪 Testes pareados entre os locais em comum (head - check)
+                        resumo[["Diferença Pareada", "IC 95% Inf", "IC 95% Sup"]] = resumo[["Diferença Pareada", "IC 95% Inf", "IC 95% Sup"]].round(1)
+                        resumo[["p (t pareado)", "p (sinal)", "p (Wilcoxon)"]] = resumo[["p (t pareado)", "p (sinal)", "p (Wilcoxon)"]].round(4)
+
+                        resumo = resumo[[
+                            "Cultivar Check", "% Vitórias", "Num_Locais", "Prod_sc_ha_media", "Diferença Média",
+                            "Diferença Pareada", "IC 95% Inf", "IC 95% Sup", "p (t pareado)", "p (sinal)", "p (Wilcoxon)"
+                        ]]
 
                         col_tabela, col_grafico = st.columns([1.4, 1.6])
                         with col_tabela:
@@ -633,15 +487,12 @@ if "merged_dataframes" in st.session_state:
                             custom_css = {".ag-header-cell-label": {"font-weight": "bold", "font-size": "15px", "color": "black"}}
                             AgGrid(resumo, gridOptions=gb.build(), height=400, custom_css=custom_css)
 
-                            buffer = io.BytesIO()
-                            with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-                                resumo.to_excel(writer, sheet_name="comparacao_multi_check", index=False)
-
-                            st.download_button(
+                            botao_exportar(
+                                resumo,
+                                nome_arquivo=f"comparacao_{head_unico}_vs_checks",
+                                chave="h2h_comparacao_multi_check",
                                 label="📅 Baixar Comparacao (Excel)",
-                                data=buffer.getvalue(),
-                                file_name=f"comparacao_{head_unico}_vs_checks.xlsx",
-                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                                nome_aba="comparacao_multi_check"
                             )
 
                         with col_grafico:
@@ -1,9 +1,8 @@
 import streamlit as st
 import pandas as pd
-import io
-import plotly.graph_objects as go
-from scipy.stats import gaussian_kde
-import numpy as np
+from utils.exportacao import botao_exportar
+from utils.filtros import painel_filtros, versao_sessao
+from utils.graficos import boxplot_variavel, histograma_densidade
 
 st.title("🎲 Ciclo dos Cultivares (AV6)")
 st.markdown("Explore o ciclo dos cultivares nas faixas avaliadas. Aplique filtros para visualizar os dados conforme necessário.")
@@ -99,43 +98,10 @@ if "merged_dataframes" in st.session_state:
                 "GM": "GM"
             }
 
-            for coluna, label in filtros.items():
-                if coluna in df_ciclo.columns:
-
-                    
-                    # 🔘 GM como slider (com checagem)
-                    if coluna == "GM":
-                        valores_gm = df_ciclo["GM"].dropna().unique()
-                        if len(valores_gm) > 0:
-                            gm_min = int(df_ciclo["GM"].min())
-                            gm_max = int(df_ciclo["GM"].max())
-                            
-                            if gm_min < gm_max:
-                                intervalo_gm = st.slider(
-                                    "Selecione intervalo de GM:",
-                                    min_value=gm_min,
-                                    max_value=gm_max,
-                                    value=(gm_min, gm_max),
-                                    step=1
-                                )
-                                df_ciclo = df_ciclo[
-                                    df_ciclo["GM"].between(intervalo_gm[0], intervalo_gm[1])
-                                ]
-                            else:
-                                st.info(f"Apenas um valor de GM disponível: **{gm_min}**")
-
-
-                    # 🔲 Checkbox para os demais
-                    else:
-                        with st.expander(label):
-                            opcoes = sorted(df_ciclo[coluna].dropna().unique())
-                            selecionados = []
-                            for op in opcoes:
-                                op_str = str(op)
-                                if st.checkbox(op_str, key=f"{coluna}_doenca_{op_str}", value=False):
-                                    selecionados.append(op)
-                            if selecionados:
-                                df_ciclo = df_ciclo[df_ciclo[coluna].isin(selecionados)]
+            # 🎛️ Seleção compartilhada entre as páginas; máscaras em cache por versão dos dados
+            df_ciclo = painel_filtros(df_ciclo, filtros, versao_sessao("av6", "ciclo"), rotulo_gm="Selecione intervalo de GM:")
+            # 🏷️ Versão dos dados + filtros: chave dos gráficos em cache
+            versao_ciclo = df_ciclo.attrs["versao_filtros"]
 
 
 
@@ -225,15 +191,13 @@ if "merged_dataframes" in st.session_state:
            
 
             # 📥 Exportar
-            output_av6 = io.BytesIO()
-            with pd.ExcelWriter(output_av6, engine="xlsxwriter") as writer:
-                df_ciclo[colunas_visiveis].to_excel(writer, index=False, sheet_name="dados_doencas")
-
-            st.download_button(
+            botao_exportar(
+                lambda: df_ciclo[colunas_visiveis],
+                versao=(df_ciclo.attrs["versao_filtros"], tuple(colunas_visiveis)),
+                nome_arquivo="faixa_ciclo_av6",
+                chave="ciclo_faixa_ciclo_av6",
                 label="📥 Baixar Dados de Ciclo (AV6)",
-                data=output_av6.getvalue(),
-                file_name="faixa_ciclo_av6.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                nome_aba="dados_doencas"
             )
 
             # 📊 Resumo por Cultivar com Mínimo e Máximo
@@ -278,310 +242,58 @@ if "merged_dataframes" in st.session_state:
             )
 
             # 📥 Exportar resumo com min/max
-            output_resumo = io.BytesIO()
-            with pd.ExcelWriter(output_resumo, engine="xlsxwriter") as writer:
-                df_resumo.to_excel(writer, index=False, sheet_name="resumo_ciclo")
-
-            st.download_button(
+            botao_exportar(
+                df_resumo,
+                nome_arquivo="resumo_ciclo",
+                chave="ciclo_resumo_ciclo",
                 label="📥 Baixar Resumo Ciclo",
-                data=output_resumo.getvalue(),
-                file_name="resumo_ciclo.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                nome_aba="resumo_ciclo"
             )
 
 
             # 📊 Histograma de Ciclo_dias
-            with st.expander("📊 Visualizar Histograma do Ciclo (dias)", expanded=False):
-                df_hist = df_ciclo.copy()
-                df_hist = df_hist[df_hist["Ciclo_dias"].notna()]
-                df_hist = df_hist[df_hist["Ciclo_dias"] > 0]
-                df_hist["Ciclo_dias"] = pd.to_numeric(df_hist["Ciclo_dias"], errors="coerce")
-
-                x_data = df_hist["Ciclo_dias"].dropna()
-                x_data = x_data[x_data > 0]
-
-                fig_hist = go.Figure()
-
-                fig_hist.add_trace(go.Histogram(
-                    x=x_data,
-                    nbinsx=50,
-                    name="Frequência",
-                    marker_color="lightblue",
-                    marker_line_color="black",
-                    marker_line_width=1.5,
-                    opacity=0.75,
-                    yaxis="y"
-                ))
-
-                # Curva de densidade
-                if len(x_data) > 1 and x_data.std() > 0:
-                    kde = gaussian_kde(x_data)
-                    x_vals = np.linspace(x_data.min(), x_data.max(), 500)
-                    y_vals = kde(x_vals)
-
-                    fig_hist.add_trace(go.Scatter(
-                        x=x_vals,
-                        y=y_vals,
-                        mode="lines",
-                        name="Densidade",
-                        line=dict(color="darkblue", width=2),
-                        yaxis="y2"
-                    ))
-                else:
-                    st.warning("⚠️ Dados insuficientes ou sem variação para calcular a curva de densidade.")
-
-                # Linha da média
-                media = x_data.mean()
-                fig_hist.add_trace(go.Scatter(
-                    x=[media, media],
-                    y=[0, y_vals.max() if len(x_data) > 1 and x_data.std() > 0 else 1],
-                    mode="lines",
-                    name=f"Média: {media:.1f}",
-                    line=dict(color="red", width=2, dash="dash"),
-                    yaxis="y2"
-                ))
-
-                # Layout
-                font_bold = dict(size=16, family="Arial Bold", color="black")
-
-                fig_hist.update_layout(
-                    title=dict(text="Histograma do Ciclo (dias)", font=font_bold),
-                    xaxis=dict(
-                        title=dict(text="Ciclo (dias)", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray",
-                    ),
-                    yaxis=dict(
-                        title=dict(text="Frequência", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    yaxis2=dict(
-                        title=dict(text="Densidade", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        overlaying="y",
-                        side="right",
-                        showgrid=False
-                    ),
-                    plot_bgcolor="white",
-                    bargap=0.1,
-                    legend=dict(
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.02,
-                        xanchor="right",
-                        x=1,
-                        font=dict(size=16, family="Arial", color="black")
-                    )
-                )
-
-                st.plotly_chart(fig_hist, use_container_width=True)
+            histograma_densidade(
+                df_ciclo["Ciclo_dias"],
+                "📊 Visualizar Histograma do Ciclo (dias)",
+                titulo="Histograma do Ciclo (dias)",
+                titulo_x="Ciclo (dias)",
+                chave="ciclo_hist_Ciclo_dias",
+                versao=versao_ciclo
+            )
             
 
 
             ## 📊 Histograma de Abertura de Vagens (ABV)
-            with st.expander("📊 Visualizar Histograma de Abertura de Vagens (ABV)", expanded=False):
-                df_hist = df_ciclo.copy()
-                df_hist = df_hist[df_hist["ABV"].notna()]
-                df_hist = df_hist[df_hist["ABV"] > 0]
-                df_hist["Ciclo_dias"] = pd.to_numeric(df_hist["ABV"], errors="coerce")
-
-                x_data = df_hist["ABV"].dropna()
-                x_data = x_data[x_data > 0]
-
-                fig_hist = go.Figure()
-
-                fig_hist.add_trace(go.Histogram(
-                    x=x_data,
-                    nbinsx=50,
-                    name="Frequência",
-                    marker_color="lightblue",
-                    marker_line_color="black",
-                    marker_line_width=1.5,
-                    opacity=0.75,
-                    yaxis="y"
-                ))
-
-                # Curva de densidade
-                if len(x_data) > 1 and x_data.std() > 0:
-                    kde = gaussian_kde(x_data)
-                    x_vals = np.linspace(x_data.min(), x_data.max(), 500)
-                    y_vals = kde(x_vals)
-
-                    fig_hist.add_trace(go.Scatter(
-                        x=x_vals,
-                        y=y_vals,
-                        mode="lines",
-                        name="Densidade",
-                        line=dict(color="darkblue", width=2),
-                        yaxis="y2"
-                    ))
-                else:
-                    st.warning("⚠️ Dados insuficientes ou sem variação para calcular a curva de densidade.")
-
-                # Linha da média
-                media = x_data.mean()
-                fig_hist.add_trace(go.Scatter(
-                    x=[media, media],
-                    y=[0, y_vals.max() if len(x_data) > 1 and x_data.std() > 0 else 1],
-                    mode="lines",
-                    name=f"Média: {media:.1f}",
-                    line=dict(color="red", width=2, dash="dash"),
-                    yaxis="y2"
-                ))
-
-                # Layout
-                font_bold = dict(size=16, family="Arial Bold", color="black")
-
-                fig_hist.update_layout(
-                    title=dict(text="Histograma de Abertura de Vagens (ABV)", font=font_bold),
-                    xaxis=dict(
-                        title=dict(text="Abertura de Vagens (ABV)", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray",
-                    ),
-                    yaxis=dict(
-                        title=dict(text="Frequência", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    yaxis2=dict(
-                        title=dict(text="Densidade", font=font_bold),
-                        tickfont=dict(family="Arial", size=20, color="black"),
-                        overlaying="y",
-                        side="right",
-                        showgrid=False
-                    ),
-                    plot_bgcolor="white",
-                    bargap=0.1,
-                    legend=dict(
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.02,
-                        xanchor="right",
-                        x=1,
-                        font=dict(size=16, family="Arial", color="black")
-                    )
-                )
-
-                st.plotly_chart(fig_hist, use_container_width=True)
+            histograma_densidade(
+                df_ciclo["ABV"],
+                "📊 Visualizar Histograma de Abertura de Vagens (ABV)",
+                titulo="Histograma de Abertura de Vagens (ABV)",
+                titulo_x="Abertura de Vagens (ABV)",
+                chave="ciclo_hist_ABV",
+                versao=versao_ciclo
+            )
 
             # 📦 Boxplot de Ciclo_dias
-            media_ciclo = df_ciclo["Ciclo_dias"].dropna().mean()
-
-            with st.expander("📦 Visualizar Box Plot de Ciclo em Dias", expanded=False):
-                fig_box_ciclo = go.Figure()
-
-                fig_box_ciclo.add_trace(go.Box(
-                    x=df_ciclo["Ciclo_dias"],
-                    name="Ciclo (dias)",
-                    boxpoints="outliers",
-                    fillcolor="lightblue",
-                    marker_color="lightblue",
-                    line=dict(color="black", width=1),
-                    boxmean=True
-                ))
-
-                # Estilo dos textos
-                font_bold = dict(size=20, family="Arial Bold", color="black")
-
-                fig_box_ciclo.update_layout(
-                    title=dict(
-                        text="Box Plot do Ciclo em Dias",
-                        font=font_bold
-                    ),
-                    xaxis=dict(
-                        title=dict(
-                            text="Ciclo em Dias",
-                            font=font_bold
-                        ),
-                        tickfont=font_bold,
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    yaxis=dict(
-                        title=dict(
-                            text="Observações",
-                            font=font_bold
-                        ),
-                        tickfont=font_bold,
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    legend=dict(
-                        font=font_bold,
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.02,
-                        xanchor="right",
-                        x=1
-                    ),
-                    plot_bgcolor="white",
-                    showlegend=True
-                )
-
-                st.plotly_chart(fig_box_ciclo, use_container_width=True)
+            boxplot_variavel(
+                df_ciclo["Ciclo_dias"],
+                "📦 Visualizar Box Plot de Ciclo em Dias",
+                nome="Ciclo (dias)",
+                titulo="Box Plot do Ciclo em Dias",
+                titulo_x="Ciclo em Dias",
+                chave="ciclo_box_Ciclo_dias",
+                versao=versao_ciclo
+            )
 
             # 📦 Boxplot de Abertura de Vagens (ABV)
-            
-            media_ciclo = df_ciclo["ABV"].dropna().mean()
-
-            with st.expander("📦 Visualizar Box Plot de Abertura de Vagens", expanded=False):
-                fig_box_ciclo = go.Figure()
-
-                fig_box_ciclo.add_trace(go.Box(
-                    x=df_ciclo["ABV"],
-                    name="Abertura de Vagens",
-                    boxpoints="outliers",
-                    fillcolor="lightblue",
-                    marker_color="lightblue",
-                    line=dict(color="black", width=1),
-                    boxmean=True
-                ))
-
-                # Estilo dos textos
-                font_bold = dict(size=20, family="Arial Bold", color="black")
-
-                fig_box_ciclo.update_layout(
-                    title=dict(
-                        text="Box Plot de Abertura de Vagens (ABV)",
-                        font=font_bold
-                    ),
-                    xaxis=dict(
-                        title=dict(
-                            text="Abertura de Vagens",
-                            font=font_bold
-                        ),
-                        tickfont=font_bold,
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    yaxis=dict(
-                        title=dict(
-                            text="Observações",
-                            font=font_bold
-                        ),
-                        tickfont=font_bold,
-                        showgrid=True,
-                        gridcolor="lightgray"
-                    ),
-                    legend=dict(
-                        font=font_bold,
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.02,
-                        xanchor="right",
-                        x=1
-                    ),
-                    plot_bgcolor="white",
-                    showlegend=True
-                )
-
-                st.plotly_chart(fig_box_ciclo, use_container_width=True)
+            boxplot_variavel(
+                df_ciclo["ABV"],
+                "📦 Visualizar Box Plot de Abertura de Vagens",
+                nome="Abertura de Vagens",
+                titulo="Box Plot de Abertura de Vagens (ABV)",
+                titulo_x="Abertura de Vagens",
+                chave="ciclo_box_ABV",
+                versao=versao_ciclo
+            )
 
 
 
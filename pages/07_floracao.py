@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-import io
+from utils.exportacao import botao_exportar
+from utils.filtros import painel_filtros, versao_sessao
 import plotly.graph_objects as go
 from scipy.stats import gaussian_kde
 import numpy as np
@@ -115,41 +116,8 @@ if "merged_dataframes" in st.session_state:
                 "GM": "GM"
             }
 
-            for coluna, label in filtros.items():
-                if coluna in df_florescimento.columns:
-
-                    # 🔘 GM como slider (com checagem)
-                    if coluna == "GM":
-                        valores_gm = df_florescimento["GM"].dropna().unique()
-                        if len(valores_gm) > 0:
-                            gm_min = int(df_florescimento["GM"].min())
-                            gm_max = int(df_florescimento["GM"].max())
-
-                            if gm_min < gm_max:
-                                intervalo_gm = st.slider(
-                                    "Selecione intervalo de GM:",
-                                    min_value=gm_min,
-                                    max_value=gm_max,
-                                    value=(gm_min, gm_max),
-                                    step=1
-                                )
-                                df_florescimento = df_florescimento[
-                                    df_florescimento["GM"].between(intervalo_gm[0], intervalo_gm[1])
-                                ]
-                            else:
-                                st.info(f"Apenas um valor de GM disponível: **{gm_min}**")
-
-                    # 🔲 Checkbox para os demais
-                    else:
-                        with st.expander(label):
-                            opcoes = sorted(df_florescimento[coluna].dropna().unique())
-                            selecionados = []
-                            for op in opcoes:
-                                op_str = str(op)
-                                if st.checkbox(op_str, key=f"{coluna}_doenca_{op_str}", value=False):
-                                    selecionados.append(op)
-                            if selecionados:
-                                df_florescimento = df_florescimento[df_florescimento[coluna].isin(selecionados)]
+            # 🎛️ Seleção compartilhada entre as páginas; máscaras em cache por versão dos dados
+            df_florescimento = painel_filtros(df_florescimento, filtros, versao_sessao("av3", "floracao"), rotulo_gm="Selecione intervalo de GM:")
 
         with col_tabela:
             # 🔠 Ordena colunas visíveis
@@ -228,13 +196,11 @@ if "merged_dataframes" in st.session_state:
              **DFAP**: Dias de floração após plantio, **DAC**: Dias até colheita
             """)
 
-            output_av6 = io.BytesIO()
-            with pd.ExcelWriter(output_av6, engine="xlsxwriter") as writer:
-                df_florescimento[colunas_visiveis].to_excel(writer, index=False, sheet_name="dados_doencas")
-
-            st.download_button(
+            botao_exportar(
+                lambda: df_florescimento[colunas_visiveis],
+                versao=(df_florescimento.attrs["versao_filtros"], tuple(colunas_visiveis)),
+                nome_arquivo="faixa_florescimento_av3",
+                chave="floracao_faixa_florescimento_av3",
                 label="📥 Baixar Dados de Florescimento (AV3)",
-                data=output_av6.getvalue(),
-                file_name="faixa_florescimento_av3.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                nome_aba="dados_doencas"
             )
@@ -4,7 +4,9 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from st_aggrid import AgGrid, GridOptionsBuilder
-import io
+from utils.exportacao import botao_exportar
+from utils.filtros import painel_filtros, versao_sessao
+from utils.metricas_av7 import calcular_metricas_av7
 
 st.title("📊 Performance dos materiais")
 st.markdown(
@@ -18,42 +20,12 @@ if "merged_dataframes" in st.session_state:
     if df_av7 is not None and not df_av7.empty:
         st.success("✅ Dados carregados com sucesso!")
 
-        df_final_av7 = df_av7[~df_av7["displayName"].isin(["raullanconi", "stine"])].copy()
+        # 🧮 Métricas da av7 (calculadas uma vez e reaproveitadas entre as páginas)
+        df_final_av7 = calcular_metricas_av7(df_av7)
 
         # 👉 Filtro para manter somente os que são "Faixa"
         df_final_av7 = df_final_av7[df_final_av7["tipoTeste"] == "Faixa"]
 
-        if "numeroLinhas" in df_final_av7.columns and "comprimentoLinha" in df_final_av7.columns:
-            df_final_av7["areaParcela"] = df_final_av7["numeroLinhas"] * df_final_av7["comprimentoLinha"] * 0.5
-
-        colunas_plantas = ["numeroPlantas10Metros1a", "numeroPlantas10Metros2a", "numeroPlantas10Metros3a", "numeroPlantas10Metros4a"]
-        if all(col in df_final_av7.columns for col in colunas_plantas):
-            df_final_av7["numeroPlantasMedio10m"] = df_final_av7[colunas_plantas].replace(0, pd.NA).mean(axis=1, skipna=True)
-            df_final_av7["Pop_Final"] = (20000 * df_final_av7["numeroPlantasMedio10m"]) / 10
-
-        if "numeroPlantasMedio10m" in df_final_av7.columns:
-            df_final_av7["popMediaFinal"] = (10000 / 0.5) * (df_final_av7["numeroPlantasMedio10m"] / 10)
-
-        if all(col in df_final_av7.columns for col in ["pesoParcela", "umidadeParcela", "areaParcela"]):
-            df_final_av7["producaoCorrigida"] = (
-                (df_final_av7["pesoParcela"] * (100 - df_final_av7["umidadeParcela"]) / 87) * (10000 / df_final_av7["areaParcela"])
-            ).astype(float).round(1)
-
-        if "producaoCorrigida" in df_final_av7.columns:
-            df_final_av7["producaoCorrigidaSc"] = (df_final_av7["producaoCorrigida"] / 60).astype(float).round(1)
-
-        if all(col in df_final_av7.columns for col in ["pesoMilGraos", "umidadeAmostraPesoMilGraos"]):
-            df_final_av7["PMG_corrigido"] = (
-                df_final_av7["pesoMilGraos"] * ((100 - df_final_av7["umidadeAmostraPesoMilGraos"]) / 87)
-            ).astype(float).round(1)
-
-        if all(col in df_final_av7.columns for col in ["fazendaRef", "indexTratamento"]):
-            df_final_av7["ChaveFaixa"] = df_final_av7["fazendaRef"].astype(str) + "_" + df_final_av7["indexTratamento"].astype(str)
-
-        for col in ["dataPlantio", "dataColheita"]:
-            if col in df_final_av7.columns:
-                df_final_av7[col] = pd.to_datetime(df_final_av7[col], origin="unix", unit="s").dt.strftime("%d/%m/%Y")
-
         # ================= Cálculo de Métricas ===========================
         df_metricas = df_final_av7.copy()
 
@@ -186,26 +158,11 @@ if "merged_dataframes" in st.session_state:
                 "Fazenda": "Fazenda",
                 "Cultivar": "Cultivar",
                 # "Teste": "Teste",  <-- removido
+                "GM": "GM"
             }
 
-            for coluna, label in filtros.items():
-                if coluna in df_final_av7.columns:
-                    with st.expander(label):
-                        opcoes = sorted(df_final_av7[coluna].dropna().unique())
-                        selecionados = [
-                            op for op in opcoes if st.checkbox(op, key=f"{coluna}_{op}", value=False)
-                        ]
-                        if selecionados:
-                            df_final_av7 = df_final_av7[df_final_av7[coluna].isin(selecionados)]
-
-            if "GM" in df_final_av7.columns:
-                gm_min = int(df_final_av7["GM"].min())
-                gm_max = int(df_final_av7["GM"].max())
-                if gm_min < gm_max:
-                    gm_range = st.slider("Intervalo de GM", gm_min, gm_max, (gm_min, gm_max), step=1)
-                    df_final_av7 = df_final_av7[df_final_av7["GM"].between(gm_range[0], gm_range[1])]
-                else:
-                    st.info(f"Apenas um valor de GM disponível: {gm_min}")       
+            # 🎛️ Seleção compartilhada entre as páginas; máscaras em cache por versão dos dados
+            df_final_av7 = painel_filtros(df_final_av7, filtros, versao_sessao("av7", "performance"))
             
 
             
@@ -244,14 +201,12 @@ if "merged_dataframes" in st.session_state:
             )
 
             # Exportação da Tabela Detalhada
-            output_normal = io.BytesIO()
-            with pd.ExcelWriter(output_normal, engine='xlsxwriter') as writer:
-                df_visualizacao.to_excel(writer, index=False, sheet_name="faixa_detalhada")
-            st.download_button(
+            botao_exportar(
+                df_visualizacao,
+                nome_arquivo="tabela_detalhada",
+                chave="performance_tabela_detalhada",
                 label="📥 Baixar Tabela Detalhada",
-                data=output_normal.getvalue(),
-                file_name="tabela_detalhada.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                nome_aba="faixa_detalhada"
             )
 
             # 🔹 TABELA PIVOTADA
@@ -325,15 +280,12 @@ if "merged_dataframes" in st.session_state:
             )
 
             # 📤 Exportação da Tabela Pivotada
-            output_pivot = io.BytesIO()
-            with pd.ExcelWriter(output_pivot, engine='xlsxwriter') as writer:
-                df_pivotado.to_excel(writer, index=False, sheet_name="faixa_pivotada")
-
-            st.download_button(
+            botao_exportar(
+                df_pivotado,
+                nome_arquivo="tabela_pivotada",
+                chave="performance_tabela_pivotada",
                 label="📥 Baixar Tabela Pivotada",
-                data=output_pivot.getvalue(),
-                file_name="tabela_pivotada.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                nome_aba="faixa_pivotada"
             )
 
 
@@ -1,40 +1,50 @@
 import streamlit as st
 import pandas as pd
 from st_aggrid import AgGrid, GridOptionsBuilder
-from io import BytesIO
+from utils.cache_escopo import espaco_cache, limpar_espaco
+from utils.exportacao import botao_exportar
+from utils.filtros import IndiceFiltros
+from utils.head_to_head import CuboHeadToHead, calcular_head_to_head
+from utils.planilha import ler_planilha
 
 # Configura a página para modo wide
 st.set_page_config(layout="wide")
 
-# Carrega os dados da planilha
-@st.cache_data
-
+# Carrega os dados da planilha (espaço de cache próprio: recarregar não afeta as outras páginas)
+@espaco_cache("planilha_gd", max_entradas=1).memorizar(show_spinner=True)
 def carregar_dados():
     caminho_arquivo = 'datasets/dados_gd.xlsx'
     aba = 'import'
-    df = pd.read_excel(caminho_arquivo, sheet_name=aba)
+    # Cópia Parquet da aba, refeita só quando a planilha muda
+    df = ler_planilha(caminho_arquivo, aba, colunas_data=['Plantio', 'Colheita'])
 
     # Formata colunas de data para dd/mm/yyyy
     for coluna in ['Plantio', 'Colheita']:
         if coluna in df.columns:
-            df[coluna] = pd.to_datetime(df[coluna]).dt.strftime('%d/%m/%Y')
+            df[coluna] = df[coluna].dt.strftime('%d/%m/%Y')
 
     return df
 
-# Função para exportar para Excel
-def converter_para_excel(df):
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False, sheet_name='Filtrado')
-    return output.getvalue()
 
 # Botão para recarregar os dados
 if st.button("🔄 Recarregar Dados"):
-    st.cache_data.clear()
+    limpar_espaco("planilha_gd")
     st.success("✅ Dados atualizados com sucesso!")
 
+# Códigos e bitmaps das colunas de filtro, montados uma vez por versão da planilha
+COLUNAS_FILTRO = [
+    "Macro", "REC", "Região", "Regional", "Gerente", "Time", "Irrigacao", "Textura do Solo",
+    "Fertilidade do Solo", "Investimento", "nome_estado", "Cidade", "Produtor", "Fazenda", "Cultivar"
+]
+
+@espaco_cache("planilha_gd").memorizar(recurso=True)
+def montar_indice_filtros(df):
+    return IndiceFiltros(df, COLUNAS_FILTRO)
+
+
 # Carregando os dados
 df = carregar_dados()
+filtro = montar_indice_filtros(df).consulta()
 
 # Cria duas colunas com proporção 15% e 85%
 col_filtros, col_tabela = st.columns([0.15, 0.85])
@@ -58,9 +68,9 @@ with col_filtros:
     for coluna, label in checkbox_colunas.items():
         if coluna in df.columns:
             with st.expander(label):
-                opcoes = df[coluna].dropna().unique().tolist()
+                opcoes = filtro.opcoes(coluna).index.tolist()
                 selecionados = st.multiselect(f"Selecionar {label}", options=opcoes, default=opcoes)
-                df = df[df[coluna].isin(selecionados)]
+                filtro.filtrar(coluna, selecionados)
 
     # Multiselect vazios por padrão
     multiselect_colunas = {
@@ -73,16 +83,16 @@ with col_filtros:
     for coluna, label in multiselect_colunas.items():
         if coluna in df.columns:
             with st.expander(label):
-                opcoes = df[coluna].dropna().unique().tolist()
+                opcoes = filtro.opcoes(coluna).index.tolist()
                 selecionados = st.multiselect(f"Selecionar {label}", options=opcoes)
                 if selecionados:
-                    df = df[df[coluna].isin(selecionados)]
+                    filtro.filtrar(coluna, selecionados)
 
     # Filtro GM
     if 'GM' in df.columns:
         with st.expander("GM"):
-            min_val = int(df['GM'].min())
-            max_val = int(df['GM'].max())
+            min_val = int(filtro.serie('GM').min())
+            max_val = int(filtro.serie('GM').max())
             if min_val == max_val:
                 st.info(f"Apenas um valor disponível para GM: {min_val}")
             else:
@@ -93,14 +103,14 @@ with col_filtros:
                     value=(min_val, max_val),
                     step=1
                 )
-                df = df[(df['GM'] >= valor[0]) & (df['GM'] <= valor[1])]
+                filtro.filtrar_faixa('GM', valor[0], valor[1])
 
 
     # Filtro Altitude
     if 'altitude' in df.columns:
         with st.expander("Altitude"):
-            min_val = int(df['altitude'].min())
-            max_val = int(df['altitude'].max())
+            min_val = int(filtro.serie('altitude').min())
+            max_val = int(filtro.serie('altitude').max())
             if min_val == max_val:
                 st.info(f"Apenas um valor disponível para Altitude: {min_val} m")
             else:
@@ -111,7 +121,11 @@ with col_filtros:
                     value=(min_val, max_val),
                     step=1
                 )
-                df = df[(df['altitude'] >= valor[0]) & (df['altitude'] <= valor[1])]
+                filtro.filtrar_faixa('altitude', valor[0], valor[1])
+
+    # Linhas materializadas uma única vez, depois de todos os filtros
+    df = filtro.resultado()
+    st.caption(f"🔎 {len(df)} linhas selecionadas")
 
 
 # Aplica filtro adicional por coluna numérica (caso alguma_coluna_numerica exista)
@@ -214,12 +228,12 @@ with col_tabela:
 
 
     # Botão de exportação para Excel (após a tabela)
-    excel_data = converter_para_excel(df_exibicao)
-    st.download_button(
+    botao_exportar(
+        df_exibicao,
+        nome_arquivo="dados_filtrados",
+        chave="gd_dados_filtrados",
         label="📥 Exportar para Excel",
-        data=excel_data,
-        file_name="dados_filtrados.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        nome_aba="Filtrado"
     )
     
     
@@ -273,12 +287,12 @@ with col_tabela:
         )
 
         # Exportar resumo para Excel
-        resumo_excel = converter_para_excel(df_resumo)
-        st.download_button(
+        botao_exportar(
+            df_resumo,
+            nome_arquivo="resumo_por_cultivar",
+            chave="gd_resumo_por_cultivar",
             label="📥 Exportar Resumo por Cultivar",
-            data=resumo_excel,
-            file_name="resumo_por_cultivar.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            nome_aba="Filtrado"
         )
     else:
         st.warning("⚠️ Nem todas as colunas necessárias estão disponíveis para gerar o resumo.")
@@ -388,52 +402,8 @@ with col_tabela:
             df_h2h = df_filtrado[["Local", "Cultivar", "prod_sc_ha_corr", "Pop Final plts/ha", "Umidade"]].dropna()
             df_h2h = df_h2h[df_h2h["prod_sc_ha_corr"] > 0]
 
-            resultados_h2h = []
-
-            for local, grupo in df_h2h.groupby("Local"):
-                cultivares = grupo["Cultivar"].unique()
-                for head in cultivares:
-                    head_row = grupo[grupo["Cultivar"] == head]
-                    if head_row.empty:
-                        continue
-
-                    prod_head = head_row["prod_sc_ha_corr"].values[0]
-                    pop_head = head_row["Pop Final plts/ha"].values[0]
-                    umid_head = head_row["Umidade"].values[0]
-
-                    for check in cultivares:
-                        if head == check:
-                            continue
-                        check_row = grupo[grupo["Cultivar"] == check]
-                        if check_row.empty:
-                            continue
-
-                        prod_check = check_row["prod_sc_ha_corr"].values[0]
-                        pop_check = check_row["Pop Final plts/ha"].values[0]
-                        umid_check = check_row["Umidade"].values[0]
-
-                        diff = prod_head - prod_check
-                        win = int(diff > 1)
-                        draw = int(-1 <= diff <= 1)
-
-                        resultados_h2h.append({
-                            "Head": head,
-                            "Check": check,
-                            "Head_Mean": round(prod_head, 1),
-                            "Check_Mean": round(prod_check, 1),
-                            "Pop_Final_Head": round(pop_head, 0),
-                            "Umidade_Head": round(umid_head, 1),
-                            "Pop_Final_Check": round(pop_check, 0),
-                            "Umidade_Check": round(umid_check, 1),
-                            "Difference": round(diff, 1),
-                            "Number_of_Win": win,
-                            "Is_Draw": draw,
-                            "Percentage_of_Win": 100.0 if win else 0.0,
-                            "Number_of_Comparison": 1,
-                            "Local": local
-                        })
-
-            df_resultado_h2h = pd.DataFrame(resultados_h2h)
+            # ⚡ Todos os pares head x check de cada local, calculados de uma vez
+            df_resultado_h2h = calcular_head_to_head(df_h2h, "prod_sc_ha_corr", "Pop Final plts/ha", "Umidade")
             st.session_state["df_resultado_h2h"] = df_resultado_h2h
             st.success("✅ Análise concluída com sucesso!")
 
@@ -447,6 +417,10 @@ with col_tabela:
     # Exibição interativa da Tabela Head-to-Head
     if "df_resultado_h2h" in st.session_state:
         df_resultado_h2h = st.session_state["df_resultado_h2h"]
+        # 🧊 Resultado indexado por par (head, check); refeito só quando a análise roda de novo
+        cubo_h2h = st.session_state.get("cubo_h2h")
+        if cubo_h2h is None or cubo_h2h.resultado is not df_resultado_h2h:
+            cubo_h2h = st.session_state["cubo_h2h"] = CuboHeadToHead(df_resultado_h2h)
         colunas_visiveis = st.session_state.get("colunas_visiveis_h2h", df_resultado_h2h.columns.tolist())
 
         import numpy as np
@@ -454,13 +428,11 @@ with col_tabela:
         st.markdown("### 🎯 Selecione os cultivares para exibir na Tabela")
         col1, col2 = st.columns(2)
         with col1:
-            head_filtrado = st.selectbox("Cultivar Head", sorted(df_resultado_h2h["Head"].unique()), key="head_tabela")
+            head_filtrado = st.selectbox("Cultivar Head", cubo_h2h.cultivares, key="head_tabela")
         with col2:
-            check_filtrado = st.selectbox("Cultivar Check", sorted(df_resultado_h2h["Check"].unique()), key="check_tabela")
+            check_filtrado = st.selectbox("Cultivar Check", cubo_h2h.cultivares, key="check_tabela")
 
-        df_filtrado = df_resultado_h2h[
-            (df_resultado_h2h["Head"] == head_filtrado) & (df_resultado_h2h["Check"] == check_filtrado)
-        ]
+        df_filtrado = cubo_h2h.confrontos(head_filtrado, check_filtrado)
 
         st.markdown(f"### 📋 Tabela Head to Head: <b>{head_filtrado} x {check_filtrado}</b>", unsafe_allow_html=True)
 
@@ -529,32 +501,24 @@ with col_tabela:
         else:
             st.warning("⚠️ Nenhum dado disponível para essa combinação.")
 
-        buffer = BytesIO()
-        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-            df_resultado_h2h.to_excel(writer, sheet_name="head_to_head", index=False)
-        st.download_button(
+        botao_exportar(
+            df_resultado_h2h,
+            nome_arquivo="resultado_head_to_head",
+            chave="gd_resultado_head_to_head",
             label="📅 Baixar Resultado Head to Head",
-            data=buffer.getvalue(),
-            file_name="resultado_head_to_head.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            nome_aba="head_to_head"
         )
 
-        buffer = BytesIO()
-        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-            df_filtrado.to_excel(writer, sheet_name="head_to_head_filtrado", index=False)
-        
-        
-        ...
-
-        st.download_button(
+        botao_exportar(
+            df_filtrado,
+            nome_arquivo=f"head_to_head_{head_filtrado}_vs_{check_filtrado}",
+            chave="gd_head_to_head_filtrado",
             label="📥 Baixar Resultado Filtrado",
-            data=buffer.getvalue(),
-            file_name=f"head_to_head_{head_filtrado}_vs_{check_filtrado}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            nome_aba="head_to_head_filtrado"
         )
 
         st.markdown("### 🔹 Selecione os cultivares para comparação Head to Head")
-        cultivares_unicos = sorted(df_resultado_h2h["Head"].unique())
+        cultivares_unicos = cubo_h2h.cultivares
         col1, col2, col3 = st.columns([0.3, 0.4, 0.3])
 
         with col1:
@@ -565,17 +529,18 @@ with col_tabela:
             check_select = st.selectbox("Selecionar Cultivar Check", options=cultivares_unicos, key="check_select")
 
         if head_select and check_select and head_select != check_select:
-            df_selecionado = df_resultado_h2h[(df_resultado_h2h["Head"] == head_select) & (df_resultado_h2h["Check"] == check_select)]
+            df_selecionado = cubo_h2h.confrontos(head_select, check_select)
+            resumo_par = cubo_h2h.resumo_par(head_select, check_select)
 
-            num_locais = df_selecionado["Local"].nunique()
-            vitorias = df_selecionado[df_selecionado["Difference"] > 1].shape[0]
-            derrotas = df_selecionado[df_selecionado["Difference"] < -1].shape[0]
-            empates = df_selecionado[df_selecionado["Difference"].between(-1, 1)].shape[0]
+            num_locais = resumo_par["num_locais"]
+            vitorias = resumo_par["vitorias"]
+            derrotas = resumo_par["derrotas"]
+            empates = resumo_par["empates"]
 
-            max_diff = df_selecionado["Difference"].max() if not df_selecionado.empty else 0
-            min_diff = df_selecionado["Difference"].min() if not df_selecionado.empty else 0
-            media_diff_vitorias = df_selecionado[df_selecionado["Difference"] > 1]["Difference"].mean() or 0
-            media_diff_derrotas = df_selecionado[df_selecionado["Difference"] < -1]["Difference"].mean() or 0
+            max_diff = resumo_par["max_diff"]
+            min_diff = resumo_par["min_diff"]
+            media_diff_vitorias = resumo_par["media_diff_vitorias"]
+            media_diff_derrotas = resumo_par["media_diff_derrotas"]
 
             col4, col5, col6, col7 = st.columns(4)
 
@@ -714,34 +679,38 @@ with col_tabela:
         checks_selecionados = st.multiselect("Cultivares Check", options=opcoes_checks, key="multi_checks")
 
         if head_unico and checks_selecionados:
-            df_multi = df_resultado_h2h[
-                (df_resultado_h2h["Head"] == head_unico) &
-                (df_resultado_h2h["Check"].isin(checks_selecionados))
-            ]
+            resumo, media_head = cubo_h2h.resumo_checks(head_unico, checks_selecionados)
 
-            if not df_multi.empty:
-                prod_head_media = df_multi["Head_Mean"].mean().round(1)
+            if not resumo.empty:
+                prod_head_media = round(media_head, 1)
 
                 st.markdown(f"#### 🎯 Cultivar Head: **{head_unico}** | Produtividade Média: **{prod_head_media} sc/ha**")
 
-                resumo = df_multi.groupby("Check").agg({
-                    "Number_of_Win": "sum",
-                    "Number_of_Comparison": "sum",
-                    "Check_Mean": "mean"
-                }).reset_index()
-
                 resumo.rename(columns={
                     "Check": "Cultivar Check",
                     "Number_of_Win": "Vitórias",
                     "Number_of_Comparison": "Num_Locais",
-                    "Check_Mean": "Prod_sc_ha_media"
+                    "Check_Mean": "Prod_sc_ha_media",
+                    "Mean_Difference": "Diferença Pareada",
+                    "CI_Lower": "IC 95% Inf",
+                    "CI_Upper": "IC 95% Sup",
+                    "p_t": "p (t pareado)",
+                    "p_Sign": "p (sinal)",
+                    "p_Wilcoxon": "p (Wilcoxon)"
                 }, inplace=True)
 
                 resumo["% Vitórias"] = (resumo["Vitórias"] / resumo["Num_Locais"] * 100).round(1)
                 resumo["Prod_sc_ha_media"] = resumo["Prod_sc_ha_media"].round(1)
                 resumo["Diferença Média"] = (prod_head_media - resumo["Prod_sc_ha_media"]).round(1)
 
-                resumo = resumo[["Cultivar Check", "% Vitórias", "Num_Locais", "Prod_sc_ha_media", "Diferença Média"]]
+                # 🧪 Testes pareados entre os locais em comum (head - check)
+                resumo[["Diferença Pareada", "IC 95% Inf", "IC 95% Sup"]] = resumo[["Diferença Pareada", "IC 95% Inf", "IC 95% Sup"]].round(1)
+                resumo[["p (t pareado)", "p (sinal)", "p (Wilcoxon)"]] = resumo[["p (t pareado)", "p (sinal)", "p (Wilcoxon)"]].round(4)
+
+                resumo = resumo[[
+                    "Cultivar Check", "% Vitórias", "Num_Locais", "Prod_sc_ha_media", "Diferença Média",
+                    "Diferença Pareada", "IC 95% Inf", "IC 95% Sup", "p (t pareado)", "p (sinal)", "p (Wilcoxon)"
+                ]]
 
                 col_tabela, col_grafico = st.columns([1.4, 1.6])
                 with col_tabela:
@@ -752,15 +721,12 @@ with col_tabela:
                     custom_css = {".ag-header-cell-label": {"font-weight": "bold", "font-size": "15px", "color": "black"}}
                     AgGrid(resumo, gridOptions=gb.build(), height=400, custom_css=custom_css)
 
-                    buffer = BytesIO()
-                    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-                        resumo.to_excel(writer, sheet_name="comparacao_multi_check", index=False)
-
-                    st.download_button(
+                    botao_exportar(
+                        resumo,
+                        nome_arquivo=f"comparacao_{head_unico}_vs_checks",
+                        chave="gd_comparacao_multi_check",
                         label="📅 Baixar Comparacao (Excel)",
-                        data=buffer.getvalue(),
-                        file_name=f"comparacao_{head_unico}_vs_checks.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        nome_aba="comparacao_multi_check"
                     )
 
                 with col_grafico:
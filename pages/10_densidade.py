@@ -2,7 +2,11 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from st_aggrid import AgGrid, GridOptionsBuilder
-import io
+from utils.exportacao import botao_exportar
+from utils.filtros import painel_filtros, versao_sessao
+from utils.graficos import LIMITE_PONTOS, tracos_dispersao
+from utils.metricas_av7 import calcular_metricas_av7
+from utils.secoes import figura_em_cache, secao_adiada
 
 st.title("📊 Performance dos materiais")
 st.markdown(
@@ -16,34 +20,8 @@ if "merged_dataframes" in st.session_state:
     if df_av7 is not None and not df_av7.empty:
         st.success("✅ Dados carregados com sucesso!")
 
-        df_final_av7 = df_av7[~df_av7["displayName"].isin(["raullanconi", "stine"])].copy()
-
-        if "numeroLinhas" in df_final_av7.columns and "comprimentoLinha" in df_final_av7.columns:
-            df_final_av7["areaParcela"] = df_final_av7["numeroLinhas"] * df_final_av7["comprimentoLinha"] * 0.5
-
-        col_plantas = ["numeroPlantas10Metros1a", "numeroPlantas10Metros2a", "numeroPlantas10Metros3a", "numeroPlantas10Metros4a"]
-        if all(col in df_final_av7.columns for col in col_plantas):
-            df_final_av7["numeroPlantasMedio10m"] = df_final_av7[col_plantas].replace(0, pd.NA).mean(axis=1, skipna=True)
-            df_final_av7["Pop_Final"] = (20000 * df_final_av7["numeroPlantasMedio10m"]) / 10
-
-        if "numeroPlantasMedio10m" in df_final_av7.columns:
-            df_final_av7["popMediaFinal"] = (10000 / 0.5) * (df_final_av7["numeroPlantasMedio10m"] / 10)
-
-        if all(col in df_final_av7.columns for col in ["pesoParcela", "umidadeParcela", "areaParcela"]):
-            df_final_av7["producaoCorrigida"] = (
-                (df_final_av7["pesoParcela"] * (100 - df_final_av7["umidadeParcela"]) / 87) * (10000 / df_final_av7["areaParcela"])
-            ).astype(float).round(1)
-
-        if "producaoCorrigida" in df_final_av7.columns:
-            df_final_av7["producaoCorrigidaSc"] = (df_final_av7["producaoCorrigida"] / 60).astype(float).round(1)
-
-        if all(col in df_final_av7.columns for col in ["pesoMilGraos", "umidadeAmostraPesoMilGraos"]):
-            df_final_av7["PMG_corrigido"] = (
-                df_final_av7["pesoMilGraos"] * ((100 - df_final_av7["umidadeAmostraPesoMilGraos"]) / 87)
-            ).astype(float).round(1)
-
-        if all(col in df_final_av7.columns for col in ["fazendaRef", "indexTratamento"]):
-            df_final_av7["ChaveFaixa"] = df_final_av7["fazendaRef"].astype(str) + "_" + df_final_av7["indexTratamento"].astype(str)
+        # 🧮 Métricas da av7 (calculadas uma vez e reaproveitadas entre as páginas)
+        df_final_av7 = calcular_metricas_av7(df_av7)
 
         if all(col in df_final_av7.columns for col in ["ChaveFaixa", "populacao"]):
             df_final_av7["ChaveDensidade"] = df_final_av7["ChaveFaixa"].astype(str) + "_" + df_final_av7["populacao"].astype(str)
@@ -63,10 +41,6 @@ if "merged_dataframes" in st.session_state:
 
         df_final_av7 = df_final_av7.rename(columns=colunas_renomeadas)
 
-        for col in ["Plantio", "Colheita"]:
-            if col in df_final_av7.columns:
-                df_final_av7[col] = pd.to_datetime(df_final_av7[col], errors="coerce", origin="unix", unit="s").dt.strftime("%d/%m/%Y")
-
         if "Index" in df_final_av7.columns and "População" in df_final_av7.columns:
             df_final_av7["Index_População"] = df_final_av7["Index"].astype(str) + "_" + df_final_av7["População"].astype(str)
 
@@ -82,25 +56,14 @@ if "merged_dataframes" in st.session_state:
                 "Estado": "Estado",
                 "Cidade": "Cidade",
                 "Fazenda": "Fazenda",
-                "Cultivar": "Cultivar"
+                "Cultivar": "Cultivar",
+                "GM": "GM"
             }
 
-            for coluna, label in filtros.items():
-                if coluna in df_final_av7.columns:
-                    with st.expander(label):
-                        opcoes = sorted(df_final_av7[coluna].dropna().unique())
-                        selecionados = [
-                            op for op in opcoes if st.checkbox(op, key=f"{coluna}_{op}", value=False)
-                        ]
-                        if selecionados:
-                            df_final_av7 = df_final_av7[df_final_av7[coluna].isin(selecionados)]
-
-            if "GM" in df_final_av7.columns:
-                gm_min = int(df_final_av7["GM"].min())
-                gm_max = int(df_final_av7["GM"].max())
-                if gm_min < gm_max:
-                    gm_range = st.slider("Intervalo de GM", gm_min, gm_max, (gm_min, gm_max), step=1)
-                    df_final_av7 = df_final_av7[df_final_av7["GM"].between(gm_range[0], gm_range[1])]
+            # 🎛️ Seleção compartilhada entre as páginas; máscaras em cache por versão dos dados
+            df_final_av7 = painel_filtros(df_final_av7, filtros, versao_sessao("av7", "densidade"))
+            # 🏷️ Versão dos dados + filtros: chave dos gráficos em cache
+            versao_densidade = df_final_av7.attrs["versao_filtros"]
 
         with col_tabela:
             st.markdown("### 📋 Tabela Informações de Produção")
@@ -133,15 +96,12 @@ if "merged_dataframes" in st.session_state:
                 custom_css=custom_css
             )
 
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                df_visualizacao.to_excel(writer, index=False, sheet_name="faixa_densidade")
-
-            st.download_button(
+            botao_exportar(
+                df_visualizacao,
+                nome_arquivo="densidade",
+                chave="densidade_densidade",
                 label="🗕️ Baixar Densidade",
-                data=output.getvalue(),
-                file_name="densidade.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                nome_aba="faixa_densidade"
             )
 
             # Novo dataframe agrupado
@@ -175,588 +135,590 @@ if "merged_dataframes" in st.session_state:
             )
 
             # Botão para exportar o dataframe de média por grupo
-            output_grupo = io.BytesIO()
-            with pd.ExcelWriter(output_grupo, engine='xlsxwriter') as writer:
-                df_media_grupo.to_excel(writer, index=False, sheet_name="media_grupos")
-
-            st.download_button(
+            botao_exportar(
+                df_media_grupo,
+                nome_arquivo="media_por_grupo",
+                chave="densidade_media_por_grupo",
                 label="🗕️ Baixar Média por Grupo",
-                data=output_grupo.getvalue(),
-                file_name="media_por_grupo.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                nome_aba="media_grupos"
             )
 
-            import pandas as pd
             import plotly.express as px
-            import numpy as np
 
             # Histograma 📊 população final
-            with st.expander("📊 Visualizar Histograma de População Final", expanded=False):
-                st.markdown("Visualize a distribuição de `População Final` por faixa de população.")
-
-                populacao_order = [200, 250, 300, 350, 400]
-
-                # Cores personalizadas
-                cores_populacao = {
-                    200: "#1f77b4",  # azul
-                    250: "#2ca02c",  # verde
-                    300: "#ff7f0e",  # laranja
-                    350: "#9467bd",  # roxo
-                    400: "#8c564b"   # marrom escuro
-                }
-
-                # Filtra zeros e nulos
-                df_filtrado = df_final_av7.copy()
-                df_filtrado["Pop_Final"] = pd.to_numeric(df_filtrado["Pop_Final"], errors="coerce")
-                df_filtrado = df_filtrado[df_filtrado["Pop_Final"].notna()]
-                df_filtrado = df_filtrado[df_filtrado["Pop_Final"] > 0]
-
-                fig = px.histogram(
-                    df_filtrado,
-                    x="Pop_Final",
-                    color="População",
-                    facet_col="População",
-                    nbins=50,
-                    title="Histograma da População por 'Pop_Final'",
-                    labels={"Pop_Final": "População Final"},
-                    category_orders={"População": populacao_order},
-                    color_discrete_map=cores_populacao
-                )
-
-                # Layout geral
-                fig.update_layout(
-                    showlegend=False,
-                    height=600,
-                    bargap=0.3,
-                    template="plotly_white",
-                    title=dict(
-                        text="Histograma da População por 'Pop_Final'",
-                        font=dict(size=18, family="Arial Black", color="black")
-                    )
-                )
-
-                # Títulos das facetas em negrito
-                for annotation in fig.layout.annotations:
-                    annotation.font = dict(family="Arial Black", size=14, color="black")
-
-                # Eixos + linha de média + anotação
-                for i, populacao in enumerate(populacao_order):
-                    eixo_x = f"xaxis{i + 1 if i > 0 else ''}"
-                    eixo_y = f"yaxis{i + 1 if i > 0 else ''}"
+            with secao_adiada("📊 Visualizar Histograma de População Final", "dens_hist_pop") as aberta:
+                if aberta:
+                    st.markdown("Visualize a distribuição de `População Final` por faixa de população.")
+
+                    def construir_hist_pop():
+                        populacao_order = [200, 250, 300, 350, 400]
+
+                        # Cores personalizadas
+                        cores_populacao = {
+                            200: "#1f77b4",  # azul
+                            250: "#2ca02c",  # verde
+                            300: "#ff7f0e",  # laranja
+                            350: "#9467bd",  # roxo
+                            400: "#8c564b"   # marrom escuro
+                        }
+
+                        # Filtra zeros e nulos
+                        df_filtrado = df_final_av7.copy()
+                        df_filtrado["Pop_Final"] = pd.to_numeric(df_filtrado["Pop_Final"], errors="coerce")
+                        df_filtrado = df_filtrado[df_filtrado["Pop_Final"].notna()]
+                        df_filtrado = df_filtrado[df_filtrado["Pop_Final"] > 0]
+
+                        fig = px.histogram(
+                            df_filtrado,
+                            x="Pop_Final",
+                            color="População",
+                            facet_col="População",
+                            nbins=50,
+                            title="Histograma da População por 'Pop_Final'",
+                            labels={"Pop_Final": "População Final"},
+                            category_orders={"População": populacao_order},
+                            color_discrete_map=cores_populacao
+                        )
 
-                    fig.update_layout({
-                        eixo_x: dict(
-                            range=[100000, 450000],
-                            tickformat="~s",
+                        # Layout geral
+                        fig.update_layout(
+                            showlegend=False,
+                            height=600,
+                            bargap=0.3,
+                            template="plotly_white",
                             title=dict(
-                                text="População Final",
-                                font=dict(family="Arial Black", size=14, color="black")
-                            ),
-                            tickfont=dict(family="Arial", size=12, color="black")
-                        ),
-                        eixo_y: dict(
-                            range=[0, 10],  # Ajuste conforme necessário
-                            title=dict(
-                                text="Frequência",
-                                font=dict(family="Arial Black", size=14, color="black")
-                            ),
-                            tickfont=dict(family="Arial", size=12, color="black")
+                                text="Histograma da População por 'Pop_Final'",
+                                font=dict(size=18, family="Arial Black", color="black")
+                            )
                         )
-                    })
-
-                    # Dados por população (limpos)
-                    dados_pop = df_filtrado[df_filtrado["População"] == populacao]["Pop_Final"]
-
-                    if len(dados_pop) == 0:
-                        continue
-
-                    media = dados_pop.mean()
-                    xref = eixo_x.replace("axis", "")
-                    yref = eixo_y.replace("axis", "")
-
-                    # Linha da média
-                    fig.add_shape(
-                        type="line",
-                        x0=media,
-                        x1=media,
-                        y0=0,
-                        y1=0.88,
-                        xref=xref,
-                        yref="paper",
-                        line=dict(color="red", width=2, dash="dash")
-                    )
 
-                    # Anotação da média
-                    fig.add_annotation(
-                        x=media,
-                        y=1.05,
-                        xref=xref,
-                        yref="paper",
-                        text=f"Média: {int(media/1000)}K",
-                        showarrow=False,
-                        yanchor="bottom",
-                        font=dict(family="Arial Black", size=12, color="red"),
-                        align="center"
-                    )
+                        # Títulos das facetas em negrito
+                        for annotation in fig.layout.annotations:
+                            annotation.font = dict(family="Arial Black", size=14, color="black")
+
+                        # Eixos + linha de média + anotação
+                        for i, populacao in enumerate(populacao_order):
+                            eixo_x = f"xaxis{i + 1 if i > 0 else ''}"
+                            eixo_y = f"yaxis{i + 1 if i > 0 else ''}"
+
+                            fig.update_layout({
+                                eixo_x: dict(
+                                    range=[100000, 450000],
+                                    tickformat="~s",
+                                    title=dict(
+                                        text="População Final",
+                                        font=dict(family="Arial Black", size=14, color="black")
+                                    ),
+                                    tickfont=dict(family="Arial", size=12, color="black")
+                                ),
+                                eixo_y: dict(
+                                    range=[0, 10],  # Ajuste conforme necessário
+                                    title=dict(
+                                        text="Frequência",
+                                        font=dict(family="Arial Black", size=14, color="black")
+                                    ),
+                                    tickfont=dict(family="Arial", size=12, color="black")
+                                )
+                            })
+
+                            # Dados por população (limpos)
+                            dados_pop = df_filtrado[df_filtrado["População"] == populacao]["Pop_Final"]
+
+                            if len(dados_pop) == 0:
+                                continue
+
+                            media = dados_pop.mean()
+                            xref = eixo_x.replace("axis", "")
+
+                            # Linha da média
+                            fig.add_shape(
+                                type="line",
+                                x0=media,
+                                x1=media,
+                                y0=0,
+                                y1=0.88,
+                                xref=xref,
+                                yref="paper",
+                                line=dict(color="red", width=2, dash="dash")
+                            )
 
-                # Exibe o gráfico
-                st.plotly_chart(fig, use_container_width=True)
+                            # Anotação da média
+                            fig.add_annotation(
+                                x=media,
+                                y=1.05,
+                                xref=xref,
+                                yref="paper",
+                                text=f"Média: {int(media/1000)}K",
+                                showarrow=False,
+                                yanchor="bottom",
+                                font=dict(family="Arial Black", size=12, color="red"),
+                                align="center"
+                            )
+                        return fig
 
+                    fig = figura_em_cache("dens_hist_pop", versao_densidade, construir_hist_pop)
+                    # Exibe o gráfico
+                    st.plotly_chart(fig, use_container_width=True)
 
 
 
-            import pandas as pd
-            import plotly.express as px
-            import numpy as np
 
             # Histograma 📊 produção corrigida
-            with st.expander("📊 Visualizar Histograma de Produção (sc/ha)", expanded=False):
-                st.markdown("Distribuição da produção por faixa de população, considerando apenas valores válidos (≠ 0 e não nulos).")
-
-                populacao_order = [200, 250, 300, 350, 400]
-
-                cores_populacao = {
-                    200: "#1f77b4",
-                    250: "#2ca02c",
-                    300: "#ff7f0e",
-                    350: "#9467bd",
-                    400: "#8c564b"
-                }
-
-                # Filtrando zeros e nulos
-                df_filtrado = df_final_av7.copy()
-                df_filtrado["prod_sc_ha"] = pd.to_numeric(df_filtrado["prod_sc_ha"], errors="coerce")
-                df_filtrado = df_filtrado[df_filtrado["prod_sc_ha"].notna()]
-                df_filtrado = df_filtrado[df_filtrado["prod_sc_ha"] > 0]
-
-                fig = px.histogram(
-                    df_filtrado,
-                    x="prod_sc_ha",
-                    color="População",
-                    facet_col="População",
-                    nbins=50,
-                    title="Histograma da Produção por 'sc/ha'",
-                    labels={"prod_sc_ha": "Produção (sc/ha)"},
-                    category_orders={"População": populacao_order},
-                    color_discrete_map=cores_populacao
-                )
-
-                fig.update_layout(
-                    showlegend=False,
-                    height=600,
-                    bargap=0.3,
-                    template="plotly_white",
-                    title=dict(
-                        text="Histograma da Produção por 'sc/ha'",
-                        font=dict(size=18, family="Arial Black", color="black")
-                    )
-                )
-
-                for annotation in fig.layout.annotations:
-                    annotation.font = dict(family="Arial Black", size=14, color="black")
-
-                for i, populacao in enumerate(populacao_order):
-                    eixo_x = f"xaxis{i + 1 if i > 0 else ''}"
-                    eixo_y = f"yaxis{i + 1 if i > 0 else ''}"
+            with secao_adiada("📊 Visualizar Histograma de Produção (sc/ha)", "dens_hist_prod") as aberta:
+                if aberta:
+                    st.markdown("Distribuição da produção por faixa de população, considerando apenas valores válidos (≠ 0 e não nulos).")
+
+                    def construir_hist_prod():
+                        populacao_order = [200, 250, 300, 350, 400]
+
+                        cores_populacao = {
+                            200: "#1f77b4",
+                            250: "#2ca02c",
+                            300: "#ff7f0e",
+                            350: "#9467bd",
+                            400: "#8c564b"
+                        }
+
+                        # Filtrando zeros e nulos
+                        df_filtrado = df_final_av7.copy()
+                        df_filtrado["prod_sc_ha"] = pd.to_numeric(df_filtrado["prod_sc_ha"], errors="coerce")
+                        df_filtrado = df_filtrado[df_filtrado["prod_sc_ha"].notna()]
+                        df_filtrado = df_filtrado[df_filtrado["prod_sc_ha"] > 0]
+
+                        fig = px.histogram(
+                            df_filtrado,
+                            x="prod_sc_ha",
+                            color="População",
+                            facet_col="População",
+                            nbins=50,
+                            title="Histograma da Produção por 'sc/ha'",
+                            labels={"prod_sc_ha": "Produção (sc/ha)"},
+                            category_orders={"População": populacao_order},
+                            color_discrete_map=cores_populacao
+                        )
 
-                    fig.update_layout({
-                        eixo_x: dict(
-                            range=[0, 120],
-                            title=dict(
-                                text="Produção (sc/ha)",
-                                font=dict(family="Arial Black", size=14, color="black")
-                            ),
-                            tickfont=dict(family="Arial", size=12, color="black")
-                        ),
-                        eixo_y: dict(
-                            range=[0, 20],
+                        fig.update_layout(
+                            showlegend=False,
+                            height=600,
+                            bargap=0.3,
+                            template="plotly_white",
                             title=dict(
-                                text="Frequência",
-                                font=dict(family="Arial Black", size=14, color="black")
-                            ),
-                            tickfont=dict(family="Arial", size=12, color="black")
+                                text="Histograma da Produção por 'sc/ha'",
+                                font=dict(size=18, family="Arial Black", color="black")
+                            )
                         )
-                    })
-
-                    # Filtra os dados válidos por população
-                    dados_pop = df_filtrado[df_filtrado["População"] == populacao]["prod_sc_ha"]
-
-                    if len(dados_pop) == 0:
-                        continue
-
-                    media = dados_pop.mean()
-                    xref = eixo_x.replace("axis", "")
-
-                    fig.add_shape(
-                        type="line",
-                        x0=media,
-                        x1=media,
-                        y0=0,
-                        y1=1,
-                        xref=xref,
-                        yref="paper",
-                        line=dict(color="red", width=2, dash="dash")
-                    )
 
-                    fig.add_annotation(
-                        x=media,
-                        y=1.05,
-                        xref=xref,
-                        yref="paper",
-                        text=f"Média: {media:.1f} sc/ha",
-                        showarrow=False,
-                        yanchor="bottom",
-                        font=dict(family="Arial Black", size=12, color="red"),
-                        align="center"
-                    )
+                        for annotation in fig.layout.annotations:
+                            annotation.font = dict(family="Arial Black", size=14, color="black")
+
+                        for i, populacao in enumerate(populacao_order):
+                            eixo_x = f"xaxis{i + 1 if i > 0 else ''}"
+                            eixo_y = f"yaxis{i + 1 if i > 0 else ''}"
+
+                            fig.update_layout({
+                                eixo_x: dict(
+                                    range=[0, 120],
+                                    title=dict(
+                                        text="Produção (sc/ha)",
+                                        font=dict(family="Arial Black", size=14, color="black")
+                                    ),
+                                    tickfont=dict(family="Arial", size=12, color="black")
+                                ),
+                                eixo_y: dict(
+                                    range=[0, 20],
+                                    title=dict(
+                                        text="Frequência",
+                                        font=dict(family="Arial Black", size=14, color="black")
+                                    ),
+                                    tickfont=dict(family="Arial", size=12, color="black")
+                                )
+                            })
+
+                            # Filtra os dados válidos por população
+                            dados_pop = df_filtrado[df_filtrado["População"] == populacao]["prod_sc_ha"]
+
+                            if len(dados_pop) == 0:
+                                continue
+
+                            media = dados_pop.mean()
+                            xref = eixo_x.replace("axis", "")
+
+                            fig.add_shape(
+                                type="line",
+                                x0=media,
+                                x1=media,
+                                y0=0,
+                                y1=1,
+                                xref=xref,
+                                yref="paper",
+                                line=dict(color="red", width=2, dash="dash")
+                            )
 
-                st.plotly_chart(fig, use_container_width=True)
+                            fig.add_annotation(
+                                x=media,
+                                y=1.05,
+                                xref=xref,
+                                yref="paper",
+                                text=f"Média: {media:.1f} sc/ha",
+                                showarrow=False,
+                                yanchor="bottom",
+                                font=dict(family="Arial Black", size=12, color="red"),
+                                align="center"
+                            )
+                        return fig
 
+                    fig = figura_em_cache("dens_hist_prod", versao_densidade, construir_hist_prod)
+                    st.plotly_chart(fig, use_container_width=True)
 
 
-            import pandas as pd
-            import plotly.express as px
-            import numpy as np
 
             # Histograma 📊 PMG
-            with st.expander("📊 Visualizar Histograma de PMG (Peso de Mil Grãos)", expanded=False):
-                st.markdown("Distribuição do PMG (Peso de Mil Grãos) por faixa de população, considerando apenas valores válidos.")
-
-                populacao_order = [200, 250, 300, 350, 400]
-
-                cores_populacao = {
-                    200: "#1f77b4",
-                    250: "#2ca02c",
-                    300: "#ff7f0e",
-                    350: "#9467bd",
-                    400: "#8c564b"
-                }
-
-                # Filtrando zeros e nulos
-                df_filtrado = df_final_av7.copy()
-                df_filtrado["PMG"] = pd.to_numeric(df_filtrado["PMG"], errors="coerce")
-                df_filtrado = df_filtrado[df_filtrado["PMG"].notna()]
-                df_filtrado = df_filtrado[df_filtrado["PMG"] > 0]
-
-                fig = px.histogram(
-                    df_filtrado,
-                    x="PMG",
-                    color="População",
-                    facet_col="População",
-                    nbins=10,
-                    title="Histograma do Peso de Mil Grãos (PMG)",
-                    labels={"PMG": "PMG (g)"},
-                    category_orders={"População": populacao_order},
-                    color_discrete_map=cores_populacao
-                )
-
-                fig.update_layout(
-                    showlegend=False,
-                    height=600,
-                    bargap=0.3,
-                    template="plotly_white",
-                    title=dict(
-                        text="Histograma do Peso de Mil Grãos (PMG)",
-                        font=dict(size=18, family="Arial Black", color="black")
-                    )
-                )
-
-                for annotation in fig.layout.annotations:
-                    annotation.font = dict(family="Arial Black", size=14, color="black")
-
-                for i, populacao in enumerate(populacao_order):
-                    eixo_x = f"xaxis{i + 1 if i > 0 else ''}"
-                    eixo_y = f"yaxis{i + 1 if i > 0 else ''}"
+            with secao_adiada("📊 Visualizar Histograma de PMG (Peso de Mil Grãos)", "dens_hist_pmg") as aberta:
+                if aberta:
+                    st.markdown("Distribuição do PMG (Peso de Mil Grãos) por faixa de população, considerando apenas valores válidos.")
+
+                    def construir_hist_pmg():
+                        populacao_order = [200, 250, 300, 350, 400]
+
+                        cores_populacao = {
+                            200: "#1f77b4",
+                            250: "#2ca02c",
+                            300: "#ff7f0e",
+                            350: "#9467bd",
+                            400: "#8c564b"
+                        }
+
+                        # Filtrando zeros e nulos
+                        df_filtrado = df_final_av7.copy()
+                        df_filtrado["PMG"] = pd.to_numeric(df_filtrado["PMG"], errors="coerce")
+                        df_filtrado = df_filtrado[df_filtrado["PMG"].notna()]
+                        df_filtrado = df_filtrado[df_filtrado["PMG"] > 0]
+
+                        fig = px.histogram(
+                            df_filtrado,
+                            x="PMG",
+                            color="População",
+                            facet_col="População",
+                            nbins=10,
+                            title="Histograma do Peso de Mil Grãos (PMG)",
+                            labels={"PMG": "PMG (g)"},
+                            category_orders={"População": populacao_order},
+                            color_discrete_map=cores_populacao
+                        )
 
-                    fig.update_layout({
-                        eixo_x: dict(
-                            title=dict(
-                                text="PMG (g)",
-                                font=dict(family="Arial Black", size=14, color="black")
-                            ),
-                            tickfont=dict(family="Arial", size=12, color="black")
-                        ),
-                        eixo_y: dict(
-                            range=[0, 8],  # ajuste se quiser fixar o eixo Y
+                        fig.update_layout(
+                            showlegend=False,
+                            height=600,
+                            bargap=0.3,
+                            template="plotly_white",
                             title=dict(
-                                text="Frequência",
-                                font=dict(family="Arial Black", size=14, color="black")
-                            ),
-                            tickfont=dict(family="Arial", size=12, color="black")
+                                text="Histograma do Peso de Mil Grãos (PMG)",
+                                font=dict(size=18, family="Arial Black", color="black")
+                            )
                         )
-                    })
-
-                    # Média por população
-                    dados_pop = df_filtrado[df_filtrado["População"] == populacao]["PMG"]
-
-                    if len(dados_pop) == 0:
-                        continue
-
-                    media = dados_pop.mean()
-                    xref = eixo_x.replace("axis", "")
-
-                    # Linha da média
-                    fig.add_shape(
-                        type="line",
-                        x0=media,
-                        x1=media,
-                        y0=0,
-                        y1=1,
-                        xref=xref,
-                        yref="paper",
-                        line=dict(color="red", width=2, dash="dash")
-                    )
 
-                    # Anotação da média
-                    fig.add_annotation(
-                        x=media,
-                        y=1.05,
-                        xref=xref,
-                        yref="paper",
-                        text=f"Média: {media:.1f} g",
-                        showarrow=False,
-                        yanchor="bottom",
-                        font=dict(family="Arial Black", size=12, color="red"),
-                        align="center"
-                    )
+                        for annotation in fig.layout.annotations:
+                            annotation.font = dict(family="Arial Black", size=14, color="black")
+
+                        for i, populacao in enumerate(populacao_order):
+                            eixo_x = f"xaxis{i + 1 if i > 0 else ''}"
+                            eixo_y = f"yaxis{i + 1 if i > 0 else ''}"
+
+                            fig.update_layout({
+                                eixo_x: dict(
+                                    title=dict(
+                                        text="PMG (g)",
+                                        font=dict(family="Arial Black", size=14, color="black")
+                                    ),
+                                    tickfont=dict(family="Arial", size=12, color="black")
+                                ),
+                                eixo_y: dict(
+                                    range=[0, 8],  # ajuste se quiser fixar o eixo Y
+                                    title=dict(
+                                        text="Frequência",
+                                        font=dict(family="Arial Black", size=14, color="black")
+                                    ),
+                                    tickfont=dict(family="Arial", size=12, color="black")
+                                )
+                            })
+
+                            # Média por população
+                            dados_pop = df_filtrado[df_filtrado["População"] == populacao]["PMG"]
+
+                            if len(dados_pop) == 0:
+                                continue
+
+                            media = dados_pop.mean()
+                            xref = eixo_x.replace("axis", "")
+
+                            # Linha da média
+                            fig.add_shape(
+                                type="line",
+                                x0=media,
+                                x1=media,
+                                y0=0,
+                                y1=1,
+                                xref=xref,
+                                yref="paper",
+                                line=dict(color="red", width=2, dash="dash")
+                            )
 
-                st.plotly_chart(fig, use_container_width=True)
+                            # Anotação da média
+                            fig.add_annotation(
+                                x=media,
+                                y=1.05,
+                                xref=xref,
+                                yref="paper",
+                                text=f"Média: {media:.1f} g",
+                                showarrow=False,
+                                yanchor="bottom",
+                                font=dict(family="Arial Black", size=12, color="red"),
+                                align="center"
+                            )
+                        return fig
 
+                    fig = figura_em_cache("dens_hist_pmg", versao_densidade, construir_hist_pmg)
+                    st.plotly_chart(fig, use_container_width=True)
 
 
-            import numpy as np
-            import pandas as pd
-            import plotly.express as px
 
             # Boxplot 📦 População Final
-            with st.expander("📦 Visualizar Boxplot de População Final", expanded=False):
-                st.markdown("Boxplot da População Final por faixa de população. As médias e medianas ignoram valores zero e nulos.")
-
-                populacao_order = [200, 250, 300, 350, 400]
-
-                cores_populacao = {
-                    200: "#1f77b4",
-                    250: "#2ca02c",
-                    300: "#ff7f0e",
-                    350: "#9467bd",
-                    400: "#8c564b"
-                }
-
-                # Filtra PMG não nulo e maior que zero
-                df_filtrado = df_final_av7.copy()
-                df_filtrado["Pop_Final"] = pd.to_numeric(df_filtrado["Pop_Final"], errors="coerce")
-                df_filtrado = df_filtrado[df_filtrado["Pop_Final"].notna()]
-                df_filtrado = df_filtrado[df_filtrado["Pop_Final"] > 0]
-
-                fig = px.box(
-                    df_filtrado,
-                    y="Pop_Final",
-                    color="População",
-                    facet_col="População",
-                    category_orders={"População": populacao_order},
-                    color_discrete_map=cores_populacao,
-                    points="outliers",
-                    labels={"Pop_Final": "População Final"}
-                )
-
-                # Layout geral
-                fig.update_layout(
-                    showlegend=False,
-                    height=600,
-                    template="plotly_white"
-                )
-
-                # Títulos das facetas com média e mediana
-                for annotation in fig.layout.annotations:
-                    try:
-                        pop_value = int(annotation.text.split("=")[-1])
-                        dados = df_filtrado[df_filtrado["População"] == pop_value]["Pop_Final"]
-
-                        if len(dados) > 0:
-                            media = dados.mean()
-                            mediana = dados.median()
-                            annotation.text = (
-                                f"População: {pop_value}<br>"
-                                f"<span style='font-size:12px;color:#333;'>🔺 Mediana: {int(mediana/1000)}K</span><br>"
-                                f"<span style='font-size:12px;color:red;'>🔻 Média: {int(media/1000)}K</span>"
-                            )
-                    except:
-                        pass
-
-                    annotation.font = dict(family="Arial Black", size=14, color="black")
-
-                # Ajuste visual dos eixos
-                for i, populacao in enumerate(populacao_order):
-                    eixo_y = f"yaxis{i + 1 if i > 0 else ''}"
+            with secao_adiada("📦 Visualizar Boxplot de População Final", "dens_box_pop") as aberta:
+                if aberta:
+                    st.markdown("Boxplot da População Final por faixa de população. As médias e medianas ignoram valores zero e nulos.")
+
+                    def construir_box_pop():
+                        populacao_order = [200, 250, 300, 350, 400]
+
+                        cores_populacao = {
+                            200: "#1f77b4",
+                            250: "#2ca02c",
+                            300: "#ff7f0e",
+                            350: "#9467bd",
+                            400: "#8c564b"
+                        }
+
+                        # Filtra PMG não nulo e maior que zero
+                        df_filtrado = df_final_av7.copy()
+                        df_filtrado["Pop_Final"] = pd.to_numeric(df_filtrado["Pop_Final"], errors="coerce")
+                        df_filtrado = df_filtrado[df_filtrado["Pop_Final"].notna()]
+                        df_filtrado = df_filtrado[df_filtrado["Pop_Final"] > 0]
+
+                        fig = px.box(
+                            df_filtrado,
+                            y="Pop_Final",
+                            color="População",
+                            facet_col="População",
+                            category_orders={"População": populacao_order},
+                            color_discrete_map=cores_populacao,
+                            points="outliers",
+                            labels={"Pop_Final": "População Final"}
+                        )
 
-                    fig.update_layout({
-                        eixo_y: dict(
-                            range=[100000, 450000],
-                            title=dict(
-                                text="População Final",
-                                font=dict(family="Arial Black", size=14, color="black")
-                            ),
-                            tickformat="~s",
-                            tickfont=dict(family="Arial", size=12, color="black")
+                        # Layout geral
+                        fig.update_layout(
+                            showlegend=False,
+                            height=600,
+                            template="plotly_white"
                         )
-                    })
 
-                # Exibe o gráfico
-                st.plotly_chart(fig, use_container_width=True)
+                        # Títulos das facetas com média e mediana
+                        for annotation in fig.layout.annotations:
+                            try:
+                                pop_value = int(annotation.text.split("=")[-1])
+                                dados = df_filtrado[df_filtrado["População"] == pop_value]["Pop_Final"]
+
+                                if len(dados) > 0:
+                                    media = dados.mean()
+                                    mediana = dados.median()
+                                    annotation.text = (
+                                        f"População: {pop_value}<br>"
+                                        f"<span style='font-size:12px;color:#333;'>🔺 Mediana: {int(mediana/1000)}K</span><br>"
+                                        f"<span style='font-size:12px;color:red;'>🔻 Média: {int(media/1000)}K</span>"
+                                    )
+                            except:
+                                pass
+
+                            annotation.font = dict(family="Arial Black", size=14, color="black")
+
+                        # Ajuste visual dos eixos
+                        for i, populacao in enumerate(populacao_order):
+                            eixo_y = f"yaxis{i + 1 if i > 0 else ''}"
+
+                            fig.update_layout({
+                                eixo_y: dict(
+                                    range=[100000, 450000],
+                                    title=dict(
+                                        text="População Final",
+                                        font=dict(family="Arial Black", size=14, color="black")
+                                    ),
+                                    tickformat="~s",
+                                    tickfont=dict(family="Arial", size=12, color="black")
+                                )
+                            })
+                        return fig
+
+                    fig = figura_em_cache("dens_box_pop", versao_densidade, construir_box_pop)
+                    # Exibe o gráfico
+                    st.plotly_chart(fig, use_container_width=True)
 
         
             
-            import numpy as np
-            import pandas as pd
-            import plotly.express as px
-
             # Boxplot 📦 Produção (sc/ha)
-            with st.expander("📦 Visualizar Boxplot de Produção (sc/ha)", expanded=False):
-                st.markdown("Boxplot da Produção (sc/ha) por faixa de população, com média e mediana exibidas em cada faceta.")
-
-                populacao_order = [200, 250, 300, 350, 400]
-
-                cores_populacao = {
-                    200: "#1f77b4",
-                    250: "#2ca02c",
-                    300: "#ff7f0e",
-                    350: "#9467bd",
-                    400: "#8c564b"
-                }
-
-                # Filtra produção válida
-                df_filtrado = df_final_av7.copy()
-                df_filtrado["prod_sc_ha"] = pd.to_numeric(df_filtrado["prod_sc_ha"], errors="coerce")
-                df_filtrado = df_filtrado[df_filtrado["prod_sc_ha"].notna()]
-                df_filtrado = df_filtrado[df_filtrado["prod_sc_ha"] > 0]
-
-                fig = px.box(
-                    df_filtrado,
-                    y="prod_sc_ha",
-                    color="População",
-                    facet_col="População",
-                    category_orders={"População": populacao_order},
-                    color_discrete_map=cores_populacao,
-                    points="outliers",
-                    labels={"prod_sc_ha": "Produção (sc/ha)"}
-                )
-
-                fig.update_layout(
-                    showlegend=False,
-                    height=600,
-                    template="plotly_white"
-                )
-
-                # Injeta média e mediana nos títulos das facetas
-                for annotation in fig.layout.annotations:
-                    try:
-                        pop_value = int(annotation.text.split("=")[-1])
-                        dados = df_filtrado[df_filtrado["População"] == pop_value]["prod_sc_ha"]
-
-                        if len(dados) > 0:
-                            media = dados.mean()
-                            mediana = dados.median()
-                            annotation.text = (
-                                f"População: {pop_value}<br>"
-                                f"<span style='font-size:12px;color:#333;'>🔺 Mediana: {mediana:.1f} sc/ha</span><br>"
-                                f"<span style='font-size:12px;color:red;'>🔻 Média: {media:.1f} sc/ha</span>"
-                            )
-                    except:
-                        pass
-
-                    annotation.font = dict(family="Arial Black", size=14, color="black")
-
-                # Eixos formatados
-                for i, populacao in enumerate(populacao_order):
-                    eixo_y = f"yaxis{i + 1 if i > 0 else ''}"
+            with secao_adiada("📦 Visualizar Boxplot de Produção (sc/ha)", "dens_box_prod") as aberta:
+                if aberta:
+                    st.markdown("Boxplot da Produção (sc/ha) por faixa de população, com média e mediana exibidas em cada faceta.")
+
+                    def construir_box_prod():
+                        populacao_order = [200, 250, 300, 350, 400]
+
+                        cores_populacao = {
+                            200: "#1f77b4",
+                            250: "#2ca02c",
+                            300: "#ff7f0e",
+                            350: "#9467bd",
+                            400: "#8c564b"
+                        }
+
+                        # Filtra produção válida
+                        df_filtrado = df_final_av7.copy()
+                        df_filtrado["prod_sc_ha"] = pd.to_numeric(df_filtrado["prod_sc_ha"], errors="coerce")
+                        df_filtrado = df_filtrado[df_filtrado["prod_sc_ha"].notna()]
+                        df_filtrado = df_filtrado[df_filtrado["prod_sc_ha"] > 0]
+
+                        fig = px.box(
+                            df_filtrado,
+                            y="prod_sc_ha",
+                            color="População",
+                            facet_col="População",
+                            category_orders={"População": populacao_order},
+                            color_discrete_map=cores_populacao,
+                            points="outliers",
+                            labels={"prod_sc_ha": "Produção (sc/ha)"}
+                        )
 
-                    fig.update_layout({
-                        eixo_y: dict(
-                            range=[0, 120],
-                            title=dict(
-                                text="Produção (sc/ha)",
-                                font=dict(family="Arial Black", size=14, color="black")
-                            ),
-                            tickfont=dict(family="Arial", size=12, color="black")
+                        fig.update_layout(
+                            showlegend=False,
+                            height=600,
+                            template="plotly_white"
                         )
-                    })
 
-                # Exibe o gráfico
-                st.plotly_chart(fig, use_container_width=True)
+                        # Injeta média e mediana nos títulos das facetas
+                        for annotation in fig.layout.annotations:
+                            try:
+                                pop_value = int(annotation.text.split("=")[-1])
+                                dados = df_filtrado[df_filtrado["População"] == pop_value]["prod_sc_ha"]
+
+                                if len(dados) > 0:
+                                    media = dados.mean()
+                                    mediana = dados.median()
+                                    annotation.text = (
+                                        f"População: {pop_value}<br>"
+                                        f"<span style='font-size:12px;color:#333;'>🔺 Mediana: {mediana:.1f} sc/ha</span><br>"
+                                        f"<span style='font-size:12px;color:red;'>🔻 Média: {media:.1f} sc/ha</span>"
+                                    )
+                            except:
+                                pass
+
+                            annotation.font = dict(family="Arial Black", size=14, color="black")
+
+                        # Eixos formatados
+                        for i, populacao in enumerate(populacao_order):
+                            eixo_y = f"yaxis{i + 1 if i > 0 else ''}"
+
+                            fig.update_layout({
+                                eixo_y: dict(
+                                    range=[0, 120],
+                                    title=dict(
+                                        text="Produção (sc/ha)",
+                                        font=dict(family="Arial Black", size=14, color="black")
+                                    ),
+                                    tickfont=dict(family="Arial", size=12, color="black")
+                                )
+                            })
+                        return fig
+
+                    fig = figura_em_cache("dens_box_prod", versao_densidade, construir_box_prod)
+                    # Exibe o gráfico
+                    st.plotly_chart(fig, use_container_width=True)
 
 
 
             # Boxplot 📦 PMG (Peso de Mil Grãos)
-            with st.expander("📦 Visualizar Boxplot de PMG por Faixa de População", expanded=False):
-                st.markdown("Boxplot do Peso de Mil Grãos (PMG) por faixa de população, com média e mediana exibidas.")
-
-                populacao_order = [200, 250, 300, 350, 400]
-
-                cores_populacao = {
-                    200: "#1f77b4",
-                    250: "#2ca02c",
-                    300: "#ff7f0e",
-                    350: "#9467bd",
-                    400: "#8c564b"
-                }
-
-                # Filtra PMG válido
-                df_filtrado = df_final_av7.copy()
-                df_filtrado["PMG"] = pd.to_numeric(df_filtrado["PMG"], errors="coerce")
-                df_filtrado = df_filtrado[df_filtrado["PMG"].notna()]
-                df_filtrado = df_filtrado[df_filtrado["PMG"] > 0]
-
-                fig = px.box(
-                    df_filtrado,
-                    y="PMG",
-                    color="População",
-                    facet_col="População",
-                    category_orders={"População": populacao_order},
-                    color_discrete_map=cores_populacao,
-                    points="outliers",
-                    labels={"PMG": "PMG (g)"}
-                )
-
-                fig.update_layout(
-                    showlegend=False,
-                    height=600,
-                    template="plotly_white",
-                )
-
-                # Injeta mediana e média nos títulos das facetas
-                for annotation in fig.layout.annotations:
-                    try:
-                        pop_value = int(annotation.text.split("=")[-1])
-                        dados = df_filtrado[df_filtrado["População"] == pop_value]["PMG"]
-
-                        if len(dados) > 0:
-                            media = dados.mean()
-                            mediana = dados.median()
-                            annotation.text = (
-                                f"População: {pop_value}<br>"
-                                f"<span style='font-size:12px;color:#333;'>🔺 Mediana: {mediana:.1f} g</span><br>"
-                                f"<span style='font-size:12px;color:red;'>🔻 Média: {media:.1f} g</span>"
-                            )
-                    except:
-                        pass
-
-                    annotation.font = dict(family="Arial Black", size=14, color="black")
+            with secao_adiada("📦 Visualizar Boxplot de PMG por Faixa de População", "dens_box_pmg") as aberta:
+                if aberta:
+                    st.markdown("Boxplot do Peso de Mil Grãos (PMG) por faixa de população, com média e mediana exibidas.")
+
+                    def construir_box_pmg():
+                        populacao_order = [200, 250, 300, 350, 400]
+
+                        cores_populacao = {
+                            200: "#1f77b4",
+                            250: "#2ca02c",
+                            300: "#ff7f0e",
+                            350: "#9467bd",
+                            400: "#8c564b"
+                        }
+
+                        # Filtra PMG válido
+                        df_filtrado = df_final_av7.copy()
+                        df_filtrado["PMG"] = pd.to_numeric(df_filtrado["PMG"], errors="coerce")
+                        df_filtrado = df_filtrado[df_filtrado["PMG"].notna()]
+                        df_filtrado = df_filtrado[df_filtrado["PMG"] > 0]
+
+                        fig = px.box(
+                            df_filtrado,
+                            y="PMG",
+                            color="População",
+                            facet_col="População",
+                            category_orders={"População": populacao_order},
+                            color_discrete_map=cores_populacao,
+                            points="outliers",
+                            labels={"PMG": "PMG (g)"}
+                        )
 
-                # Ajusta os eixos
-                for i, populacao in enumerate(populacao_order):
-                    eixo_y = f"yaxis{i + 1 if i > 0 else ''}"
-                    fig.update_layout({
-                        eixo_y: dict(
-                            range=[0, 350],  # ajuste conforme necessário
-                            title=dict(
-                                text="PMG (g)",
-                                font=dict(family="Arial Black", size=14, color="black")
-                            ),
-                            tickfont=dict(family="Arial", size=12, color="black")
+                        fig.update_layout(
+                            showlegend=False,
+                            height=600,
+                            template="plotly_white",
                         )
-                    })
 
-                st.plotly_chart(fig, use_container_width=True)
+                        # Injeta mediana e média nos títulos das facetas
+                        for annotation in fig.layout.annotations:
+                            try:
+                                pop_value = int(annotation.text.split("=")[-1])
+                                dados = df_filtrado[df_filtrado["População"] == pop_value]["PMG"]
+
+                                if len(dados) > 0:
+                                    media = dados.mean()
+                                    mediana = dados.median()
+                                    annotation.text = (
+                                        f"População: {pop_value}<br>"
+                                        f"<span style='font-size:12px;color:#333;'>🔺 Mediana: {mediana:.1f} g</span><br>"
+                                        f"<span style='font-size:12px;color:red;'>🔻 Média: {media:.1f} g</span>"
+                                    )
+                            except:
+                                pass
+
+                            annotation.font = dict(family="Arial Black", size=14, color="black")
+
+                        # Ajusta os eixos
+                        for i, populacao in enumerate(populacao_order):
+                            eixo_y = f"yaxis{i + 1 if i > 0 else ''}"
+                            fig.update_layout({
+                                eixo_y: dict(
+                                    range=[0, 350],  # ajuste conforme necessário
+                                    title=dict(
+                                        text="PMG (g)",
+                                        font=dict(family="Arial Black", size=14, color="black")
+                                    ),
+                                    tickfont=dict(family="Arial", size=12, color="black")
+                                )
+                            })
+                        return fig
+
+                    fig = figura_em_cache("dens_box_pmg", versao_densidade, construir_box_pmg)
+                    st.plotly_chart(fig, use_container_width=True)
 
 
 
@@ -765,93 +727,101 @@ if "merged_dataframes" in st.session_state:
             with st.expander("📊 Média de Produção por Faixa de População Final", expanded=True):
                 st.markdown("Este gráfico mostra a média de produção (`sc/ha`) por faixas de `Pop_Final`.")
 
-                # Cria as faixas personalizadas de 50k em 50k
-                bins = list(range(0, int(df_final_av7["Pop_Final"].max()) + 50000, 50000))
-                labels = [f"{int(bins[i]/1000)}K - {int(bins[i+1]/1000)}K" for i in range(len(bins)-1)]
-
-                df_faixa = df_final_av7.copy()
-                df_faixa = df_faixa[df_faixa["Pop_Final"] > 0]  # remove zeros
-                df_faixa["Faixa_Pop"] = pd.cut(df_faixa["Pop_Final"], bins=bins, labels=labels, right=False)
-
-                # Agrupa para calcular média e contagem
-                df_grouped = df_faixa.groupby("Faixa_Pop").agg({
-                    "prod_sc_ha": "mean",
-                    "Cultivar": "count"
-                }).reset_index().rename(columns={"Cultivar": "n_amostras"})
-
-                df_grouped = df_grouped.dropna()
-
-                # Gráfico de barras
-                fig_bar = px.bar(
-                    df_grouped,
-                    x="Faixa_Pop",
-                    y="n_amostras",
-                    text=df_grouped["prod_sc_ha"].round(1).astype(str) + " sc/ha",
-                    labels={"n_amostras": "Nº de Amostras", "Faixa_Pop": "Faixa de População Final"},
-                    title="Produção média (sc/ha) por faixa de População Final"
-                )
-
-                fig_bar.update_traces(textposition="outside")
-                fig_bar.update_layout(
-                    xaxis_title="Faixa de População Final",
-                    yaxis_title="Nº de Amostras",
-                    template="plotly_white",
-                    font=dict(family="Arial", size=14),
-                    height=500
-                )
+                def construir_media_faixa():
+                    # Cria as faixas personalizadas de 50k em 50k
+                    bins = list(range(0, int(df_final_av7["Pop_Final"].max()) + 50000, 50000))
+                    labels = [f"{int(bins[i]/1000)}K - {int(bins[i+1]/1000)}K" for i in range(len(bins)-1)]
+
+                    df_faixa = df_final_av7.copy()
+                    df_faixa = df_faixa[df_faixa["Pop_Final"] > 0]  # remove zeros
+                    df_faixa["Faixa_Pop"] = pd.cut(df_faixa["Pop_Final"], bins=bins, labels=labels, right=False)
+
+                    # Agrupa para calcular média e contagem
+                    df_grouped = df_faixa.groupby("Faixa_Pop").agg({
+                        "prod_sc_ha": "mean",
+                        "Cultivar": "count"
+                    }).reset_index().rename(columns={"Cultivar": "n_amostras"})
+
+                    df_grouped = df_grouped.dropna()
+
+                    # Gráfico de barras
+                    fig_bar = px.bar(
+                        df_grouped,
+                        x="Faixa_Pop",
+                        y="n_amostras",
+                        text=df_grouped["prod_sc_ha"].round(1).astype(str) + " sc/ha",
+                        labels={"n_amostras": "Nº de Amostras", "Faixa_Pop": "Faixa de População Final"},
+                        title="Produção média (sc/ha) por faixa de População Final"
+                    )
 
+                    fig_bar.update_traces(textposition="outside")
+                    fig_bar.update_layout(
+                        xaxis_title="Faixa de População Final",
+                        yaxis_title="Nº de Amostras",
+                        template="plotly_white",
+                        font=dict(family="Arial", size=14),
+                        height=500
+                    )
+                    return fig_bar
+
+                fig_bar = figura_em_cache("dens_media_faixa", versao_densidade, construir_media_faixa)
                 st.plotly_chart(fig_bar, use_container_width=True)
             
 
-            import plotly.express as px
-            import numpy as np
-            import pandas as pd
+            import plotly.graph_objects as go
             from sklearn.linear_model import LinearRegression
 
             # Regressão Linear 📈 População Final vs Produção (sc/ha)
             with st.expander("📈 Regressão Linear: População Final vs Produção (sc/ha)", expanded=True):
                 st.markdown("Análise de tendência linear entre População Final e Produção (`sc/ha`).")
 
-                # Prepara os dados (remove nulos, zeros e infinitos)
-                df_reg = df_final_av7.copy()
-                df_reg["Pop_Final"] = pd.to_numeric(df_reg["Pop_Final"], errors="coerce")
-                df_reg["prod_sc_ha"] = pd.to_numeric(df_reg["prod_sc_ha"], errors="coerce")
-
-                df_reg = df_reg[
-                    (df_reg["Pop_Final"].notna()) &
-                    (df_reg["Pop_Final"] > 0) &
-                    (~np.isinf(df_reg["Pop_Final"])) &
-                    (df_reg["prod_sc_ha"].notna()) &
-                    (df_reg["prod_sc_ha"] > 0) &
-                    (~np.isinf(df_reg["prod_sc_ha"]))
-                ]
-
-                # Regressão linear
-                X = df_reg[["Pop_Final"]].values
-                y = df_reg["prod_sc_ha"].values
-                model = LinearRegression()
-                model.fit(X, y)
-
-                # Predição para linha de tendência
-                x_range = np.linspace(df_reg["Pop_Final"].min(), df_reg["Pop_Final"].max(), 100)
-                y_pred = model.predict(x_range.reshape(-1, 1))
-
-                # Gráfico
-                fig = px.scatter(df_reg, x="Pop_Final", y="prod_sc_ha",
-                                trendline=None,
-                                labels={"Pop_Final": "População Final", "prod_sc_ha": "Produção (sc/ha)"},
-                                title="Regressão Linear: População Final vs Produção (sc/ha)")
-
-                fig.add_traces(px.line(x=x_range, y=y_pred, labels={"x": "Pop_Final", "y": "Produção"}).data)
-
-                # Ajustes visuais
-                fig.update_layout(
-                    template="plotly_white",
-                    height=500,
-                    title=dict(font=dict(size=18, family="Arial Black", color="black")),
-                    xaxis=dict(title=dict(text="População Final", font=dict(family="Arial Black", size=14))),
-                    yaxis=dict(title=dict(text="Produção (sc/ha)", font=dict(family="Arial Black", size=14)))
-                )
+                def construir_regressao():
+                    # Prepara os dados (remove nulos, zeros e infinitos)
+                    df_reg = df_final_av7.copy()
+                    df_reg["Pop_Final"] = pd.to_numeric(df_reg["Pop_Final"], errors="coerce")
+                    df_reg["prod_sc_ha"] = pd.to_numeric(df_reg["prod_sc_ha"], errors="coerce")
+
+                    df_reg = df_reg[
+                        (df_reg["Pop_Final"].notna()) &
+                        (df_reg["Pop_Final"] > 0) &
+                        (~np.isinf(df_reg["Pop_Final"])) &
+                        (df_reg["prod_sc_ha"].notna()) &
+                        (df_reg["prod_sc_ha"] > 0) &
+                        (~np.isinf(df_reg["prod_sc_ha"]))
+                    ]
+
+                    # Regressão linear
+                    X = df_reg[["Pop_Final"]].values
+                    y = df_reg["prod_sc_ha"].values
+                    model = LinearRegression()
+                    model.fit(X, y)
+
+                    # Predição para linha de tendência
+                    x_range = np.linspace(df_reg["Pop_Final"].min(), df_reg["Pop_Final"].max(), 100)
+                    y_pred = model.predict(x_range.reshape(-1, 1))
+
+                    # Gráfico
+                    # Pontos em WebGL (agregados acima do limite); a reta usa todos os dados
+                    fig = go.Figure(tracos_dispersao(
+                        df_reg, x="Pop_Final", y="prod_sc_ha",
+                        rotulos={"Pop_Final": "População Final", "prod_sc_ha": "Produção (sc/ha)"}
+                    ))
+                    fig.add_trace(go.Scatter(x=x_range, y=y_pred, mode="lines", name="Tendência", showlegend=False))
+                    fig.update_layout(title=dict(text="Regressão Linear: População Final vs Produção (sc/ha)"))
+
+                    # Ajustes visuais
+                    fig.update_layout(
+                        template="plotly_white",
+                        height=500,
+                        title=dict(font=dict(size=18, family="Arial Black", color="black")),
+                        xaxis=dict(title=dict(text="População Final", font=dict(family="Arial Black", size=14))),
+                        yaxis=dict(title=dict(text="Produção (sc/ha)", font=dict(family="Arial Black", size=14)))
+                    )
+                    return fig, len(df_reg)
+
+                fig, n_pontos = figura_em_cache("dens_regressao", versao_densidade, construir_regressao)
+                if n_pontos > LIMITE_PONTOS:
+                    st.caption(f"ℹ️ {n_pontos:,} pontos agregados por proximidade; o tamanho do marcador indica o nº de observações.".replace(",", "."))
 
                 st.plotly_chart(fig, use_container_width=True)
 
@@ -0,0 +1,72 @@
+"""ANOVA por absorção do bloco x ``anova_lm(typ=2)`` do statsmodels."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from statsmodels.formula.api import ols
+from statsmodels.stats.anova import anova_lm
+
+from utils.anova import COLUNAS_ANOVA, anova_dois_fatores, lsd_por_variavel
+
+
+def dados_teste(semente=0, n=300):
+    rng = np.random.default_rng(semente)
+    cultivar = rng.choice([f"K{i}" for i in range(9)], n)
+    fazenda = rng.choice([f"F{i}" for i in range(12)], n)
+    efeito_c = dict(zip(sorted(set(cultivar)), rng.normal(0, 4, 9)))
+    efeito_f = dict(zip(sorted(set(fazenda)), rng.normal(0, 6, 12)))
+    df = pd.DataFrame({
+        "Cultivar": cultivar,
+        "Fazenda": fazenda,
+        "prod": 60 + pd.Series(cultivar).map(efeito_c) + pd.Series(fazenda).map(efeito_f) + rng.normal(0, 3, n),
+        "pmg": rng.normal(150, 10, n),
+    })
+    # Desbalanceado e com ausentes
+    df.loc[::9, "prod"] = np.nan
+    df.loc[::23, "Fazenda"] = None
+    return df
+
+
+def anova_statsmodels(df, resposta):
+    dados = df[[resposta, "Cultivar", "Fazenda"]].dropna()
+    modelo = ols(f"{resposta} ~ C(Cultivar) + C(Fazenda)", data=dados).fit()
+    return anova_lm(modelo, typ=2)
+
+
+@pytest.mark.parametrize("semente", [0, 1, 2])
+def test_anova_igual_ao_statsmodels(semente):
+    df = dados_teste(semente)
+    tabela = anova_dois_fatores(df, "prod", "Cultivar", "Fazenda")
+    esperado = anova_statsmodels(df, "prod")
+
+    assert list(tabela.columns) == COLUNAS_ANOVA
+    assert list(tabela.index) == list(esperado.index)
+    np.testing.assert_allclose(
+        tabela.to_numpy(dtype=float), esperado[COLUNAS_ANOVA].to_numpy(dtype=float), rtol=1e-8, equal_nan=True
+    )
+
+
+@pytest.mark.filterwarnings("ignore::statsmodels.tools.sm_exceptions.SingularMatrixWarning")
+def test_delineamento_desconexo_mantem_residuo():
+    # Dois grupos de fazendas sem cultivar em comum: o modelo perde posto
+    df = dados_teste(4)
+    df["Cultivar"] = np.where(df["Fazenda"].isin(["F0", "F1", "F2"]), df["Cultivar"] + "a", df["Cultivar"])
+    tabela = anova_dois_fatores(df, "prod", "Cultivar", "Fazenda")
+    esperado = anova_statsmodels(df, "prod")
+
+    assert tabela.loc["Residual", "sum_sq"] == pytest.approx(esperado.loc["Residual", "sum_sq"], rel=1e-8)
+    assert tabela.loc["Residual", "df"] == pytest.approx(esperado.loc["Residual", "df"])
+
+
+def test_lsd_por_variavel_usa_o_residuo_do_statsmodels():
+    df = dados_teste(5)
+    resultado = lsd_por_variavel(df, ["prod", "pmg", "ausente"], "Cultivar", "Fazenda")
+
+    assert set(resultado) == {"prod", "pmg"}
+    for resposta, valor in resultado.items():
+        esperado = anova_statsmodels(df, resposta)
+        gl = esperado.loc["Residual", "df"]
+        mse = esperado.loc["Residual", "sum_sq"] / gl
+        n_rep = df[[resposta, "Cultivar", "Fazenda"]].dropna()["Fazenda"].nunique()
+        assert valor == pytest.approx(stats.t.ppf(0.975, gl) * (2 * mse / n_rep) ** 0.5, rel=1e-8)
@@ -0,0 +1,65 @@
+"""Regressão agrupada de Finlay–Wilkinson x ``np.polyfit`` por cultivar."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.estabilidade import COLUNAS_ESTABILIDADE, calcular_estabilidade, indice_ambiental
+
+
+def dados_teste(semente=0, n=500):
+    rng = np.random.default_rng(semente)
+    fazenda = rng.choice([f"F{i:02d}" for i in range(20)], n)
+    cultivar = rng.choice([f"K{i}" for i in range(10)], n)
+    ambiente = dict(zip(sorted(set(fazenda)), rng.normal(60, 8, 20)))
+    inclinacao = dict(zip(sorted(set(cultivar)), rng.normal(1, 0.3, 10)))
+    x = pd.Series(fazenda).map(ambiente)
+    df = pd.DataFrame({
+        "FazendaRef": fazenda,
+        "Cultivar": cultivar,
+        "prod_sc_ha": 60 + pd.Series(cultivar).map(inclinacao) * (x - 60) + rng.normal(0, 3, n),
+    })
+    df.loc[::19, "prod_sc_ha"] = np.nan
+
+    # Casos de borda: uma observação, duas observações e índice constante
+    bordas = pd.DataFrame({
+        "FazendaRef": ["F00", "F01", "F02", "F03", "F03"],
+        "Cultivar": ["Unica", "Dupla", "Dupla", "Constante", "Constante"],
+        "prod_sc_ha": [55.0, 58.0, 63.0, 61.0, 64.0],
+    })
+    return pd.concat([df, bordas], ignore_index=True)
+
+
+def test_estabilidade_igual_ao_polyfit():
+    df = dados_teste()
+    resultado = calcular_estabilidade(df).set_index("Cultivar")
+    assert list(resultado.reset_index().columns) == COLUNAS_ESTABILIDADE
+
+    dados = df.assign(indice=indice_ambiental(df)).dropna(subset=["prod_sc_ha", "indice"])
+    for cultivar, grupo in dados.groupby("Cultivar"):
+        if cultivar in ("Unica", "Dupla", "Constante"):
+            continue
+        x, y = grupo["indice"].to_numpy(), grupo["prod_sc_ha"].to_numpy()
+        b, a = np.polyfit(x, y, 1)
+        residuo = y - (a + b * x)
+        linha = resultado.loc[cultivar]
+
+        assert linha["Locais"] == len(y)
+        assert linha["Media"] == pytest.approx(y.mean())
+        assert linha["Inclinacao"] == pytest.approx(b, rel=1e-9)
+        assert linha["Intercepto"] == pytest.approx(a, rel=1e-9)
+        assert linha["Desvio_Regressao"] == pytest.approx(residuo @ residuo / (len(y) - 2), rel=1e-9)
+        assert linha["R2"] == pytest.approx(1 - residuo @ residuo / ((y - y.mean()) @ (y - y.mean())), rel=1e-9)
+
+
+def test_estabilidade_casos_de_borda():
+    resultado = calcular_estabilidade(dados_teste()).set_index("Cultivar")
+
+    # Uma observação ou índice constante: sem coeficientes
+    for cultivar in ("Unica", "Constante"):
+        assert np.isnan(resultado.loc[cultivar, "Inclinacao"])
+        assert np.isnan(resultado.loc[cultivar, "Desvio_Regressao"])
+
+    # Duas observações: a reta passa pelos dois pontos, sem graus de liberdade no resíduo
+    assert not np.isnan(resultado.loc["Dupla", "Inclinacao"])
+    assert np.isnan(resultado.loc["Dupla", "Desvio_Regressao"])
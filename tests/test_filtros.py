@@ -0,0 +1,126 @@
+"""Painel de filtros compartilhado x cascata original das páginas."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+
+def dados_teste():
+    rng = np.random.default_rng(0)
+    n = 600
+    df = pd.DataFrame({
+        "Estado": rng.choice(["GO", "MT", "PR"], n),
+        "Cidade": rng.choice([f"C{i}" for i in range(8)], n),
+        "Cultivar": rng.choice([f"K{i}" for i in range(6)], n),
+        "GM": rng.choice([6.0, 7.0, 8.0], n),
+    })
+    df.loc[::7, "GM"] = np.nan
+    df.loc[::11, "Cidade"] = None
+    return df
+
+
+def cascata_original(df, filtros, selecao, faixa_gm=None, gm_unico="manter"):
+    """Cascata como as páginas faziam antes (GM na posição do dicionário)."""
+    opcoes_por_coluna = {}
+    for coluna in filtros:
+        if coluna not in df.columns:
+            continue
+        if coluna == "GM":
+            if len(df["GM"].dropna().unique()) > 0:
+                gm_min, gm_max = int(df["GM"].min()), int(df["GM"].max())
+                if gm_min < gm_max:
+                    inicio, fim = faixa_gm or (gm_min, gm_max)
+                    df = df[df["GM"].between(inicio, fim)]
+                elif gm_unico == "filtrar":
+                    df = df[df["GM"] == gm_min]
+        else:
+            opcoes = sorted(df[coluna].dropna().unique())
+            opcoes_por_coluna[coluna] = opcoes
+            selecionados = [op for op in opcoes if op in selecao.get(coluna, [])]
+            if selecionados:
+                df = df[df[coluna].isin(selecionados)]
+    return df, opcoes_por_coluna
+
+
+def app_painel(filtros, selecao, gm_unico):
+    import streamlit as st
+
+    from test_filtros import dados_teste
+    from utils.filtros import ESTADO_SELECAO, painel_filtros
+
+    st.session_state.setdefault(ESTADO_SELECAO, selecao)
+    st.session_state["resultado"] = painel_filtros(dados_teste(), filtros, ("teste",), gm_unico=gm_unico)
+
+
+CASOS = [
+    # GM no meio da cascata: as opções de Cultivar dependem da faixa de GM
+    ({"Estado": "Estado", "GM": "GM", "Cultivar": "Cultivar"}, {"Estado": ["GO"], "Cultivar": ["K1", "K2"]}, None),
+    ({"Estado": "Estado", "GM": "GM", "Cultivar": "Cultivar"}, {"Cultivar": ["K3"]}, (7, 8)),
+    # Faixa inteira: linhas sem GM também saem
+    ({"Cidade": "Cidade", "Cultivar": "Cultivar", "GM": "GM"}, {}, None),
+    ({"Cidade": "Cidade", "Cultivar": "Cultivar", "GM": "GM"}, {"Cidade": ["C1", "C4"]}, (6, 7)),
+]
+
+
+@pytest.mark.parametrize("filtros, selecao, faixa_gm", CASOS)
+def test_painel_igual_a_cascata_original(filtros, selecao, faixa_gm):
+    selecao_app = {**selecao, "GM": faixa_gm}
+    at = AppTest.from_function(app_painel, args=(filtros, selecao_app, "manter")).run()
+    assert not at.exception
+
+    esperado, opcoes = cascata_original(dados_teste(), filtros, selecao, faixa_gm)
+    pd.testing.assert_frame_equal(at.session_state["resultado"], esperado)
+    assert at.session_state["resultado"]["GM"].notna().all()
+
+    for coluna, valores in opcoes.items():
+        exibidas = sorted(c.label for c in at.checkbox if c.key.startswith(f"filtro_{coluna}_"))
+        assert exibidas == sorted(str(v) for v in valores)
+
+
+@pytest.mark.parametrize("gm_unico", ["manter", "filtrar"])
+def test_gm_unico(gm_unico):
+    filtros = {"Estado": "Estado", "Cultivar": "Cultivar", "GM": "GM"}
+    selecao = {"Cultivar": ["K0"]}
+    # Só GO + K0 com GM 7 ou sem GM
+    app = f"""
+import streamlit as st
+from test_filtros import dados_teste
+from utils.filtros import ESTADO_SELECAO, painel_filtros
+df = dados_teste()
+df = df[df["GM"].isna() | (df["GM"] == 7.0)]
+st.session_state.setdefault(ESTADO_SELECAO, {selecao!r})
+st.session_state["resultado"] = painel_filtros(df, {filtros!r}, ("teste-unico",), gm_unico={gm_unico!r})
+"""
+    at = AppTest.from_string(app).run()
+    assert not at.exception
+
+    df = dados_teste()
+    df = df[df["GM"].isna() | (df["GM"] == 7.0)]
+    esperado, _ = cascata_original(df, filtros, selecao, gm_unico=gm_unico)
+    pd.testing.assert_frame_equal(at.session_state["resultado"], esperado)
+    assert at.info
+
+
+def test_registro_sem_versao_usa_o_conteudo():
+    # Dois DataFrames do mesmo tamanho sob a mesma versão ``None``: não podem dividir índice
+    filtros = {"Estado": "Estado", "Cultivar": "Cultivar"}
+    selecao = {"Estado": ["GO"]}
+    for semente in (1, 2):
+        app = f"""
+import numpy as np
+import streamlit as st
+from test_filtros import dados_teste
+from utils.filtros import ESTADO_SELECAO, painel_filtros
+df = dados_teste()
+df["Estado"] = np.random.default_rng({semente}).permutation(df["Estado"].to_numpy())
+st.session_state.setdefault(ESTADO_SELECAO, {selecao!r})
+st.session_state["resultado"] = painel_filtros(df, {filtros!r}, (None, "sem-versao"))
+"""
+        at = AppTest.from_string(app).run()
+        assert not at.exception
+
+        df = dados_teste()
+        df["Estado"] = np.random.default_rng(semente).permutation(df["Estado"].to_numpy())
+        esperado, _ = cascata_original(df, filtros, selecao)
+        pd.testing.assert_frame_equal(at.session_state["resultado"], esperado)
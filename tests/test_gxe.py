@@ -0,0 +1,51 @@
+"""Imputação EM-AMMI da matriz cultivar x local."""
+
+import numpy as np
+import pytest
+
+from utils.gxe import imputar_matriz
+
+
+def matriz_posto_baixo(semente=0, componentes=2):
+    """Efeitos aditivos + interação de posto ``componentes`` e ~15% das células mascaradas."""
+    rng = np.random.default_rng(semente)
+    interacao = rng.normal(0, 3, (12, componentes)) @ rng.normal(0, 1, (componentes, 10))
+    interacao -= interacao.mean(axis=0, keepdims=True)
+    interacao -= interacao.mean(axis=1, keepdims=True)
+    completa = rng.normal(60, 5, (12, 1)) + rng.normal(0, 8, (1, 10)) + interacao
+
+    faltando = rng.random(completa.shape) < 0.15
+    mascarada = completa.copy()
+    mascarada[faltando] = np.nan
+    return completa, mascarada, faltando
+
+
+@pytest.mark.parametrize("semente", [0, 1])
+def test_imputacao_recupera_matriz_de_posto_baixo(semente):
+    completa, mascarada, faltando = matriz_posto_baixo(semente)
+    assert faltando.any()
+
+    imputada, iteracoes, convergiu = imputar_matriz(mascarada, componentes=2, max_iter=2000, tolerancia=1e-8)
+
+    assert convergiu and 0 < iteracoes < 2000
+    np.testing.assert_array_equal(imputada[~faltando], completa[~faltando])
+    np.testing.assert_allclose(imputada[faltando], completa[faltando], atol=1e-3)
+    # A entrada não é alterada
+    assert np.isnan(mascarada[faltando]).all()
+
+
+def test_imputacao_sem_convergir_avisa():
+    _, mascarada, faltando = matriz_posto_baixo()
+    imputada, iteracoes, convergiu = imputar_matriz(mascarada, componentes=2, max_iter=3, tolerancia=1e-8)
+
+    assert not convergiu
+    assert iteracoes == 3
+    assert np.isfinite(imputada[faltando]).all()
+
+
+def test_matriz_completa_nao_itera():
+    completa, _, _ = matriz_posto_baixo()
+    imputada, iteracoes, convergiu = imputar_matriz(completa)
+
+    assert (iteracoes, convergiu) == (0, True)
+    np.testing.assert_array_equal(imputada, completa)
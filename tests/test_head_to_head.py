@@ -0,0 +1,175 @@
+"""Motor vetorizado do Head to Head x cálculos de referência."""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+# Importa o módulo: ``testes_pareados`` importado pelo nome seria coletado pelo pytest
+from utils import head_to_head
+from utils.head_to_head import (
+    COLUNAS_RESULTADO, LIMITE_EMPATE, LIMITE_WILCOXON_EXATO, CacheHeadToHead, CuboHeadToHead,
+    calcular_head_to_head, indices_pares,
+)
+
+
+def dados_teste(semente=0, n=400):
+    rng = np.random.default_rng(semente)
+    df = pd.DataFrame({
+        "Local": rng.choice([f"L{i:02d}" for i in range(15)], n),
+        "Cultivar": rng.choice([f"K{i}" for i in range(8)], n),
+        "prod_sc_ha": np.round(rng.normal(60, 6, n), 1),
+        "Pop_Final": rng.normal(250000, 20000, n),
+        "Umidade (%)": rng.normal(14, 1, n),
+    })
+    # Duplicados no mesmo local, produtividade nula e valores ausentes
+    df.loc[::13, "prod_sc_ha"] = 0
+    df.loc[::17, "Umidade (%)"] = np.nan
+    return df
+
+
+def head_to_head_laco(df):
+    """Laço por local e por par, como as páginas faziam antes do motor vetorizado."""
+    df_h2h = df[["Local", "Cultivar", "prod_sc_ha", "Pop_Final", "Umidade (%)"]].dropna()
+    df_h2h = df_h2h[df_h2h["prod_sc_ha"] > 0]
+
+    resultados = []
+    for local, grupo in df_h2h.groupby("Local"):
+        cultivares = grupo["Cultivar"].unique()
+        for head in cultivares:
+            head_row = grupo[grupo["Cultivar"] == head]
+            prod_head = head_row["prod_sc_ha"].values[0]
+            for check in cultivares:
+                if head == check:
+                    continue
+                check_row = grupo[grupo["Cultivar"] == check]
+                prod_check = check_row["prod_sc_ha"].values[0]
+                diff = prod_head - prod_check
+                win = int(diff > 1)
+                resultados.append({
+                    "Head": head,
+                    "Check": check,
+                    "Head_Mean": round(prod_head, 1),
+                    "Check_Mean": round(prod_check, 1),
+                    "Pop_Final_Head": round(head_row["Pop_Final"].values[0], 0),
+                    "Umidade_Head": round(head_row["Umidade (%)"].values[0], 1),
+                    "Pop_Final_Check": round(check_row["Pop_Final"].values[0], 0),
+                    "Umidade_Check": round(check_row["Umidade (%)"].values[0], 1),
+                    "Difference": round(diff, 1),
+                    "Number_of_Win": win,
+                    "Is_Draw": int(-1 <= diff <= 1),
+                    "Percentage_of_Win": 100.0 if win else 0.0,
+                    "Number_of_Comparison": 1,
+                    "Local": local,
+                })
+    return pd.DataFrame(resultados, columns=COLUNAS_RESULTADO)
+
+
+def calcular(df):
+    return calcular_head_to_head(df, "prod_sc_ha", "Pop_Final", "Umidade (%)")
+
+
+def test_indices_pares_igual_ao_laco():
+    grupos = np.array([0, 0, 0, 1, 2, 2, 3, 3, 3, 3])
+    esperado = [
+        (h, c)
+        for g in np.unique(grupos)
+        for h in np.flatnonzero(grupos == g)
+        for c in np.flatnonzero(grupos == g)
+        if h != c
+    ]
+    head, check = indices_pares(grupos)
+    assert list(zip(head, check)) == esperado
+
+    vazio = indices_pares(np.array([], dtype=np.int64))
+    assert len(vazio[0]) == len(vazio[1]) == 0
+
+
+@pytest.mark.parametrize("semente", [0, 1, 2])
+def test_head_to_head_igual_ao_laco(semente):
+    df = dados_teste(semente)
+    pd.testing.assert_frame_equal(calcular(df), head_to_head_laco(df), check_dtype=False)
+
+
+def test_cubo_fatias_iguais_ao_filtro():
+    resultado = head_to_head_laco(dados_teste())
+    cubo = CuboHeadToHead(calcular(dados_teste()))
+
+    for head in cubo.cultivares:
+        for check in cubo.cultivares:
+            filtrado = resultado[(resultado["Head"] == head) & (resultado["Check"] == check)]
+            fatia = cubo.confrontos(head, check)
+            pd.testing.assert_frame_equal(
+                fatia.reset_index(drop=True), filtrado.reset_index(drop=True), check_dtype=False
+            )
+
+            resumo = cubo.resumo_par(head, check)
+            diferenca = filtrado["Difference"]
+            assert resumo["num_locais"] == filtrado["Local"].nunique()
+            assert resumo["vitorias"] == (diferenca > LIMITE_EMPATE).sum()
+            assert resumo["derrotas"] == (diferenca < -LIMITE_EMPATE).sum()
+            assert resumo["empates"] == diferenca.between(-LIMITE_EMPATE, LIMITE_EMPATE).sum()
+            if len(filtrado):
+                assert resumo["max_diff"] == diferenca.max()
+                assert resumo["min_diff"] == diferenca.min()
+
+        checks = [c for c in cubo.cultivares if c != head]
+        resumo, media_head = cubo.resumo_checks(head, checks)
+        filtrado = resultado[(resultado["Head"] == head) & resultado["Check"].isin(checks)]
+        esperado = filtrado.groupby("Check", as_index=False).agg(
+            Number_of_Win=("Number_of_Win", "sum"),
+            Number_of_Comparison=("Number_of_Comparison", "sum"),
+            Check_Mean=("Check_Mean", "mean"),
+        )
+        pd.testing.assert_frame_equal(
+            resumo[esperado.columns.tolist()], esperado, check_dtype=False
+        )
+        assert media_head == pytest.approx(filtrado["Head_Mean"].mean())
+
+
+def test_cache_incremental_igual_ao_laco():
+    df = dados_teste(3)
+    cache = CacheHeadToHead()
+    rng = np.random.default_rng(3)
+    locais = sorted(df["Local"].unique())
+
+    # Sequência de filtros: tudo, subconjunto de locais, valor alterado, de volta a tudo
+    alterado = df.copy()
+    alterado.loc[alterado["Local"] == locais[0], "prod_sc_ha"] += 5
+    for parcial in [
+        df,
+        df[df["Local"].isin(rng.choice(locais, 6, replace=False))],
+        df[df["Cultivar"] != "K0"],
+        alterado,
+        df,
+        df.iloc[0:0],
+    ]:
+        obtido = cache.calcular(parcial, "prod_sc_ha", "Pop_Final", "Umidade (%)")
+        pd.testing.assert_frame_equal(
+            obtido.reset_index(drop=True), head_to_head_laco(parcial), check_dtype=False
+        )
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5, 7, 12, 30, LIMITE_WILCOXON_EXATO, LIMITE_WILCOXON_EXATO + 1, 80])
+def test_wilcoxon_igual_ao_scipy(n):
+    rng = np.random.default_rng(n)
+    # Dois grupos do mesmo tamanho, para misturar m na mesma chamada
+    diferencas = np.r_[rng.normal(0.5, 2, n), rng.normal(-1, 2, n)]
+    grupos = np.repeat([0, 1], n)
+    resultado = head_to_head.testes_pareados(grupos, diferencas, 2)
+
+    metodo = "exact" if n <= LIMITE_WILCOXON_EXATO else "approx"
+    for grupo in (0, 1):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            esperado = stats.wilcoxon(diferencas[grupos == grupo], method=metodo).pvalue
+        assert resultado["p_wilcoxon"][grupo] == pytest.approx(esperado, rel=1e-9)
+
+
+def test_wilcoxon_com_empates_usa_aproximacao():
+    diferencas = np.array([1.0, 1.0, -2.0, 3.0, 3.0, 4.0, 0.0])
+    resultado = head_to_head.testes_pareados(np.zeros(len(diferencas), dtype=np.int64), diferencas, 1)
+    esperado = stats.wilcoxon(diferencas, method="approx").pvalue
+    assert resultado["p_wilcoxon"][0] == pytest.approx(esperado, rel=1e-9)
@@ -0,0 +1,158 @@
+"""Modelo misto com absorção da fazenda x equações de Henderson densas."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+from statsmodels.formula.api import ols
+from statsmodels.stats.anova import anova_lm
+
+from utils.anova import anova_dois_fatores
+from utils.modelo_misto import (
+    COLUNAS_BLUP, PISO_VARIANCIA, blup_cultivares, componentes_variancia, resolver_henderson,
+)
+
+
+def dados_teste(semente=0, n=250):
+    rng = np.random.default_rng(semente)
+    cultivar = rng.choice([f"K{i}" for i in range(7)], n)
+    fazenda = rng.choice([f"F{i:02d}" for i in range(10)], n)
+    efeito_c = dict(zip(sorted(set(cultivar)), rng.normal(0, 3, 7)))
+    efeito_f = dict(zip(sorted(set(fazenda)), rng.normal(0, 5, 10)))
+    return pd.DataFrame({
+        "Cultivar": cultivar,
+        "FazendaRef": fazenda,
+        "prod_sc_ha": 60 + pd.Series(cultivar).map(efeito_c) + pd.Series(fazenda).map(efeito_f) + rng.normal(0, 2, n),
+    })
+
+
+def dados_balanceados(sem_efeito, semente=0):
+    """Um plot por cultivar x fazenda, sem nenhuma variação entre níveis de ``sem_efeito``."""
+    rng = np.random.default_rng(semente)
+    ruido = rng.normal(0, 2, (6, 8))
+    if sem_efeito == "Cultivar":
+        ruido -= ruido.mean(axis=1, keepdims=True)
+        y = ruido + rng.normal(0, 5, 8)
+    else:
+        ruido -= ruido.mean(axis=0, keepdims=True)
+        y = ruido + rng.normal(0, 3, (6, 1))
+    cultivar, fazenda = np.meshgrid(np.arange(6), np.arange(8), indexing="ij")
+    return pd.DataFrame({
+        "Cultivar": [f"K{i}" for i in cultivar.ravel()],
+        "FazendaRef": [f"F{j}" for j in fazenda.ravel()],
+        "prod_sc_ha": 60 + y.ravel(),
+    })
+
+
+def incidencia(codigos, n_niveis):
+    return np.eye(n_niveis)[codigos]
+
+
+def henderson_denso(W, penalidade_w, Z, lambda_z, y):
+    """Equações de Henderson completas, sem absorção."""
+    M = np.hstack([W, Z])
+    C = M.T @ M + np.diag(np.r_[penalidade_w, np.full(Z.shape[1], lambda_z)])
+    inversa = np.linalg.inv(C)
+    p = W.shape[1]
+    return (inversa @ (M.T @ y))[:p], np.diag(inversa)[:p]
+
+
+def referencia(dados, sigma_e, sigma_t, sigma_b):
+    y = dados["prod_sc_ha"].to_numpy(dtype=float)
+    codigos_t, cultivares = pd.factorize(dados["Cultivar"])
+    codigos_b, fazendas = pd.factorize(dados["FazendaRef"])
+    X = incidencia(codigos_t, len(cultivares))
+    Z = incidencia(codigos_b, len(fazendas))
+
+    blue, diagonal_blue = henderson_denso(X, np.zeros(X.shape[1]), Z, sigma_e / sigma_b, y)
+    W = np.hstack([np.ones((len(y), 1)), X])
+    solucao, diagonal_blup = henderson_denso(W, np.r_[0.0, np.full(X.shape[1], sigma_e / sigma_t)], Z, sigma_e / sigma_b, y)
+    return pd.DataFrame({
+        "Cultivar": cultivares,
+        "BLUE": blue,
+        "EP_BLUE": np.sqrt(diagonal_blue * sigma_e),
+        "BLUP": solucao[0] + solucao[1:],
+        "PEV": diagonal_blup[1:] * sigma_e,
+    })
+
+
+def test_componentes_henderson_iii():
+    dados = dados_teste()
+    codigos_t, cultivares = pd.factorize(dados["Cultivar"])
+    codigos_b, fazendas = pd.factorize(dados["FazendaRef"])
+    X = incidencia(codigos_t, len(cultivares))
+    Z = incidencia(codigos_b, len(fazendas))
+
+    # E[SS(bloco | tratamento)] = gl σ²_e + tr(Z' M_X Z) σ²_b, e o simétrico para tratamento
+    def coeficiente(A, B):
+        projecao = B @ np.linalg.pinv(B)
+        return np.trace(A.T @ (np.eye(len(A)) - projecao) @ A)
+
+    anova = anova_lm(ols("prod_sc_ha ~ C(Cultivar) + C(FazendaRef)", data=dados).fit(), typ=2)
+    sigma_e = anova.loc["Residual", "sum_sq"] / anova.loc["Residual", "df"]
+    esperado_t = (anova.iloc[0]["sum_sq"] - anova.iloc[0]["df"] * sigma_e) / coeficiente(X, Z)
+    esperado_b = (anova.iloc[1]["sum_sq"] - anova.iloc[1]["df"] * sigma_e) / coeficiente(Z, X)
+
+    tabela = anova_dois_fatores(dados, "prod_sc_ha", "Cultivar", "FazendaRef")
+    obtido = componentes_variancia(tabela, codigos_t, codigos_b, len(cultivares), len(fazendas))
+    assert obtido == pytest.approx((sigma_e, esperado_t, esperado_b), rel=1e-8)
+
+
+def test_blue_blup_iguais_ao_sistema_denso():
+    dados = dados_teste(1)
+    tabela, variancias = blup_cultivares(dados)
+    assert list(tabela.columns) == COLUNAS_BLUP
+    assert variancias["ajustadas"] == []
+
+    esperado = referencia(dados, variancias["residual"], variancias["cultivar"], variancias["fazenda"])
+    np.testing.assert_allclose(tabela["BLUE"], esperado["BLUE"], rtol=1e-9)
+    np.testing.assert_allclose(tabela["EP_BLUE"], esperado["EP_BLUE"], rtol=1e-9)
+    np.testing.assert_allclose(tabela["BLUP"], esperado["BLUP"], rtol=1e-9)
+    np.testing.assert_allclose(
+        tabela["Confiabilidade"], np.clip(1 - esperado["PEV"] / variancias["cultivar"], 0, 1), rtol=1e-9, atol=1e-12
+    )
+    assert tabela.loc[tabela["BLUP"].idxmax(), "Rank_BLUP"] == 1
+
+
+@pytest.mark.parametrize("sem_efeito, componente", [("Cultivar", "cultivar"), ("FazendaRef", "fazenda")])
+def test_variancia_nula_vai_para_o_piso(sem_efeito, componente):
+    dados = dados_balanceados(sem_efeito)
+    tabela, variancias = blup_cultivares(dados)
+
+    piso = PISO_VARIANCIA * np.var(dados["prod_sc_ha"])
+    assert variancias["ajustadas"] == [componente]
+    assert variancias[componente] == pytest.approx(piso)
+    assert np.isfinite(tabela[["BLUE", "EP_BLUE", "BLUP", "Confiabilidade"]].to_numpy()).all()
+
+    esperado = referencia(dados, variancias["residual"], variancias["cultivar"], variancias["fazenda"])
+    np.testing.assert_allclose(tabela["BLUE"], esperado["BLUE"], rtol=1e-7)
+    np.testing.assert_allclose(tabela["BLUP"], esperado["BLUP"], rtol=1e-7)
+    if componente == "cultivar":
+        # Sem variância genética: BLUP encolhido para a média e confiabilidade zero
+        np.testing.assert_allclose(tabela["BLUP"], dados["prod_sc_ha"].mean(), rtol=1e-6)
+        assert (tabela["Confiabilidade"] == 0).all()
+
+
+def test_sistema_singular_usa_minimos_quadrados(monkeypatch):
+    # Um nível de cultivar sem nenhum plot e sem penalidade: linha nula na matriz reduzida
+    dados = dados_teste(2)
+    y = dados["prod_sc_ha"].to_numpy(dtype=float)
+    codigos_t, cultivares = pd.factorize(dados["Cultivar"])
+    codigos_b, fazendas = pd.factorize(dados["FazendaRef"])
+    X = incidencia(codigos_t, len(cultivares))
+    Z = incidencia(codigos_b, len(fazendas))
+    W = np.hstack([X, np.zeros((len(y), 1))])
+
+    chamadas = []
+    lstsq = np.linalg.lstsq
+    monkeypatch.setattr(np.linalg, "lstsq", lambda *args, **kwargs: chamadas.append(1) or lstsq(*args, **kwargs))
+    solucao, diagonal = resolver_henderson(
+        sparse.csc_matrix(W), np.zeros(W.shape[1]), sparse.csc_matrix(Z), 2.0, y
+    )
+    assert chamadas
+
+    # Mínima norma: o nível vazio fica em zero e os demais batem com o sistema denso
+    esperado, diagonal_esperada = henderson_denso(X, np.zeros(X.shape[1]), Z, 2.0, y)
+    np.testing.assert_allclose(solucao[:-1], esperado, rtol=1e-9)
+    np.testing.assert_allclose(diagonal[:-1], diagonal_esperada, rtol=1e-9)
+    assert solucao[-1] == pytest.approx(0.0, abs=1e-9)
@@ -0,0 +1,102 @@
+"""ANOVA de dois fatores (modelo aditivo) e LSD sem matrizes de dummies.
+
+Para ``y ~ C(tratamento) + C(bloco)`` (ex.: cultivar + fazenda), o efeito de
+bloco é absorvido: com a matriz de incidência esparsa ``N`` (tratamento x
+bloco) monta-se o sistema reduzido dos tratamentos,
+
+    C = diag(n_i.) - N diag(1 / n_.j) N'      q = y_i. - N diag(1 / n_.j) y_.j
+
+que tem só ``tratamentos x tratamentos`` posições. As somas de quadrados saem
+das somas e contagens por grupo, valem para dados desbalanceados e batem com
+o ``anova_lm(..., typ=2)`` do statsmodels (em delineamentos desconexos, em que
+o modelo perde posto, só o resíduo coincide; é o que o LSD usa).
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse, stats
+
+COLUNAS_ANOVA = ["sum_sq", "df", "F", "PR(>F)"]
+
+
+def anova_dois_fatores(df, resposta, tratamento, bloco):
+    """Tabela ANOVA (tipo II) de ``resposta ~ C(tratamento) + C(bloco)``.
+
+    Linhas com valores ausentes em qualquer das três colunas são descartadas.
+    Retorna um DataFrame no formato do ``anova_lm`` (índices
+    ``C(tratamento)``, ``C(bloco)`` e ``Residual``; colunas ``COLUNAS_ANOVA``).
+    """
+    dados = df[[resposta, tratamento, bloco]].dropna()
+    y = dados[resposta].to_numpy(dtype=float)
+    codigos_t, niveis_t = pd.factorize(dados[tratamento])
+    codigos_b, niveis_b = pd.factorize(dados[bloco])
+    n_t, n_b = len(niveis_t), len(niveis_b)
+
+    # Matriz de incidência esparsa tratamento x bloco (contagens)
+    incidencia = sparse.coo_matrix(
+        (np.ones(len(y)), (codigos_t, codigos_b)), shape=(n_t, n_b)
+    ).tocsr()
+    n_t_total = np.bincount(codigos_t, minlength=n_t).astype(float)
+    n_b_total = np.bincount(codigos_b, minlength=n_b).astype(float)
+    soma_t = np.bincount(codigos_t, weights=y, minlength=n_t)
+    soma_b = np.bincount(codigos_b, weights=y, minlength=n_b)
+
+    # Sistema reduzido dos tratamentos (efeito de bloco absorvido)
+    ponderada = incidencia.multiply(1 / n_b_total).tocsr()
+    reduzida = np.diag(n_t_total) - (ponderada @ incidencia.T).toarray()
+    ajustado = soma_t - ponderada @ soma_b
+    efeitos, _, posto_t, _ = np.linalg.lstsq(reduzida, ajustado, rcond=None)
+
+    ss_total = float(y @ y)
+    ss_blocos = float(soma_b @ (soma_b / n_b_total))
+    ss_tratamentos = float(soma_t @ (soma_t / n_t_total))
+    ss_modelo = ss_blocos + float(efeitos @ ajustado)
+    posto_modelo = n_b + posto_t
+
+    sum_sq = np.array([
+        ss_modelo - ss_blocos,          # tratamento ajustado para bloco
+        ss_modelo - ss_tratamentos,     # bloco ajustado para tratamento
+        max(ss_total - ss_modelo, 0.0),
+    ])
+    graus = np.array([posto_t, posto_modelo - n_t, len(y) - posto_modelo], dtype=float)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        quadrado_medio = sum_sq / graus
+        f = quadrado_medio / quadrado_medio[2]
+        p = stats.f.sf(f, graus, graus[2])
+    f[2] = p[2] = np.nan
+
+    return pd.DataFrame(
+        {"sum_sq": sum_sq, "df": graus, "F": f, "PR(>F)": p},
+        index=[f"C({tratamento})", f"C({bloco})", "Residual"],
+        columns=COLUNAS_ANOVA,
+    )
+
+
+def lsd(tabela_anova, n_rep, alfa=0.05):
+    """Diferença mínima significativa (t de Fisher) a partir da tabela ANOVA."""
+    gl_residuo = tabela_anova.loc["Residual", "df"]
+    mse = tabela_anova.loc["Residual", "sum_sq"] / gl_residuo
+    t_val = stats.t.ppf(1 - alfa / 2, gl_residuo)
+    return t_val * (2 * mse / n_rep) ** 0.5
+
+
+def lsd_por_variavel(df, respostas, tratamento, bloco, alfa=0.05):
+    """LSD de cada coluna de ``respostas`` com ``tratamento`` + ``bloco``.
+
+    Cada variável usa só as próprias linhas válidas (e o número de blocos
+    dessas linhas como repetições). Variáveis ausentes, com menos de dois
+    blocos ou sem graus de liberdade no resíduo ficam de fora do dict.
+    """
+    resultado = {}
+    for resposta in respostas:
+        if resposta not in df.columns:
+            continue
+        dados = df[[resposta, tratamento, bloco]].dropna()
+        n_rep = dados[bloco].nunique()
+        if dados.empty or n_rep < 2:
+            continue
+        tabela = anova_dois_fatores(dados, resposta, tratamento, bloco)
+        if tabela.loc["Residual", "df"] > 0:
+            resultado[resposta] = lsd(tabela, n_rep, alfa)
+    return resultado
@@ -0,0 +1,52 @@
+"""Índice de busca sobre os valores distintos de uma coluna (produtores, fazendas...).
+
+Os nomes são normalizados uma vez (minúsculas, sem acentos, espaços
+simples) e guardados numa lista ordenada de chaves: o nome inteiro e cada
+palavra dele. A busca tenta, nesta ordem:
+
+1. prefixo do nome ou de qualquer palavra (``bisect`` na lista ordenada);
+2. trecho em qualquer posição do nome;
+3. aproximada (``difflib``), para erros de digitação.
+"""
+
+import difflib
+import unicodedata
+from bisect import bisect_left
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sem acentos e com espaços simples."""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.lower().split())
+
+
+class IndiceBusca:
+    """Busca por prefixo, trecho ou aproximação em ``valores``; devolve posições."""
+
+    def __init__(self, valores):
+        self.nomes = [normalizar_texto(valor) for valor in valores]
+        chaves = []
+        for posicao, nome in enumerate(self.nomes):
+            palavras = nome.split()
+            chaves.append((nome, posicao))
+            chaves.extend((palavra, posicao) for palavra in palavras[1:])
+        chaves.sort()
+        self.chaves = [chave for chave, _ in chaves]
+        self.posicoes = [posicao for _, posicao in chaves]
+
+    def buscar(self, termo, corte_aproximado=0.75):
+        """Conjunto das posições dos valores que casam com ``termo`` (vazio = todos)."""
+        termo = normalizar_texto(termo)
+        if not termo:
+            return set(range(len(self.nomes)))
+
+        inicio = bisect_left(self.chaves, termo)
+        fim = bisect_left(self.chaves, termo + "\uffff")
+        achados = set(self.posicoes[inicio:fim])
+        if not achados:
+            achados = {posicao for posicao, nome in enumerate(self.nomes) if termo in nome}
+        if not achados:
+            parecidos = set(difflib.get_close_matches(termo, self.chaves, n=20, cutoff=corte_aproximado))
+            achados = {posicao for chave, posicao in zip(self.chaves, self.posicoes) if chave in parecidos}
+        return achados
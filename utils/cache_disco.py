@@ -0,0 +1,111 @@
+"""Cache persistente em disco (Parquet) das tabelas do Supabase.
+
+Cada gravação cria uma versão nova em ``DIRETORIO_CACHE/<versao>/`` com as
+tabelas brutas, os DataFrames mesclados e um ``manifesto.json``. O arquivo
+``ATUAL`` aponta para a versão mais recente e só as ``MANTER_VERSOES`` últimas
+são mantidas. Um snapshot mais velho que o TTL é considerado vencido.
+"""
+
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+DIRETORIO_CACHE = Path(os.environ.get("JAUM_CACHE_DIR", ".cache_supabase"))
+
+# Tempo de validade do snapshot em disco (segundos)
+TTL_PADRAO = 12 * 60 * 60
+
+# Quantidade de versões antigas mantidas em disco
+MANTER_VERSOES = 3
+
+
+def _salvar_frame(df, pasta, nome):
+    """Grava em Parquet; colunas com tipos misturados caem para pickle."""
+    try:
+        df.to_parquet(pasta / f"{nome}.parquet", index=False)
+        return "parquet"
+    except Exception:
+        (pasta / f"{nome}.parquet").unlink(missing_ok=True)
+        df.to_pickle(pasta / f"{nome}.pkl")
+        return "pickle"
+
+
+def _ler_frame(pasta, nome, formato):
+    if formato == "pickle":
+        return pd.read_pickle(pasta / f"{nome}.pkl")
+    return pd.read_parquet(pasta / f"{nome}.parquet", memory_map=True)
+
+
+def salvar_snapshot(dataframes, merged=None, criado_em=None, diretorio=DIRETORIO_CACHE, manter=MANTER_VERSOES):
+    """Grava uma nova versão do snapshot e a marca como atual. Retorna o nome da versão.
+
+    ``criado_em`` é o instante (epoch) em que os dados foram baixados do
+    Supabase; por padrão, o momento da gravação. O TTL é contado a partir dele.
+    """
+    versao = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    pasta = Path(diretorio) / versao
+    criado_em = time.time() if criado_em is None else criado_em
+    manifesto = {"versao": versao, "criado_em": criado_em, "tabelas": {}, "merged": {}}
+
+    for grupo, frames in (("tabelas", dataframes), ("merged", merged or {})):
+        (pasta / grupo).mkdir(parents=True, exist_ok=True)
+        for nome, df in frames.items():
+            # DataFrames ausentes (merge sem dados) são registrados como None
+            manifesto[grupo][nome] = None if df is None else _salvar_frame(df, pasta / grupo, nome)
+
+    (pasta / "manifesto.json").write_text(json.dumps(manifesto), encoding="utf-8")
+
+    # ✍️ Troca atômica do ponteiro para a versão atual
+    ponteiro_tmp = Path(diretorio) / f"ATUAL.{versao}.tmp"
+    ponteiro_tmp.write_text(versao, encoding="utf-8")
+    os.replace(ponteiro_tmp, Path(diretorio) / "ATUAL")
+
+    _remover_versoes_antigas(Path(diretorio), manter)
+    return versao
+
+
+def _remover_versoes_antigas(diretorio, manter):
+    versoes = sorted(p for p in diretorio.iterdir() if p.is_dir())
+    for pasta in versoes[:-manter]:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+def info_snapshot(diretorio=DIRETORIO_CACHE):
+    """Retorna o manifesto da versão atual (com a idade em segundos) ou ``None``."""
+    try:
+        versao = (Path(diretorio) / "ATUAL").read_text(encoding="utf-8").strip()
+        manifesto = json.loads((Path(diretorio) / versao / "manifesto.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    manifesto["idade"] = time.time() - manifesto["criado_em"]
+    return manifesto
+
+
+def carregar_snapshot(ttl=TTL_PADRAO, diretorio=DIRETORIO_CACHE):
+    """Lê o snapshot atual do disco.
+
+    Retorna ``(dataframes, merged, manifesto)`` ou ``None`` se não houver
+    snapshot, se ele estiver vencido (mais velho que ``ttl``) ou corrompido.
+    """
+    manifesto = info_snapshot(diretorio)
+    if manifesto is None or (ttl is not None and manifesto["idade"] > ttl):
+        return None
+
+    pasta = Path(diretorio) / manifesto["versao"]
+    try:
+        dataframes = {
+            nome: _ler_frame(pasta / "tabelas", nome, formato)
+            for nome, formato in manifesto["tabelas"].items()
+        }
+        merged = {
+            nome: None if formato is None else _ler_frame(pasta / "merged", nome, formato)
+            for nome, formato in manifesto["merged"].items()
+        }
+    except Exception:
+        return None
+    return dataframes, merged, manifesto
@@ -0,0 +1,108 @@
+"""Espaços de cache nomeados, com limpeza por fonte de dados.
+
+``st.cache_data.clear()`` apaga o cache de todas as funções do processo (e de
+todas as sessões). Aqui cada fonte de dados tem o seu espaço: as funções
+memorizadas com ``espaco_cache(nome).memorizar`` usam o TTL e o limite de
+entradas do espaço, e ``limpar_espaco(nome)`` limpa só elas.
+
+Cada espaço conta as chamadas e os cálculos (execuções de fato, ou seja, as
+faltas no cache); ``estatisticas_cache()`` junta os números de todos.
+"""
+
+import functools
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+_lock = threading.Lock()
+_espacos = {}
+
+
+class EspacoCache:
+    """Grupo de funções memorizadas que são limpas juntas."""
+
+    def __init__(self, nome, ttl=None, max_entradas=None):
+        self.nome = nome
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.funcoes = {}
+        self.chamadas = 0
+        self.calculos = 0
+        self.limpezas = 0
+        self.ultima_limpeza = None
+
+    def memorizar(self, funcao=None, *, recurso=False, show_spinner=False):
+        """Decorador: ``st.cache_data`` (ou ``st.cache_resource``) com os limites do espaço.
+
+        A função decorada mantém o ``.clear()`` do Streamlit para limpar só ela.
+        """
+        if funcao is None:
+            return functools.partial(self.memorizar, recurso=recurso, show_spinner=show_spinner)
+
+        @functools.wraps(funcao)
+        def calcular(*args, **kwargs):
+            # Só roda quando a chamada não está no cache
+            with _lock:
+                self.calculos += 1
+            return funcao(*args, **kwargs)
+
+        decorador = st.cache_resource if recurso else st.cache_data
+        memorizada = decorador(ttl=self.ttl, max_entries=self.max_entradas, show_spinner=show_spinner)(calcular)
+
+        @functools.wraps(funcao)
+        def chamar(*args, **kwargs):
+            with _lock:
+                self.chamadas += 1
+            return memorizada(*args, **kwargs)
+
+        chamar.clear = memorizada.clear
+        # As páginas são reexecutadas a cada rerun: a mesma função substitui o registro anterior
+        self.funcoes[f"{funcao.__module__}.{funcao.__qualname__}"] = memorizada
+        return chamar
+
+    def limpar(self):
+        """Limpa o cache de todas as funções do espaço (em todas as sessões)."""
+        for memorizada in list(self.funcoes.values()):
+            memorizada.clear()
+        with _lock:
+            self.limpezas += 1
+            self.ultima_limpeza = time.time()
+
+    def estatisticas(self):
+        acertos = self.chamadas - self.calculos
+        return {
+            "Espaço": self.nome,
+            "Funções": len(self.funcoes),
+            "TTL (s)": self.ttl,
+            "Máx. Entradas": self.max_entradas,
+            "Chamadas": self.chamadas,
+            "Cálculos": self.calculos,
+            "Acertos (%)": round(100 * acertos / self.chamadas, 1) if self.chamadas else None,
+            "Limpezas": self.limpezas,
+        }
+
+
+def espaco_cache(nome, ttl=None, max_entradas=None):
+    """Retorna o espaço ``nome``, criando-o com ``ttl``/``max_entradas`` na primeira vez."""
+    with _lock:
+        espaco = _espacos.get(nome)
+        if espaco is None:
+            espaco = _espacos[nome] = EspacoCache(nome, ttl, max_entradas)
+        return espaco
+
+
+def limpar_espaco(nome):
+    """Limpa só as funções do espaço ``nome`` (sem efeito se ele não existir)."""
+    with _lock:
+        espaco = _espacos.get(nome)
+    if espaco is not None:
+        espaco.limpar()
+
+
+def estatisticas_cache():
+    """DataFrame com as estatísticas de todos os espaços."""
+    with _lock:
+        espacos = list(_espacos.values())
+    return pd.DataFrame([espaco.estatisticas() for espaco in espacos])
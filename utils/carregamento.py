@@ -0,0 +1,182 @@
+"""Carregamento paginado e paralelo das tabelas do Supabase.
+
+O PostgREST limita a quantidade de linhas devolvidas por requisição, então
+cada tabela é lida em páginas com ``range`` e todas as páginas de todas as
+tabelas são buscadas ao mesmo tempo num pool de threads limitado.
+
+A sincronização incremental usa a coluna ``dataSync`` como marca d'água:
+só as linhas alteradas/inseridas depois da última carga são buscadas e
+depois mescladas no snapshot local pela chave ``uuid``.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+# Limite padrão de linhas por requisição do PostgREST (max-rows)
+TAMANHO_PAGINA = 1000
+
+# Número máximo de requisições simultâneas ao Supabase
+MAX_WORKERS = 8
+
+# Coluna de data de sincronização usada como marca d'água no modo incremental
+COLUNA_WATERMARK = "dataSync"
+
+
+def aplicar_filtro(query, filtro):
+    """Aplica o filtro ``(coluna, valor)`` como ``coluna >= valor``."""
+    if filtro is None:
+        return query
+    coluna, valor = filtro
+    return query.gte(coluna, valor)
+
+
+def contar_linhas(client, tabela, filtro=None):
+    """Retorna o número de linhas da tabela ou ``None`` se a contagem falhar."""
+    try:
+        query = client.table(tabela).select("*", count="exact", head=True)
+        response = aplicar_filtro(query, filtro).execute()
+        return response.count
+    except Exception:
+        return None
+
+
+def buscar_intervalo(client, tabela, inicio, fim, coluna_ordem="uuid", filtro=None):
+    """Busca as linhas ``inicio..fim`` (inclusive) da tabela.
+
+    Se o servidor devolver menos linhas que o pedido (max-rows menor que a
+    página), continua buscando a partir de onde parou até completar o intervalo.
+    """
+    linhas = []
+    while inicio <= fim:
+        query = aplicar_filtro(client.table(tabela).select("*"), filtro)
+        if coluna_ordem:
+            query = query.order(coluna_ordem)
+        dados = query.range(inicio, fim).execute().data or []
+        if not dados:
+            break
+        linhas.extend(dados)
+        inicio += len(dados)
+    return linhas
+
+
+def buscar_sequencial(client, tabela, tamanho_pagina=TAMANHO_PAGINA, coluna_ordem="uuid", filtro=None):
+    """Pagina a tabela uma página por vez (usado quando a contagem não está disponível)."""
+    linhas = []
+    inicio = 0
+    while True:
+        pagina = buscar_intervalo(client, tabela, inicio, inicio + tamanho_pagina - 1, coluna_ordem, filtro)
+        linhas.extend(pagina)
+        if len(pagina) < tamanho_pagina:
+            return linhas
+        inicio += tamanho_pagina
+
+
+def carregar_tabelas(client, tabelas, tamanho_pagina=TAMANHO_PAGINA, max_workers=MAX_WORKERS, coluna_ordem="uuid", filtros=None):
+    """Carrega várias tabelas em paralelo, paginando cada uma.
+
+    ``filtros`` opcional ``{tabela: (coluna, valor)}`` restringe a busca às
+    linhas com ``coluna >= valor``.
+
+    Retorna ``(dataframes, relatorio)``: um dicionário ``{tabela: DataFrame}`` e
+    um DataFrame com linhas, páginas, tempo e eventual erro de cada tabela.
+    Tabelas com erro voltam como DataFrame vazio.
+    """
+    filtros = filtros or {}
+    inicio_geral = time.perf_counter()
+    paginas = {tabela: {} for tabela in tabelas}
+    fim_tabela = {tabela: inicio_geral for tabela in tabelas}
+    erros = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # 1️⃣ Conta as linhas de todas as tabelas ao mesmo tempo
+        contagens = dict(zip(tabelas, executor.map(lambda t: contar_linhas(client, t, filtros.get(t)), tabelas)))
+
+        # 2️⃣ Dispara todas as páginas de todas as tabelas no mesmo pool
+        futuros = {}
+        for tabela, total in contagens.items():
+            if total is None:
+                futuro = executor.submit(buscar_sequencial, client, tabela, tamanho_pagina, coluna_ordem, filtros.get(tabela))
+                futuros[futuro] = (tabela, 0)
+                continue
+            for ordem, inicio in enumerate(range(0, total, tamanho_pagina)):
+                fim = min(inicio + tamanho_pagina, total) - 1
+                futuro = executor.submit(buscar_intervalo, client, tabela, inicio, fim, coluna_ordem, filtros.get(tabela))
+                futuros[futuro] = (tabela, ordem)
+
+        # 3️⃣ Junta as páginas conforme forem chegando
+        for futuro in as_completed(futuros):
+            tabela, ordem = futuros[futuro]
+            fim_tabela[tabela] = max(fim_tabela[tabela], time.perf_counter())
+            try:
+                paginas[tabela][ordem] = futuro.result()
+            except Exception as e:
+                erros.setdefault(tabela, str(e))
+
+    dataframes = {}
+    relatorio = []
+    for tabela in tabelas:
+        if tabela in erros:
+            dataframes[tabela] = pd.DataFrame()
+        else:
+            linhas = [linha for ordem in sorted(paginas[tabela]) for linha in paginas[tabela][ordem]]
+            dataframes[tabela] = pd.DataFrame(linhas)
+
+        relatorio.append({
+            "Tabela": tabela,
+            "Linhas": len(dataframes[tabela]),
+            "Páginas": len(paginas[tabela]),
+            "Tempo (s)": round(fim_tabela[tabela] - inicio_geral, 2),
+            "Erro": erros.get(tabela, ""),
+        })
+
+    return dataframes, pd.DataFrame(relatorio)
+
+
+def mesclar_por_chave(base, novos, chave="uuid"):
+    """Mescla as linhas novas no snapshot; linhas com a mesma chave são substituídas."""
+    if novos is None or novos.empty:
+        return base
+    if base is None or base.empty:
+        return novos
+    mesclado = pd.concat([base, novos], ignore_index=True)
+    return mesclado.drop_duplicates(subset=chave, keep="last").reset_index(drop=True)
+
+
+def sincronizar_tabelas(client, snapshots, tabelas, coluna_watermark=COLUNA_WATERMARK, chave="uuid", **kwargs):
+    """Atualiza os snapshots buscando só as linhas alteradas desde a última carga.
+
+    A marca d'água de cada tabela é o maior valor de ``coluna_watermark`` no
+    snapshot. Tabelas sem snapshot ou sem a coluna são recarregadas por
+    completo. Linhas excluídas no banco não são detectadas; para isso use a
+    carga completa.
+
+    Retorna ``(dataframes, relatorio)`` no mesmo formato de ``carregar_tabelas``,
+    com as colunas extras ``Modo`` e ``Total``.
+    """
+    filtros = {}
+    for tabela in tabelas:
+        base = snapshots.get(tabela)
+        if base is None or base.empty or coluna_watermark not in base.columns or chave not in base.columns:
+            continue
+        marca = base[coluna_watermark].max()
+        if pd.notna(marca):
+            filtros[tabela] = (coluna_watermark, marca)
+
+    novos, relatorio = carregar_tabelas(client, tabelas, filtros=filtros, **kwargs)
+
+    dataframes = {}
+    for tabela, erro in zip(relatorio["Tabela"], relatorio["Erro"]):
+        base = snapshots.get(tabela)
+        if erro and base is not None:
+            # 🛟 Em caso de erro mantém o snapshot anterior
+            dataframes[tabela] = base
+        elif tabela in filtros:
+            dataframes[tabela] = mesclar_por_chave(base, novos[tabela], chave)
+        else:
+            dataframes[tabela] = novos[tabela]
+
+    relatorio["Modo"] = ["incremental" if tabela in filtros else "completo" for tabela in relatorio["Tabela"]]
+    relatorio["Total"] = [len(dataframes[tabela]) for tabela in relatorio["Tabela"]]
+    return dataframes, relatorio
@@ -0,0 +1,47 @@
+"""Registro de tabelas mescladas compartilhado por todas as sessões do processo.
+
+Cada sessão do Streamlit guarda no ``session_state`` só uma referência para o
+``RegistroMerged`` da versão de dados que carregou; sessões com a mesma versão
+(mesma carga do Supabase ou mesmo snapshot em disco) apontam para o mesmo
+objeto, e o snapshot gravado a partir de uma carga aponta para o registro
+dessa carga (``apelidar_registro``). O registro sai da memória sozinho quando nenhuma sessão o referencia
+mais (contagem de referências do Python via ``weakref``).
+
+Os DataFrames compartilhados são somente leitura: quem for alterar uma tabela
+deve trabalhar numa cópia (as páginas já fazem ``df.copy()`` antes de mexer).
+"""
+
+import threading
+import weakref
+
+from utils.dimensoes import RegistroMerged
+
+_lock = threading.Lock()
+_registros = weakref.WeakValueDictionary()
+
+
+def obter_registro(versao):
+    """Retorna o registro já publicado para ``versao`` ou ``None``."""
+    with _lock:
+        return _registros.get(versao)
+
+
+def publicar_registro(versao, dataframes, materializados=None):
+    """Retorna o registro compartilhado de ``versao``, criando-o se ainda não existir."""
+    with _lock:
+        registro = _registros.get(versao)
+        if registro is None:
+            registro = RegistroMerged(dataframes, materializados, versao=versao)
+            _registros[versao] = registro
+        return registro
+
+
+def apelidar_registro(versao, registro):
+    """Publica ``registro`` (já existente) também sob ``versao``.
+
+    Usado depois de gravar o snapshot em disco: as sessões que aquecerem a
+    partir dele (``disco-…``) reaproveitam o registro da carga, em vez de
+    ler o Parquet para um segundo registro com os mesmos dados.
+    """
+    with _lock:
+        return _registros.setdefault(versao, registro)
@@ -0,0 +1,119 @@
+"""Dimensão de local compartilhada pelas tabelas de avaliação.
+
+Em vez de mesclar cada ``avNTratamentoSoja`` cinco vezes (avaliação, fazenda,
+usuário, cidade e estado), a cadeia ``avaliacao → fazenda → users → cidade →
+estado`` é desnormalizada uma única vez numa tabela pequena com uma linha por
+avaliação. Cada tabela de avaliação faz então um único join por ``avaliacaoRef``.
+
+O resultado tem as mesmas colunas, na mesma ordem, que a cadeia de merges
+original (incluindo ``uuid_x``/``uuid_y``), então as páginas não mudam.
+
+``RegistroMerged`` monta essas tabelas sob demanda: cada página só paga pelas
+tabelas de avaliação que realmente lê.
+"""
+
+import threading
+from collections.abc import Mapping
+
+TABELAS_AV = [
+    "av1TratamentoSoja", "av2TratamentoSoja", "av3TratamentoSoja", "av4TratamentoSoja",
+    "av5TratamentoSoja", "av6TratamentoSoja", "av7TratamentoSoja",
+]
+
+# Sufixo das chaves de ``merged_dataframes`` usadas pelas páginas
+SUFIXO_MERGED = "_Avaliacao_Fazenda_Users_Cidade_Estado"
+
+COLUNAS_AVALIACAO = ["uuid", "fazendaRef", "tipoAvaliacao", "avaliado"]
+
+# (tabela, coluna de referência que aponta para o uuid dela, colunas trazidas)
+CADEIA_LOCAL = [
+    ("fazenda", "fazendaRef", ["nomeFazenda", "nomeProdutor", "latitude", "longitude", "altitude", "regional",
+                               "dataPlantio", "dataColheita", "dtcResponsavelRef", "cidadeRef"]),
+    ("users", "dtcResponsavelRef", ["displayName"]),
+    ("cidade", "cidadeRef", ["nomeCidade", "estadoRef"]),
+    ("estado", "estadoRef", ["codigoEstado", "nomeEstado"]),
+]
+
+
+def montar_dimensao_local(avaliacao, fazenda, users, cidade, estado):
+    """Desnormaliza avaliação → fazenda → usuário → cidade → estado.
+
+    Retorna um DataFrame com uma linha por avaliação (coluna ``uuid``) ou
+    ``None`` se alguma das tabelas estiver ausente.
+    """
+    tabelas = {"fazenda": fazenda, "users": users, "cidade": cidade, "estado": estado}
+    if avaliacao is None or avaliacao.empty or any(df is None for df in tabelas.values()):
+        return None
+
+    dimensao = avaliacao[COLUNAS_AVALIACAO]
+    for nome, referencia, colunas in CADEIA_LOCAL:
+        lookup = tabelas[nome][["uuid"] + colunas].rename(columns={"uuid": referencia})
+        dimensao = dimensao.merge(lookup, on=referencia, how="left")
+    return dimensao
+
+
+def juntar_dimensao_local(df, dimensao):
+    """Traz as colunas de local para uma tabela de avaliação num único join."""
+    if df is None or df.empty or dimensao is None:
+        return None
+    return df.merge(
+        dimensao,
+        left_on="avaliacaoRef",
+        right_on="uuid",
+        how="left"
+    ).drop(columns=["uuid"], errors="ignore")
+
+
+class RegistroMerged(Mapping):
+    """Dicionário preguiçoso ``{f"{tabela}{SUFIXO_MERGED}": DataFrame}``.
+
+    Cada tabela mesclada só é montada na primeira vez que alguma página a pede
+    (``registro.get(chave)``) e fica memorizada enquanto ``dataframes`` for o
+    mesmo. A dimensão de local também é montada uma única vez, sob demanda.
+    O registro pode ser compartilhado entre sessões (ver ``utils.compartilhado``).
+    """
+
+    def __init__(self, dataframes, materializados=None, versao=None):
+        self.dataframes = dataframes
+        # Chave de publicação (``supabase-…``, ``sync-…``, ``disco-…``); None se montado localmente
+        self.versao = versao
+        self._dimensao = None
+        self._cache = dict(materializados or {})
+        self._lock = threading.RLock()
+
+    def dimensao(self):
+        with self._lock:
+            if self._dimensao is None:
+                self._dimensao = montar_dimensao_local(
+                    *(self.dataframes.get(nome) for nome in ["avaliacao", "fazenda", "users", "cidade", "estado"])
+                )
+            return self._dimensao
+
+    def __getitem__(self, chave):
+        with self._lock:
+            if chave not in self._cache:
+                if not chave.endswith(SUFIXO_MERGED) or chave[:-len(SUFIXO_MERGED)] not in TABELAS_AV:
+                    raise KeyError(chave)
+                tabela = chave[:-len(SUFIXO_MERGED)]
+                self._cache[chave] = juntar_dimensao_local(self.dataframes.get(tabela), self.dimensao())
+            return self._cache[chave]
+
+    def __iter__(self):
+        return (f"{tabela}{SUFIXO_MERGED}" for tabela in TABELAS_AV)
+
+    def __len__(self):
+        return len(TABELAS_AV)
+
+    def materializados(self):
+        """Só as tabelas já montadas (usado ao gravar o cache em disco)."""
+        with self._lock:
+            return dict(self._cache)
+
+
+def registro_da_sessao(session_state, dataframes):
+    """Reaproveita o registro da sessão se ele foi montado sobre os mesmos ``dataframes``."""
+    registro = session_state.get("merged_dataframes")
+    if not isinstance(registro, RegistroMerged) or registro.dataframes is not dataframes:
+        registro = RegistroMerged(dataframes)
+        session_state["merged_dataframes"] = registro
+    return registro
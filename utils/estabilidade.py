@@ -0,0 +1,63 @@
+"""Estabilidade pelo índice ambiental (Finlay–Wilkinson / Eberhart–Russell).
+
+O índice ambiental de cada local é a média de produção de todos os materiais
+naquele local. Para cada cultivar, ajusta-se ``produção = a + b * índice``
+com mínimos quadrados em forma fechada, agrupando por cultivar: as somas de
+produtos cruzados saem de um único ``groupby``, sem um modelo por cultivar.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+COLUNAS_ESTABILIDADE = ["Cultivar", "Locais", "Media", "Intercepto", "Inclinacao", "R2", "Desvio_Regressao"]
+
+
+def indice_ambiental(df, coluna_ambiente="FazendaRef", coluna_resposta="prod_sc_ha"):
+    """Média da resposta por ambiente, alinhada às linhas de ``df``."""
+    return df.groupby(coluna_ambiente)[coluna_resposta].transform("mean")
+
+
+@st.cache_data(show_spinner=False)
+def calcular_estabilidade(df, coluna_ambiente="FazendaRef", coluna_cultivar="Cultivar", coluna_resposta="prod_sc_ha"):
+    """Regressão de cada cultivar sobre o índice ambiental, todas de uma vez.
+
+    Retorna um DataFrame com ``COLUNAS_ESTABILIDADE``: número de locais
+    (observações), média, intercepto ``a``, inclinação ``b`` (adaptabilidade),
+    ``R2`` e o desvio da regressão (quadrado médio do resíduo, ``s²d`` sem
+    descontar o erro experimental). Cultivares com menos de duas observações
+    ou com um único valor de índice ficam com ``NaN`` nos coeficientes.
+    """
+    dados = pd.DataFrame({
+        "Cultivar": df[coluna_cultivar],
+        "x": indice_ambiental(df, coluna_ambiente, coluna_resposta),
+        "y": df[coluna_resposta],
+    }).dropna()
+
+    grupos = dados.groupby("Cultivar")
+    n = grupos["y"].size()
+    media_x = grupos["x"].mean()
+    media_y = grupos["y"].mean()
+
+    # Desvios em relação à média do próprio cultivar (duas passadas, mais estável)
+    dx = dados["x"] - dados["Cultivar"].map(media_x)
+    dy = dados["y"] - dados["Cultivar"].map(media_y)
+    somas = pd.DataFrame({"Cultivar": dados["Cultivar"], "sxx": dx * dx, "sxy": dx * dy, "syy": dy * dy}).groupby("Cultivar").sum()
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sxx = somas["sxx"].where(somas["sxx"] > 0)
+        inclinacao = somas["sxy"] / sxx
+        intercepto = media_y - inclinacao * media_x
+        ss_residuo = (somas["syy"] - inclinacao * somas["sxy"]).clip(lower=0)
+        r2 = 1 - ss_residuo / somas["syy"]
+        desvio = ss_residuo / (n - 2).where(n > 2)
+
+    return pd.DataFrame({
+        "Cultivar": n.index,
+        "Locais": n.to_numpy(),
+        "Media": media_y.to_numpy(),
+        "Intercepto": intercepto.to_numpy(),
+        "Inclinacao": inclinacao.to_numpy(),
+        "R2": r2.to_numpy(),
+        "Desvio_Regressao": desvio.to_numpy(),
+    }, columns=COLUNAS_ESTABILIDADE)
@@ -0,0 +1,203 @@
+"""Exportação de DataFrames para Excel, CSV e Parquet sob demanda.
+
+O arquivo só é gerado quando o usuário clica em "Gerar" (e não a cada
+rerun do Streamlit) e é escrito direto num arquivo temporário em disco:
+
+- Excel usa o modo ``constant_memory`` do xlsxwriter, gravando linha a linha
+  em blocos de ``TAMANHO_BLOCO`` linhas, sem montar a planilha inteira na memória;
+- CSV é escrito em blocos pelo próprio pandas (``chunksize``);
+- Parquet é escrito com o pyarrow.
+
+O download lê o arquivo já pronto, sem ``BytesIO`` nem ``.getvalue()``. Nos
+reruns seguintes o arquivo vale enquanto a ``versao`` passada pela página
+(ou, sem ela, o hash do conteúdo) não mudar.
+"""
+
+import os
+import tempfile
+import time
+from datetime import date, datetime
+
+import pandas as pd
+import streamlit as st
+import xlsxwriter
+
+# Linhas convertidas por vez na escrita do Excel/CSV
+TAMANHO_BLOCO = 5000
+
+# Pasta dos arquivos gerados e tempo (segundos) até serem apagados
+DIRETORIO_EXPORTACAO = os.path.join(tempfile.gettempdir(), "jaum_exportacoes")
+IDADE_MAXIMA = 60 * 60
+
+FORMATOS = {
+    "xlsx": ("Excel (.xlsx)", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("CSV (.csv)", "text/csv"),
+    "parquet": ("Parquet (.parquet)", "application/octet-stream"),
+}
+
+
+def _valor_excel(valor):
+    """Converte tipos que o xlsxwriter não entende (listas, dicts, uuid...) em texto."""
+    if valor is None or isinstance(valor, (str, bool, int, float, datetime, date)):
+        return valor
+    return str(valor)
+
+
+def _bloco_excel(bloco):
+    bloco = bloco.copy()
+    for coluna in bloco.columns:
+        serie = bloco[coluna]
+        texto_livre = serie.dtype == object
+        if isinstance(serie.dtype, pd.DatetimeTZDtype):
+            serie = serie.dt.tz_localize(None)
+        serie = serie.astype(object).where(serie.notna(), None)
+        if texto_livre:
+            serie = serie.map(_valor_excel)
+        bloco[coluna] = serie
+    return bloco
+
+
+def escrever_excel(df, caminho, nome_aba="dados", tamanho_bloco=TAMANHO_BLOCO):
+    """Grava ``df`` em .xlsx com o xlsxwriter em modo ``constant_memory``."""
+    workbook = xlsxwriter.Workbook(caminho, {
+        "constant_memory": True,
+        "nan_inf_to_errors": True,
+        "strings_to_urls": False,
+        "default_date_format": "dd/mm/yyyy hh:mm:ss",
+    })
+    try:
+        worksheet = workbook.add_worksheet(nome_aba[:31])
+        cabecalho = workbook.add_format({"bold": True})
+        worksheet.write_row(0, 0, [str(coluna) for coluna in df.columns], cabecalho)
+
+        linha = 1
+        for inicio in range(0, len(df), tamanho_bloco):
+            bloco = _bloco_excel(df.iloc[inicio:inicio + tamanho_bloco])
+            for valores in bloco.itertuples(index=False, name=None):
+                worksheet.write_row(linha, 0, valores)
+                linha += 1
+    finally:
+        workbook.close()
+
+
+def escrever_csv(df, caminho, tamanho_bloco=TAMANHO_BLOCO):
+    # utf-8-sig para o Excel abrir os acentos corretamente
+    df.to_csv(caminho, index=False, encoding="utf-8-sig", chunksize=tamanho_bloco)
+
+
+def escrever_parquet(df, caminho):
+    try:
+        df.to_parquet(caminho, index=False)
+    except Exception:
+        # Colunas com tipos misturados (ex.: jsonb) vão como texto
+        df = df.copy()
+        for coluna in df.columns[df.dtypes == object]:
+            df[coluna] = df[coluna].map(lambda v: v if v is None or isinstance(v, str) else str(v))
+        df.to_parquet(caminho, index=False)
+
+
+def gerar_arquivo(df, formato, nome_aba="dados"):
+    """Grava ``df`` num arquivo temporário no ``formato`` pedido e retorna o caminho."""
+    os.makedirs(DIRETORIO_EXPORTACAO, exist_ok=True)
+    limpar_exportacoes_antigas()
+    descritor, caminho = tempfile.mkstemp(suffix=f".{formato}", dir=DIRETORIO_EXPORTACAO)
+    os.close(descritor)
+    try:
+        if formato == "xlsx":
+            escrever_excel(df, caminho, nome_aba)
+        elif formato == "csv":
+            escrever_csv(df, caminho)
+        elif formato == "parquet":
+            escrever_parquet(df, caminho)
+        else:
+            raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    except Exception:
+        os.remove(caminho)
+        raise
+    return caminho
+
+
+def limpar_exportacoes_antigas(idade_maxima=IDADE_MAXIMA):
+    """Apaga arquivos gerados há mais de ``idade_maxima`` segundos (sessões encerradas)."""
+    limite = time.time() - idade_maxima
+    try:
+        arquivos = os.scandir(DIRETORIO_EXPORTACAO)
+    except OSError:
+        return
+    for arquivo in arquivos:
+        try:
+            if arquivo.is_file() and arquivo.stat().st_mtime < limite:
+                os.remove(arquivo.path)
+        except OSError:
+            pass
+
+
+def _assinatura(df):
+    """Forma, colunas, tipos e hash (vetorizado) de todo o conteúdo do DataFrame."""
+    try:
+        conteudo = int(pd.util.hash_pandas_object(df, index=False).sum())
+    except TypeError:
+        conteudo = None
+    return (df.shape, tuple(map(str, df.columns)), tuple(map(str, df.dtypes)), conteudo)
+
+
+def botao_exportar(fonte, nome_arquivo, chave, label, formatos=("xlsx",), nome_aba="dados", versao=None):
+    """Botão "Gerar" + download: o arquivo só é montado quando o usuário pede.
+
+    ``fonte`` é o DataFrame a exportar ou uma função sem argumentos que o
+    devolve. ``chave`` identifica a exportação no ``session_state`` e deve
+    ser única no app. O arquivo fica disponível enquanto o formato e
+    ``versao`` não mudarem; sem ``versao``, enquanto o conteúdo de ``fonte``
+    (``_assinatura``) não mudar. Com ``versao`` a função só é
+    chamada no clique de "Gerar".
+    """
+    estado = f"exportacao_{chave}"
+    if len(formatos) > 1:
+        formato = st.radio(
+            "Formato", formatos, horizontal=True, key=f"{estado}_formato",
+            format_func=lambda f: FORMATOS[f][0]
+        )
+    else:
+        formato = formatos[0]
+
+    resolvido = []
+
+    def obter_df():
+        if not resolvido:
+            resolvido.append(fonte() if callable(fonte) else fonte)
+        return resolvido[0]
+
+    def assinatura():
+        return (formato, versao if versao is not None else _assinatura(obter_df()))
+
+    gerado = st.session_state.get(estado)
+    if gerado is not None and (
+        not os.path.exists(gerado["caminho"])
+        or gerado["assinatura"] != assinatura()
+    ):
+        _descartar(gerado)
+        gerado = st.session_state[estado] = None
+
+    if gerado is None:
+        if not st.button(f"⚙️ Gerar {nome_arquivo}.{formato}", key=f"{estado}_gerar"):
+            return
+        with st.spinner("Gerando arquivo..."):
+            df = obter_df()
+            caminho = gerar_arquivo(df, formato, nome_aba)
+        gerado = st.session_state[estado] = {"assinatura": assinatura(), "caminho": caminho}
+
+    with open(gerado["caminho"], "rb") as arquivo:
+        st.download_button(
+            label=label,
+            data=arquivo,
+            file_name=f"{nome_arquivo}.{formato}",
+            mime=FORMATOS[formato][1],
+            key=f"{estado}_baixar"
+        )
+
+
+def _descartar(gerado):
+    try:
+        os.remove(gerado["caminho"])
+    except OSError:
+        pass
@@ -0,0 +1,329 @@
+"""Motor de filtros em cascata com códigos categóricos e bitmaps por valor.
+
+Filtrar com ``df = df[df[coluna].isin(selecionados)]`` a cada passo copia o
+DataFrame inteiro e recalcula ``unique()`` sobre a cópia. ``IndiceFiltros``
+faz o trabalho pesado uma vez por conjunto de dados: cada coluna categórica
+vira códigos inteiros (``pd.factorize``) e cada valor ganha um bitmap
+compactado (``np.packbits``, 1 bit por linha).
+
+Uma ``ConsultaFiltros`` guarda só o bitmap das linhas que passaram até agora:
+
+- a seleção de uma coluna é o OU dos bitmaps dos valores escolhidos (ou o
+  complemento dos não escolhidos, o que for mais curto), combinada por E;
+- ``opcoes`` devolve a contagem (faceta) de cada valor ainda presente, na
+  ordem de primeira aparição, como o ``unique()`` do DataFrame filtrado;
+- ``resultado`` materializa as linhas uma única vez, no final.
+
+``painel_filtros`` é o painel de filtros das páginas de avaliação (checkboxes
+em cascata + slider de GM). A seleção fica numa só chave do
+``session_state`` (``ESTADO_SELECAO``) e vale para todas as páginas. As
+máscaras de cada passo da cascata são memorizadas por (versão dos dados,
+seleções até ali) num LRU da sessão (``ESTADO_MASCARAS``): voltar a uma página
+ou abrir outra com os mesmos dados não refaz a filtragem. A versão vem do
+registro publicado na carga (``versao_sessao``), não do conteúdo do DataFrame.
+
+Colunas com mais de ``LIMITE_CHECKBOXES`` opções (produtores, fazendas,
+cultivares) trocam a lista de checkboxes por uma busca (``utils.busca``, um
+índice por coluna montado uma vez por versão dos dados): só os primeiros
+``MAX_VISIVEIS`` resultados viram widgets e "Marcar todos" age sobre todo o
+resultado da busca.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.busca import IndiceBusca
+from utils.cache_escopo import espaco_cache
+
+# Seleção compartilhada entre as páginas: {coluna: [valores]} e {"GM": (min, max)}
+ESTADO_SELECAO = "filtros_selecao"
+# LRU das máscaras e opções da cascata, por versão dos dados e seleção
+ESTADO_MASCARAS = "filtros_mascaras"
+MAX_MASCARAS = 64
+
+# Acima deste número de opções a coluna usa a busca em vez de um checkbox por valor
+LIMITE_CHECKBOXES = 25
+# Resultados da busca exibidos como checkbox de cada vez
+MAX_VISIVEIS = 25
+
+
+class IndiceFiltros:
+    """Códigos e bitmaps das ``colunas`` categóricas de ``df`` (somente leitura)."""
+
+    def __init__(self, df, colunas):
+        self.df = df
+        self.n_linhas = len(df)
+        self.n_bytes = (self.n_linhas + 7) // 8
+        self.codigos = {}
+        self.valores = {}
+        self.bitmaps = {}
+        self.presentes = {}
+
+        linhas = np.arange(self.n_linhas)
+        bits = (0x80 >> (linhas & 7)).astype(np.uint8)
+        for coluna in colunas:
+            if coluna not in df.columns:
+                continue
+            # NaN vira o código -1 e fica fora de todos os bitmaps
+            codigos, valores = pd.factorize(df[coluna], sort=False)
+            validos = codigos >= 0
+            bitmaps = np.zeros((len(valores), self.n_bytes), dtype=np.uint8)
+            np.bitwise_or.at(bitmaps, (codigos[validos], linhas[validos] >> 3), bits[validos])
+            self.codigos[coluna] = codigos
+            self.valores[coluna] = pd.Index(valores)
+            self.bitmaps[coluna] = bitmaps
+            self.presentes[coluna] = np.packbits(validos)
+
+        self.todas = np.packbits(np.ones(self.n_linhas, dtype=bool))
+        self._buscas = {}
+
+    def busca(self, coluna):
+        """``IndiceBusca`` dos valores de ``coluna`` (montado na primeira busca)."""
+        if coluna not in self._buscas:
+            self._buscas[coluna] = IndiceBusca(self.valores[coluna])
+        return self._buscas[coluna]
+
+    def consulta(self):
+        """Nova consulta partindo de todas as linhas."""
+        return ConsultaFiltros(self)
+
+
+class ConsultaFiltros:
+    """Estado de uma cascata de filtros sobre um ``IndiceFiltros``."""
+
+    def __init__(self, indice, mascara=None):
+        self.indice = indice
+        self.mascara = (indice.todas if mascara is None else mascara).copy()
+
+    def linhas(self):
+        """Máscara booleana (uma posição por linha) das linhas que passaram."""
+        return np.unpackbits(self.mascara, count=self.indice.n_linhas).astype(bool)
+
+    def n_linhas(self):
+        return int(np.unpackbits(self.mascara, count=self.indice.n_linhas).sum())
+
+    def opcoes(self, coluna):
+        """Contagem de linhas por valor de ``coluna`` entre as linhas que passaram.
+
+        Série indexada pelos valores (só os presentes), na ordem de primeira
+        aparição nas linhas filtradas.
+        """
+        codigos = self.indice.codigos[coluna][self.linhas()]
+        codigos = codigos[codigos >= 0]
+        presentes, primeira = np.unique(codigos, return_index=True)
+        presentes = presentes[np.argsort(primeira, kind="stable")]
+        contagens = np.bincount(codigos, minlength=len(self.indice.valores[coluna]))
+        return pd.Series(contagens[presentes], index=self.indice.valores[coluna][presentes], name=coluna)
+
+    def filtrar(self, coluna, selecionados):
+        """Mantém só as linhas cujo valor de ``coluna`` está em ``selecionados``."""
+        posicoes = self.indice.valores[coluna].get_indexer(pd.Index(selecionados).unique())
+        escolhidos = np.zeros(len(self.indice.valores[coluna]), dtype=bool)
+        escolhidos[posicoes[posicoes >= 0]] = True
+        bitmaps = self.indice.bitmaps[coluna]
+
+        # O OU de um conjunto vazio de bitmaps é zero (identidade do bitwise_or)
+        if escolhidos.sum() <= len(escolhidos) // 2:
+            selecao = np.bitwise_or.reduce(bitmaps[escolhidos], axis=0)
+        else:
+            # Mais barato tirar os não escolhidos das linhas com valor
+            selecao = self.indice.presentes[coluna] & ~np.bitwise_or.reduce(bitmaps[~escolhidos], axis=0)
+        self.mascara &= selecao
+        return self
+
+    def filtrar_faixa(self, coluna, minimo, maximo):
+        """Mantém só as linhas com ``minimo <= coluna <= maximo``."""
+        serie = self.indice.df[coluna]
+        dentro = ((serie >= minimo) & (serie <= maximo)).to_numpy(dtype=bool, na_value=False)
+        self.mascara &= np.packbits(dentro)
+        return self
+
+    def serie(self, coluna):
+        """Valores de ``coluna`` nas linhas que passaram (sem copiar o DataFrame)."""
+        return self.indice.df[coluna][self.linhas()]
+
+    def resultado(self):
+        """DataFrame com as linhas que passaram em todos os filtros."""
+        return self.indice.df[self.linhas()]
+
+
+def versao_sessao(*derivacao):
+    """Versão dos dados da sessão para ``painel_filtros``, sem olhar o conteúdo.
+
+    Junta a versão do registro publicado (``supabase-…``, ``sync-…``,
+    ``disco-…``) com ``derivacao``, que identifica a tabela e como a página
+    a preparou (ex.: ``("av7", "faixa")``). Páginas com a mesma derivação
+    compartilham índice e máscaras. Sem registro publicado a versão fica
+    ``None`` e ``painel_filtros`` usa o hash do conteúdo.
+    """
+    registro = st.session_state.get("merged_dataframes")
+    return (getattr(registro, "versao", None),) + derivacao
+
+
+def versao_conteudo(versao, df):
+    """``versao`` de ``versao_sessao`` ou, sem registro publicado, o hash de ``df``.
+
+    O ``id()`` do registro não serve: o Python o reaproveita depois do GC.
+    Conteúdo que não dá para hashear vira uma versão nova a cada chamada.
+    """
+    if versao[0] is not None:
+        return versao
+    try:
+        conteudo = int(pd.util.hash_pandas_object(df).sum())
+    except TypeError:
+        conteudo = object()
+    return (("conteudo", conteudo),) + versao[1:]
+
+
+@espaco_cache("filtros", max_entradas=16).memorizar(recurso=True)
+def indice_filtros(versao, _df, colunas):
+    """``IndiceFiltros`` compartilhado por todas as sessões com a mesma ``versao`` dos dados.
+
+    ``_df`` não entra na chave do cache: a versão identifica o conteúdo.
+    """
+    return IndiceFiltros(_df, colunas)
+
+
+def _memorizado(cache, chave, calcular):
+    if chave in cache:
+        cache.move_to_end(chave)
+        return cache[chave]
+    valor = cache[chave] = calcular()
+    while len(cache) > MAX_MASCARAS:
+        cache.popitem(last=False)
+    return valor
+
+
+def _selecao_checkboxes(coluna, opcoes, selecao):
+    """Um checkbox por opção, iniciado pela seleção compartilhada; devolve os marcados."""
+    marcados = []
+    for op in opcoes:
+        chave = f"filtro_{coluna}_{op}"
+        if chave not in st.session_state:
+            st.session_state[chave] = op in selecao
+        if st.checkbox(str(op), key=chave):
+            marcados.append(op)
+    return marcados
+
+
+def _marcar_resultados(coluna, valores, marcar):
+    # Callback dos botões da busca: roda antes do rerun, então os checkboxes são recriados já atualizados
+    selecao = st.session_state.setdefault(ESTADO_SELECAO, {})
+    valores_set = set(valores)
+    mantidos = [op for op in selecao.get(coluna, ()) if op not in valores_set]
+    selecao[coluna] = mantidos + list(valores) if marcar else mantidos
+    for op in valores:
+        st.session_state.pop(f"filtro_{coluna}_{op}", None)
+
+
+def _selecao_busca(indice, coluna, opcoes, selecao):
+    """Busca com checkboxes só para os primeiros ``MAX_VISIVEIS`` resultados.
+
+    Devolve os marcados entre ``opcoes``: os visíveis conforme os checkboxes,
+    os demais conforme ``selecao``.
+    """
+    termo = st.text_input("🔎 Buscar", key=f"filtro_{coluna}_busca", placeholder="Parte do nome")
+    achados = indice.busca(coluna).buscar(termo)
+    posicoes = indice.valores[coluna].get_indexer(opcoes)
+    resultados = [op for op, posicao in zip(opcoes, posicoes) if posicao in achados]
+
+    col_marcar, col_desmarcar = st.columns(2)
+    col_marcar.button("✅ Marcar todos", key=f"filtro_{coluna}_marcar", on_click=_marcar_resultados,
+                      args=(coluna, resultados, True), disabled=not resultados)
+    col_desmarcar.button("🧹 Desmarcar", key=f"filtro_{coluna}_desmarcar", on_click=_marcar_resultados,
+                         args=(coluna, resultados, False), disabled=not resultados)
+
+    visiveis = resultados[:MAX_VISIVEIS]
+    marcados_visiveis = set(_selecao_checkboxes(coluna, visiveis, selecao))
+    visiveis = set(visiveis)
+    marcados = [op for op in opcoes if op in marcados_visiveis or (op not in visiveis and op in selecao)]
+
+    if len(resultados) > MAX_VISIVEIS:
+        st.caption(f"Mostrando {MAX_VISIVEIS} de {len(resultados)} resultados; refine a busca.")
+    elif not resultados:
+        st.caption("Nenhum resultado.")
+    if marcados:
+        st.caption(f"{len(marcados)} selecionado(s)")
+    return marcados
+
+
+def _slider_gm(indice, mascara, selecao, rotulo, gm_unico):
+    """Slider de GM sobre as linhas de ``mascara``; devolve a faixa a aplicar ou ``None``.
+
+    A faixa é aplicada mesmo quando cobre todos os valores (como o
+    ``between`` das páginas, descarta as linhas sem GM). Com um único valor,
+    ``gm_unico="filtrar"`` mantém só esse valor e ``"manter"`` não filtra.
+    """
+    gm = ConsultaFiltros(indice, mascara).serie("GM").dropna()
+    if gm.empty:
+        return None
+    gm_min, gm_max = int(gm.min()), int(gm.max())
+    if gm_min == gm_max:
+        st.info(f"Apenas um valor de GM disponível: {gm_min}")
+        return (gm_min, gm_min) if gm_unico == "filtrar" else None
+
+    atual = st.session_state.get("filtro_GM")
+    if atual is not None and tuple(atual) != st.session_state.get("filtro_GM_exibido"):
+        faixa = tuple(atual)  # movido pelo usuário neste rerun
+    else:
+        # None = faixa inteira, que acompanha os dados filtrados
+        faixa = selecao.get("GM") or (gm_min, gm_max)
+    faixa = (min(max(faixa[0], gm_min), gm_max), max(min(faixa[1], gm_max), gm_min))
+    if atual is None or tuple(atual) != faixa:
+        st.session_state["filtro_GM"] = faixa
+    faixa = tuple(st.slider(rotulo, gm_min, gm_max, step=1, key="filtro_GM"))
+    st.session_state["filtro_GM_exibido"] = faixa
+    selecao["GM"] = None if faixa == (gm_min, gm_max) else faixa
+    return faixa
+
+
+def painel_filtros(df, filtros, versao, rotulo_gm="Intervalo de GM", gm_unico="manter"):
+    """Filtros em cascata (um expander de checkboxes por coluna) e slider de GM.
+
+    ``filtros`` mapeia coluna -> rótulo, na ordem da cascata; colunas
+    ausentes em ``df`` são ignoradas e ``"GM"`` vira o slider na sua posição
+    (ver ``_slider_gm``). Colunas com muitas opções usam a busca
+    (``LIMITE_CHECKBOXES``). Coluna sem nada marcado não filtra.
+
+    ``versao`` (de ``versao_sessao``) identifica o conteúdo de ``df`` e é a
+    chave do índice e das máscaras: nada é recalculado por conteúdo a cada
+    rerun (só quando a versão do registro é ``None``). A seleção é lida e gravada em ``ESTADO_SELECAO``; valores que não
+    aparecem nesta página continuam selecionados para as outras. Retorna as
+    linhas de ``df`` que passaram, com ``attrs["versao_filtros"]`` = versão
+    dos dados + filtros aplicados (ex.: ``versao`` de ``botao_exportar``).
+    """
+    colunas = [coluna for coluna in filtros if coluna in df.columns]
+    versao = (versao_conteudo(versao, df[colunas]), len(df))
+    indice = indice_filtros(versao, df, [coluna for coluna in colunas if coluna != "GM"])
+    selecao = st.session_state.setdefault(ESTADO_SELECAO, {})
+    cache = st.session_state.setdefault(ESTADO_MASCARAS, OrderedDict())
+
+    passos = ()
+    mascara = indice.todas
+    for coluna in colunas:
+        consulta = ConsultaFiltros(indice, mascara)
+        if coluna == "GM":
+            faixa = _slider_gm(indice, mascara, selecao, rotulo_gm, gm_unico)
+            if faixa is not None:
+                passos += (("GM", faixa),)
+                mascara = _memorizado(cache, (versao, passos), lambda: consulta.filtrar_faixa("GM", *faixa).mascara)
+            continue
+
+        opcoes = _memorizado(cache, (versao, passos, coluna), lambda: sorted(consulta.opcoes(coluna).index))
+        with st.expander(filtros[coluna]):
+            if len(opcoes) > LIMITE_CHECKBOXES:
+                marcados = _selecao_busca(indice, coluna, opcoes, set(selecao.get(coluna, ())))
+            else:
+                marcados = _selecao_checkboxes(coluna, opcoes, set(selecao.get(coluna, ())))
+        # Mantém o que foi escolhido em outras páginas e não aparece aqui
+        selecao[coluna] = [op for op in selecao.get(coluna, ()) if op not in opcoes] + marcados
+        if marcados:
+            passos += ((coluna, tuple(marcados)),)
+            mascara = _memorizado(cache, (versao, passos), lambda: consulta.filtrar(coluna, marcados).mascara)
+
+    filtrado = df[np.unpackbits(mascara, count=len(df)).astype(bool)]
+    filtrado.attrs["versao_filtros"] = (versao, passos)
+    return filtrado
@@ -0,0 +1,284 @@
+"""Gráficos de distribuição reutilizados pelas páginas (histograma + densidade).
+
+A curva de densidade usa um KDE gaussiano "binado": a amostra é distribuída
+(interpolação linear) numa grade regular e convoluída com o kernel por FFT.
+O custo fica em O(n + G log G) para uma grade de ``G`` pontos, em vez de
+O(n · pontos) do ``scipy.stats.gaussian_kde`` avaliado ponto a ponto. A
+largura de banda é a mesma regra de Scott do ``gaussian_kde``.
+
+``calcular_densidade`` é memorizada com ``st.cache_data``: como a chave é o
+conteúdo da série, cada combinação coluna + filtros é calculada uma vez só.
+Os gráficos ficam em seções adiadas (``utils.secoes``): só são montados
+depois que o usuário abre a seção.
+
+Dispersões grandes (``tracos_dispersao``) usam traços WebGL e, acima de
+``LIMITE_PONTOS``, os pontos são agregados numa grade: cada célula ocupada
+vira um ponto na média da célula, com tamanho proporcional à contagem. O
+navegador recebe no máximo uma fração da amostra; regressões e demais
+estatísticas continuam calculadas com todos os dados pela página.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+from scipy.signal import fftconvolve
+
+from utils.secoes import figura_em_cache, secao_adiada
+
+# Pontos da grade do KDE binado e pontos da curva desenhada
+PONTOS_GRADE = 2048
+PONTOS_CURVA = 500
+
+# Acima deste número de pontos a dispersão é agregada numa grade de classes x classes
+LIMITE_PONTOS = 5000
+CLASSES_DISPERSAO = 150
+
+
+def kde_binado(valores, pontos=PONTOS_CURVA, pontos_grade=PONTOS_GRADE):
+    """KDE gaussiano (banda de Scott) avaliado em ``pontos`` entre o mínimo e o máximo.
+
+    Retorna ``(x, densidade)``.
+    """
+    valores = np.asarray(valores, dtype=float)
+    n = len(valores)
+    banda = valores.std(ddof=1) * n ** (-1 / 5)
+
+    inicio = valores.min() - 4 * banda
+    fim = valores.max() + 4 * banda
+    grade, passo = np.linspace(inicio, fim, pontos_grade, retstep=True)
+
+    # Binagem linear: cada observação divide o peso entre os dois nós vizinhos
+    posicao = (valores - inicio) / passo
+    esquerda = np.clip(np.floor(posicao).astype(int), 0, pontos_grade - 2)
+    fracao = posicao - esquerda
+    contagens = np.bincount(esquerda, weights=1 - fracao, minlength=pontos_grade)
+    contagens += np.bincount(esquerda + 1, weights=fracao, minlength=pontos_grade)
+
+    alcance = int(np.ceil(4 * banda / passo))
+    deslocamentos = np.arange(-alcance, alcance + 1) * passo
+    kernel = np.exp(-0.5 * (deslocamentos / banda) ** 2) / (banda * np.sqrt(2 * np.pi))
+    densidade = fftconvolve(contagens, kernel, mode="same") / n
+
+    x = np.linspace(valores.min(), valores.max(), pontos)
+    return x, np.interp(x, grade, np.clip(densidade, 0, None))
+
+
+@st.cache_data(show_spinner=False)
+def calcular_densidade(serie):
+    """Valores válidos (> 0), média e curva KDE de ``serie`` (memorizado por conteúdo).
+
+    Retorna ``(x_data, media, x_vals, y_vals)``; ``x_vals``/``y_vals`` são
+    ``None`` quando não há dados suficientes ou variação para a densidade.
+    """
+    x_data = pd.to_numeric(serie, errors="coerce").dropna()
+    x_data = x_data[x_data > 0]
+    media = x_data.mean()
+    if len(x_data) > 1 and x_data.std() > 0:
+        x_vals, y_vals = kde_binado(x_data.to_numpy())
+        return x_data, media, x_vals, y_vals
+    return x_data, media, None, None
+
+
+def figura_histograma(x_data, media, x_vals, y_vals, titulo, titulo_x):
+    """Histograma (50 classes) com a curva de densidade e a linha da média."""
+    fig_hist = go.Figure()
+
+    fig_hist.add_trace(go.Histogram(
+        x=x_data,
+        nbinsx=50,
+        name="Frequência",
+        marker_color="lightblue",
+        marker_line_color="black",
+        marker_line_width=1.5,
+        opacity=0.75,
+        yaxis="y"
+    ))
+
+    if x_vals is not None:
+        fig_hist.add_trace(go.Scatter(
+            x=x_vals,
+            y=y_vals,
+            mode="lines",
+            name="Densidade",
+            line=dict(color="darkblue", width=2),
+            yaxis="y2"
+        ))
+
+    # Linha da média
+    fig_hist.add_trace(go.Scatter(
+        x=[media, media],
+        y=[0, y_vals.max() if y_vals is not None else 1],
+        mode="lines",
+        name=f"Média: {media:.1f}",
+        line=dict(color="red", width=2, dash="dash"),
+        yaxis="y2"
+    ))
+
+    font_bold = dict(size=16, family="Arial Bold", color="black")
+
+    fig_hist.update_layout(
+        title=dict(text=titulo, font=font_bold),
+        xaxis=dict(
+            title=dict(text=titulo_x, font=font_bold),
+            tickfont=dict(family="Arial", size=20, color="black"),
+            showgrid=True,
+            gridcolor="lightgray",
+        ),
+        yaxis=dict(
+            title=dict(text="Frequência", font=font_bold),
+            tickfont=dict(family="Arial", size=20, color="black"),
+            showgrid=True,
+            gridcolor="lightgray"
+        ),
+        yaxis2=dict(
+            title=dict(text="Densidade", font=font_bold),
+            tickfont=dict(family="Arial", size=20, color="black"),
+            overlaying="y",
+            side="right",
+            showgrid=False
+        ),
+        plot_bgcolor="white",
+        bargap=0.1,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1,
+            font=dict(size=16, family="Arial", color="black")
+        )
+    )
+    return fig_hist
+
+
+def histograma_densidade(serie, rotulo, titulo, titulo_x, chave, versao):
+    """Seção adiada com o histograma + densidade de ``serie`` (só valores > 0).
+
+    Nada é calculado enquanto a seção ``chave`` não for aberta; a figura só
+    é refeita quando ``versao`` (ver ``figura_em_cache``) muda.
+    """
+    with secao_adiada(rotulo, chave) as aberta:
+        if not aberta:
+            return
+
+        def construir():
+            x_data, media, x_vals, y_vals = calcular_densidade(serie)
+            if x_data.empty:
+                return None, x_vals is None
+            return figura_histograma(x_data, media, x_vals, y_vals, titulo, titulo_x), x_vals is None
+
+        fig_hist, sem_densidade = figura_em_cache(chave, versao, construir)
+        if sem_densidade:
+            st.warning("⚠️ Dados insuficientes ou sem variação para calcular a curva de densidade.")
+        if fig_hist is not None:
+            st.plotly_chart(fig_hist, use_container_width=True)
+
+
+def figura_boxplot(serie, nome, titulo, titulo_x):
+    """Box plot horizontal com a média (``boxmean``) e os outliers."""
+    fig_box = go.Figure()
+
+    fig_box.add_trace(go.Box(
+        x=serie,
+        name=nome,
+        boxpoints="outliers",
+        fillcolor="lightblue",
+        marker_color="lightblue",
+        line=dict(color="black", width=1),
+        boxmean=True
+    ))
+
+    font_bold = dict(size=20, family="Arial Bold", color="black")
+
+    fig_box.update_layout(
+        title=dict(text=titulo, font=font_bold),
+        xaxis=dict(
+            title=dict(text=titulo_x, font=font_bold),
+            tickfont=font_bold,
+            showgrid=True,
+            gridcolor="lightgray"
+        ),
+        yaxis=dict(
+            title=dict(text="Observações", font=font_bold),
+            tickfont=font_bold,
+            showgrid=True,
+            gridcolor="lightgray"
+        ),
+        legend=dict(
+            font=font_bold,
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        plot_bgcolor="white",
+        showlegend=True
+    )
+    return fig_box
+
+
+def boxplot_variavel(serie, rotulo, nome, titulo, titulo_x, chave, versao):
+    """Seção adiada com o box plot de ``serie`` (refeito só quando ``versao`` muda)."""
+    with secao_adiada(rotulo, chave) as aberta:
+        if aberta:
+            fig_box = figura_em_cache(chave, versao, lambda: figura_boxplot(serie, nome, titulo, titulo_x))
+            st.plotly_chart(fig_box, use_container_width=True)
+
+
+def agregar_pontos(x, y, limites_x, limites_y, classes=CLASSES_DISPERSAO):
+    """Agrega ``(x, y)`` numa grade ``classes`` x ``classes`` sobre os limites dados.
+
+    Retorna ``(x_medio, y_medio, contagem)`` das células ocupadas.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    def _classe(valores, limites):
+        inicio, fim = limites
+        largura = (fim - inicio) or 1.0
+        return np.clip(((valores - inicio) / largura * classes).astype(int), 0, classes - 1)
+
+    celulas = _classe(x, limites_x) * classes + _classe(y, limites_y)
+    _, inverso = np.unique(celulas, return_inverse=True)
+    contagem = np.bincount(inverso)
+    return np.bincount(inverso, weights=x) / contagem, np.bincount(inverso, weights=y) / contagem, contagem
+
+
+def tracos_dispersao(df, x, y, grupo=None, cores=None, rotulos=None, limite=LIMITE_PONTOS):
+    """Traços ``Scattergl`` de ``df[x]`` x ``df[y]``, um por valor de ``grupo``.
+
+    Até ``limite`` pontos no total, todos são enviados. Acima disso cada
+    grupo é agregado por ``agregar_pontos`` (grade comum a todos os grupos) e
+    o tamanho do marcador cresce com o nº de observações da célula.
+    ``cores`` mapeia grupo -> cor e ``rotulos`` coluna -> texto do hover.
+    """
+    rotulos = rotulos or {}
+    rotulo_x, rotulo_y = rotulos.get(x, x), rotulos.get(y, y)
+    agregar = len(df) > limite
+    limites_x = (df[x].min(), df[x].max())
+    limites_y = (df[y].min(), df[y].max())
+
+    grupos = df.groupby(grupo, sort=False) if grupo is not None else [(None, df)]
+    tracos = []
+    for nome, dados in grupos:
+        marcador = dict(color=(cores or {}).get(nome))
+        if agregar:
+            x_pts, y_pts, contagem = agregar_pontos(dados[x], dados[y], limites_x, limites_y)
+            marcador["size"] = np.clip(4 + 2 * np.sqrt(contagem), 4, 20)
+            hover = f"{rotulo_x}: %{{x:.1f}}<br>{rotulo_y}: %{{y:.1f}}<br>Observações: %{{customdata}}<extra></extra>"
+        else:
+            x_pts, y_pts, contagem = dados[x].to_numpy(), dados[y].to_numpy(), None
+            hover = f"{rotulo_x}: %{{x}}<br>{rotulo_y}: %{{y}}<extra></extra>"
+        tracos.append(go.Scattergl(
+            x=x_pts,
+            y=y_pts,
+            mode="markers",
+            name=str(nome) if nome is not None else rotulo_y,
+            marker=marcador,
+            customdata=contagem,
+            hovertemplate=hover,
+            showlegend=nome is not None
+        ))
+    return tracos
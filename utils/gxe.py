@@ -0,0 +1,136 @@
+"""Interação genótipo x ambiente: biplots GGE e AMMI da matriz Local x Cultivar.
+
+A matriz de produção média (cultivar x local) é montada uma vez. Células sem
+dado são preenchidas por imputação iterativa (EM-AMMI): parte-se dos efeitos
+aditivos e, a cada passo, as células ausentes recebem o valor ajustado pelo
+modelo aditivo + os primeiros componentes da interação, até estabilizar.
+
+A decomposição usa SVD truncada (``randomized_svd`` do scikit-learn quando a
+matriz é grande), que só calcula os poucos componentes do biplot.
+
+- GGE: matriz centrada pela média de cada local (G + GE);
+- AMMI: matriz duplamente centrada (só a interação GE).
+
+No GGE, o "quem venceu onde" atribui cada local ao cultivar com maior valor
+previsto pelo biplot (produto escalar dos escores); os locais com o mesmo
+vencedor formam um mega-ambiente.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from sklearn.utils.extmath import randomized_svd
+
+MODELOS_GXE = ["GGE", "AMMI"]
+
+
+def matriz_local_cultivar(df, coluna_local="Local", coluna_cultivar="Cultivar", coluna_resposta="prod_sc_ha", minimo_observacoes=2):
+    """Média da resposta por cultivar (linhas) x local (colunas).
+
+    Cultivares e locais com menos de ``minimo_observacoes`` células preenchidas
+    são descartados (repetidamente, até todos atenderem ao mínimo).
+    """
+    matriz = df.pivot_table(index=coluna_cultivar, columns=coluna_local, values=coluna_resposta, aggfunc="mean")
+    while not matriz.empty:
+        linhas = matriz.notna().sum(axis=1) >= minimo_observacoes
+        colunas = matriz.notna().sum(axis=0) >= minimo_observacoes
+        if linhas.all() and colunas.all():
+            break
+        matriz = matriz.loc[linhas, colunas]
+    return matriz
+
+
+def svd_truncada(matriz, componentes, semente=0):
+    """Primeiros ``componentes`` valores/vetores singulares de ``matriz``."""
+    menor = min(matriz.shape)
+    componentes = min(componentes, menor)
+    if menor <= 4 * componentes + 10:
+        u, s, vt = np.linalg.svd(matriz, full_matrices=False)
+        return u[:, :componentes], s[:componentes], vt[:componentes]
+    return randomized_svd(matriz, componentes, n_iter=7, random_state=semente)
+
+
+def _efeitos_aditivos(matriz):
+    geral = matriz.mean()
+    return matriz.mean(axis=1, keepdims=True) + matriz.mean(axis=0, keepdims=True) - geral
+
+
+def imputar_matriz(matriz, componentes=2, max_iter=50, tolerancia=1e-4):
+    """Preenche os ``NaN`` de ``matriz`` (array) por EM-AMMI com ``componentes`` eixos.
+
+    Retorna ``(matriz_completa, iteracoes, convergiu)``; ``convergiu`` é
+    ``False`` quando ``max_iter`` foi atingido sem a mudança nas células
+    imputadas ficar abaixo de ``tolerancia`` (relativa ao desvio da matriz).
+    """
+    matriz = np.array(matriz, dtype=float)
+    faltando = np.isnan(matriz)
+    if not faltando.any():
+        return matriz, 0, True
+
+    geral = np.nanmean(matriz)
+    linhas = np.nanmean(matriz, axis=1, keepdims=True) - geral
+    colunas = np.nanmean(matriz, axis=0, keepdims=True) - geral
+    matriz[faltando] = (geral + linhas + colunas)[faltando]
+    escala = np.nanstd(matriz) or 1.0
+
+    iteracoes, convergiu = 0, False
+    for iteracoes in range(1, max_iter + 1):
+        aditivo = _efeitos_aditivos(matriz)
+        u, s, vt = svd_truncada(matriz - aditivo, componentes)
+        ajuste = aditivo + (u * s) @ vt
+        mudanca = np.sqrt(np.mean((ajuste[faltando] - matriz[faltando]) ** 2))
+        matriz[faltando] = ajuste[faltando]
+        if mudanca < tolerancia * escala:
+            convergiu = True
+            break
+    return matriz, iteracoes, convergiu
+
+
+@st.cache_data(show_spinner=False)
+def analise_gxe(matriz, modelo="GGE", componentes=2):
+    """Biplot GGE ou AMMI da matriz cultivar x local (saída de ``matriz_local_cultivar``).
+
+    Retorna um dict com:
+
+    - ``cultivares``: DataFrame ``Cultivar``, ``Media`` e ``PC1..PCk``;
+    - ``locais``: DataFrame ``Local``, ``Media``, ``PC1..PCk`` e, no GGE,
+      ``Vencedor`` (mega-ambiente);
+    - ``variancia``: % da soma de quadrados explicada por componente;
+    - ``imputados``: nº de células preenchidas; ``iteracoes`` e ``convergiu``
+      da imputação.
+    """
+    completa, iteracoes, convergiu = imputar_matriz(matriz.to_numpy(dtype=float), componentes)
+
+    if modelo == "GGE":
+        centrada = completa - completa.mean(axis=0, keepdims=True)
+    elif modelo == "AMMI":
+        centrada = completa - _efeitos_aditivos(completa)
+    else:
+        raise ValueError(f"Modelo GxE desconhecido: {modelo}")
+
+    u, s, vt = svd_truncada(centrada, componentes)
+    raiz = np.sqrt(s)
+    escores_cultivar = u * raiz
+    escores_local = vt.T * raiz
+    nomes = [f"PC{i + 1}" for i in range(len(s))]
+
+    cultivares = pd.DataFrame(escores_cultivar, columns=nomes)
+    cultivares.insert(0, "Cultivar", matriz.index.to_numpy())
+    cultivares.insert(1, "Media", completa.mean(axis=1))
+
+    locais = pd.DataFrame(escores_local, columns=nomes)
+    locais.insert(0, "Local", matriz.columns.to_numpy())
+    locais.insert(1, "Media", completa.mean(axis=0))
+    if modelo == "GGE":
+        # Quem venceu onde: maior valor previsto pelo biplot em cada local
+        locais["Vencedor"] = matriz.index.to_numpy()[np.argmax(escores_cultivar @ escores_local.T, axis=0)]
+
+    total = float((centrada ** 2).sum())
+    return {
+        "cultivares": cultivares,
+        "locais": locais,
+        "variancia": s ** 2 / total * 100 if total else np.zeros_like(s),
+        "imputados": int(matriz.isna().to_numpy().sum()),
+        "iteracoes": iteracoes,
+        "convergiu": convergiu,
+    }
@@ -0,0 +1,380 @@
+"""Motor vetorizado da análise Head to Head.
+
+Em cada local, todo cultivar é comparado com todos os outros (head x check).
+Em vez de laços aninhados por local e por par de cultivares, os pares são
+montados de uma vez com índices NumPy: as linhas são ordenadas por local e,
+para cada local com ``k`` cultivares, geram-se os ``k * (k - 1)`` pares.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Diferença (sc/ha) abaixo da qual o confronto é considerado empate
+LIMITE_EMPATE = 1
+
+# Nível de confiança dos intervalos da diferença pareada
+CONFIANCA = 0.95
+
+# Até quantas diferenças não nulas o Wilcoxon usa a distribuição exata
+LIMITE_WILCOXON_EXATO = 50
+
+COLUNAS_RESUMO_CHECKS = [
+    "Check", "Number_of_Win", "Number_of_Comparison", "Check_Mean",
+    "Mean_Difference", "CI_Lower", "CI_Upper", "p_t", "p_Sign", "p_Wilcoxon"
+]
+
+COLUNAS_RESULTADO = [
+    "Head", "Check", "Head_Mean", "Check_Mean", "Pop_Final_Head", "Umidade_Head",
+    "Pop_Final_Check", "Umidade_Check", "Difference", "Number_of_Win", "Is_Draw",
+    "Percentage_of_Win", "Number_of_Comparison", "Local"
+]
+
+
+def indices_pares(grupos):
+    """Índices ``(head, check)`` de todos os pares distintos dentro de cada grupo.
+
+    ``grupos`` é um array já ordenado (linhas do mesmo grupo contíguas). Os pares
+    saem na ordem grupo → head → check, sem comparar uma linha com ela mesma.
+    """
+    n = len(grupos)
+    if n == 0:
+        vazio = np.array([], dtype=np.int64)
+        return vazio, vazio
+
+    inicio_grupo = np.flatnonzero(np.r_[True, grupos[1:] != grupos[:-1]])
+    tamanhos = np.diff(np.r_[inicio_grupo, n])
+    tamanho_linha = np.repeat(tamanhos, tamanhos)
+    inicio_linha = np.repeat(inicio_grupo, tamanhos)
+
+    head = np.repeat(np.arange(n), tamanho_linha)
+    deslocamento = np.arange(len(head)) - np.repeat(np.cumsum(tamanho_linha) - tamanho_linha, tamanho_linha)
+    check = np.repeat(inicio_linha, tamanho_linha) + deslocamento
+
+    distintos = head != check
+    return head[distintos], check[distintos]
+
+
+def calcular_head_to_head(df, coluna_prod, coluna_pop, coluna_umid, coluna_local="Local", coluna_cultivar="Cultivar"):
+    """Confrontos head x check de todos os cultivares em cada local.
+
+    Linhas com valores ausentes ou produtividade <= 0 são descartadas e, se um
+    cultivar aparecer mais de uma vez no mesmo local, vale a primeira linha.
+    Retorna um DataFrame com ``COLUNAS_RESULTADO``, ordenado por local.
+    """
+    base = df[[coluna_local, coluna_cultivar, coluna_prod, coluna_pop, coluna_umid]].dropna()
+    base = base[base[coluna_prod] > 0]
+    base = base.drop_duplicates([coluna_local, coluna_cultivar], keep="first")
+    base = base.sort_values(coluna_local, kind="stable")
+
+    locais = base[coluna_local].to_numpy()
+    cultivares = base[coluna_cultivar].to_numpy()
+    prod = base[coluna_prod].to_numpy(dtype=float)
+    pop = base[coluna_pop].to_numpy(dtype=float)
+    umid = base[coluna_umid].to_numpy(dtype=float)
+
+    head, check = indices_pares(locais)
+    diferenca = prod[head] - prod[check]
+    vitoria = (diferenca > LIMITE_EMPATE).astype(int)
+
+    return pd.DataFrame({
+        "Head": cultivares[head],
+        "Check": cultivares[check],
+        "Head_Mean": np.round(prod[head], 1),
+        "Check_Mean": np.round(prod[check], 1),
+        "Pop_Final_Head": np.round(pop[head], 0),
+        "Umidade_Head": np.round(umid[head], 1),
+        "Pop_Final_Check": np.round(pop[check], 0),
+        "Umidade_Check": np.round(umid[check], 1),
+        "Difference": np.round(diferenca, 1),
+        "Number_of_Win": vitoria,
+        "Is_Draw": ((diferenca >= -LIMITE_EMPATE) & (diferenca <= LIMITE_EMPATE)).astype(int),
+        "Percentage_of_Win": vitoria * 100.0,
+        "Number_of_Comparison": 1,
+        "Local": locais[head],
+    }, columns=COLUNAS_RESULTADO)
+
+
+def _distribuicao_wilcoxon(limite=LIMITE_WILCOXON_EXATO):
+    """Tabela ``acumulada[m, t] = P(T+ <= t)`` da estatística de Wilcoxon sem empates.
+
+    Os coeficientes de ``prod (1 + x^j)`` (número de subconjuntos de
+    ``1..m`` com soma ``t``) são montados por programação dinâmica, um ``m``
+    por vez; posições além de ``m (m + 1) / 2`` ficam com 1.
+    """
+    maximo = limite * (limite + 1) // 2
+    contagens = np.zeros(maximo + 1)
+    contagens[0] = 1.0
+    acumulada = np.ones((limite + 1, maximo + 1))
+    for m in range(1, limite + 1):
+        contagens[m:] = contagens[m:] + contagens[:-m].copy()
+        acumulada[m] = np.minimum(np.cumsum(contagens) / 2.0 ** m, 1.0)
+    return acumulada
+
+
+_ACUMULADA_WILCOXON = _distribuicao_wilcoxon()
+
+
+def testes_pareados(grupos, diferencas, n_grupos, confianca=CONFIANCA):
+    """Testes pareados de todos os grupos (pares head x check) numa passada só.
+
+    ``grupos`` indica a qual grupo (``0 .. n_grupos - 1``) pertence cada
+    diferença; diferenças ``NaN`` são ignoradas. Retorna um dict de arrays com
+    ``n_grupos`` posições:
+
+    - ``n``, ``media``, ``ic_inf``/``ic_sup``: diferença média e intervalo t;
+    - ``p_t``: t pareado bilateral;
+    - ``p_sinal``: teste do sinal exato (binomial), sem os empates exatos;
+    - ``p_wilcoxon``: postos sinalizados de Wilcoxon, exato (como
+      ``method="exact"`` do scipy) nos grupos com até
+      ``LIMITE_WILCOXON_EXATO`` diferenças não nulas e sem empates; nos
+      demais, aproximação normal com correção de empates (``method="approx"``).
+
+    Grupos sem dados suficientes ficam com ``NaN``.
+    """
+    validos = ~np.isnan(diferencas)
+    grupos, diferencas = grupos[validos], diferencas[validos]
+
+    def total(pesos=None):
+        return np.bincount(grupos, weights=pesos, minlength=n_grupos)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # t pareado e intervalo de confiança
+        n = total()
+        media = total(diferencas) / n
+        variancia = total((diferencas - media[grupos]) ** 2) / (n - 1)
+        erro = np.sqrt(variancia / n)
+        gl = np.where(n > 1, n - 1, np.nan)
+        p_t = 2 * stats.t.sf(np.abs(media / erro), gl)
+        margem = stats.t.ppf(0.5 + confianca / 2, gl) * erro
+
+        # Teste do sinal
+        positivos = total((diferencas > 0).astype(float))
+        negativos = total((diferencas < 0).astype(float))
+        m = positivos + negativos
+        p_sinal = np.minimum(1.0, 2 * stats.binom.cdf(np.minimum(positivos, negativos), m, 0.5))
+        p_sinal[m == 0] = np.nan
+
+        # Wilcoxon: postos de |d| dentro de cada grupo, sem as diferenças nulas
+        nao_nulas = diferencas != 0
+        g, d = grupos[nao_nulas], diferencas[nao_nulas]
+        absolutos = pd.Series(np.abs(d))
+        postos = absolutos.groupby(g).rank(method="average").to_numpy()
+        soma_positivos = np.bincount(g, weights=np.where(d > 0, postos, 0.0), minlength=n_grupos)
+        tamanhos_empates = absolutos.groupby([g, absolutos.to_numpy()]).size()
+        correcao = (tamanhos_empates ** 3 - tamanhos_empates).groupby(level=0).sum()
+        empates = np.zeros(n_grupos)
+        empates[correcao.index.to_numpy(dtype=np.int64)] = correcao.to_numpy(dtype=float)
+        esperado = m * (m + 1) / 4
+        desvio = np.sqrt(m * (m + 1) * (2 * m + 1) / 24 - empates / 48)
+        p_wilcoxon = 2 * stats.norm.sf(np.abs(soma_positivos - esperado) / desvio)
+
+        # Poucos pares: distribuição exata, lida da tabela pelo tamanho m de cada grupo
+        exato = (m > 0) & (m <= LIMITE_WILCOXON_EXATO) & (empates == 0)
+        m_exato = m[exato].astype(np.int64)
+        soma_exata = np.rint(soma_positivos[exato]).astype(np.int64)
+        cauda = np.minimum(soma_exata, m_exato * (m_exato + 1) // 2 - soma_exata)
+        p_wilcoxon[exato] = np.minimum(1.0, 2 * _ACUMULADA_WILCOXON[m_exato, cauda])
+        p_wilcoxon[m == 0] = np.nan
+
+    return {
+        "n": n,
+        "media": media,
+        "ic_inf": media - margem,
+        "ic_sup": media + margem,
+        "p_t": p_t,
+        "p_sinal": p_sinal,
+        "p_wilcoxon": p_wilcoxon,
+    }
+
+
+class CuboHeadToHead:
+    """Resultado do Head to Head organizado por par (head, check).
+
+    As linhas de ``resultado`` (saída de ``calcular_head_to_head``) são
+    reordenadas por par de cultivares e, para cada par, guarda-se o intervalo
+    de linhas (``inicio``/``fim``) e os totais agregados em matrizes
+    ``cultivar x cultivar``. Assim os confrontos de um par são uma fatia
+    (local x head x check esparso) e os resumos saem direto das matrizes, sem
+    filtrar o DataFrame inteiro a cada mudança de seleção. Os testes pareados
+    de todos os pares (``testes_pareados``) são calculados uma vez, na
+    primeira vez que um resumo precisa deles.
+    """
+
+    def __init__(self, resultado):
+        self.resultado = resultado
+        self.cultivares = sorted(pd.unique(pd.concat([resultado["Head"], resultado["Check"]])))
+        self.codigos = {cultivar: codigo for codigo, cultivar in enumerate(self.cultivares)}
+        n = len(self.cultivares)
+
+        head = pd.Categorical(resultado["Head"], categories=self.cultivares).codes.astype(np.int64)
+        check = pd.Categorical(resultado["Check"], categories=self.cultivares).codes.astype(np.int64)
+        par = head * n + check
+        ordem = np.argsort(par, kind="stable")
+        par = par[ordem]
+        self.par = par
+        self._testes = None
+        self.linhas = resultado.iloc[ordem].reset_index(drop=True)
+
+        pares = np.arange(n * n)
+        self.inicio = np.searchsorted(par, pares, side="left").reshape(n, n)
+        self.fim = np.searchsorted(par, pares, side="right").reshape(n, n)
+
+        diferenca = self.linhas["Difference"].to_numpy(dtype=float)
+        vitoria = diferenca > LIMITE_EMPATE
+        derrota = diferenca < -LIMITE_EMPATE
+
+        def total(pesos=None):
+            return np.bincount(par, weights=pesos, minlength=n * n).reshape(n, n)
+
+        self.comparacoes = total(self.linhas["Number_of_Comparison"].to_numpy(dtype=float))
+        self.soma_vitorias = total(self.linhas["Number_of_Win"].to_numpy(dtype=float))
+        self.soma_head = total(self.linhas["Head_Mean"].to_numpy(dtype=float))
+        self.soma_check = total(self.linhas["Check_Mean"].to_numpy(dtype=float))
+        self.vitorias = total(vitoria.astype(float))
+        self.derrotas = total(derrota.astype(float))
+        self.empates = total((~vitoria & ~derrota & ~np.isnan(diferenca)).astype(float))
+        self.soma_diff_vitorias = total(np.where(vitoria, diferenca, 0.0))
+        self.soma_diff_derrotas = total(np.where(derrota, diferenca, 0.0))
+
+        self.max_diff = np.full(n * n, np.nan)
+        self.min_diff = np.full(n * n, np.nan)
+        validos = ~np.isnan(diferenca)
+        np.fmax.at(self.max_diff, par[validos], diferenca[validos])
+        np.fmin.at(self.min_diff, par[validos], diferenca[validos])
+        self.max_diff = self.max_diff.reshape(n, n)
+        self.min_diff = self.min_diff.reshape(n, n)
+
+    def testes(self):
+        """Matrizes ``cultivar x cultivar`` de ``testes_pareados`` sobre ``Difference``."""
+        if self._testes is None:
+            n = len(self.cultivares)
+            testes = testes_pareados(self.par, self.linhas["Difference"].to_numpy(dtype=float), n * n)
+            self._testes = {nome: valores.reshape(n, n) for nome, valores in testes.items()}
+        return self._testes
+
+    def _par(self, head, check):
+        return self.codigos.get(head), self.codigos.get(check)
+
+    def confrontos(self, head, check):
+        """Linhas (uma por local) do confronto ``head`` x ``check``."""
+        h, c = self._par(head, check)
+        if h is None or c is None:
+            return self.linhas.iloc[0:0]
+        return self.linhas.iloc[self.inicio[h, c]:self.fim[h, c]]
+
+    def resumo_par(self, head, check):
+        """Totais do confronto ``head`` x ``check`` usados nos cards da página."""
+        h, c = self._par(head, check)
+        if h is None or c is None or self.fim[h, c] == self.inicio[h, c]:
+            return {"num_locais": 0, "vitorias": 0, "derrotas": 0, "empates": 0,
+                    "max_diff": 0, "min_diff": 0, "media_diff_vitorias": np.nan, "media_diff_derrotas": np.nan}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                "num_locais": self.confrontos(head, check)["Local"].nunique(),
+                "vitorias": int(self.vitorias[h, c]),
+                "derrotas": int(self.derrotas[h, c]),
+                "empates": int(self.empates[h, c]),
+                "max_diff": self.max_diff[h, c],
+                "min_diff": self.min_diff[h, c],
+                "media_diff_vitorias": self.soma_diff_vitorias[h, c] / self.vitorias[h, c],
+                "media_diff_derrotas": self.soma_diff_derrotas[h, c] / self.derrotas[h, c],
+            }
+
+    def resumo_checks(self, head, checks):
+        """Soma de vitórias/comparações e média do check para ``head`` contra cada um dos ``checks``.
+
+        Traz também a diferença pareada média (head - check), seu intervalo de
+        confiança e os p-valores do t pareado, do sinal e de Wilcoxon.
+        Equivale a filtrar o resultado por ``head`` e ``checks`` e agrupar por
+        ``Check`` (checks sem confronto ficam de fora). Retorna
+        ``(resumo, media_head)``; ``media_head`` é a média de ``Head_Mean``
+        nas linhas filtradas (``NaN`` se não houver nenhuma).
+        """
+        h = self.codigos.get(head)
+        codigos = sorted(self.codigos[c] for c in checks if c in self.codigos)
+        if h is None or not codigos:
+            return pd.DataFrame(columns=COLUNAS_RESUMO_CHECKS), np.nan
+
+        codigos = np.array(codigos)
+        comparacoes = self.comparacoes[h, codigos]
+        com_dados = comparacoes > 0
+        codigos, comparacoes = codigos[com_dados], comparacoes[com_dados]
+        if len(codigos) == 0:
+            return pd.DataFrame(columns=COLUNAS_RESUMO_CHECKS), np.nan
+
+        resumo = pd.DataFrame({
+            "Check": [self.cultivares[c] for c in codigos],
+            "Number_of_Win": self.soma_vitorias[h, codigos].astype(int),
+            "Number_of_Comparison": comparacoes.astype(int),
+            "Check_Mean": self.soma_check[h, codigos] / comparacoes,
+        })
+        testes = self.testes()
+        resumo["Mean_Difference"] = testes["media"][h, codigos]
+        resumo["CI_Lower"] = testes["ic_inf"][h, codigos]
+        resumo["CI_Upper"] = testes["ic_sup"][h, codigos]
+        resumo["p_t"] = testes["p_t"][h, codigos]
+        resumo["p_Sign"] = testes["p_sinal"][h, codigos]
+        resumo["p_Wilcoxon"] = testes["p_wilcoxon"][h, codigos]
+        media_head = self.soma_head[h, codigos].sum() / comparacoes.sum()
+        return resumo, media_head
+
+
+class CacheHeadToHead:
+    """Head to Head incremental: guarda o resultado de cada local separadamente.
+
+    A chave de cada local é ``(local, assinatura)``, em que a assinatura é um
+    hash das linhas que entram no cálculo daquele local (na ordem em que
+    aparecem). Quando os filtros mudam, só os locais cujas linhas mudaram (ou
+    que nunca foram calculados) passam pelo ``calcular_head_to_head``; os
+    demais são reaproveitados.
+    """
+
+    # Acima disso, entradas que não foram usadas na última chamada são descartadas
+    MAX_ENTRADAS = 20000
+
+    def __init__(self):
+        self._por_local = {}
+        self._ultimo = (None, None)
+
+    def calcular(self, df, coluna_prod, coluna_pop, coluna_umid, coluna_local="Local", coluna_cultivar="Cultivar"):
+        """Mesmo resultado de ``calcular_head_to_head``, recalculando só os locais alterados."""
+        colunas = [coluna_local, coluna_cultivar, coluna_prod, coluna_pop, coluna_umid]
+        base = df[colunas].dropna()
+        base = base[base[coluna_prod] > 0]
+        base = base.drop_duplicates([coluna_local, coluna_cultivar], keep="first")
+
+        # Assinatura por local sensível à ordem (a ordem define a ordem dos pares)
+        hashes = pd.util.hash_pandas_object(base, index=False).to_numpy(dtype=np.uint64)
+        posicao = base.groupby(coluna_local, sort=False).cumcount().to_numpy(dtype=np.uint64) + np.uint64(1)
+        with np.errstate(over="ignore"):
+            pesos = hashes * (posicao * np.uint64(0x9E3779B97F4A7C15))
+        assinaturas = pd.Series(pesos, index=base.index).groupby(base[coluna_local].to_numpy()).sum()
+
+        chaves = tuple(zip(assinaturas.index, assinaturas.to_numpy()))
+        if self._ultimo[0] == chaves:
+            return self._ultimo[1]
+
+        faltando = {local for local, assinatura in chaves if (local, assinatura) not in self._por_local}
+        if faltando:
+            novos = calcular_head_to_head(
+                base[base[coluna_local].isin(faltando)], coluna_prod, coluna_pop, coluna_umid, coluna_local, coluna_cultivar
+            )
+            vazio = novos.iloc[0:0]
+            por_local = dict(tuple(novos.groupby("Local", sort=False)))
+            for local, assinatura in chaves:
+                if local in faltando:
+                    self._por_local[(local, assinatura)] = por_local.get(local, vazio)
+
+        partes = [self._por_local[chave] for chave in chaves]
+        if partes:
+            resultado = pd.concat(partes, ignore_index=True)
+        else:
+            resultado = calcular_head_to_head(base, coluna_prod, coluna_pop, coluna_umid, coluna_local, coluna_cultivar)
+
+        if len(self._por_local) > self.MAX_ENTRADAS:
+            usadas = set(chaves)
+            self._por_local = {chave: valor for chave, valor in self._por_local.items() if chave in usadas}
+
+        self._ultimo = (chaves, resultado)
+        return resultado
@@ -0,0 +1,127 @@
+"""Métricas de produtividade da av7, calculadas uma única vez para todas as páginas.
+
+As páginas de conjunta, head to head, performance e densidade partem da mesma
+derivação da av7 (área da parcela, população, produção corrigida, PMG,
+``ChaveFaixa``, datas e nomes de cultivares). As funções abaixo são
+memorizadas com ``st.cache_data`` pelo hash do DataFrame de origem, então
+trocar de página não refaz as contas. Ficam no espaço de cache ``"av7"``
+(``utils.cache_escopo``), que pode ser limpo sem afetar as outras fontes.
+"""
+
+import pandas as pd
+
+from utils.cache_escopo import espaco_cache
+
+# Poucas versões da av7 convivem no processo (uma por carga do Supabase)
+ESPACO_AV7 = espaco_cache("av7", max_entradas=8)
+
+# Usuários de teste que não entram nas análises
+USUARIOS_EXCLUIDOS = ["raullanconi", "stine"]
+
+COLUNAS_PLANTAS = ["numeroPlantas10Metros1a", "numeroPlantas10Metros2a", "numeroPlantas10Metros3a", "numeroPlantas10Metros4a"]
+
+# Tipos das colunas calculadas por ``calcular_metricas_av7``
+ESQUEMA_METRICAS = {
+    "areaParcela": "float64",
+    "numeroPlantasMedio10m": "float64",
+    "Pop_Final": "float64",
+    "popMediaFinal": "float64",
+    "producaoCorrigida": "float64",
+    "producaoCorrigidaSc": "float64",
+    "PMG_corrigido": "float64",
+    "ChaveFaixa": "object",
+    "dataPlantio": "object",
+    "dataColheita": "object",
+}
+
+COLUNAS_SELECIONADAS = [
+    "nomeFazenda", "nomeProdutor", "regional", "nomeCidade", "codigoEstado", "nomeEstado",
+    "dataPlantio", "dataColheita", "tipoTeste", "populacao", "indexTratamento", "nome", "gm",
+    "areaParcela", "numeroPlantasMedio10m", "Pop_Final", "umidadeParcela", "producaoCorrigida",
+    "producaoCorrigidaSc", "PMG_corrigido", "displayName", "cidadeRef", "fazendaRef", "ChaveFaixa"
+]
+
+COLUNAS_RENOMEADAS = {
+    "nomeFazenda": "Fazenda",
+    "nomeProdutor": "Produtor",
+    "regional": "Microrregiao",
+    "nomeCidade": "Cidade",
+    "codigoEstado": "Estado",
+    "nomeEstado": "UF",
+    "dataPlantio": "Plantio",
+    "dataColheita": "Colheita",
+    "tipoTeste": "Teste",
+    "nome": "Cultivar",
+    "gm": "GM",
+    "indexTratamento": "Index",
+    "areaParcela": "Área Parcela",
+    "numeroPlantasMedio10m": "plts_10m",
+    "Pop_Final": "Pop_Final",
+    "umidadeParcela": "Umidade (%)",
+    "producaoCorrigida": "prod_kg_ha",
+    "producaoCorrigidaSc": "prod_sc_ha",
+    "PMG_corrigido": "PMG",
+    "displayName": "DTC",
+    "cidadeRef": "CidadeRef",
+    "fazendaRef": "FazendaRef",
+    "ChaveFaixa": "ChaveFaixa"
+}
+
+# Nomes de cultivares corrompidos na origem
+SUBSTITUICOES_CULTIVARES = {
+    "B�NUS IPRO": "BÔNUS IPRO",
+    "DOM�NIO IPRO": "DOMÍNIO IPRO",
+    "F�RIA CE": "FÚRIA CE",
+    "V�NUS CE": "VÊNUS CE",
+    "GH 2383 IPRO": "GH 2483 IPRO",
+}
+
+
+@ESPACO_AV7.memorizar
+def calcular_metricas_av7(df_av7):
+    """Colunas calculadas da av7 (nomes originais), sem os usuários de teste.
+
+    Mantém todas as colunas de ``df_av7`` e acrescenta as de ``ESQUEMA_METRICAS``
+    que puderem ser calculadas; as datas saem como texto ``dd/mm/aaaa``.
+    """
+    df = df_av7[~df_av7["displayName"].isin(USUARIOS_EXCLUIDOS)].copy()
+
+    if "numeroLinhas" in df.columns and "comprimentoLinha" in df.columns:
+        df["areaParcela"] = df["numeroLinhas"] * df["comprimentoLinha"] * 0.5
+
+    if all(col in df.columns for col in COLUNAS_PLANTAS):
+        df["numeroPlantasMedio10m"] = df[COLUNAS_PLANTAS].replace(0, pd.NA).mean(axis=1, skipna=True)
+        df["Pop_Final"] = (20000 * df["numeroPlantasMedio10m"]) / 10
+        df["popMediaFinal"] = (10000 / 0.5) * (df["numeroPlantasMedio10m"] / 10)
+
+    if all(col in df.columns for col in ["pesoParcela", "umidadeParcela", "areaParcela"]):
+        df["producaoCorrigida"] = (
+            (df["pesoParcela"] * (100 - df["umidadeParcela"]) / 87) * (10000 / df["areaParcela"])
+        ).astype(float).round(1)
+        df["producaoCorrigidaSc"] = (df["producaoCorrigida"] / 60).astype(float).round(1)
+
+    if all(col in df.columns for col in ["pesoMilGraos", "umidadeAmostraPesoMilGraos"]):
+        df["PMG_corrigido"] = (
+            df["pesoMilGraos"] * ((100 - df["umidadeAmostraPesoMilGraos"]) / 87)
+        ).astype(float).round(1)
+
+    if all(col in df.columns for col in ["fazendaRef", "indexTratamento"]):
+        df["ChaveFaixa"] = df["fazendaRef"].astype(str) + "_" + df["indexTratamento"].astype(str)
+
+    for col in ["dataPlantio", "dataColheita"]:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce", origin="unix", unit="s").dt.strftime("%d/%m/%Y")
+
+    return df.astype({col: tipo for col, tipo in ESQUEMA_METRICAS.items() if col in df.columns})
+
+
+@ESPACO_AV7.memorizar
+def tabela_av7(df_av7):
+    """Tabela de análise da av7: colunas selecionadas, renomeadas e com nomes corrigidos."""
+    df = calcular_metricas_av7(df_av7)
+    df = df[COLUNAS_SELECIONADAS].rename(columns=COLUNAS_RENOMEADAS)
+
+    df["Produtor"] = df["Produtor"].astype(str).str.upper()
+    df["Fazenda"] = df["Fazenda"].astype(str).str.upper()
+    df["Cultivar"] = df["Cultivar"].replace(SUBSTITUICOES_CULTIVARES)
+    return df
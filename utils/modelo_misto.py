@@ -0,0 +1,154 @@
+"""Modelo misto cultivar + fazenda pelas equações de Henderson (esparsas).
+
+Em ensaios desbalanceados (cada cultivar em um conjunto diferente de
+fazendas), a média bruta mistura o efeito do cultivar com o das fazendas em
+que ele foi plantado. Aqui a fazenda entra como efeito aleatório:
+
+    y = X b + Z u + e        u ~ N(0, σ²_f I),  e ~ N(0, σ²_e I)
+
+- BLUE: cultivar fixo (``X`` = indicadora de cultivar), média ajustada para
+  uma fazenda média;
+- BLUP: cultivar também aleatório (``μ + g``), com confiabilidade
+  ``1 - PEV / σ²_g``.
+
+As matrizes de incidência são esparsas. Como o bloco das fazendas nas
+equações de Henderson (``Z'Z + λ I``) é diagonal, ele é absorvido e sobra um
+sistema denso só do tamanho do número de cultivares, resolvido uma vez com
+``np.linalg.solve`` (que dá também a diagonal da inversa, para os erros de
+predição). Os componentes de variância são
+estimados por momentos (Henderson III) a partir da ANOVA aditiva de
+``utils.anova``.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from scipy import sparse
+
+from utils.anova import anova_dois_fatores
+
+# Piso dos componentes de variância, relativo à variância da resposta
+PISO_VARIANCIA = 1e-6
+
+COLUNAS_BLUP = ["Cultivar", "Num_Fazendas", "Media_Bruta", "BLUE", "EP_BLUE", "BLUP", "Confiabilidade", "Rank_BLUP"]
+
+
+def _incidencia(codigos, n_niveis):
+    n = len(codigos)
+    return sparse.csc_matrix((np.ones(n), (np.arange(n), codigos)), shape=(n, n_niveis))
+
+
+def resolver_henderson(W, penalidade_w, Z, lambda_z, y):
+    """Resolve as equações de Henderson absorvendo o efeito aleatório ``Z``.
+
+    ``W`` são as colunas que ficam no sistema (fixos e/ou aleatórios com
+    penalidade ``penalidade_w`` na diagonal) e ``Z`` as do efeito aleatório
+    absorvido, com ``Z'Z + lambda_z I`` diagonal (uma coluna por nível).
+    Retorna ``(solucao, diagonal)``: a solução para as colunas de ``W`` e a
+    diagonal correspondente da inversa da matriz dos coeficientes. Se o
+    sistema for singular, usa mínimos quadrados (``lstsq``).
+    """
+    diagonal_z = np.asarray(Z.sum(axis=0)).ravel() + lambda_z
+    wz = (W.T @ Z).tocsr()
+    wz_escalada = wz.multiply(1 / diagonal_z).tocsr()
+    reduzida = (W.T @ W).toarray() + np.diag(penalidade_w) - (wz_escalada @ wz.T).toarray()
+    lado_direito = W.T @ y - wz_escalada @ (Z.T @ y)
+    # Resolve a solução e a inversa (colunas da identidade) numa chamada só
+    termos = np.column_stack([lado_direito, np.eye(len(reduzida))])
+    try:
+        resultado = np.linalg.solve(reduzida, termos)
+    except np.linalg.LinAlgError:
+        # Sistema singular: solução de mínimos quadrados
+        resultado = np.linalg.lstsq(reduzida, termos, rcond=None)[0]
+    return resultado[:, 0], np.diag(resultado[:, 1:])
+
+
+def componentes_variancia(tabela_anova, codigos_t, codigos_b, n_t, n_b):
+    """Variâncias residual, de tratamento e de bloco por Henderson III.
+
+    Usa as somas de quadrados ajustadas (tipo II) e os coeficientes
+    ``N - Σ n_ij² / n_i.`` (bloco) e ``N - Σ n_ij² / n_.j`` (tratamento).
+    Estimativas negativas são truncadas em zero.
+    """
+    n = len(codigos_t)
+    contagens = pd.Series(1, index=pd.MultiIndex.from_arrays([codigos_t, codigos_b])).groupby(level=[0, 1]).size()
+    n_ij = contagens.to_numpy(dtype=float)
+    n_i = np.bincount(codigos_t, minlength=n_t).astype(float)
+    n_j = np.bincount(codigos_b, minlength=n_b).astype(float)
+    i = contagens.index.get_level_values(0).to_numpy()
+    j = contagens.index.get_level_values(1).to_numpy()
+
+    residuo = tabela_anova.iloc[2]
+    tratamento = tabela_anova.iloc[0]
+    bloco = tabela_anova.iloc[1]
+    sigma_e = residuo["sum_sq"] / residuo["df"] if residuo["df"] > 0 else np.nan
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sigma_b = (bloco["sum_sq"] - bloco["df"] * sigma_e) / (n - np.sum(n_ij ** 2 / n_i[i]))
+        sigma_t = (tratamento["sum_sq"] - tratamento["df"] * sigma_e) / (n - np.sum(n_ij ** 2 / n_j[j]))
+    return sigma_e, max(sigma_t, 0.0), max(sigma_b, 0.0)
+
+
+@st.cache_data(show_spinner=False)
+def blup_cultivares(df, coluna_resposta="prod_sc_ha", coluna_cultivar="Cultivar", coluna_bloco="FazendaRef"):
+    """BLUE e BLUP de cada cultivar com a fazenda como efeito aleatório.
+
+    Retorna ``(tabela, variancias)``: ``tabela`` tem ``COLUNAS_BLUP`` (uma
+    linha por cultivar, ``Rank_BLUP`` = 1 para o maior BLUP) e
+    ``variancias`` é um dict com ``residual``, ``cultivar`` e ``fazenda``
+    (já com o piso ``PISO_VARIANCIA``) e ``ajustadas``, os nomes dos
+    componentes estimados como zero/indefinidos que foram para o piso.
+    Com menos de duas fazendas ou sem resíduo, retorna ``(None, None)``.
+    """
+    dados = df[[coluna_resposta, coluna_cultivar, coluna_bloco]].dropna()
+    if dados.empty or dados[coluna_bloco].nunique() < 2:
+        return None, None
+
+    tabela_anova = anova_dois_fatores(dados, coluna_resposta, coluna_cultivar, coluna_bloco)
+    if not tabela_anova.loc["Residual", "df"] > 0:
+        return None, None
+
+    y = dados[coluna_resposta].to_numpy(dtype=float)
+    codigos_t, cultivares = pd.factorize(dados[coluna_cultivar])
+    codigos_b, _ = pd.factorize(dados[coluna_bloco])
+    n_t, n_b = len(cultivares), codigos_b.max() + 1
+    estimadas = componentes_variancia(tabela_anova, codigos_t, codigos_b, n_t, n_b)
+
+    # Variância nula (ou indefinida) vai para um piso positivo: λ fica finito e,
+    # no efeito aleatório, muito grande (efeito encolhido para zero)
+    piso = PISO_VARIANCIA * (np.var(y) if np.var(y) > 0 else 1.0)
+    ajustadas = [nome for nome, valor in zip(("residual", "cultivar", "fazenda"), estimadas) if not valor > piso]
+    sigma_e, sigma_t, sigma_b = (valor if valor > piso else piso for valor in estimadas)
+
+    X = _incidencia(codigos_t, n_t)
+    Z = _incidencia(codigos_b, n_b)
+    um = sparse.csc_matrix(np.ones((len(y), 1)))
+    lambda_b = sigma_e / sigma_b
+    lambda_t = sigma_e / sigma_t
+
+    # BLUE: cultivar fixo, fazenda aleatória
+    blue, diagonal_blue = resolver_henderson(X, np.zeros(n_t), Z, lambda_b, y)
+
+    # BLUP: μ fixo, cultivar e fazenda aleatórios
+    W = sparse.hstack([um, X]).tocsc()
+    solucao, diagonal_blup = resolver_henderson(W, np.r_[0.0, np.full(n_t, lambda_t)], Z, lambda_b, y)
+    pev_blup = diagonal_blup[1:] * sigma_e
+
+    if "cultivar" in ajustadas:
+        confiabilidade = np.zeros(n_t)
+    else:
+        confiabilidade = np.clip(1 - pev_blup / sigma_t, 0, 1)
+
+    blup = solucao[0] + solucao[1:1 + n_t]
+    tabela = pd.DataFrame({
+        "Cultivar": cultivares.to_numpy(),
+        "Num_Fazendas": dados.groupby(codigos_t)[coluna_bloco].nunique().to_numpy(),
+        "Media_Bruta": np.bincount(codigos_t, weights=y, minlength=n_t) / np.bincount(codigos_t, minlength=n_t),
+        "BLUE": blue,
+        "EP_BLUE": np.sqrt(diagonal_blue * sigma_e),
+        "BLUP": blup,
+        "Confiabilidade": confiabilidade,
+    })
+    tabela["Rank_BLUP"] = tabela["BLUP"].rank(method="min", ascending=False).astype(int)
+    variancias = {"residual": sigma_e, "cultivar": sigma_t, "fazenda": sigma_b, "ajustadas": ajustadas}
+    return tabela[COLUNAS_BLUP], variancias
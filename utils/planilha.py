@@ -0,0 +1,111 @@
+"""Leitura de planilhas Excel com cópia colunar (Parquet) em disco.
+
+Interpretar o XML do ``.xlsx`` é a parte lenta da carga. Na primeira leitura
+a aba é convertida uma vez para Parquet (datas já convertidas, tipos
+preservados) em ``DIRETORIO_PLANILHAS``, junto de um manifesto com o
+``mtime``, o tamanho e o SHA-256 da planilha. Nas leituras seguintes o
+Parquet é aberto com ``memory_map`` enquanto a planilha não mudar:
+
+- ``mtime`` e tamanho iguais: a cópia vale sem reler a planilha;
+- ``mtime`` diferente mas mesmo hash (arquivo copiado/tocado): a cópia vale
+  e o manifesto é atualizado;
+- caso contrário a aba é convertida de novo.
+
+A conversão usa o motor ``calamine`` (pacote ``python-calamine``) quando
+instalado, bem mais rápido que o ``openpyxl``; sem ele, o padrão do pandas.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import python_calamine  # noqa: F401
+    MOTOR_EXCEL = "calamine"
+except ImportError:
+    MOTOR_EXCEL = None
+
+DIRETORIO_PLANILHAS = Path(os.environ.get("JAUM_PLANILHAS_DIR", ".cache_planilhas"))
+
+
+def hash_arquivo(caminho, bloco=1 << 20):
+    """SHA-256 do conteúdo do arquivo (lido em blocos)."""
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for parte in iter(lambda: arquivo.read(bloco), b""):
+            sha.update(parte)
+    return sha.hexdigest()
+
+
+def _gravar_atomico(caminho, escrever):
+    temporario = caminho.with_name(caminho.name + ".tmp")
+    try:
+        escrever(temporario)
+        os.replace(temporario, caminho)
+    finally:
+        temporario.unlink(missing_ok=True)
+
+
+def converter_planilha(caminho, aba, colunas_data=(), motor=MOTOR_EXCEL):
+    """Lê a aba ``aba`` do Excel e converte ``colunas_data`` para datetime."""
+    df = pd.read_excel(caminho, sheet_name=aba, engine=motor)
+    for coluna in colunas_data:
+        if coluna in df.columns:
+            df[coluna] = pd.to_datetime(df[coluna])
+    return df
+
+
+def ler_planilha(caminho, aba, colunas_data=(), diretorio=DIRETORIO_PLANILHAS):
+    """DataFrame da aba ``aba`` de ``caminho``, lido da cópia Parquet quando válida.
+
+    Se a cópia não puder ser gravada (disco somente leitura, tipos que o
+    Parquet não aceita), a planilha é devolvida assim mesmo.
+    """
+    caminho = Path(caminho)
+    estado = os.stat(caminho)
+    base = Path(diretorio) / f"{caminho.stem}.{aba}"
+    arquivo_manifesto = base.with_name(base.name + ".json")
+    arquivo_dados = base.with_name(base.name + ".parquet")
+
+    try:
+        manifesto = json.loads(arquivo_manifesto.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        manifesto = None
+
+    if manifesto is not None and manifesto.get("colunas_data") == list(colunas_data):
+        mesmo_arquivo = manifesto["mtime_ns"] == estado.st_mtime_ns and manifesto["tamanho"] == estado.st_size
+        if not mesmo_arquivo and manifesto["tamanho"] == estado.st_size and manifesto["sha256"] == hash_arquivo(caminho):
+            # 🔁 Conteúdo igual com outro mtime: só atualiza o manifesto
+            manifesto["mtime_ns"] = estado.st_mtime_ns
+            try:
+                _gravar_atomico(arquivo_manifesto, lambda p: p.write_text(json.dumps(manifesto), encoding="utf-8"))
+            except OSError:
+                pass
+            mesmo_arquivo = True
+        if mesmo_arquivo:
+            try:
+                return pd.read_parquet(arquivo_dados, memory_map=True)
+            except Exception:
+                pass
+
+    df = converter_planilha(caminho, aba, colunas_data)
+    manifesto = {
+        "planilha": str(caminho),
+        "aba": aba,
+        "colunas_data": list(colunas_data),
+        "mtime_ns": estado.st_mtime_ns,
+        "tamanho": estado.st_size,
+        "sha256": hash_arquivo(caminho),
+        "motor": MOTOR_EXCEL or "padrao",
+    }
+    try:
+        Path(diretorio).mkdir(parents=True, exist_ok=True)
+        _gravar_atomico(arquivo_dados, lambda p: df.to_parquet(p, index=False))
+        _gravar_atomico(arquivo_manifesto, lambda p: p.write_text(json.dumps(manifesto), encoding="utf-8"))
+    except Exception:
+        # Sem cópia em disco: a próxima leitura converte de novo
+        arquivo_manifesto.unlink(missing_ok=True)
+    return df
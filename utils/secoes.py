@@ -0,0 +1,51 @@
+"""Seções recolhíveis que só montam o conteúdo depois que o usuário as abre.
+
+O ``st.expander`` executa todo o bloco a cada rerun, mesmo fechado (o
+navegador só esconde o resultado). ``secao_adiada`` coloca dentro do expander
+um toggle "Carregar gráfico": enquanto ele estiver desligado, o bloco da
+página não roda (``if aberta:``). Uma seção carregada volta aberta nos reruns
+seguintes.
+
+``figura_em_cache`` guarda a figura já montada de uma seção e só a refaz
+quando a versão das entradas muda (filtros aplicados + widgets da seção);
+reabrir a seção ou qualquer outro rerun não reconstrói o gráfico nem
+percorre os dados.
+"""
+
+from contextlib import contextmanager
+
+import streamlit as st
+
+ROTULO_CARREGAR = "📈 Carregar gráfico"
+
+
+@contextmanager
+def secao_adiada(rotulo, chave):
+    """Expander com toggle de carregamento; devolve ``True`` se a seção foi aberta.
+
+    Uso::
+
+        with secao_adiada("📦 Box Plot", "conjunta_box_pop") as aberta:
+            if aberta:
+                ...  # monta e exibe o gráfico
+
+    ``chave`` identifica a seção no ``session_state`` e deve ser única no app.
+    """
+    estado = f"secao_{chave}"
+    with st.expander(rotulo, expanded=bool(st.session_state.get(estado, False))):
+        yield st.toggle(ROTULO_CARREGAR, key=estado)
+
+
+def figura_em_cache(chave, versao, construir):
+    """Figura da seção ``chave``, refeita com ``construir()`` só quando ``versao`` muda.
+
+    ``versao`` identifica as entradas do gráfico sem olhar o conteúdo: em
+    geral o ``attrs["versao_filtros"]`` do resultado de ``painel_filtros``
+    mais os widgets da seção que mudam a figura. ``construir`` pode devolver
+    a figura ou uma tupla com ela e o que mais a seção exibir.
+    """
+    estado = f"figura_{chave}"
+    salvo = st.session_state.get(estado)
+    if salvo is None or salvo[0] != versao:
+        salvo = st.session_state[estado] = (versao, construir())
+    return salvo[1]